@@ -15,11 +15,13 @@ import json
 from leadership_scraper import LeadershipScraper
 import logging
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import pytz
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from celery.result import AsyncResult
@@ -30,7 +32,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from src.analysis.text_processor import TextProcessor
 from src.visualization.dashboard_generator import DashboardGenerator
 from src.ai.llm_generator import LLMReportGenerator
+from src.ai.llm_registry import llm_generator_registry
 from src.tasks.report_tasks import generate_llm_report_task
+from src.tasks.celery_app import TASK_STORE_REDIS_URL
 from src.export.report_exporter import ReportExporter
 from src.analysis.sentiment_analyzer import SentimentAnalyzer
 from src.analysis.entity_extractor import EntityExtractor
@@ -40,6 +44,7 @@ from src.analysis.investment_evaluator import InvestmentEvaluator
 from src.visualization.map_visualizer import MapVisualizer
 from src.visualization.knowledge_graph_visualizer import KnowledgeGraphVisualizer
 from src.visualization.story_generator import StoryGenerator
+from src.analysis.report_analyses import REPORT_ANALYZERS, run_report_analysis
 from src.analysis.trend_analyzer import TrendAnalyzer
 from src.analysis.comparison_analyzer import ComparisonAnalyzer
 from src.analysis.poi_parser import PoiDocumentParser
@@ -47,6 +52,19 @@ from src.analysis.poi_searcher import BaiduPoiSearcher, PoiDataProcessor, PoiExp
 from src.utils.api_error_handler import api_error_handler, handle_api_error
 from src.utils.notification_service import notification_service
 from src.utils.performance_optimizer import CacheManager
+from src.utils.cache_backends import configure_cache_backends
+from src.utils.task_registry import configure_task_store
+from src.utils.task_progress import configure_task_progress, snapshot_from_result, task_progress
+from src.utils.llm_rate_limiter import configure_llm_rate_limiter, llm_rate_limiter
+from src.utils.database_setup import configure_database, ensure_columns, ensure_indexes, sqlite_engine_options
+from src.utils.pagination import DEFAULT_PAGE_SIZE, keyset_page, page_size
+from src.utils.fulltext_index import (
+    build_match_query,
+    ensure_fulltext_indexes,
+    policy_fulltext_index,
+    wechat_article_fulltext_index,
+)
+from src.utils.report_analysis_cache import report_analysis_cache
 from src.utils.time_utils import utc_to_beijing, format_beijing_time, now_beijing
 from scripts.api_notification_routes import register_notification_routes
 
@@ -80,15 +98,32 @@ app.config['UPLOAD_FOLDER'] = 'data/input'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///industrial_analysis.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# WAL + busy timeout + pool sized per process, see src/utils/database_setup.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 # Initialize extensions
 db = SQLAlchemy(app)
+configure_database(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
 # Initialize leadership scraper
 leadership_scraper = LeadershipScraper()
 
+# Shared caches: memory -> Redis (when configured, one pooled client) -> disk
+configure_cache_backends(os.getenv('CACHE_REDIS_URL') or os.getenv('REDIS_URL'))
+policy_search_cache = CacheManager(ttl=3600, namespace='policy_search')
+# Click counters are shared by every worker: increment()/get_counter() skip the memory tier
+link_stats_cache = CacheManager(ttl=24 * 3600)
+
+# Report generation task state and events, shared by all worker processes
+# The same Redis the Celery workers publish progress to (see celery_app)
+task_store_client = configure_task_store(TASK_STORE_REDIS_URL)
+# Celery task progress snapshots and pub/sub use the same Redis
+configure_task_progress(redis_client=task_store_client)
+# LLM rate limits are shared with the Celery workers through it as well
+configure_llm_rate_limiter(redis_client=task_store_client)
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'txt', 'md', 'json', 'doc', 'docx', 'pdf'}
 
@@ -121,6 +156,14 @@ class User(UserMixin, db.Model):
 
 class Report(db.Model):
     """Report model to track generated reports."""
+    __table_args__ = (
+        # reports_list / api_reports: WHERE user_id = ? ORDER BY created_at DESC
+        db.Index('ix_report_user_created', 'user_id', 'created_at'),
+        # Completed-report listings and the admin view, newest first
+        db.Index('ix_report_status_created', 'status', 'created_at'),
+        db.Index('ix_report_created', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     report_id = db.Column(db.String(100), unique=True, nullable=False)
     title = db.Column(db.String(200))
@@ -132,10 +175,36 @@ class Report(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
     created_at = db.Column(db.DateTime, default=beijing_now)
     completed_at = db.Column(db.DateTime)
+    # Cached result of the report file existence check (None = not checked yet)
+    file_available = db.Column(db.Boolean)
+    file_checked_at = db.Column(db.DateTime)
+
+
+@event.listens_for(Report, 'before_update')
+def _reset_report_file_status(mapper, connection, target):
+    """Re-check the file on the next listing when its path or status changes."""
+    state = db.inspect(target)
+    if state.attrs.file_path.history.has_changes() or state.attrs.status.history.has_changes():
+        if not state.attrs.file_available.history.has_changes():
+            target.file_available = None
+
+
+# Columns the report listings render; avoids loading anything else per row
+REPORT_LIST_COLUMNS = (
+    Report.id, Report.report_id, Report.title, Report.city, Report.industry,
+    Report.report_type, Report.file_path, Report.status, Report.created_at,
+    Report.completed_at, Report.file_available, Report.file_checked_at,
+)
 
 
 class WeChatArticle(db.Model):
     """WeChat article model to store articles from specified WeChat accounts."""
+    __table_args__ = (
+        # fetch_wechat_articles_task looks articles up by URL and upserts on it
+        db.Index('uq_wechat_article_url', 'url', unique=True),
+        db.Index('ix_wechat_article_created', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     content = db.Column(db.Text)  # 存储完整文章内容
@@ -171,6 +240,19 @@ class WeChatArticle(db.Model):
 
 class PolicyAnalysis(db.Model):
     """Policy analysis model to store analyzed policy documents from email URLs."""
+    __table_args__ = (
+        # api_policies: each classification filter, ordered by created_at DESC;
+        # the region/industry ones also serve the DISTINCT counts in api_policy_stats
+        db.Index('ix_policy_region_created', 'classification_region', 'created_at'),
+        db.Index('ix_policy_industry_created', 'classification_industry', 'created_at'),
+        db.Index('ix_policy_year_created', 'classification_year', 'created_at'),
+        db.Index('ix_policy_type_created', 'classification_policy_type', 'created_at'),
+        # Unfiltered listing and the "new this week" count
+        db.Index('ix_policy_created', 'created_at'),
+        # Email ingestion: skip URLs that were already analyzed
+        db.Index('ix_policy_original_url', 'original_url'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)  # 政策标题
     original_url = db.Column(db.String(500))  # 原始URL
@@ -217,6 +299,21 @@ class PolicyAnalysis(db.Model):
         }
 
 
+# Columns PolicyAnalysis.to_dict() reads; list endpoints skip content and JSON blobs
+POLICY_LIST_COLUMNS = (
+    PolicyAnalysis.id, PolicyAnalysis.title, PolicyAnalysis.original_url, PolicyAnalysis.source_type,
+    PolicyAnalysis.content_summary, PolicyAnalysis.classification_region,
+    PolicyAnalysis.classification_industry, PolicyAnalysis.classification_year,
+    PolicyAnalysis.classification_policy_type, PolicyAnalysis.applicability_score,
+    PolicyAnalysis.scraped_at, PolicyAnalysis.analyzed_at, PolicyAnalysis.created_at,
+    PolicyAnalysis.updated_at, PolicyAnalysis.status, PolicyAnalysis.tags,
+)
+
+# Keep the FTS5 search tables in sync with inserts, updates and deletes
+policy_fulltext_index.watch(PolicyAnalysis)
+wechat_article_fulltext_index.watch(WeChatArticle)
+
+
 class QwenProcessingResult(db.Model):
     """Store Qwen text processing results and history"""
     id = db.Column(db.Integer, primary_key=True)
@@ -276,6 +373,18 @@ def init_db():
     """Initialize database and create default admin user."""
     with app.app_context():
         db.create_all()
+        # create_all() skips columns and indexes added to tables that already exist
+        ensure_columns(db)
+        # The unique URL index the WeChat upsert relies on cannot be built over duplicates
+        from src.tasks.wechat_tasks import deduplicate_wechat_articles, has_unique_url_index
+        with db.engine.connect() as conn:
+            missing_url_index = not has_unique_url_index(conn, WeChatArticle.__table__)
+        if missing_url_index:
+            removed = deduplicate_wechat_articles(db.session, WeChatArticle)
+            if removed:
+                logger.info(f"已删除 {removed} 条重复的微信文章，以便创建唯一 URL 索引")
+        ensure_indexes(db)
+        ensure_fulltext_indexes(db)
 
         # Create default admin user if not exists
         if not User.query.filter_by(username='admin').first():
@@ -379,6 +488,47 @@ def _resolve_report_file_path(report_id: str, report: 'Report') -> Optional[Path
         return None
     except Exception:
         return None
+
+
+# How long a cached "file exists" result is trusted before it is re-checked
+REPORT_FILE_RECHECK = timedelta(hours=1)
+
+
+def _report_file_may_exist():
+    """Listing filter: reports whose file exists or whose check is due.
+
+    Rows cached as missing come back once their check is older than
+    REPORT_FILE_RECHECK, so a file that was only briefly unavailable (a network
+    mount hiccup, a regeneration in progress) is not hidden for good.
+    """
+    stale_before = now_beijing().replace(tzinfo=None) - REPORT_FILE_RECHECK
+    return db.or_(
+        Report.file_available.isnot(False),
+        Report.file_checked_at.is_(None),
+        Report.file_checked_at < stale_before,
+    )
+
+
+def _refresh_report_file_status(reports) -> None:
+    """Check the files of reports whose cached status is missing or stale.
+
+    Only the rows passed in are checked, so a listing page stats at most one
+    file per row, and only once per REPORT_FILE_RECHECK.
+    """
+    now = now_beijing().replace(tzinfo=None)
+    changed = False
+    for r in reports:
+        if r.file_available is not None and r.file_checked_at and now - r.file_checked_at < REPORT_FILE_RECHECK:
+            continue
+        r.file_available = _resolve_report_file_path(r.report_id, r) is not None
+        r.file_checked_at = now
+        changed = True
+    if changed:
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Could not store report file status: {e}")
 @app.route('/')
 @login_required
 def index():
@@ -594,10 +744,16 @@ def api_policy_stats():
 @app.route('/api/policies')
 @login_required
 def api_policies():
-    """API endpoint for policies list with filtering and pagination."""
+    """API endpoint for policies list with filtering and pagination.
+
+    ``?page=`` uses OFFSET pagination with a total count (dashboard). Passing
+    ``?cursor=`` (empty for the first page) switches to keyset pagination
+    newest first, returning ``next_cursor`` and counting only with ``with_total=1``.
+    """
     try:
+        cursor_mode = 'cursor' in request.args
         page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 10))
+        limit = page_size(request.args.get('limit'), 10)
         region = request.args.get('region', '')
         industry = request.args.get('industry', '')
         year = request.args.get('year', '')
@@ -616,7 +772,13 @@ def api_policies():
             query = query.filter(PolicyAnalysis.classification_year == int(year))
         if type_:
             query = query.filter(PolicyAnalysis.classification_policy_type == type_)
-        if search:
+        match = build_match_query(search) if search else ''
+        hits = None
+        if match and policy_fulltext_index.exists(db.session.connection()):
+            # Ranked full-text search over title, summary and content
+            hits = policy_fulltext_index.match_subquery(match)
+            query = query.join(hits, hits.c.rowid == PolicyAnalysis.id)
+        elif search:
             query = query.filter(
                 db.or_(
                     PolicyAnalysis.title.contains(search),
@@ -625,18 +787,53 @@ def api_policies():
                 )
             )
 
-        # Get total count
-        total = query.count()
+        query = query.options(load_only(*POLICY_LIST_COLUMNS))
+        if hits is not None:
+            query = query.add_columns(hits.c.rank)
+
+        if cursor_mode:
+            # Keyset pagination on (created_at, id): newest first, cost independent
+            # of depth; the total is only counted when asked for
+            rows, next_cursor = keyset_page(
+                query, PolicyAnalysis.created_at, PolicyAnalysis.id, request.args.get('cursor') or None, limit,
+                key=(lambda row: (row[0].created_at, row[0].id)) if hits is not None else None)
+            total = query.order_by(None).count() if request.args.get('with_total') else None
+        else:
+            # Get total count
+            total = query.count()
 
-        # Apply pagination
-        policies = query.order_by(PolicyAnalysis.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+            # Apply pagination
+            if hits is not None:
+                query = query.order_by(hits.c.rank, PolicyAnalysis.created_at.desc())
+            else:
+                query = query.order_by(PolicyAnalysis.created_at.desc())
+            rows = query.offset((page - 1) * limit).limit(limit).all()
+            next_cursor = None
+
+        if hits is not None:
+            highlights = policy_fulltext_index.highlights(
+                db.session.connection(), match, [policy.id for policy, _ in rows])
+            policies = []
+            for policy, rank in rows:
+                item = policy.to_dict()
+                item['score'] = round(-rank, 6)
+                item['highlights'] = highlights.get(policy.id, {})
+                policies.append(item)
+        else:
+            policies = [policy.to_dict() for policy in rows]
 
-        return jsonify({
-            'policies': [policy.to_dict() for policy in policies],
+        result = {
+            'policies': policies,
             'total': total,
-            'page': page,
             'limit': limit
-        })
+        }
+        if cursor_mode:
+            result['next_cursor'] = next_cursor
+        else:
+            result['page'] = page
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting policies: {e}")
         return jsonify({'error': str(e)}), 500
@@ -657,75 +854,21 @@ def api_policy_detail(policy_id):
 @app.route('/api/check-email-policies', methods=['POST'])
 @login_required
 def api_check_email_policies():
-    """API endpoint to check email for new policy URLs and process them."""
-    try:
-        from src.utils.email_reader import EmailReader
-        from src.analysis.policy_analysis_integrator import PolicyAnalysisIntegrator
+    """API endpoint to queue a background check of email for new policy URLs.
 
-        # Initialize email reader
-        email_reader = EmailReader()
-
-        # Get new emails with URLs
-        emails_with_urls = email_reader.get_unread_emails_with_urls()
-
-        new_policies_count = 0
-
-        if emails_with_urls:
-            # Initialize policy integrator
-            integrator = PolicyAnalysisIntegrator()
-
-            for email_info in emails_with_urls:
-                for url in email_info['urls']:
-                    try:
-                        # Analyze the policy from URL
-                        analysis_result = integrator.analyze_policy_from_url(url)
-
-                        if analysis_result.get('success'):
-                            # Extract classification info
-                            classification = analysis_result.get('classification', {})
-
-                            # Create PolicyAnalysis record
-                            policy_analysis = PolicyAnalysis(
-                                title=analysis_result.get('title', 'Unknown Title'),
-                                original_url=analysis_result.get('url'),
-                                source_type='email',
-                                content=analysis_result.get('content', ''),
-                                content_summary=analysis_result.get('content_summary', analysis_result.get('title', ''))[:500],  # Better summary
-                                analysis_result=analysis_result,
-                                classification_region=classification.get('region', [None])[0] if classification.get('region') else None,
-                                classification_industry=classification.get('industry', [None])[0] if classification.get('industry') else None,
-                                classification_year=classification.get('year'),
-                                classification_policy_type=classification.get('policy_type'),
-                                applicability_score=analysis_result.get('policy_analysis', {}).get('applicability', {}).get('score', 0) if analysis_result.get('policy_analysis', {}).get('applicability') else 0,
-                                entities=analysis_result.get('entities'),
-                                knowledge_graph=analysis_result.get('knowledge_graph'),
-                                llm_interpretation=analysis_result.get('llm_interpretation'),
-                                tags=','.join(classification.get('region', []) + classification.get('industry', [])),
-                                status='completed'
-                            )
-
-                            db.session.add(policy_analysis)
-                            db.session.commit()
-                            new_policies_count += 1
-
-                    except Exception as e:
-                        logger.error(f"Error processing policy from email {email_info['id']}, URL {url}: {e}")
-                        # Create failed record
-                        policy_analysis = PolicyAnalysis(
-                            title=f"分析失败 - {url}",
-                            original_url=url,
-                            source_type='email',
-                            status='failed',
-                            content_summary=f"分析失败: {str(e)}"
-                        )
-                        db.session.add(policy_analysis)
-                        db.session.commit()
+    The analysis runs in ``ingest_email_policies_task``; poll
+    ``/api/task/<task_id>/status`` for its progress and result.
+    """
+    try:
+        from src.tasks.email_policy_tasks import ingest_email_policies_task
 
+        task = ingest_email_policies_task.delay()
         return jsonify({
             'success': True,
-            'new_policies': new_policies_count,
-            'message': f'检查完成，新增 {new_policies_count} 条政策'
-        })
+            'task_id': task.id,
+            'status_url': url_for('api_task_status', task_id=task.id),
+            'message': '邮件检查任务已提交'
+        }), 202
     except Exception as e:
         logger.error(f"Error checking email policies: {e}")
         return jsonify({
@@ -955,7 +1098,6 @@ def api_export_policies():
             })
 
         # Create response with proper headers for download
-        from flask import Response
         json_data = json.dumps(export_data, ensure_ascii=False, indent=2)
         return Response(
             json_data,
@@ -1077,121 +1219,51 @@ def task_status_page(task_id):
     return render_template('task_status.html', task_id=task_id, report_id=report_id)
 
 
+def _celery_task_snapshot(task_id):
+    """Progress snapshot built from the Celery result backend."""
+    from src.tasks.celery_app import celery_app
+    task = AsyncResult(task_id, app=celery_app)
+    return snapshot_from_result(task.state, task.info)
+
+
+def _task_snapshot(task_id, cached=True):
+    """Latest progress snapshot of a Celery task.
+
+    Tasks publish their progress to ``task_progress``; only a task that has
+    not published yet (still queued) costs an ``AsyncResult`` read, and every
+    read is cached for ``TASK_PROGRESS_CACHE_SECONDS`` per process.
+    """
+    return task_progress.snapshot(task_id, cached=cached,
+                                  fallback=lambda: _celery_task_snapshot(task_id))
+
+
+def _report_task_response(snapshot, report_id=None):
+    """Status payload of a report task; marks the report completed on SUCCESS."""
+    if snapshot.get('state') != 'SUCCESS':
+        return snapshot
+
+    result = snapshot.get('result') or {}
+    final_report_id = result.get('report_id') or report_id
+    if final_report_id:
+        report = Report.query.filter_by(report_id=final_report_id).first()
+        # Every poll and stream sees the finished task; update the report once
+        if report and report.status != 'completed':
+            report.status = 'completed'
+            report.completed_at = beijing_now()
+            if result.get('file_path'):
+                report.file_path = result['file_path']
+            db.session.commit()
+            logger.info(f"Updated report {final_report_id} status to completed")
+    return dict(snapshot, result=dict(result, report_id=final_report_id))
+
+
 @app.route('/task/<task_id>/status')
 @app.route('/api/task-status/<task_id>')
 def task_status(task_id):
     """Check status of background task (API endpoint)."""
-    report_id = request.args.get('report_id')
-    
     try:
-        from src.tasks.celery_app import celery_app
-        task = AsyncResult(task_id, app=celery_app)
-        state = task.state
-        
-        logger.info(f"Task {task_id[:8]}... state from Celery: {state}")
-        
-        if state == 'PENDING':
-            response = {
-                'state': state,
-                'status': '等待处理...'
-            }
-        elif state == 'PROGRESS':
-            response = {
-                'state': state,
-                'current': task.info.get('current', 0),
-                'total': task.info.get('total', 100),
-                'status': task.info.get('status', ''),
-                'stage': task.info.get('stage', 'init'),
-                'message': task.info.get('message', task.info.get('status', ''))
-            }
-            logger.info(f"Task PROGRESS - stage: {response['stage']}, message: {response['message']}")
-        elif state == 'SUCCESS':
-            # Get task result (prefer result over info on SUCCESS)
-            task_result = task.result
-            logger.info(f"Raw task result: {task_result}")
-            logger.info(f"Task result type: {type(task_result)}")
-            
-            # Check if this is actually a failure disguised as success
-            if isinstance(task_result, dict) and not task_result.get('success', True):
-                # This is actually a failure - convert to FAILURE state
-                logger.info("Task reported SUCCESS but contains error - treating as FAILURE")
-                error_msg = task_result.get('error', 'Unknown error')
-                response = {
-                    'state': 'FAILURE',
-                    'status': f'任务失败: {error_msg}',
-                    'error': error_msg
-                }
-                return response
-            
-            if not isinstance(task_result, dict) or 'report_id' not in task_result:
-                # Fallback to info meta if available
-                if isinstance(task.info, dict):
-                    task_result = task.info
-                    logger.info(f"Using task.info as fallback: {task_result}")
-                    logger.info(f"Task.info type: {type(task.info)}")
-            
-            # Extract report_id from result
-            result_report_id = None
-            if isinstance(task_result, dict):
-                result_report_id = task_result.get('report_id')
-                logger.info(f"Extracted report_id from task_result: {result_report_id}")
-            else:
-                logger.info(f"Task result is not a dict or missing report_id: {task_result}")
-            
-            # Use result report_id or fallback to query parameter
-            final_report_id = result_report_id or report_id
-            
-            logger.info(f"Task SUCCESS - result_report_id: {result_report_id}, query_report_id: {report_id}, final: {final_report_id}")
-            
-            # Update report status in database
-            if final_report_id:
-                report = Report.query.filter_by(report_id=final_report_id).first()
-                if report:
-                    report.status = 'completed'
-                    report.completed_at = beijing_now()
-                    if isinstance(task_result, dict) and task_result.get('file_path'):
-                        report.file_path = task_result.get('file_path')
-                    db.session.commit()
-                    logger.info(f"Updated report {final_report_id} status to completed")
-            
-            response = {
-                'state': state,
-                'status': '完成',
-                'result': {
-                    'report_id': final_report_id,
-                    **(task_result if isinstance(task_result, dict) else {})
-                }
-            }
-        else:
-            # Error occurred
-            status = str(task.info)
-            error_details = None
-            
-            if isinstance(task.info, dict):
-                if 'error' in task.info:
-                    status = task.info['error']
-                # Check if this is an API error with detailed information
-                if 'exc_type' in task.info and 'exc_message' in task.info:
-                    error_details = {
-                        'error_type': task.info.get('exc_type'),
-                        'error_message': task.info.get('exc_message'),
-                        'is_api_error': 'api' in task.info.get('exc_type', '').lower()
-                    }
-            
-            response = {
-                'state': state,
-                'status': status,
-                'error_details': error_details
-            }
-            
-            # Log the error for monitoring
-            if error_details:
-                logger.error(f"Task {task_id[:8]}... failed with API error: {error_details}")
-            else:
-                logger.error(f"Task {task_id[:8]}... failed: {status}")
-        
-        return jsonify(response)
-        
+        snapshot = _task_snapshot(task_id)
+        return jsonify(_report_task_response(snapshot, request.args.get('report_id')))
     except Exception as e:
         logger.error(f"Error checking task status: {e}")
         return jsonify({
@@ -1200,12 +1272,34 @@ def task_status(task_id):
         })
 
 
+@app.route('/task/<task_id>/events')
+def task_events(task_id):
+    """Server-Sent Events relay of a background task's progress.
+
+    Sends the current status (same payload as ``/task/<task_id>/status``),
+    then every update the task publishes, with a keep-alive comment during
+    quiet stretches. The stream ends when the task finishes.
+    """
+    report_id = request.args.get('report_id')
+    stream = task_progress.sse_stream(
+        task_id,
+        load=lambda: _task_snapshot(task_id, cached=False),
+        transform=lambda snapshot: _report_task_response(snapshot, report_id)
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/stop-task/<task_id>', methods=['POST'])
 @login_required
 def stop_task(task_id):
     try:
         from src.tasks.celery_app import celery_app
         celery_app.control.revoke(task_id, terminate=True)
+        task_progress.publish(task_id, 'REVOKED', status='任务已停止', error='任务已停止')
         logger.info(f"Revoked task {task_id}")
         return jsonify({'success': True, 'message': '任务已停止'})
     except Exception as e:
@@ -1604,12 +1698,20 @@ def upload_file():
 @app.route('/api/reports')
 @login_required
 def api_reports():
-    """API endpoint to get user's reports."""
-    reports = Report.query.filter_by(user_id=current_user.id)\
-        .order_by(Report.created_at.desc())\
-        .all()
-    
-    return jsonify([{
+    """API endpoint to get user's reports, newest first.
+
+    Paged with ``?cursor=&limit=``; the cursor of the next page is returned in
+    the ``X-Next-Cursor`` header (absent on the last page).
+    """
+    try:
+        limit = page_size(request.args.get('limit'), DEFAULT_PAGE_SIZE)
+        query = Report.query.options(load_only(*REPORT_LIST_COLUMNS)).filter(Report.user_id == current_user.id)
+        reports, next_cursor = keyset_page(query, Report.created_at, Report.id,
+                                           request.args.get('cursor') or None, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify([{
         'report_id': r.report_id,
         'title': r.title,
         'city': r.city,
@@ -1619,6 +1721,10 @@ def api_reports():
         'created_at': r.created_at.isoformat(),
         'completed_at': r.completed_at.isoformat() if r.completed_at else None
     } for r in reports])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("api_reports", cursor=next_cursor, limit=limit)}>; rel="next"'
+    return response
 
 
 @app.route('/api/llm/stream', methods=['POST'])
@@ -1633,7 +1739,7 @@ def api_llm_stream():
         
         def generate():
             try:
-                generator = LLMReportGenerator(llm_service=llm_service)
+                generator = llm_generator_registry.get_generator(llm_service)
                 for chunk in generator.stream_report_content(city, industry, additional_context):
                     yield chunk
             except Exception as e:
@@ -1644,6 +1750,16 @@ def api_llm_stream():
         logger.error(f"Error starting LLM stream: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/llm/utilization')
+def api_llm_utilization():
+    """Current LLM rate limiter usage per service and API key, and circuit breaker health."""
+    return jsonify({
+        'success': True,
+        'buckets': llm_rate_limiter.utilization(),
+        'stats': llm_rate_limiter.stats,
+        'circuit_breakers': api_error_handler.get_service_health()
+    })
+
 @app.route('/api/report/<report_id>/qa', methods=['POST'])
 @login_required
 def api_report_qa(report_id):
@@ -1667,11 +1783,12 @@ def api_report_qa(report_id):
         with open(file_path, 'r', encoding='utf-8') as f:
             report_data = json.load(f)
         
-        # Get answer from LLM
-        generator = LLMReportGenerator()
+        # Get answer from LLM; "refresh" bypasses the response cache
+        generator = llm_generator_registry.get_generator()
         answer = generator.answer_question(
             report_data.get('full_content', ''),
-            question
+            question,
+            use_cache=not request.json.get('refresh', False)
         )
         
         return jsonify({'answer': answer})
@@ -1684,50 +1801,9 @@ def api_report_qa(report_id):
 # API Status and Notification Routes
 @app.route('/api/task/<task_id>/status')
 def api_task_status(task_id):
-    """Get the status of a background task."""
-    from src.tasks.celery_app import celery_app
-    
+    """Get the status of a background task (its cached progress snapshot)."""
     try:
-        # Get task result
-        task = celery_app.AsyncResult(task_id)
-        
-        if task.state == 'PENDING':
-            # Task is waiting to be processed
-            response = {
-                'state': task.state,
-                'status': '任务正在等待处理...'
-            }
-        elif task.state == 'PROGRESS':
-            # Task is currently being processed
-            response = {
-                'state': task.state,
-                'current': task.info.get('current', 0),
-                'total': task.info.get('total', 1),
-                'status': task.info.get('status', ''),
-                'stage': task.info.get('stage', ''),
-                'message': task.info.get('message', '')
-            }
-        elif task.state == 'SUCCESS':
-            # Task completed successfully
-            response = {
-                'state': task.state,
-                'result': task.info
-            }
-        elif task.state == 'FAILURE':
-            # Task failed
-            response = {
-                'state': task.state,
-                'error': str(task.info)
-            }
-        else:
-            # Something else happened
-            response = {
-                'state': task.state,
-                'result': task.info
-            }
-        
-        return jsonify(response)
-    
+        return jsonify(_task_snapshot(task_id))
     except Exception as e:
         logger.error(f"Error getting task status: {e}")
         return jsonify({'state': 'FAILURE', 'error': str(e)}), 500
@@ -1787,24 +1863,12 @@ def api_sentiment_analysis(report_id):
         if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
             return jsonify({'error': '无权限访问'}), 403
         
-        # Load report content
-        if report.report_type == 'llm':
-            file_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{report_id}.json"
-        else:
-            file_path = Path(report.file_path)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        
-        # Perform sentiment analysis
-        analyzer = SentimentAnalyzer()
-        sentiment_result = analyzer.analyze_by_category(report_data)
-        risks = analyzer.detect_risks(report_data.get('full_content', ''))
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
         
-        return jsonify({
-            'sentiment': sentiment_result,
-            'risks': risks
-        })
+        # Perform sentiment analysis (served from the analysis cache)
+        return jsonify(run_report_analysis('sentiment', report_id, file_path))
     
     except Exception as e:
         logger.error(f"Error in sentiment analysis: {e}")
@@ -1820,24 +1884,12 @@ def api_entity_extraction(report_id):
         if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
             return jsonify({'error': '无权限访问'}), 403
         
-        # Load report
-        if report.report_type == 'llm':
-            file_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{report_id}.json"
-        else:
-            file_path = Path(report.file_path)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        
-        # Extract entities
-        extractor = EntityExtractor()
-        entities = extractor.extract_entities(report_data.get('full_content', ''))
-        graph = extractor.build_entity_graph(entities)
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
         
-        return jsonify({
-            'entities': entities,
-            'graph': graph
-        })
+        # Extract entities (served from the analysis cache)
+        return jsonify(run_report_analysis('entities', report_id, file_path))
     
     except Exception as e:
         logger.error(f"Error in entity extraction: {e}")
@@ -1853,20 +1905,12 @@ def api_investment_evaluation(report_id):
         if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
             return jsonify({'error': '无权限访问'}), 403
         
-        # Load report
-        if report.report_type == 'llm':
-            file_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{report_id}.json"
-        else:
-            file_path = Path(report.file_path)
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        
-        # Evaluate investment
-        evaluator = InvestmentEvaluator()
-        evaluation = evaluator.evaluate(report_data)
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
         
-        return jsonify(evaluation)
+        # Evaluate investment (served from the analysis cache)
+        return jsonify(run_report_analysis('investment', report_id, file_path))
     
     except Exception as e:
         logger.error(f"Error in investment evaluation: {e}")
@@ -1886,64 +1930,12 @@ def api_report_visualizations(report_id):
         file_path = _resolve_report_file_path(report_id, report)
         if not file_path:
             return jsonify({'error': '报告文件不存在'}), 404
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        
-        # Load config
-        with open('config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        # Generate visualizations
-        visualizer = MapVisualizer(config)
-        
-        # Extract geo data from report
-        content = report_data.get('full_content', '')
-        geo_data = visualizer.extract_geo_data_from_report(content)
         
-        # Province map (fallback sample data)
-        province_data = {
-            report.city or "四川": 100,
-            "北京": 80,
-            "上海": 90,
-            "广东": 85
-        }
-        province_map = visualizer.generate_province_map(
-            province_data, 
-            title=f"{report.industry}产业分布地图"
-        )
-        
-        # Geo scatter
-        geo_scatter = visualizer.generate_geo_scatter(
-            geo_data.get('cities', []),
-            title=f"{report.city or ''}产业地理分布"
-        )
-        
-        # 3D bar (mock using keywords)
-        bar3d_data = [
-            {"x": "市场规模", "y": report.city or "成都", "z": 100},
-            {"x": "投资", "y": report.city or "成都", "z": 80},
-            {"x": "企业数", "y": report.city or "成都", "z": 60}
-        ]
-        bar_3d = visualizer.generate_3d_bar_chart(bar3d_data)
-        
-        # Simple network graph
-        nodes = [
-            {"id": "1", "name": report.city or "城市", "category": 0, "value": 100},
-            {"id": "2", "name": report.industry or "产业", "category": 1, "value": 80},
-            {"id": "3", "name": "龙头企业", "category": 2, "value": 60}
-        ]
-        links = [
-            {"source": "1", "target": "2", "value": 1},
-            {"source": "2", "target": "3", "value": 1}
-        ]
-        network_graph = visualizer.generate_industry_network(nodes, links)
-        
-        return jsonify({
-            'province_map': province_map,
-            'bar_3d': bar_3d,
-            'geo_scatter': geo_scatter,
-            'network_graph': network_graph
-        })
+        # Generate visualizations (served from the analysis cache)
+        return jsonify(run_report_analysis(
+            'visualizations', report_id, file_path,
+            city=report.city, industry=report.industry
+        ))
     
     except Exception as e:
         logger.error(f"Error generating visualizations: {e}")
@@ -2151,34 +2143,29 @@ def ui_states_page():
 def reports_list():
     """Display all reports for current user."""
     try:
-        # Only show usable (completed + file exists) reports, separated by type
-        base_query = Report.query
+        # Only show usable (completed + file exists) reports, separated by type.
+        # Keyset pages over (created_at, id); file existence is cached on the row
+        cursor = request.args.get('cursor') or None
+        limit = page_size(request.args.get('limit'), DEFAULT_PAGE_SIZE)
+        base_query = Report.query.options(load_only(*REPORT_LIST_COLUMNS))\
+            .filter(Report.status == 'completed', _report_file_may_exist())
         if current_user.role != 'admin':
-            base_query = base_query.filter_by(user_id=current_user.id)
-        all_reports = base_query.order_by(Report.created_at.desc()).all()
+            base_query = base_query.filter(Report.user_id == current_user.id)
+        page_reports, next_cursor = keyset_page(base_query, Report.created_at, Report.id, cursor, limit)
+        _refresh_report_file_status(page_reports)
 
         usable_llm = []
         usable_upload = []
-        for r in all_reports:
-            if r.status != 'completed':
-                continue
-            # Verify file exists
-            try:
-                if r.report_type == 'llm':
-                    default_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{r.report_id}.json"
-                    file_path = default_path if default_path.exists() else Path(r.file_path)
-                else:
-                    file_path = Path(r.file_path)
-                if not file_path.exists():
-                    continue
-            except Exception:
+        for r in page_reports:
+            if not r.file_available:
                 continue
             if r.report_type == 'llm':
                 usable_llm.append(r)
             else:
                 usable_upload.append(r)
         
-        return render_template('reports_list.html', reports_llm=usable_llm, reports_upload=usable_upload)
+        return render_template('reports_list.html', reports_llm=usable_llm, reports_upload=usable_upload,
+                               next_cursor=next_cursor, page_limit=limit, is_first_page=cursor is None)
     except Exception as e:
         logger.error(f"Error loading reports: {e}")
         flash('无法加载报告列表', 'error')
@@ -2529,25 +2516,9 @@ def api_policy_search():
         if not region or not industry_tags:
             return jsonify({'error': '请输入区域与产业标签'}), 400
 
-        # Caching: Redis (hot), file+memory (fallback)
+        # Caching: memory -> Redis -> disk, see configure_cache_backends
         cache_key = f"policy_search:{region}:{region_code}:{','.join(industry_tags)}:{years}"
-        cached = None
-        # Try Redis first
-        try:
-            import os
-            import redis
-            redis_url = os.getenv('REDIS_URL')
-            if redis_url:
-                r = redis.Redis.from_url(redis_url)
-                hit = r.get(cache_key)
-                if hit:
-                    cached = json.loads(hit)
-        except Exception:
-            cached = None
-        # Fallback local cache
-        if not cached:
-            cm = CacheManager(ttl=3600)
-            cached = cm.get(cache_key)
+        cached = policy_search_cache.get(cache_key)
         if cached:
             return jsonify({'success': True, 'cached': True, 'data': cached})
 
@@ -2562,50 +2533,58 @@ def api_policy_search():
             # Get WeChat articles from database that match the region and industry
             from sqlalchemy import or_, and_
 
-            # Search for WeChat articles matching the region or industry
+            # Search for WeChat articles matching any industry tag: one ranked
+            # full-text query instead of a LIKE table scan per tag
             wechat_articles = []
-            for industry_tag in industry_tags:
-                # Search by industry relevance and region
-                articles_query = WeChatArticle.query.filter(
+            match = build_match_query(' '.join(industry_tags), any_term=True)
+            articles_query = WeChatArticle.query
+            hits = None
+            if match and wechat_article_fulltext_index.exists(db.session.connection()):
+                hits = wechat_article_fulltext_index.match_subquery(match)
+                articles_query = articles_query.join(hits, hits.c.rowid == WeChatArticle.id)
+            else:
+                articles_query = articles_query.filter(or_(*[
                     or_(
                         WeChatArticle.industry_relevance.like(f'%{industry_tag}%'),
                         WeChatArticle.title.like(f'%{industry_tag}%'),
                         WeChatArticle.content.like(f'%{industry_tag}%')
                     )
-                )
-
-                # Filter by region if specified
-                if region:
-                    articles_query = articles_query.filter(
-                        or_(
-                            WeChatArticle.source_account.like(f'%{region}%'),
-                            # Note: WeChatArticle doesn't currently have a region field,
-                            # but when the task runs it includes region in industry_relevance or source_account
-                        )
-                    )
-
-                # Filter by time range
-                from datetime import datetime, timedelta
-                time_limit = now_beijing() - timedelta(days=years*365)
-                articles_query = articles_query.filter(
-                    WeChatArticle.created_at >= time_limit
-                )
+                    for industry_tag in industry_tags
+                ]))
+
+            # Filter by region if specified
+            if region:
+                # Note: WeChatArticle doesn't currently have a region field,
+                # but when the task runs it includes region in industry_relevance or source_account
+                articles_query = articles_query.filter(WeChatArticle.source_account.like(f'%{region}%'))
+
+            # Filter by time range
+            from datetime import datetime, timedelta
+            time_limit = now_beijing() - timedelta(days=years*365)
+            articles_query = articles_query.filter(
+                WeChatArticle.created_at >= time_limit
+            )
 
-                articles = articles_query.all()
-
-                for article in articles:
-                    wechat_articles.append({
-                        'title': article.title,
-                        'publish_date': article.publish_date,
-                        'source': article.source_account,
-                        'summary': article.summary,
-                        'url': article.url,
-                        'type': '微信公众号文章',
-                        'region_code': region_code,  # Use provided region code
-                        'industry_tags': industry_tags,
-                        'official_link': article.url,
-                        'timeliness': '有效' if article.publish_date else '未知'
-                    })
+            if hits is not None:
+                articles_query = articles_query.order_by(hits.c.rank)
+            articles = articles_query.all()
+            highlights = wechat_article_fulltext_index.highlights(
+                db.session.connection(), match, [article.id for article in articles]) if hits is not None else {}
+
+            for article in articles:
+                wechat_articles.append({
+                    'title': article.title,
+                    'publish_date': article.publish_date,
+                    'source': article.source_account,
+                    'summary': article.summary,
+                    'url': article.url,
+                    'type': '微信公众号文章',
+                    'region_code': region_code,  # Use provided region code
+                    'industry_tags': industry_tags,
+                    'official_link': article.url,
+                    'timeliness': '有效' if article.publish_date else '未知',
+                    'highlights': highlights.get(article.id, {})
+                })
 
             # Add WeChat articles to the government policies
             agg.get('policies', []).extend(wechat_articles)
@@ -2629,14 +2608,7 @@ def api_policy_search():
             # Continue without WeChat articles if there's an error
 
         # Save to caches
-        try:
-            if redis_url:
-                r = redis.Redis.from_url(redis_url)
-                r.setex(cache_key, 3600, json.dumps(agg, ensure_ascii=False))
-        except Exception:
-            pass
-        cm = CacheManager(ttl=3600)
-        cm.set(cache_key, agg)
+        policy_search_cache.set(cache_key, agg)
 
         return jsonify({'success': True, 'cached': False, 'data': agg})
     except Exception as e:
@@ -3033,12 +3005,9 @@ def api_link_click():
         url = (data.get('url') or '').strip()
         if not url:
             return jsonify({'error': '缺少链接'}), 400
-        cm = CacheManager(ttl=24 * 3600)
         key = f"link_stats:{url}"
-        cur = cm.get(key) or {'count': 0}
-        cur['count'] = int(cur.get('count', 0)) + 1
-        cm.set(key, cur)
-        return jsonify({'success': True, 'url': url, 'count': cur['count']})
+        count = link_stats_cache.increment(key)
+        return jsonify({'success': True, 'url': url, 'count': count})
     except Exception as e:
         logger.error(f"Error in link click: {e}")
         return jsonify({'error': str(e)}), 500
@@ -3049,12 +3018,10 @@ def api_links_stats():
     try:
         urls = request.args.get('urls') or ''
         urls_list = [u.strip() for u in urls.split(',') if u.strip()]
-        cm = CacheManager(ttl=24 * 3600)
         data = {}
         for u in urls_list:
             key = f"link_stats:{u}"
-            cur = cm.get(key) or {'count': 0}
-            data[u] = cur
+            data[u] = {'count': link_stats_cache.get_counter(key)}
         return jsonify({'success': True, 'stats': data})
     except Exception as e:
         logger.error(f"Error in links stats: {e}")
@@ -3102,27 +3069,14 @@ def api_knowledge_graph(report_id):
         report = Report.query.filter_by(report_id=report_id).first()
         if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
             return jsonify({'error': '无权限访问'}), 403
-        # Load report
-        if report.report_type == 'llm':
-            default_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{report_id}.json"
-            file_path = default_path if default_path.exists() else Path(report.file_path)
-        else:
-            file_path = Path(report.file_path)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        # Extract entities
-        extractor = EntityExtractor()
-        entities = extractor.extract_entities(report_data.get('full_content', ''))
-        # Build graph
-        kg = KnowledgeGraphVisualizer()
-        graph = kg.transform_entities_to_graph(entities)
-        config = kg.generate_echarts_config(graph, title=f"{report.city or ''}{report.industry or ''} 知识图谱")
-        return jsonify({
-            'graph_config': config,
-            'node_count': graph.get('statistics', {}).get('total_nodes', 0),
-            'edge_count': graph.get('statistics', {}).get('total_links', 0),
-            'type_count': graph.get('statistics', {}).get('node_types', 0)
-        })
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
+        # Build graph from extracted entities (served from the analysis cache)
+        return jsonify(run_report_analysis(
+            'knowledge_graph', report_id, file_path,
+            city=report.city, industry=report.industry
+        ))
     except Exception as e:
         logger.error(f"Error in knowledge graph: {e}")
         return jsonify({'error': str(e)}), 500
@@ -3135,36 +3089,11 @@ def api_industry_chain(report_id):
         report = Report.query.filter_by(report_id=report_id).first()
         if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
             return jsonify({'error': '无权限访问'}), 403
-        # Load report
-        if report.report_type == 'llm':
-            default_path = APP_ROOT / 'data' / 'output' / 'llm_reports' / f"{report_id}.json"
-            file_path = default_path if default_path.exists() else Path(report.file_path)
-        else:
-            file_path = Path(report.file_path)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            report_data = json.load(f)
-        text = report_data.get('sections', {}).get('value_chain') or report_data.get('full_content', '')
-        # Simple heuristic parsing
-        def section(items):
-            return {
-                'strength': '良好',
-                'components': items[:6],
-                'gaps': items[6:9]
-            }
-        # Extract bullet-like lines
-        import re
-        items = [ln.strip('- •* ').strip() for ln in text.split('\n') if re.match(r'^\s*[-•*]|\d+[\.\)、]', ln)]
-        upstream = section(items[:9])
-        midstream = section(items[3:12])
-        downstream = section(items[6:15])
-        weak_points = [it for it in items if any(k in it for k in ['瓶颈', '缺', '不足', '短板'])][:5]
-        return jsonify({
-            'completeness_score': 78,
-            'upstream': upstream,
-            'midstream': midstream,
-            'downstream': downstream,
-            'weak_points': weak_points
-        })
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
+        # Simple heuristic parsing (served from the analysis cache)
+        return jsonify(run_report_analysis('industry_chain', report_id, file_path))
     except Exception as e:
         logger.error(f"Error in industry chain: {e}")
         return jsonify({'error': str(e)}), 500
@@ -3346,17 +3275,43 @@ def api_report_story(report_id):
         if not file_path:
             return jsonify({'error': '报告文件不存在'}), 404
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        story_gen = StoryGenerator()
         # Get story type from query parameter, default to 'industry_overview'
         story_type = request.args.get('type', 'industry_overview')
-        story = story_gen.create_story(data, story_type=story_type)
+        story = run_report_analysis(
+            'story', report_id, file_path,
+            variant=story_type, story_type=story_type
+        )
         return jsonify(story)
     except Exception as e:
         logger.error(f"Error generating story: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/report/<report_id>/analysis-cache', methods=['DELETE'])
+@login_required
+def api_invalidate_report_analysis_cache(report_id):
+    """Drop cached analyses of a report, e.g. after it was regenerated.
+    
+    Query parameter ``analyzer`` limits invalidation to one analyzer.
+    """
+    try:
+        report = Report.query.filter_by(report_id=report_id).first()
+        if not report or (report.user_id != current_user.id and current_user.role != 'admin'):
+            return jsonify({'error': '无权限访问'}), 403
+        
+        analyzer = request.args.get('analyzer')
+        if analyzer and analyzer not in REPORT_ANALYZERS:
+            return jsonify({'error': f'未知的分析类型: {analyzer}'}), 400
+        
+        file_path = _resolve_report_file_path(report_id, report)
+        if not file_path:
+            return jsonify({'error': '报告文件不存在'}), 404
+        
+        removed = report_analysis_cache.invalidate(file_path, analyzer=analyzer)
+        return jsonify({'success': True, 'removed': removed})
+    except Exception as e:
+        logger.error(f"Error invalidating analysis cache: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/report/<report_id>/story-view')
 @login_required
 def report_story_view(report_id):
@@ -4044,6 +3999,11 @@ def main():
     app.register_blueprint(report_gen_bp)
     app.register_blueprint(report_generation_bp)
 
+    # Pre-warm the shared LLM generators and clients without delaying startup
+    if os.getenv('LLM_PREWARM', '1').lower() not in ('0', 'false', 'no'):
+        import threading
+        threading.Thread(target=llm_generator_registry.warm, name='llm-prewarm', daemon=True).start()
+
     # Fetch WeChat articles in the background when the app starts
     try:
         from src.tasks.wechat_tasks import fetch_wechat_articles_task
@@ -1,101 +1,33 @@
 from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
-import uuid
 import logging
 import time
 import asyncio
-import threading
-import queue
-from concurrent.futures import ThreadPoolExecutor
-from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Optional
 import json
 import pytz
 from datetime import datetime
 
-from src.ai.streaming_llm_generator import StreamingLLMReportGenerator
+from src.ai.llm_registry import llm_generator_registry
 from src.utils.api_error_handler import handle_api_error, APIService
+from src.utils.task_registry import TaskManager, TaskStatus
 
 logger = logging.getLogger(__name__)
 
 # Create blueprint for the new reporting system
 report_generation_bp = Blueprint('report_generation', __name__)
 
-# Task status enum
-class TaskStatus(Enum):
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    TIMEOUT = "timeout"
-
-# Task information data class
-@dataclass
-class TaskInfo:
-    task_id: str
-    city: str
-    industry: str
-    llm_service: str
-    additional_context: str
-    status: TaskStatus
-    created_at: float
-    started_at: Optional[float] = None
-    completed_at: Optional[float] = None
-    result: Optional[dict] = None
-    error: Optional[str] = None
-    report_id: Optional[str] = None  # ID of generated report after completion
-    user_id: Optional[int] = None   # User who created the task
-
-# Task manager for background tasks
-class TaskManager:
-    def __init__(self):
-        self._tasks: Dict[str, TaskInfo] = {}
-        self._result_queues: Dict[str, queue.Queue] = {}
-        self._lock = threading.Lock()
-        self._executor = ThreadPoolExecutor(max_workers=5)
-
-        # Start cleanup thread
-        self._cleanup_thread = threading.Thread(target=self._cleanup_old_tasks, daemon=True)
-        self._cleanup_thread.start()
-
-    def create_task(self, city: str, industry: str, llm_service: str, additional_context: str, user_id: int = None) -> str:
-        """Create a new task and return task ID"""
-        task_id = str(uuid.uuid4())
-
-        with self._lock:
-            self._tasks[task_id] = TaskInfo(
-                task_id=task_id,
-                city=city,
-                industry=industry,
-                llm_service=llm_service,
-                additional_context=additional_context,
-                status=TaskStatus.PENDING,
-                created_at=time.time(),
-                started_at=None,
-                completed_at=None,
-                result=None,
-                error=None,
-                report_id=None,
-                user_id=user_id
-            )
-            self._result_queues[task_id] = queue.Queue()
-
-        # Submit to thread pool
-        future = self._executor.submit(self._execute_task, task_id)
-
-        return task_id
-
+# Report generation tasks; state and events live in the shared task registry
+class ReportTaskManager(TaskManager):
     def _execute_task(self, task_id: str):
         """Execute the report generation task in background"""
-        with self._lock:
-            task = self._tasks[task_id]
-            task.status = TaskStatus.PROCESSING
-            task.started_at = time.time()
+        task = self.update_task(task_id, status=TaskStatus.PROCESSING, started_at=time.time())
+        if task is None:
+            return
 
         try:
             # Send start event
-            self._send_event(task_id, 'generation_start', {
+            self.send_event(task_id, 'generation_start', {
                 'message': f'开始为{task.city} {task.industry}生成产业分析报告...',
                 'city': task.city,
                 'industry': task.industry,
@@ -103,8 +35,8 @@ class TaskManager:
             })
 
             # Initialize AI generator
-            generator = StreamingLLMReportGenerator(
-                llm_service=task.llm_service,
+            generator = llm_generator_registry.get_streaming_generator(
+                task.llm_service,
                 enable_fallback=True
             )
 
@@ -121,42 +53,42 @@ class TaskManager:
                     accumulated_content += chunk_data['content']
 
                     # Send content chunk to frontend
-                    self._send_event(task_id, 'report_chunk', {
+                    self.send_event(task_id, 'report_chunk', {
                         'content': chunk_data['content'],
-                        'accumulated': accumulated_content,
                         'chunk_index': chunk_index,
                         'stage': chunk_data.get('stage', 'generating')
                     })
 
                 elif chunk_data['type'] == 'complete':
                     # Main report completed
-                    self._send_event(task_id, 'report_complete', {
+                    self.send_event(task_id, 'report_complete', {
                         'content': chunk_data['content'],
                         'stage': 'generating',
                         'total_length': len(accumulated_content)
                     })
 
                     # Generate summary
-                    self._send_event(task_id, 'summary_complete', {
+                    self.send_event(task_id, 'summary_complete', {
                         'content': '摘要生成完成',
                         'language': 'zh'
                     })
 
                     # Generate SWOT analysis
-                    self._send_event(task_id, 'swot_complete', {
+                    self.send_event(task_id, 'swot_complete', {
                         'content': 'SWOT分析生成完成'
                     })
 
             # Task completed
-            with self._lock:
-                completed_task = self._tasks[task_id]
-                completed_task.status = TaskStatus.COMPLETED
-                completed_task.completed_at = time.time()
-                completed_task.result = {'content': accumulated_content}
-                completed_task.report_id = f"report_{task_id[:8]}"  # Generate report ID
+            completed_task = self.update_task(
+                task_id,
+                status=TaskStatus.COMPLETED,
+                completed_at=time.time(),
+                result={'content': accumulated_content},
+                report_id=f"report_{task_id[:8]}"  # Generate report ID
+            ) or task
 
             # Send final completion event
-            self._send_event(task_id, 'final_complete', {
+            self.send_event(task_id, 'final_complete', {
                 'message': '报告生成完成',
                 'task_id': task_id,
                 'report_id': completed_task.report_id,
@@ -165,14 +97,11 @@ class TaskManager:
             })
 
         except Exception as e:
-            with self._lock:
-                task = self._tasks[task_id]
-                task.status = TaskStatus.FAILED
-                task.error = str(e)
+            self.update_task(task_id, status=TaskStatus.FAILED, error=str(e))
 
             # Send error event
             api_error = handle_api_error(e, task.llm_service, 'background_task')
-            self._send_event(task_id, 'error', {
+            self.send_event(task_id, 'error', {
                 'error': api_error.user_friendly_message,
                 'type': 'api_error',
                 'suggested_action': api_error.suggested_action
@@ -180,72 +109,10 @@ class TaskManager:
 
         finally:
             # Send end marker
-            self._send_event(task_id, 'end', {})
-
-    def _send_event(self, task_id: str, event_type: str, data: dict):
-        """Send event to task queue"""
-        result_queue = self._result_queues.get(task_id)
-        if result_queue:
-            result_queue.put({
-                'type': event_type,
-                'data': data,
-                'timestamp': time.time()
-            })
-
-    def _cleanup_old_tasks(self):
-        """Periodically clean up old tasks"""
-        while True:
-            time.sleep(300)  # Check every 5 minutes
-            current_time = time.time()
-
-            with self._lock:
-                old_tasks = [
-                    task_id for task_id, task in self._tasks.items()
-                    if current_time - task.created_at > 3600  # 1 hour old tasks
-                ]
-
-                for task_id in old_tasks:
-                    del self._tasks[task_id]
-                    if task_id in self._result_queues:
-                        del self._result_queues[task_id]
-
-    def get_task_info(self, task_id: str) -> Optional[TaskInfo]:
-        """Get task information"""
-        with self._lock:
-            return self._tasks.get(task_id)
-
-    def get_next_chunk(self, task_id: str, timeout: int = 30) -> Optional[dict]:
-        """Get next content chunk"""
-        result_queue = self._result_queues.get(task_id)
-        if not result_queue:
-            return None
-
-        try:
-            chunk = result_queue.get(timeout=timeout)
-            return chunk
-        except queue.Empty:
-            return None
-
-    def delete_task(self, task_id: str) -> bool:
-        """Delete a task"""
-        with self._lock:
-            if task_id in self._tasks:
-                del self._tasks[task_id]
-                if task_id in self._result_queues:
-                    del self._result_queues[task_id]
-                return True
-        return False
-
-    def get_all_tasks(self, user_id: int = None) -> list:
-        """Get all tasks, optionally filtered by user"""
-        with self._lock:
-            tasks = list(self._tasks.values())
-            if user_id:
-                tasks = [task for task in tasks if task.user_id == user_id]
-            return tasks
+            self.send_event(task_id, 'end', {})
 
 # Global task manager instance
-task_manager = TaskManager()
+task_manager = ReportTaskManager('report_generation')
 
 @report_generation_bp.route('/report-generation')
 @login_required
@@ -269,55 +136,13 @@ def stream_generate_report():
 
         # Create task
         user_id = getattr(current_user, 'id', 1)  # Default to user 1 if not available
-        task_id = task_manager.create_task(city, industry, llm_service, additional_context, user_id)
-
-        def generate_stream():
-            """Generator function for SSE streaming"""
-            try:
-                # Send initial connection event
-                yield format_sse_event('connection_established', {
-                    'task_id': task_id,
-                    'message': '连接已建立，开始生成报告...'
-                })
-
-                # Stream chunks from task manager
-                while True:
-                    chunk = task_manager.get_next_chunk(task_id)
-                    if chunk is None:
-                        # Check if task is still processing
-                        task_info = task_manager.get_task_info(task_id)
-                        if task_info and task_info.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-                            break
-                        continue  # Try again
-
-                    # If we get end marker, break
-                    if chunk.get('type') == 'end':
-                        break
-
-                    # Send the chunk
-                    yield format_sse_event(chunk['type'], chunk['data'])
-
-            except GeneratorExit:
-                # Client disconnected
-                logger.info(f"Client disconnected for task {task_id}")
-            except Exception as e:
-                logger.error(f"Error in stream generator: {e}")
-                yield format_sse_event('error', {
-                    'error': str(e),
-                    'type': 'generator_error'
-                })
+        task_id, _ = task_manager.create_task(city, industry, llm_service, additional_context, user_id)
 
         # Return SSE response
         return Response(
-            generate_stream(),
+            stream_task_events(task_id, message='连接已建立，开始生成报告...'),
             mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no',
-                'Connection': 'keep-alive',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization'
-            }
+            headers=SSE_HEADERS
         )
 
     except Exception as e:
@@ -336,6 +161,50 @@ def format_sse_event(event_type: str, data: dict) -> str:
     }
     return f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
 
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization'
+}
+
+def stream_task_events(task_id: str, last_event_id: Optional[str] = None, message: str = ''):
+    """Generator function for SSE streaming of a task's event log"""
+    try:
+        # Send initial connection event
+        yield format_sse_event('connection_established', {
+            'task_id': task_id,
+            'message': message,
+            'resumed_from': last_event_id
+        })
+
+        # Stream events from the task registry until the end marker
+        yield from task_manager.sse_stream(task_id, after=last_event_id)
+
+    except GeneratorExit:
+        # Client disconnected
+        logger.info(f"Client disconnected for task {task_id}")
+    except Exception as e:
+        logger.error(f"Error in stream generator: {e}")
+        yield format_sse_event('error', {
+            'error': str(e),
+            'type': 'generator_error'
+        })
+
+@report_generation_bp.route('/api/tasks/<task_id>/events', methods=['GET'])
+@login_required
+def api_task_events(task_id):
+    """Re-attach to a task's event stream, resuming after Last-Event-ID"""
+    if not task_manager.get_task_info(task_id):
+        return jsonify({'error': 'Task not found'}), 404
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_task_events(task_id, last_event_id, message='已重新连接'),
+        mimetype='text/event-stream',
+        headers=SSE_HEADERS
+    )
+
 @report_generation_bp.route('/api/tasks', methods=['GET'])
 @login_required
 def api_get_tasks():
@@ -176,6 +176,7 @@ def api_get_api_status():
             'success': True,
             'error_summary': error_summary,
             'recent_errors': recent_errors,
+            'service_health': api_error_handler.get_service_health(),
             'has_recent_issues': len(recent_errors) > 0
         })
         
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Celery queue latency benchmark
+Runs a mixed workload of long (LLM report) and short (scrape, analysis)
+jobs through in-process workers on the in-memory broker: once with
+every task on one shared queue, as before the queue topology, and once with
+the named queues, routes and per-queue concurrency of src/tasks/celery_app.py.
+Reports how long each kind of job waited in its queue.
+
+Usage:
+    python scripts/benchmark_task_queues.py
+    python scripts/benchmark_task_queues.py --long-jobs 8 --long-seconds 2 --short-jobs 60
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from kombu import Queue
+
+from src.tasks.celery_app import QUEUE_SETTINGS, queue_setting
+
+# Benchmark task -> queue it stands in for
+JOB_QUEUES = {
+    'bench.llm': 'llm',
+    'bench.scrape': 'scrape',
+    'bench.analysis': 'analysis',
+}
+
+
+def build_app(named_queues: bool, waits: list, lock: threading.Lock):
+    """Benchmark Celery app on the in-memory broker (shared by all apps of
+    this process); its jobs append ``(task name, seconds queued)`` to ``waits``.
+    """
+    app = Celery('queue_benchmark', broker='memory://', backend='cache+memory://')
+    app.conf.update(task_serializer='json', accept_content=['json'],
+                    worker_prefetch_multiplier=1, worker_hijack_root_logger=False,
+                    # The memory transport polls once a second by default
+                    broker_transport_options={'polling_interval': 0.005})
+    if named_queues:
+        app.conf.update(
+            task_queues=[Queue(name, routing_key=name) for name in QUEUE_SETTINGS],
+            task_default_queue='analysis',
+            task_routes={name: {'queue': queue} for name, queue in JOB_QUEUES.items()},
+        )
+
+    def job(name):
+        @app.task(name=name)
+        def run(seconds: float, sent_at: float):
+            with lock:
+                waits.append((name, time.monotonic() - sent_at))
+            time.sleep(seconds)
+        return run
+
+    for name in JOB_QUEUES:
+        job(name)
+    return app
+
+
+def workers(named_queues: bool, waits: list, lock: threading.Lock, stack: ExitStack):
+    """Start the workers of a topology inside ``stack``.
+
+    Both topologies get the same total number of slots. Each worker has its
+    own app because a worker's queue selection is stored on the app.
+    """
+    total = sum(queue_setting(queue, 'concurrency') for queue in QUEUE_SETTINGS)
+    if not named_queues:
+        stack.enter_context(start_worker(build_app(False, waits, lock), pool='threads',
+                                         concurrency=total, perform_ping_check=False,
+                                         loglevel='WARNING'))
+        return
+    for queue in QUEUE_SETTINGS:
+        stack.enter_context(start_worker(
+            build_app(True, waits, lock), pool='threads',
+            concurrency=queue_setting(queue, 'concurrency'),
+            queues=[queue], hostname=f'{queue}@benchmark',
+            prefetch_multiplier=queue_setting(queue, 'prefetch'),
+            perform_ping_check=False, loglevel='WARNING'
+        ))
+
+
+def run(named_queues: bool, long_jobs: int, long_seconds: float,
+        short_jobs: int, short_seconds: float) -> Dict[str, List[float]]:
+    """Enqueue a burst of long jobs followed by a stream of short ones.
+
+    Returns:
+        Seconds each job waited, per job kind
+    """
+    waits = []
+    lock = threading.Lock()
+    app = build_app(named_queues, waits, lock)
+    short_names = [name for name in JOB_QUEUES if name != 'bench.llm']
+    with ExitStack() as stack:
+        workers(named_queues, waits, lock, stack)
+        for _ in range(long_jobs):
+            app.tasks['bench.llm'].delay(long_seconds, time.monotonic())
+        for i in range(short_jobs):
+            app.tasks[short_names[i % len(short_names)]].delay(short_seconds, time.monotonic())
+            time.sleep(short_seconds / 2)
+
+        deadline = time.monotonic() + long_jobs * long_seconds + short_jobs * short_seconds + 30
+        while len(waits) < long_jobs + short_jobs and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    by_kind = {'long': [], 'short': []}
+    for name, wait in waits:
+        by_kind['long' if name == 'bench.llm' else 'short'].append(wait)
+    return by_kind
+
+
+def summarize(waits: List[float]) -> str:
+    if not waits:
+        return 'no jobs finished'
+    waits = sorted(waits)
+    p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+    return (f"n={len(waits):3d}  mean={statistics.mean(waits) * 1000:8.1f}ms  "
+            f"p95={p95 * 1000:8.1f}ms  max={waits[-1] * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Celery queue latency under a mixed workload')
+    parser.add_argument('--long-jobs', type=int, default=12, help='LLM report jobs in the burst')
+    parser.add_argument('--long-seconds', type=float, default=1.0, help='Duration of a long job')
+    parser.add_argument('--short-jobs', type=int, default=40, help='Short jobs after the burst')
+    parser.add_argument('--short-seconds', type=float, default=0.02, help='Duration of a short job')
+    args = parser.parse_args()
+
+    os.environ.setdefault('PYTHONWARNINGS', 'ignore')
+    print(f"{args.long_jobs} long jobs x {args.long_seconds}s, "
+          f"{args.short_jobs} short jobs x {args.short_seconds}s")
+    for label, named in (('shared queue', False), ('named queues', True)):
+        # Each topology gets a fresh process: the in-memory broker and
+        # Celery's worker state are process-global
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            waits = executor.submit(run, named, args.long_jobs, args.long_seconds,
+                                    args.short_jobs, args.short_seconds).result()
+        print(f"\n{label}")
+        print(f"  long  {summarize(waits['long'])}")
+        print(f"  short {summarize(waits['short'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+迁移现有数据库：启用 WAL 模式，创建查询所需的复合索引与全文检索表
+
+用法: python scripts/migrate_db_performance.py
+可重复执行；已存在的索引会被跳过。
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import app, db, WeChatArticle
+from src.utils.database_setup import ensure_columns, ensure_indexes
+from src.utils.fulltext_index import ensure_fulltext_indexes
+from src.tasks.wechat_tasks import deduplicate_wechat_articles
+
+
+def migrate():
+    """启用 WAL，补齐模型中声明的索引并创建（回填）全文检索表"""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            mode = conn.execute(text('PRAGMA journal_mode=WAL')).scalar()
+            print(f"journal_mode: {mode}")
+
+        db.create_all()
+        for name in ensure_columns(db):
+            print(f"已添加字段: {name}")
+
+        # 唯一 URL 索引要求先清理重复文章（保留最新一条），并替换旧的普通索引
+        removed = deduplicate_wechat_articles(db.session, WeChatArticle)
+        if removed:
+            print(f"已删除 {removed} 条重复的微信文章")
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP INDEX IF EXISTS ix_wechat_article_url'))
+        created = ensure_indexes(db)
+        if created:
+            print(f"已创建 {len(created)} 个索引:")
+            for name in created:
+                print(f"  - {name}")
+        else:
+            print("索引已是最新，无需迁移")
+
+        fts_created = ensure_fulltext_indexes(db)
+        for name in fts_created:
+            print(f"已创建并回填全文检索表: {name}")
+
+        with db.engine.connect() as conn:
+            conn.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+
+
+if __name__ == "__main__":
+    migrate()
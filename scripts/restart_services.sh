@@ -19,7 +19,19 @@ mkdir -p logs
 # 启动 Celery worker
 echo "  启动 Celery worker..."
 cd /Users/wangyu94/regional-industrial-dashboard
-python3 -m celery -A src.tasks.celery_app worker --loglevel=info --detach --logfile=logs/celery.log
+# 每个队列一个 worker（llm、scrape、analysis），见 src/tasks/celery_app.py
+WORKER_OPTIONS=$(python3 -c "
+from src.tasks.celery_app import QUEUE_SETTINGS, worker_options
+for queue in QUEUE_SETTINGS:
+    print(queue, ' '.join(worker_options(queue)))
+")
+if [ -z "$WORKER_OPTIONS" ]; then
+    echo "  ✗ 无法读取 Celery 队列配置（src/tasks/celery_app.py），未启动任何 worker"
+    exit 1
+fi
+while read -r QUEUE OPTIONS; do
+    python3 -m celery -A src.tasks.celery_app worker $OPTIONS --loglevel=info --detach --logfile=logs/celery-$QUEUE.log
+done <<< "$WORKER_OPTIONS"
 
 sleep 3
 
@@ -35,7 +47,7 @@ echo ""
 echo "✅ 所有服务已启动"
 echo ""
 echo "访问: http://localhost:5000"
-echo "查看日志: tail -f logs/celery.log"
+echo "查看日志: tail -f logs/celery-*.log"
 echo ""
 
 # 如果Flask应用还没运行，提示启动
@@ -131,20 +131,35 @@ cleanup() {
 # Trap cleanup on script exit
 trap cleanup EXIT INT TERM
 
-# Start Celery Worker in background
+# Start one Celery worker per queue (llm, scrape, analysis) so long
+# LLM reports never hold up short jobs; concurrency and prefetch come from
+# QUEUE_SETTINGS in src/tasks/celery_app.py
 print_info "启动Celery后台任务处理器..."
 export PYTHONPATH="$SCRIPT_DIR/..:$PYTHONPATH"
-PYTHONWARNINGS="ignore::UserWarning" venv/bin/celery -A src.tasks.celery_app worker --loglevel=info > logs/celery.log 2>&1 &
-CELERY_PID=$!
-sleep 3
-
-if ps -p $CELERY_PID > /dev/null; then
-    print_success "Celery Worker已启动 (PID: $CELERY_PID)"
-else
-    print_error "Celery Worker启动失败，请查看logs/celery.log"
+WORKER_OPTIONS=$(PYTHONWARNINGS="ignore" venv/bin/python -c "
+from src.tasks.celery_app import QUEUE_SETTINGS, worker_options
+for queue in QUEUE_SETTINGS:
+    print(queue, ' '.join(worker_options(queue)))
+")
+if [ -z "$WORKER_OPTIONS" ]; then
+    print_error "无法读取 Celery 队列配置（src/tasks/celery_app.py），未启动任何 worker"
     exit 1
 fi
 
+while read -r QUEUE OPTIONS; do
+    [ -z "$QUEUE" ] && continue
+    PYTHONWARNINGS="ignore::UserWarning" venv/bin/celery -A src.tasks.celery_app worker $OPTIONS --loglevel=info > logs/celery-$QUEUE.log 2>&1 &
+    CELERY_PID=$!
+    sleep 3
+
+    if ps -p $CELERY_PID > /dev/null; then
+        print_success "Celery Worker [$QUEUE] 已启动 (PID: $CELERY_PID)"
+    else
+        print_error "Celery Worker [$QUEUE] 启动失败，请查看logs/celery-$QUEUE.log"
+        exit 1
+    fi
+done <<< "$WORKER_OPTIONS"
+
 # Start Flask Application
 print_info "启动Flask应用..."
 echo ""
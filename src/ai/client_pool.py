@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Shared LLM SDK clients
+One client per (service, API key) for the whole process, so HTTP connection pools
+and TLS sessions are reused across requests instead of rebuilt per generator
+"""
+
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from openai import OpenAI
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+KIMI_BASE_URL = "https://api.moonshot.cn/v1"
+
+
+class LLMClientPool:
+    """Thread-safe cache of SDK clients keyed by service and API key.
+
+    Reusing one ``OpenAI`` instance keeps its keep-alive connection pool warm.
+    When a key is rotated the next lookup builds a client for the new key and
+    drops the clients of the old one.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+        self._gemini_configured_key: Optional[str] = None
+
+    def _get_or_create(self, service: str, api_key: str, variant: Tuple, factory):
+        key = (service, api_key) + variant
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+            # A different key for the same service means it was rotated
+            stale = [k for k in self._clients if k[0] == service and k[1] != api_key]
+            for k in stale:
+                del self._clients[k]
+            if stale:
+                logger.info(f"🔑 {service.upper()} API Key 已轮换，丢弃 {len(stale)} 个旧客户端")
+            client = factory()
+            self._clients[key] = client
+            return client
+
+    def kimi_client(self, api_key: str, timeout: Optional[float] = None) -> OpenAI:
+        """Shared OpenAI-compatible client for the Kimi (Moonshot) endpoint."""
+        def factory():
+            kwargs = {'api_key': api_key, 'base_url': KIMI_BASE_URL}
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            return OpenAI(**kwargs)
+        return self._get_or_create('kimi', api_key, (timeout,), factory)
+
+    def gemini_model(self, api_key: str, model_name: str):
+        """Shared Gemini model handle; configures the SDK when the key changes."""
+        def factory():
+            if self._gemini_configured_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_configured_key = api_key
+            return genai.GenerativeModel(model_name)
+        return self._get_or_create('gemini', api_key, (model_name,), factory)
+
+    def clear(self):
+        """Drop every cached client."""
+        with self._lock:
+            self._clients.clear()
+            self._gemini_configured_key = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+
+# Global client pool instance
+llm_client_pool = LLMClientPool()
@@ -7,8 +7,10 @@ import logging
 import json
 import time
 from typing import Dict, Any, List
-from openai import OpenAI
 import os
+from src.ai.client_pool import llm_client_pool
+from src.utils.llm_rate_limiter import llm_rate_limiter
+from src.utils.llm_response_cache import llm_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -33,10 +35,7 @@ class KimiPolicyParser:
             raise ValueError("Kimi API key not found in config or environment variables")
         
         # Initialize the OpenAI client with Kimi endpoint
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url="https://api.moonshot.cn/v1"
-        )
+        self.client = llm_client_pool.kimi_client(self.api_key)
         
         # Use a high-context model for better policy understanding
         self.model = "moonshot-v1-128k"
@@ -54,12 +53,13 @@ class KimiPolicyParser:
             logger.error(f"Error loading config: {e}")
             return {}
     
-    def parse_policy_document(self, document_text: str) -> Dict[str, Any]:
+    def parse_policy_document(self, document_text: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Parse a policy document using Kimi AI for comprehensive analysis.
         
         Args:
             document_text: The full text of the policy document
+            use_cache: Serve documents parsed before from the LLM response cache
             
         Returns:
             Dict containing structured policy analysis results
@@ -71,25 +71,35 @@ class KimiPolicyParser:
             # Prepare the prompt for policy analysis
             prompt = self._create_policy_analysis_prompt(document_text)
             
-            # Call Kimi API
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are an expert policy analyst. Analyze the given policy document and extract key information in JSON format. Be precise, comprehensive, and structure the information logically. Focus on identifying specific amounts, dates, eligibility criteria, and requirements."""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}  # Request JSON output
+            messages = [
+                {
+                    "role": "system",
+                    "content": """You are an expert policy analyst. Analyze the given policy document and extract key information in JSON format. Be precise, comprehensive, and structure the information logically. Focus on identifying specific amounts, dates, eligibility criteria, and requirements."""
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+
+            def call():
+                # Call Kimi API
+                with llm_rate_limiter.acquire('kimi', self.api_key, prompt=messages,
+                                              max_tokens=self.max_tokens) as lease:
+                    completion = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        response_format={"type": "json_object"}  # Request JSON output
+                    )
+                    lease.settle(getattr(completion.usage, 'total_tokens', None))
+                return completion.choices[0].message.content
+
+            response_text = llm_response_cache.get_or_call(
+                'kimi', self.model, self.temperature, messages, call,
+                bypass=not use_cache, max_tokens=self.max_tokens, response_format='json_object'
             )
-            
-            response_text = completion.choices[0].message.content
             logger.info(f"✅ Kimi API call completed in {time.time() - start_time:.2f}s")
             
             # Parse the JSON response
@@ -8,11 +8,14 @@ import os
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Optional, List
-from openai import OpenAI
-import google.generativeai as genai
-from src.utils.api_error_handler import api_error_handler, handle_api_error, APIError, APIService
+from typing import Callable, Dict, Optional, List
+from src.utils.api_error_handler import (api_error_handler, handle_api_error, APIError, APIErrorType, APIService,
+                                        CircuitState)
+from src.ai.client_pool import llm_client_pool
+from src.utils.llm_rate_limiter import llm_rate_limiter
+from src.utils.llm_response_cache import llm_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -53,10 +56,7 @@ class LLMReportGenerator:
                 logger.error("❌ Kimi API Key 未找到，请检查配置或环境变量")
                 raise ValueError("Kimi API key not found")
             with self._client_lock:
-                self.client = OpenAI(
-                    api_key=self.api_key,
-                    base_url="https://api.moonshot.cn/v1"
-                )
+                self.client = llm_client_pool.kimi_client(self.api_key)
             self.model_name = os.environ.get('KIMI_MODEL', "moonshot-v1-128k")
             self.temperature = float(os.environ.get('KIMI_TEMPERATURE', 0.7))
             self.max_tokens = int(os.environ.get('KIMI_MAX_TOKENS', 8000))
@@ -72,9 +72,8 @@ class LLMReportGenerator:
             if not self.api_key:
                 logger.error("❌ Gemini API Key 未找到，请检查配置或环境变量")
                 raise ValueError("Gemini API key not found")
-            genai.configure(api_key=self.api_key)
             with self._client_lock:
-                self.client = genai.GenerativeModel('gemini-1.5-pro-latest')
+                self.client = llm_client_pool.gemini_model(self.api_key, 'gemini-1.5-pro-latest')
             self.model_name = "gemini-1.5-pro-latest"
             self.temperature = 0.7
             self.max_tokens = 8000
@@ -156,7 +155,8 @@ class LLMReportGenerator:
             return ""
     
     def generate_report(self, city: str, industry: str, 
-                       additional_context: str = "", max_fallback_attempts: int = 2) -> Dict:
+                       additional_context: str = "", max_fallback_attempts: int = 2,
+                       on_progress: Optional[Callable[[float, str], None]] = None) -> Dict:
         """Generate a comprehensive industrial analysis report with intelligent error handling and fallback.
         
         Args:
@@ -164,6 +164,8 @@ class LLMReportGenerator:
             industry: Target industry name (e.g., "人工智能", "汽车产业")
             additional_context: Additional context or requirements
             max_fallback_attempts: Maximum number of fallback attempts to other services
+            on_progress: Called as ``on_progress(fraction, message)`` at each step,
+                with ``fraction`` between 0 and 1
         
         Returns:
             Dictionary containing the generated report and metadata, with error information if failed
@@ -182,7 +184,7 @@ class LLMReportGenerator:
             
             # 尝试生成报告，支持服务回退
             return self._generate_report_with_fallback(
-                city, industry, prompt, max_fallback_attempts
+                city, industry, prompt, max_fallback_attempts, on_progress
             )
             
         except Exception as e:
@@ -250,22 +252,36 @@ class LLMReportGenerator:
             }
         }
     def _generate_report_with_fallback(self, city: str, industry: str, prompt: str, 
-                                       max_fallback_attempts: int) -> Dict:
+                                       max_fallback_attempts: int,
+                                       on_progress: Optional[Callable[[float, str], None]] = None) -> Dict:
         """Generate report with intelligent fallback between services"""
         
-        services_to_try = [self.current_service] + [
+        def progress(fraction: float, message: str):
+            if on_progress is not None:
+                try:
+                    on_progress(fraction, message)
+                except Exception as e:
+                    logger.debug(f"进度回调失败: {e}")
+        
+        candidates = [self.current_service] + [
             s for s in self.available_services 
             if s != self.current_service
         ]
+        # Healthiest first; services whose circuit is open are skipped
+        services_to_try = api_error_handler.order_services(candidates, preferred=self.current_service)
         
         last_error = None
         attempted_services = []
         
         for i, service in enumerate(services_to_try[:max_fallback_attempts + 1]):
             service_name = service.value
+            if not api_error_handler.allow_request(service):
+                logger.info(f"🔌 {service_name.upper()} 熔断中，跳过")
+                continue
             attempted_services.append(service_name)
             
             logger.info(f"\n🔄 尝试服务 {i+1}/{len(services_to_try)}: {service_name.upper()}")
+            progress(0.05 * i, f'正在调用 {service_name.upper()} API 生成报告 (服务 {i+1}/{len(services_to_try)})')
             
             try:
                 # 临时切换到目标服务
@@ -277,7 +293,8 @@ class LLMReportGenerator:
                 self._reinitialize_client(service_name)
                 
                 # 生成报告
-                result = self._call_api_with_retry(service_name, prompt)
+                result = self._call_api_with_retry(service_name, prompt, on_retry=lambda attempt, delay: progress(
+                    0.05 * i, f'{service_name.upper()} API 调用失败，{delay} 秒后第 {attempt} 次重试'))
                 
                 # 恢复原始服务
                 self.llm_service = original_service
@@ -292,17 +309,22 @@ class LLMReportGenerator:
                     
                     # 解析报告章节
                     logger.info("🔍 解析报告章节...")
+                    progress(0.5, f'{service_name.upper()} 已返回报告，正在解析章节')
                     sections = self._parse_report_sections(report_content)
                     logger.info(f"✓ 解析完成，共 {len(sections)} 个章节: {list(sections.keys())}")
                     
                     # Generate summary and SWOT analysis
+                    progress(0.6, '正在生成报告中文摘要')
                     summary_zh = self.generate_summary(report_content, 'zh')
+                    progress(0.7, '正在生成报告英文摘要')
                     summary_en = self.generate_summary(report_content, 'en')
 
+                    progress(0.8, '正在生成报告 SWOT 分析')
                     swot_analysis = self.generate_swot_analysis(report_content)
 
                     # Generate dashboard data for visualizations
                     from src.visualization.dashboard_generator import DashboardGenerator
+                    progress(0.9, '正在生成仪表盘数据')
                     dashboard_gen = DashboardGenerator()
 
                     # Create a temporary analysis result structure for dashboard generation
@@ -381,8 +403,64 @@ class LLMReportGenerator:
         if last_error:
             raise last_error
         else:
-            raise Exception("所有 AI 服务都无法生成报告")
-    
+            raise api_error_handler.circuit_open_error(candidates)
+
+    def generate_text(self, prompt: str, max_fallback_attempts: int = 2,
+                      on_retry: Optional[Callable[[int, float], None]] = None) -> Dict:
+        """One completion of ``prompt`` with the retry and service fallback of generate_report.
+
+        The generator stays switched to the service that answered, so use one
+        copy per thread (see ``llm_generator_registry``).
+
+        Returns:
+            Dictionary with 'content', 'tokens', 'used_service' and 'attempted_services'
+
+        Raises:
+            The last error once every service failed
+        """
+        candidates = [self.current_service] + [
+            s for s in self.available_services
+            if s != self.current_service
+        ]
+        if not self.enable_fallback:
+            candidates = candidates[:1]
+        services_to_try = api_error_handler.order_services(candidates, preferred=self.current_service)
+
+        last_error = None
+        attempted_services = []
+
+        for i, service in enumerate(services_to_try[:max_fallback_attempts + 1]):
+            service_name = service.value
+            if not api_error_handler.allow_request(service):
+                logger.info(f"🔌 {service_name.upper()} 熔断中，跳过")
+                continue
+            attempted_services.append(service_name)
+            try:
+                if service_name != self.llm_service or i > 0:
+                    self._reinitialize_client(service_name)
+                    self.llm_service = service_name
+                    self.current_service = service
+                result = self._call_api_with_retry(service_name, prompt, on_retry=on_retry)
+                if result and result.get('success'):
+                    return {
+                        'content': result['content'],
+                        'tokens': result['tokens'],
+                        'used_service': service_name,
+                        'attempted_services': attempted_services
+                    }
+            except Exception as e:
+                logger.warning(f"❌ {service_name.upper()} 服务失败: {str(e)}")
+                last_error = e
+                api_error = handle_api_error(e, service_name, f"服务回退尝试 {i+1}")
+                if api_error.error_type.value == 'quota_exceeded' or \
+                        api_error_handler.is_connection_issue(service, e):
+                    logger.info(f"➡️  尝试下一个服务...")
+                    continue
+                raise
+
+        logger.error(f"❌ 所有可用服务都失败，已尝试: {attempted_services}")
+        raise last_error or api_error_handler.circuit_open_error(candidates)
+
     def _reinitialize_client(self, service_name: str):
         """Reinitialize the API client for the specified service"""
         logger.info(f"🔧 重新初始化 {service_name.upper()} 客户端...")
@@ -398,10 +476,7 @@ class LLMReportGenerator:
             if not self.api_key:
                 raise ValueError("Kimi API key not found in config")
 
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url="https://api.moonshot.cn/v1"
-            )
+            self.client = llm_client_pool.kimi_client(self.api_key)
             self.model_name = "moonshot-v1-128k"
 
         elif service_name == 'gemini':
@@ -414,8 +489,7 @@ class LLMReportGenerator:
             if not self.api_key:
                 raise ValueError("Gemini API key not found in config")
 
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel('gemini-pro')
+            self.client = llm_client_pool.gemini_model(self.api_key, 'gemini-pro')
             self.model_name = "gemini-pro"
 
         elif service_name == 'doubao':
@@ -427,7 +501,8 @@ class LLMReportGenerator:
             self.client = None  # 占位符
             self.model_name = "doubao-pro"
     
-    def _call_api_with_retry(self, service_name: str, prompt: str) -> Dict:
+    def _call_api_with_retry(self, service_name: str, prompt: str,
+                             on_retry: Optional[Callable[[int, float], None]] = None) -> Dict:
         """Call API with intelligent retry logic"""
         max_retries = 3
         base_delay = 2
@@ -440,36 +515,55 @@ class LLMReportGenerator:
                 # Key rotation check and reinit if necessary
                 self._check_key_rotation_and_reinit(service_name)
                 if service_name == 'kimi':
-                    return self._call_kimi_api(prompt, start_time)
+                    result = self._call_kimi_api(prompt, start_time)
                 elif service_name == 'gemini':
-                    return self._call_gemini_api(prompt, start_time)
+                    result = self._call_gemini_api(prompt, start_time)
                 elif service_name == 'doubao':
-                    return self._call_doubao_api(prompt, start_time)
+                    result = self._call_doubao_api(prompt, start_time)
+                else:
+                    return None
+                api_error_handler.record_success(self._get_service_enum(service_name),
+                                                 time.time() - start_time)
+                return result
                 
             except Exception as e:
                 elapsed = time.time() - start_time
                 logger.error(f"❌ API 调用失败 (尝试 {attempt + 1}/{max_retries}，耗时 {elapsed:.2f}秒)")
                 
                 # 使用错误处理器分析错误
-                api_error = handle_api_error(e, service_name, f"API 调用尝试 {attempt + 1}")
+                api_error = handle_api_error(e, service_name, f"API 调用尝试 {attempt + 1}", latency=elapsed)
                 
                 # 检查是否应该立即重试
                 if not api_error_handler.should_retry_immediately(api_error):
                     logger.warning(f"⏹️  错误类型不建议重试: {api_error.error_type.value}")
                     raise e
                 
+                # 熔断器已打开，交给回退逻辑换服务
+                if api_error_handler.breaker_state(api_error.service) != CircuitState.CLOSED:
+                    logger.warning(f"🔌 {service_name.upper()} 熔断器已打开，停止重试")
+                    raise e
+                
                 if attempt < max_retries - 1:
                     delay = base_delay * (2 ** attempt)  # 指数退避
                     retry_after = api_error.retry_after or delay
                     logger.warning(f"⏳ 等待 {retry_after} 秒后重试...")
-                    time.sleep(retry_after)
+                    if on_retry is not None:
+                        on_retry(attempt + 1, retry_after)
+                    if api_error.error_type == APIErrorType.RATE_LIMITED and \
+                            not llm_rate_limiter.limits_for(service_name).unlimited:
+                        # Pause every caller of this key, not just this one;
+                        # the retry waits for the bucket to reopen
+                        llm_rate_limiter.backoff(service_name, getattr(self, 'api_key', None), retry_after)
+                    else:
+                        time.sleep(retry_after)
                 else:
                     logger.error("💥 所有重试均失败，放弃请求")
                     raise
     
     def _call_kimi_api(self, prompt: str, start_time: float) -> Dict:
         """Call Kimi API"""
-        with self._client_lock:
+        with self._client_lock, llm_rate_limiter.acquire('kimi', self.api_key, prompt=prompt,
+                                                         max_tokens=self.max_tokens) as lease:
             completion = self.client.chat.completions.create(
             model=self.model_name,
             messages=[
@@ -485,6 +579,7 @@ class LLMReportGenerator:
             temperature=self.temperature,
             max_tokens=self.max_tokens
         )
+            lease.settle(completion.usage.total_tokens)
         
         report_content = completion.choices[0].message.content
         prompt_tokens = completion.usage.prompt_tokens
@@ -507,7 +602,8 @@ class LLMReportGenerator:
     
     def _call_gemini_api(self, prompt: str, start_time: float) -> Dict:
         """Call Gemini API"""
-        with self._client_lock:
+        with self._client_lock, llm_rate_limiter.acquire('gemini', self.api_key, prompt=prompt,
+                                                         max_tokens=self.max_tokens):
             response = self.client.generate_content(
             prompt,
             generation_config={
@@ -652,25 +748,27 @@ class LLMReportGenerator:
         try:
             prompt = self._prepare_prompt(city, industry, additional_context)
             if self.llm_service == 'kimi':
-                stream = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "你是一位专业的产业分析师。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                    stream=True
-                )
-                for chunk in stream:
-                    delta = getattr(chunk.choices[0], 'delta', None)
-                    if delta and getattr(delta, 'content', None):
-                        yield delta.content
+                with llm_rate_limiter.acquire('kimi', self.api_key, prompt=prompt, max_tokens=self.max_tokens):
+                    stream = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[
+                            {"role": "system", "content": "你是一位专业的产业分析师。"},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        stream=True
+                    )
+                    for chunk in stream:
+                        delta = getattr(chunk.choices[0], 'delta', None)
+                        if delta and getattr(delta, 'content', None):
+                            yield delta.content
             elif self.llm_service == 'gemini':
-                response = self.client.generate_content(prompt, stream=True)
-                for chunk in response:
-                    if hasattr(chunk, 'text') and chunk.text:
-                        yield chunk.text
+                with llm_rate_limiter.acquire('gemini', self.api_key, prompt=prompt, max_tokens=self.max_tokens):
+                    response = self.client.generate_content(prompt, stream=True)
+                    for chunk in response:
+                        if hasattr(chunk, 'text') and chunk.text:
+                            yield chunk.text
             else:
                 # Fallback: no streaming support
                 result = self.generate_report(city, industry, additional_context)
@@ -679,8 +777,30 @@ class LLMReportGenerator:
             logger.error(f"Streaming failed: {e}")
             yield f"[流式生成出错] {e}"
 
-    def generate_summary(self, full_report: str, language: str = 'zh') -> str:
-        """Generate a concise summary of the full report."""
+    def _cached_completion(self, prompt: str, call, use_cache: bool = True,
+                           temperature: Optional[float] = None, **params) -> str:
+        """Run an LLM call through the response cache of the current service and model.
+
+        Only cache misses reach the API, so only they wait for the rate limiter.
+        """
+        def limited_call():
+            with llm_rate_limiter.acquire(self.llm_service, getattr(self, 'api_key', None), prompt=prompt,
+                                          max_tokens=params.get('max_tokens')):
+                return call()
+
+        return llm_response_cache.get_or_call(
+            self.llm_service, self.model_name, temperature, prompt, limited_call,
+            bypass=not use_cache, **params
+        )
+
+    def generate_summary(self, full_report: str, language: str = 'zh', use_cache: bool = True) -> str:
+        """Generate a concise summary of the full report.
+
+        Args:
+            full_report: Complete report text
+            language: 'zh' or 'en'
+            use_cache: Serve identical requests from the LLM response cache
+        """
         logger.info(f"\n{'='*60}")
         logger.info(f"📝 生成{language.upper()}摘要...")
         logger.info(f"{'='*60}")
@@ -713,18 +833,23 @@ Please output the summary directly without additional formatting instructions.""
             start_time = time.time()
             
             if self.llm_service == 'kimi':
-                completion = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "user", "content": summary_prompt}
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=1000
+                def call():
+                    completion = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[
+                            {"role": "user", "content": summary_prompt}
+                        ],
+                        temperature=self.temperature,
+                        max_tokens=1000
+                    )
+                    return completion.choices[0].message.content
+                summary_content = self._cached_completion(
+                    summary_prompt, call, use_cache, temperature=self.temperature, max_tokens=1000
                 )
-                summary_content = completion.choices[0].message.content
             elif self.llm_service == 'gemini':
-                response = self.client.generate_content(summary_prompt)
-                summary_content = response.text
+                summary_content = self._cached_completion(
+                    summary_prompt, lambda: self.client.generate_content(summary_prompt).text, use_cache
+                )
             elif self.llm_service == 'doubao':
                 # 调用豆包大模型 API 生成摘要 (占位符实现)
                 logger.warning("⚠️ 豆包大模型摘要生成功能尚未完全实现")
@@ -739,8 +864,13 @@ Please output the summary directly without additional formatting instructions.""
             logger.error(f"❌ 摘要生成失败: {type(e).__name__} - {str(e)}")
             return "摘要生成失败" if language == 'zh' else "Summary generation failed"
     
-    def generate_swot_analysis(self, full_report: str) -> Dict:
-        """Generate SWOT analysis from the full report."""
+    def generate_swot_analysis(self, full_report: str, use_cache: bool = True) -> Dict:
+        """Generate SWOT analysis from the full report.
+
+        Args:
+            full_report: Complete report text
+            use_cache: Serve identical requests from the LLM response cache
+        """
         logger.info(f"\n{'='*60}")
         logger.info(f"📊 生成 SWOT 分析...")
         logger.info(f"{'='*60}")
@@ -771,25 +901,32 @@ Please output the summary directly without additional formatting instructions.""
             start_time = time.time()
             
             if self.llm_service == 'kimi':
-                completion = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "你是一位专业的战略分析师，擅长进行SWOT分析。请严格按照JSON格式输出结果，不要添加任何markdown标记或额外说明。"
-                        },
-                        {
-                            "role": "user",
-                            "content": swot_prompt
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                response_text = completion.choices[0].message.content.strip()
+                swot_messages = [
+                    {
+                        "role": "system",
+                        "content": "你是一位专业的战略分析师，擅长进行SWOT分析。请严格按照JSON格式输出结果，不要添加任何markdown标记或额外说明。"
+                    },
+                    {
+                        "role": "user",
+                        "content": swot_prompt
+                    }
+                ]
+
+                def call():
+                    completion = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=swot_messages,
+                        temperature=0.7,
+                        max_tokens=2000
+                    )
+                    return completion.choices[0].message.content
+                response_text = self._cached_completion(
+                    swot_messages, call, use_cache, temperature=0.7, max_tokens=2000
+                ).strip()
             elif self.llm_service == 'gemini':
-                response = self.client.generate_content(swot_prompt)
-                response_text = response.text.strip()
+                response_text = self._cached_completion(
+                    swot_prompt, lambda: self.client.generate_content(swot_prompt).text, use_cache
+                ).strip()
             elif self.llm_service == 'doubao':
                 # 调用豆包大模型 API 生成 SWOT 分析 (占位符实现)
                 logger.warning("⚠️ 豆包大模型 SWOT 分析功能尚未完全实现")
@@ -938,8 +1075,52 @@ Please output the summary directly without additional formatting instructions.""
         logger.info(f"✓ 从报告提取SWOT: 优势{len(swot['strengths'])}, 劣势{len(swot['weaknesses'])}, 机遇{len(swot['opportunities'])}, 威胁{len(swot['threats'])}")
         return swot
     
-    def answer_question(self, report_content: str, question: str) -> str:
-        """Answer a specific question about the report."""
+    def generate_post_analysis(self, full_report: str, parallel: bool = False,
+                               on_complete: Optional[Callable[[str], None]] = None) -> Dict:
+        """Generate the zh/en summaries and the SWOT analysis of a finished report.
+
+        Args:
+            full_report: Complete report text
+            parallel: Issue the three independent calls concurrently instead of one after another
+            on_complete: Called with 'summary_zh', 'summary_en' or 'swot' as each part finishes
+
+        Returns:
+            Dictionary with 'summary_zh', 'summary_en' and 'swot'
+        """
+        jobs = {
+            'summary_zh': lambda: self.generate_summary(full_report, 'zh'),
+            'summary_en': lambda: self.generate_summary(full_report, 'en'),
+            'swot': lambda: self.generate_swot_analysis(full_report),
+        }
+        results = {}
+
+        if not parallel:
+            for name, job in jobs.items():
+                results[name] = job()
+                if on_complete:
+                    on_complete(name)
+            return results
+
+        logger.info("⚡ 并行生成中英文摘要与 SWOT 分析")
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {executor.submit(job): name for name, job in jobs.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name] = future.result()
+                if on_complete:
+                    on_complete(name)
+        logger.info(f"✅ 摘要与 SWOT 并行生成完成，耗时: {time.time() - start_time:.2f} 秒")
+        return results
+    
+    def answer_question(self, report_content: str, question: str, use_cache: bool = True) -> str:
+        """Answer a specific question about the report.
+
+        Args:
+            report_content: Full report text
+            question: User question
+            use_cache: Serve repeated questions from the LLM response cache
+        """
         try:
             qa_prompt = f"""基于以下产业分析报告，回答用户的问题。
 请提供准确、简洁的答案，并在可能的情况下引用报告中的具体内容。
@@ -952,18 +1133,23 @@ Please output the summary directly without additional formatting instructions.""
 请直接回答问题，不需要额外的格式说明。"""
             
             if self.llm_service == 'kimi':
-                completion = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "user", "content": qa_prompt}
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=1000
+                def call():
+                    completion = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[
+                            {"role": "user", "content": qa_prompt}
+                        ],
+                        temperature=self.temperature,
+                        max_tokens=1000
+                    )
+                    return completion.choices[0].message.content
+                return self._cached_completion(
+                    qa_prompt, call, use_cache, temperature=self.temperature, max_tokens=1000
                 )
-                return completion.choices[0].message.content
             elif self.llm_service == 'gemini':
-                response = self.client.generate_content(qa_prompt)
-                return response.text
+                return self._cached_completion(
+                    qa_prompt, lambda: self.client.generate_content(qa_prompt).text, use_cache
+                )
         
         except Exception as e:
             logger.error(f"Error answering question: {e}")
@@ -988,10 +1174,9 @@ Please output the summary directly without additional formatting instructions.""
             logger.info(f"检测到 {service_name.upper()} API Key 发生变更，正在重新初始化客户端...")
             if service_name == 'kimi':
                 with self._client_lock:
-                    self.client = OpenAI(api_key=current, base_url="https://api.moonshot.cn/v1")
+                    self.client = llm_client_pool.kimi_client(current)
                 self.api_key = current
             elif service_name == 'gemini':
-                genai.configure(api_key=current)
                 with self._client_lock:
-                    self.client = genai.GenerativeModel('gemini-1.5-pro-latest')
+                    self.client = llm_client_pool.gemini_model(current, 'gemini-1.5-pro-latest')
                 self.api_key = current
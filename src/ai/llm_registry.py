@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Process-wide registry of pre-warmed LLM report generators
+Builds one generator per (kind, service, config) and hands out cheap per-request
+copies, rebuilding it when config.json, the prompt template or an API key changes
+"""
+
+import copy
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.ai.llm_generator import LLMReportGenerator
+from src.ai.streaming_llm_generator import StreamingLLMReportGenerator
+
+logger = logging.getLogger(__name__)
+
+# Environment variables read while a generator is constructed; a change in any
+# of them (e.g. a rotated key) rebuilds the cached generator
+GENERATOR_ENV_VARS = (
+    'KIMI_API_KEY', 'MOONSHOT_API_KEY', 'GOOGLE_GEMINI_API_KEY',
+    'KIMI_MODEL', 'KIMI_TEMPERATURE', 'KIMI_MAX_TOKENS',
+    'LLM_PARALLEL_POST_PROCESSING', 'LLM_STREAM_PACING',
+)
+
+PROMPT_TEMPLATE_FILE = 'industry_analysis_llm_prompt.md'
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class LLMGeneratorRegistry:
+    """Thread-safe cache of LLM generators per service.
+
+    Constructing a generator reads config.json and the prompt template and
+    detects the available services. The registry does that once per
+    configuration and hands out shallow copies. Copies share the config,
+    template and pooled SDK clients (see ``client_pool``), but each request
+    can switch services or tweak options on its copy without affecting others.
+
+    Before handing out a copy, the registry checks the config and template
+    mtimes and the relevant environment variables (a stat call, no file reads).
+    If any of them changed, the generator is rebuilt.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple, Tuple[Tuple, object]] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple, threading.Lock] = {}
+        self.stats = {'hits': 0, 'builds': 0, 'reloads': 0}
+
+    def _fingerprint(self, config_path: str) -> Tuple:
+        return (
+            _file_signature(Path(config_path)),
+            _file_signature(Path(PROMPT_TEMPLATE_FILE)),
+            tuple(os.environ.get(name) for name in GENERATOR_ENV_VARS),
+        )
+
+    def _get(self, generator_cls, llm_service: str, config_path: str, enable_fallback: bool):
+        config_path = os.path.abspath(config_path)
+        key = (generator_cls.__name__, llm_service, config_path, enable_fallback)
+        fingerprint = self._fingerprint(config_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == fingerprint:
+                self.stats['hits'] += 1
+                return copy.copy(entry[1])
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Build outside the registry lock so other services are not blocked
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] == fingerprint:
+                    self.stats['hits'] += 1
+                    return copy.copy(entry[1])
+                reload = entry is not None
+
+            if reload:
+                logger.info(f"🔄 {llm_service.upper()} 配置或密钥已变更，重新构建 {generator_cls.__name__}")
+            generator = generator_cls(config_path=config_path, llm_service=llm_service,
+                                      enable_fallback=enable_fallback)
+            with self._lock:
+                self._entries[key] = (fingerprint, generator)
+                self.stats['builds'] += 1
+                if reload:
+                    self.stats['reloads'] += 1
+            return copy.copy(generator)
+
+    def get_generator(self, llm_service: str = 'kimi', config_path: str = 'config.json',
+                      enable_fallback: bool = True) -> LLMReportGenerator:
+        """Per-request copy of the shared LLMReportGenerator for a service.
+
+        Raises the same errors as constructing the generator (e.g. ValueError
+        for a missing API key); failed builds are not cached.
+        """
+        return self._get(LLMReportGenerator, llm_service, config_path, enable_fallback)
+
+    def get_streaming_generator(self, llm_service: str = 'kimi', config_path: str = 'config.json',
+                                enable_fallback: bool = True,
+                                **options) -> StreamingLLMReportGenerator:
+        """Per-request copy of the shared StreamingLLMReportGenerator for a service.
+
+        Args:
+            **options: Per-request attributes to override on the copy, such as
+                parallel_post_processing or stream_pacing (None values are ignored)
+        """
+        generator = self._get(StreamingLLMReportGenerator, llm_service, config_path, enable_fallback)
+        for name, value in options.items():
+            if value is not None:
+                setattr(generator, name, value)
+        return generator
+
+    def warm(self, services: Optional[Iterable[str]] = None, config_path: str = 'config.json',
+             streaming: bool = True) -> Dict[str, bool]:
+        """Build generators ahead of the first request.
+
+        Args:
+            services: Services to warm, defaults to kimi and gemini
+            config_path: Configuration file path
+            streaming: Also warm the streaming generators
+
+        Returns:
+            Mapping of service name to whether its generators could be built
+        """
+        results = {}
+        for service in services or ('kimi', 'gemini'):
+            try:
+                self.get_generator(service, config_path)
+                if streaming:
+                    self.get_streaming_generator(service, config_path)
+                results[service] = True
+            except Exception as e:
+                logger.info(f"跳过预热 {service.upper()} 生成器: {e}")
+                results[service] = False
+        logger.info(f"LLM 生成器预热完成: {results}")
+        return results
+
+    def invalidate(self, llm_service: Optional[str] = None):
+        """Drop cached generators (all, or those of one service)."""
+        with self._lock:
+            for key in [k for k in self._entries if llm_service is None or k[1] == llm_service]:
+                del self._entries[key]
+
+
+# Global generator registry instance
+llm_generator_registry = LLMGeneratorRegistry()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Section-by-section LLM report generation
+Splits the report prompt template into its numbered sections and generates
+each one as its own LLM call. Every finished section is checkpointed to disk,
+so a retried report task only pays for the sections it has not written yet.
+Independent sections run concurrently within the service's shared budget
+(see ``llm_rate_limiter``); the executive summary and conclusion are written
+last, from the other sections
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.llm_rate_limiter import llm_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Section number in the prompt template -> key in report['sections'];
+# the same keys as LLMReportGenerator._parse_report_sections
+SECTION_KEYS = {
+    1: 'executive_summary',
+    2: 'industry_overview',
+    3: 'policy_landscape',
+    4: 'ecosystem',
+    5: 'value_chain',
+    6: 'ai_integration',
+    7: 'conclusion',
+}
+
+# Sections that summarize the others, so they are generated after them
+DEPENDENT_SECTIONS = frozenset({'executive_summary', 'conclusion'})
+
+# Characters of each finished section passed to the dependent sections
+CONTEXT_CHARS_PER_SECTION = 1500
+
+_HEADING_RE = re.compile(r'^(\d+)\.\s+(\S.*)$')
+
+
+def section_concurrency(service: str) -> int:
+    """Sections of one report generated at a time.
+
+    Defaults to the service's concurrency budget; the rate limiter still
+    caps calls across all reports and workers. LLM_SECTION_CONCURRENCY
+    overrides it for every service.
+    """
+    override = os.getenv('LLM_SECTION_CONCURRENCY')
+    if override:
+        try:
+            return max(1, int(override))
+        except ValueError:
+            logger.warning(f"无效的 LLM_SECTION_CONCURRENCY: {override}")
+    return llm_rate_limiter.limits_for(service).concurrency or 2
+
+
+@dataclass
+class ReportSection:
+    number: int
+    key: str
+    heading: str
+    outline: str
+
+
+class SectionGenerationError(Exception):
+    """Some sections failed; the finished ones are checkpointed."""
+
+    def __init__(self, failed: Dict[str, Exception]):
+        self.failed = failed
+        details = '; '.join(f"{key}: {error}" for key, error in failed.items())
+        super().__init__(f"{len(failed)} 个章节生成失败 ({details})")
+
+
+def split_report_template(template: str, city: str, industry: str) -> Tuple[str, List[ReportSection]]:
+    """Title and numbered sections of the report prompt template.
+
+    A section starts at a line like ``3. 政策环境与扶持力度 (Policy Landscape)``;
+    the lines below it, up to the next section, are its outline. Placeholders
+    are filled in.
+
+    Returns:
+        ``(title, sections)``; no sections when the template has none
+    """
+    text = template.replace('[目标城市]', city).replace('[目标行业]', industry)
+    title = ''
+    sections: List[ReportSection] = []
+    outline: List[str] = []
+
+    def close():
+        if sections:
+            sections[-1].outline = '\n'.join(outline).strip()
+
+    for line in text.split('\n'):
+        match = _HEADING_RE.match(line.strip())
+        if match:
+            close()
+            outline = []
+            number = int(match.group(1))
+            sections.append(ReportSection(number, SECTION_KEYS.get(number, f'section_{number}'),
+                                          line.strip(), ''))
+        elif sections:
+            outline.append(line)
+        elif line.strip() and not title:
+            title = line.strip()
+    close()
+    return title, sections
+
+
+def _strip_echoed_heading(content: str, section: ReportSection) -> str:
+    """Drop the section heading when the model repeats it as its first line."""
+    lines = content.strip().split('\n')
+    first = lines[0].strip().lstrip('#').strip().strip('*').strip() if lines else ''
+    name = section.heading.split('.', 1)[1].split(' (')[0].strip()
+    if first.lstrip('0123456789. ').startswith(name):
+        lines = lines[1:]
+    return '\n'.join(lines).strip()
+
+
+class SectionCheckpointStore:
+    """One JSON file per finished section in a per-report directory.
+
+    ``manifest.json`` holds a fingerprint of the report inputs; checkpoints
+    written for other inputs (a changed template or context) are discarded.
+    Files are replaced atomically, so an interrupted write leaves no partial
+    checkpoint.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _write(self, path: Path, data: Dict):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def load(self, fingerprint: str) -> Dict[str, Dict]:
+        """Checkpointed sections for these inputs, by section key."""
+        try:
+            with open(self.directory / self.MANIFEST, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+
+        if not manifest or manifest.get('fingerprint') != fingerprint:
+            if manifest:
+                logger.info(f"报告输入已变化，丢弃旧的章节检查点: {self.directory}")
+            self.clear()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._write(self.directory / self.MANIFEST, {'fingerprint': fingerprint,
+                                                         'created_at': time.time()})
+            return {}
+
+        records = {}
+        for path in self.directory.glob('*.json'):
+            if path.name == self.MANIFEST:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+                records[record['key']] = record
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"忽略损坏的章节检查点 {path}: {e}")
+        return records
+
+    def save(self, key: str, record: Dict):
+        self._write(self._path(key), dict(record, key=key))
+
+    def clear(self):
+        """Remove every checkpoint of this report."""
+        if not self.directory.exists():
+            return
+        for path in self.directory.iterdir():
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"删除章节检查点失败 {path}: {e}")
+        try:
+            self.directory.rmdir()
+        except OSError:
+            pass
+
+
+class SectionedReportBuilder:
+    """Generates a report one section per LLM call, resuming from checkpoints.
+
+    The result has the shape of ``LLMReportGenerator.generate_report`` minus
+    the summaries, SWOT and dashboard data, which the report task derives
+    from ``full_content`` afterwards.
+    """
+
+    def __init__(self, generator, checkpoints: Optional[SectionCheckpointStore] = None):
+        self.generator = generator
+        self.checkpoints = checkpoints
+
+    @staticmethod
+    def fingerprint(city: str, industry: str, additional_context: str, template: str) -> str:
+        payload = json.dumps([city, industry, additional_context, template], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _prompt(self, title: str, section: ReportSection, additional_context: str,
+                finished: Dict[str, Dict], sections: List[ReportSection]) -> str:
+        parts = [f"你正在撰写《{title}》中的一个章节。"]
+        if section.key in DEPENDENT_SECTIONS:
+            context = '\n\n'.join(
+                f"{s.heading}\n{finished[s.key]['content'][:CONTEXT_CHARS_PER_SECTION]}"
+                for s in sections if s.key not in DEPENDENT_SECTIONS and s.key in finished
+            )
+            parts.append(f"以下是报告其他章节的内容，请以此为依据撰写本章节：\n\n{context}")
+        parts.append(f"请只撰写以下章节，不要输出其他章节内容：\n\n{section.heading}\n\n{section.outline}")
+        if additional_context:
+            parts.append(f"补充信息和要求：\n{additional_context}")
+        parts.append("内容应包含具体的数据、案例和洞察。")
+        return '\n\n'.join(parts)
+
+    def _generate_section(self, prompt: str, section: ReportSection) -> Dict:
+        # One generator copy per call: generate_text switches services on
+        # fallback, and the client lock would serialize shared copies
+        generator = copy.copy(self.generator)
+        generator._client_lock = threading.Lock()
+        started = time.time()
+        logger.info(f"📝 开始生成章节: {section.heading}")
+        result = generator.generate_text(prompt)
+        logger.info(f"✅ 章节完成: {section.heading} ({time.time() - started:.1f} 秒, "
+                    f"{result['used_service'].upper()})")
+        return {
+            'heading': section.heading,
+            'content': _strip_echoed_heading(result['content'], section),
+            'tokens': result.get('tokens') or {},
+            'service': result['used_service'],
+            'attempted_services': result.get('attempted_services', []),
+            'generated_at': time.time(),
+        }
+
+    def _run_stage(self, stage: List[ReportSection], title: str, additional_context: str,
+                   finished: Dict[str, Dict], sections: List[ReportSection],
+                   on_done: Callable[[ReportSection], None]):
+        """Generate ``stage`` concurrently; checkpoints each section as it
+        finishes and raises SectionGenerationError once the others are done."""
+        if not stage:
+            return
+        prompts = {s.key: self._prompt(title, s, additional_context, finished, sections) for s in stage}
+        workers = min(len(stage), section_concurrency(self.generator.llm_service))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-section')
+        failed: Dict[str, Exception] = {}
+        try:
+            pending = {executor.submit(self._generate_section, prompts[s.key], s): s for s in stage}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    section = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ 章节生成失败: {section.heading}: {e}")
+                        failed[section.key] = e
+                        continue
+                    finished[section.key] = record
+                    if self.checkpoints is not None:
+                        try:
+                            self.checkpoints.save(section.key, record)
+                        except OSError as e:
+                            logger.warning(f"保存章节检查点失败 {section.key}: {e}")
+                    on_done(section)
+        except BaseException:
+            # e.g. the soft time limit: stop queued sections; the running
+            # ones still checkpoint when their call returns
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+        if failed:
+            raise SectionGenerationError(failed)
+
+    def generate(self, city: str, industry: str, additional_context: str = "",
+                 on_section: Optional[Callable[[int, int, str, bool], None]] = None) -> Dict:
+        """Generate (or finish) the report.
+
+        Args:
+            on_section: Called as ``on_section(done, total, key, resumed)``
+                for every section, including those restored from checkpoints
+
+        Raises:
+            SectionGenerationError: Some sections failed after retries and
+                fallback; the task can retry and resume
+        """
+        template = self.generator.prompt_template
+        title, sections = split_report_template(template, city, industry)
+        if not sections:
+            logger.warning("⚠️ 提示词模板中没有编号章节，改为整篇生成报告")
+            return self.generator.generate_report(city, industry, additional_context)
+
+        finished: Dict[str, Dict] = {}
+        if self.checkpoints is not None:
+            restored = self.checkpoints.load(self.fingerprint(city, industry, additional_context, template))
+            finished.update({key: record for key, record in restored.items()
+                             if key in {s.key for s in sections}})
+        resumed = [s.key for s in sections if s.key in finished]
+        if resumed:
+            logger.info(f"♻️ 从检查点恢复 {len(resumed)}/{len(sections)} 个章节: {resumed}")
+
+        done_lock = threading.Lock()
+        done_count = [0]
+
+        def report(section: ReportSection, was_resumed: bool = False):
+            with done_lock:
+                done_count[0] += 1
+                count = done_count[0]
+            if on_section is not None:
+                try:
+                    on_section(count, len(sections), section.key, was_resumed)
+                except Exception as e:
+                    logger.debug(f"章节进度回调失败: {e}")
+
+        for section in sections:
+            if section.key in finished:
+                report(section, True)
+
+        todo = [s for s in sections if s.key not in finished]
+        self._run_stage([s for s in todo if s.key not in DEPENDENT_SECTIONS],
+                        title, additional_context, finished, sections, report)
+        self._run_stage([s for s in todo if s.key in DEPENDENT_SECTIONS],
+                        title, additional_context, finished, sections, report)
+
+        return self._assemble(city, industry, title, sections, finished, resumed)
+
+    def _assemble(self, city: str, industry: str, title: str, sections: List[ReportSection],
+                  finished: Dict[str, Dict], resumed: List[str]) -> Dict:
+        # Same layout as a single-call report, so _parse_report_sections and
+        # the report view read it unchanged
+        blocks = [title] if title else []
+        blocks += [f"{s.heading}\n\n{finished[s.key]['content']}" for s in sections]
+        full_content = '\n\n'.join(blocks)
+
+        tokens = {'prompt': 0, 'completion': 0, 'total': 0}
+        services = Counter()
+        attempted: List[str] = []
+        for section in sections:
+            record = finished[section.key]
+            for name in tokens:
+                tokens[name] += record.get('tokens', {}).get(name) or 0
+            services[record.get('service')] += 1
+            for service in record.get('attempted_services', []):
+                if service not in attempted:
+                    attempted.append(service)
+        used_service = services.most_common(1)[0][0] or self.generator.llm_service
+
+        return {
+            'success': True,
+            'city': city,
+            'industry': industry,
+            'full_content': full_content,
+            'sections': {s.key: finished[s.key]['content'] for s in sections},
+            'metadata': {
+                'generated_at': None,
+                'model': getattr(self.generator, 'model_name', None),
+                'provider': used_service,
+                'prompt_version': '1.0',
+                'tokens': tokens,
+                'sectioned': True
+            },
+            'used_service': used_service,
+            'attempted_services': attempted or [used_service],
+            'resumed_sections': resumed
+        }
@@ -6,28 +6,119 @@ Provides streaming capabilities for Google Gemini and Kimi APIs
 
 import os
 import json
+import functools
 import logging
 import time
 import asyncio
-from typing import Dict, Optional, AsyncIterator, Iterator
+import threading
+from typing import Any, Dict, Iterable, List, Optional, AsyncIterator, Iterator
 from pathlib import Path
-from openai import OpenAI
-import google.generativeai as genai
 from src.utils.api_error_handler import api_error_handler, handle_api_error, APIError, APIService
+from src.ai.client_pool import llm_client_pool
+from src.utils.llm_rate_limiter import llm_rate_limiter
 
 logger = logging.getLogger(__name__)
 
 
+async def iterate_in_thread(iterable: Iterable[Any]) -> AsyncIterator[Any]:
+    """Consume a blocking iterable (e.g. a sync SDK stream) without blocking the event loop
+
+    A daemon thread drives the iterator and hands items to the loop through an
+    asyncio.Queue. If the consumer stops early, the reader stops at the next
+    item and closes the underlying stream when it supports ``close()``.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # Event loop already closed, nobody is listening anymore
+            stop.set()
+
+    def reader():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                put(item)
+        except Exception as e:
+            put(None, e)
+        finally:
+            if stop.is_set() and hasattr(iterable, 'close'):
+                try:
+                    iterable.close()
+                except Exception:
+                    pass
+            put(done)
+
+    threading.Thread(target=reader, name='llm-stream-reader', daemon=True).start()
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+
+
+async def merge_async_streams(streams: List[AsyncIterator[Dict]]) -> AsyncIterator[Dict]:
+    """Run several async chunk streams concurrently and yield their chunks as they arrive
+
+    Chunks of one stream keep their relative order. If any stream raises, the
+    remaining streams are cancelled and the error is re-raised to the consumer.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(stream):
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            await queue.put((done, None))
+
+    tasks = [asyncio.ensure_future(pump(stream)) for stream in streams]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 class StreamingLLMReportGenerator:
     """Streaming LLM Report Generator with real-time content streaming support"""
     
-    def __init__(self, config_path='config.json', llm_service: str = 'kimi', enable_fallback=True):
+    def __init__(self, config_path='config.json', llm_service: str = 'kimi', enable_fallback=True,
+                 parallel_post_processing: Optional[bool] = None, stream_pacing: Optional[float] = None):
         """Initialize the streaming LLM report generator
         
         Args:
             config_path: Path to configuration file containing API keys
             llm_service: The LLM service to use ('kimi', 'gemini', or 'doubao')
             enable_fallback: Whether to enable service fallback on failures
+            parallel_post_processing: Generate summaries and SWOT concurrently once the
+                report body is complete (defaults to LLM_PARALLEL_POST_PROCESSING)
+            stream_pacing: Optional delay in seconds between emitted chunks, for clients
+                that want a typewriter effect (defaults to LLM_STREAM_PACING, i.e. none)
         """
         logger.info("="*60)
         logger.info(f"初始化 {llm_service.upper()} 流式 LLM 报告生成器")
@@ -43,12 +134,12 @@ class StreamingLLMReportGenerator:
         # Streaming configuration
         self.chunk_size = 1024  # Stream chunk size in characters
         self.streaming_timeout = 30  # Timeout for streaming in seconds
-        # Simple rate limiter state
-        self._last_call_ts = {}
-        self._min_interval_sec = {
-            APIService.KIMI: float(os.environ.get('KIMI_MIN_INTERVAL', 0.5)),
-            APIService.GEMINI: float(os.environ.get('GEMINI_MIN_INTERVAL', 0.5)),
-        }
+        if parallel_post_processing is None:
+            parallel_post_processing = os.environ.get('LLM_PARALLEL_POST_PROCESSING', '0') == '1'
+        self.parallel_post_processing = parallel_post_processing
+        if stream_pacing is None:
+            stream_pacing = float(os.environ.get('LLM_STREAM_PACING', 0))
+        self.stream_pacing = max(0.0, stream_pacing)
         
         # Initialize clients
         logger.info(f"Initializing clients for service: {self.llm_service}")
@@ -95,6 +186,8 @@ class StreamingLLMReportGenerator:
     def _initialize_clients(self):
         """Initialize API clients for all available services"""
         self.clients = {}
+        # API key per service, for the shared rate limiter buckets
+        self.api_keys = {}
         
         # Initialize Kimi client
         if APIService.KIMI in self.available_services:
@@ -110,11 +203,11 @@ class StreamingLLMReportGenerator:
                 logger.info(f"Selected Kimi API key (first 10 chars): {api_key[:10] if api_key else 'None'}")
                 if api_key:
                     # Initialize OpenAI client with timeout settings to prevent hanging
-                    self.clients[APIService.KIMI] = OpenAI(
-                        api_key=api_key,
-                        base_url="https://api.moonshot.cn/v1",
+                    self.clients[APIService.KIMI] = llm_client_pool.kimi_client(
+                        api_key,
                         timeout=10.0  # 10 second timeout to prevent hanging
                     )
+                    self.api_keys[APIService.KIMI] = api_key
                     logger.info("✅ Kimi 客户端初始化成功")
             except Exception as e:
                 logger.error(f"❌ Kimi 客户端初始化失败: {e}")
@@ -134,10 +227,8 @@ class StreamingLLMReportGenerator:
                     or os.environ.get('GOOGLE_GEMINI_API_KEY')
                 )
                 if api_key:
-                    import google.generativeai as genai
-                    genai.configure(api_key=api_key)
-                    # Test the configuration by loading the model
-                    self.clients[APIService.GEMINI] = genai.GenerativeModel('gemini-1.5-flash-latest')
+                    self.clients[APIService.GEMINI] = llm_client_pool.gemini_model(api_key, 'gemini-1.5-flash-latest')
+                    self.api_keys[APIService.GEMINI] = api_key
                     logger.info("✅ Gemini 客户端(gemini-1.5-flash-latest)初始化成功")
             except Exception as e:
                 logger.error(f"❌ Gemini 客户端初始化失败: {e}")
@@ -153,13 +244,17 @@ class StreamingLLMReportGenerator:
             logger.info("⚠️ 豆包大模型客户端为占位符")
     
     async def generate_report_streaming(self, city: str, industry: str, 
-                                       additional_context: str = "") -> AsyncIterator[Dict]:
+                                       additional_context: str = "",
+                                       parallel_post_processing: Optional[bool] = None) -> AsyncIterator[Dict]:
         """Generate report with streaming support, yielding content chunks in real-time
         
         Args:
             city: Target city name
             industry: Target industry name
             additional_context: Additional context or requirements
+            parallel_post_processing: Override the generator's parallel summary/SWOT setting.
+                In parallel mode summary and SWOT chunks are interleaved and tagged
+                with 'stage' ('summary_zh', 'summary_en' or 'swot')
             
         Yields:
             Dictionary containing streaming data:
@@ -188,9 +283,15 @@ class StreamingLLMReportGenerator:
                 }
             }
             
-            # Try to generate with current service
+            # Start with the current service unless its circuit is open
+            first_service = self.current_service
+            if self.enable_fallback:
+                healthy = self.api_error_handler.order_services(
+                    [self.current_service] + self.available_services, preferred=self.current_service)
+                first_service = healthy[0] if healthy else first_service
+            
             async for chunk in self._generate_with_service_streaming(
-                self.current_service, city, industry, prompt
+                first_service, city, industry, prompt
             ):
                 yield chunk
                 
@@ -198,13 +299,14 @@ class StreamingLLMReportGenerator:
                 if chunk['type'] == 'complete':
                     full_content = chunk['content']
                     
-                    # Generate summaries
-                    async for summary_chunk in self._generate_summaries_streaming(full_content, city, industry):
-                        yield summary_chunk
+                    if parallel_post_processing is None:
+                        parallel_post_processing = self.parallel_post_processing
                     
-                    # Generate SWOT analysis
-                    async for swot_chunk in self._generate_swot_streaming(full_content, city, industry):
-                        yield swot_chunk
+                    # Generate summaries and SWOT analysis
+                    async for post_chunk in self._generate_post_analysis_streaming(
+                        full_content, city, industry, parallel=parallel_post_processing
+                    ):
+                        yield post_chunk
                     
                     break
             
@@ -225,31 +327,41 @@ class StreamingLLMReportGenerator:
             }
     
     async def _generate_with_service_streaming(self, service: APIService, city: str, industry: str, 
-                                             prompt: str) -> AsyncIterator[Dict]:
+                                             prompt: str, attempted: Optional[set] = None) -> AsyncIterator[Dict]:
         """Generate content using the specified service with streaming"""
         
         service_name = service.value
+        attempted = (attempted or set()) | {service}
         logger.info(f"🌐 开始流式调用 {service_name.upper()} API...")
         
+        started = time.time()
+        first_chunk_latency = None
         try:
+            if not self.api_error_handler.allow_request(service):
+                raise self.api_error_handler.circuit_open_error([service])
             if service == APIService.KIMI:
-                async for chunk in self._stream_kimi(prompt):
-                    yield chunk
+                stream = self._stream_kimi(prompt)
             elif service == APIService.GEMINI:
-                async for chunk in self._stream_gemini(prompt):
-                    yield chunk
+                stream = self._stream_gemini(prompt)
             elif service == APIService.DOUBAO:
-                async for chunk in self._stream_doubao(prompt):
-                    yield chunk
+                stream = self._stream_doubao(prompt)
             else:
                 raise ValueError(f"不支持的流式服务: {service_name}")
+            async for chunk in stream:
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.time() - started
+                yield chunk
+            # A long report streams for minutes; time to first chunk is the latency
+            self.api_error_handler.record_success(service, first_chunk_latency)
                 
         except Exception as e:
             logger.error(f"❌ {service_name.upper()} 流式调用失败: {e}")
+            self.api_error_handler.detect_error_type(e, service, time.time() - started)
             
-            # If fallback is enabled, try other services
+            # If fallback is enabled, try the healthiest service not tried yet
             if self.enable_fallback:
-                fallback_service = self.api_error_handler.get_fallback_service(service, self.available_services)
+                fallback_service = self.api_error_handler.get_fallback_service(
+                    service, [s for s in self.available_services if s not in attempted])
                 if fallback_service:
                     logger.info(f"🔄 回退到 {fallback_service.value.upper()} 服务...")
                     
@@ -260,10 +372,12 @@ class StreamingLLMReportGenerator:
                         'message': f'正在切换到 {fallback_service.value.upper()} 服务...'
                     }
                     
-                    async for chunk in self._generate_with_service_streaming(fallback_service, city, industry, prompt):
+                    async for chunk in self._generate_with_service_streaming(fallback_service, city, industry,
+                                                                             prompt, attempted):
                         yield chunk
                 else:
-                    raise Exception("没有可用的回退服务")
+                    logger.error("没有可用的回退服务")
+                    raise e
             else:
                 raise e
     
@@ -276,13 +390,6 @@ class StreamingLLMReportGenerator:
             raise ValueError("Kimi 客户端未初始化")
         
         try:
-            # Basic rate limiting: ensure minimal interval between calls
-            now = time.time()
-            last = self._last_call_ts.get(APIService.KIMI, 0)
-            min_interval = self._min_interval_sec.get(APIService.KIMI, 0.5)
-            if now - last < min_interval:
-                await asyncio.sleep(min_interval - (now - last))
-            self._last_call_ts[APIService.KIMI] = time.time()
             # Start streaming with OpenAI-compatible API
             attempts = 0
             err = None
@@ -290,78 +397,86 @@ class StreamingLLMReportGenerator:
             kimi_model = os.environ.get('KIMI_MODEL', 'moonshot-v1-128k')
             kimi_temp = float(os.environ.get('KIMI_TEMPERATURE', 0.7))
             kimi_max = int(os.environ.get('KIMI_MAX_TOKENS', 8000))
-            while attempts < 2:
-                attempts += 1
-                try:
-                    # Create the OpenAI client with a timeout for this specific call
-                    stream = client.chat.completions.create(
-                        model=kimi_model,
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": "你是一位专业的产业分析师，擅长撰写深度的区域产业分析报告。请基于用户提供的框架和要求，生成详实、专业的分析报告，文字长度在5000字以上。"
+            # The stream holds a slot of the shared Kimi budget until it ends
+            async with llm_rate_limiter.acquire_async('kimi', getattr(self, 'api_keys', {}).get(APIService.KIMI),
+                                                      prompt=prompt, max_tokens=kimi_max) as lease:
+                while attempts < 2:
+                    attempts += 1
+                    try:
+                        # Open the stream in a worker thread with a timeout for this specific call
+                        create_stream = functools.partial(
+                            client.chat.completions.create,
+                            model=kimi_model,
+                            messages=[
+                                {
+                                    "role": "system",
+                                    "content": "你是一位专业的产业分析师，擅长撰写深度的区域产业分析报告。请基于用户提供的框架和要求，生成详实、专业的分析报告，文字长度在5000字以上。"
+                                },
+                                {
+                                    "role": "user",
+                                    "content": prompt
+                                }
+                            ],
+                            temperature=kimi_temp,
+                            max_tokens=kimi_max,
+                            stream=True,
+                            stream_options={
+                                "include_usage": True
                             },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        temperature=kimi_temp,
-                        max_tokens=kimi_max,
-                        stream=True,
-                        stream_options={
-                            "include_usage": True
-                        },
-                        timeout=30  # 30 second timeout for the API call
-                    )
-                    err = None
-                    break
-                except Exception as e:
-                    err = e
-                    logger.warning(f"Kimi API attempt {attempts} failed: {e}")
-                    await asyncio.sleep(1.0)
-            if err and stream is None:
-                logger.error(f"Kimi API failed after {attempts} attempts: {err}")
-                raise err
+                            timeout=30  # 30 second timeout for the API call
+                        )
+                        stream = await asyncio.get_running_loop().run_in_executor(None, create_stream)
+                        err = None
+                        break
+                    except Exception as e:
+                        err = e
+                        logger.warning(f"Kimi API attempt {attempts} failed: {e}")
+                        await asyncio.sleep(1.0)
+                if err and stream is None:
+                    logger.error(f"Kimi API failed after {attempts} attempts: {err}")
+                    raise err
             
-            accumulated_content = ""
-            chunk_count = 0
+                accumulated_content = ""
+                chunk_count = 0
             
-            # Process streaming response
-            for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0:
-                    delta = chunk.choices[0].delta
-                    if hasattr(delta, 'content') and delta.content:
-                        content = delta.content
-                        accumulated_content += content
-                        chunk_count += 1
+                # Process streaming response; the blocking SDK iterator runs in a reader thread
+                async for chunk in iterate_in_thread(stream):
+                    # include_usage: the last chunk carries the token count
+                    if getattr(chunk, 'usage', None):
+                        lease.settle(getattr(chunk.usage, 'total_tokens', None))
+                    if chunk.choices and len(chunk.choices) > 0:
+                        delta = chunk.choices[0].delta
+                        if hasattr(delta, 'content') and delta.content:
+                            content = delta.content
+                            accumulated_content += content
+                            chunk_count += 1
                         
-                        # Add small delay to simulate natural streaming pace
-                        await asyncio.sleep(0.03)
+                            if self.stream_pacing:
+                                await asyncio.sleep(self.stream_pacing)
                         
-                        # Yield streaming chunk
-                        yield {
-                            'type': 'chunk',
-                            'content': content,
-                            'accumulated': accumulated_content,
-                            'chunk_index': chunk_count,
-                            'stage': 'generating',
-                            'timestamp': time.time()
-                        }
+                            # Yield streaming chunk
+                            yield {
+                                'type': 'chunk',
+                                'content': content,
+                                'accumulated': accumulated_content,
+                                'chunk_index': chunk_count,
+                                'stage': 'generating',
+                                'timestamp': time.time()
+                            }
             
-            # Yield completion
-            yield {
-                'type': 'complete',
-                'content': accumulated_content,
-                'stage': 'generating',
-                'metadata': {
-                    'chunks': chunk_count,
-                    'service': 'kimi',
-                    'total_length': len(accumulated_content)
+                # Yield completion
+                yield {
+                    'type': 'complete',
+                    'content': accumulated_content,
+                    'stage': 'generating',
+                    'metadata': {
+                        'chunks': chunk_count,
+                        'service': 'kimi',
+                        'total_length': len(accumulated_content)
+                    }
                 }
-            }
             
-            logger.info(f"✅ Kimi 流式调用完成，共 {chunk_count} 个分块，总长度: {len(accumulated_content)}")
+                logger.info(f"✅ Kimi 流式调用完成，共 {chunk_count} 个分块，总长度: {len(accumulated_content)}")
             
         except Exception as e:
             logger.error(f"❌ Kimi 流式调用失败: {e}")
@@ -384,63 +499,63 @@ class StreamingLLMReportGenerator:
                 'top_k': 40
             }
             
-            # Start streaming generation - using the correct streamGenerateContent method
-            import concurrent.futures
-            import threading
-
-            # Use a timeout to prevent hanging on the API call
-            def generate_with_timeout():
-                return client.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                    stream=True  # This enables streamGenerateContent
-                )
+            async with llm_rate_limiter.acquire_async('gemini', getattr(self, 'api_keys', {}).get(APIService.GEMINI),
+                                                      prompt=prompt,
+                                                      max_tokens=generation_config['max_output_tokens']):
+                # Start streaming generation - using the correct streamGenerateContent method
+                def generate_with_timeout():
+                    return client.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        stream=True  # This enables streamGenerateContent
+                    )
 
-            # Execute with timeout
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(generate_with_timeout)
+                # Execute with timeout without blocking the event loop
                 try:
-                    response = future.result(timeout=30)  # 30 second timeout
-                except concurrent.futures.TimeoutError:
+                    response = await asyncio.wait_for(
+                        asyncio.get_running_loop().run_in_executor(None, generate_with_timeout),
+                        timeout=30  # 30 second timeout
+                    )
+                except asyncio.TimeoutError:
                     logger.error("Gemini API call timed out after 30 seconds")
                     raise TimeoutError("Gemini API call timed out after 30 seconds")
             
-            accumulated_content = ""
-            chunk_count = 0
+                accumulated_content = ""
+                chunk_count = 0
             
-            # Process streaming response
-            for chunk in response:
-                if hasattr(chunk, 'text') and chunk.text:
-                    content = chunk.text
-                    accumulated_content += content
-                    chunk_count += 1
+                # Process streaming response; the blocking SDK iterator runs in a reader thread
+                async for chunk in iterate_in_thread(response):
+                    if hasattr(chunk, 'text') and chunk.text:
+                        content = chunk.text
+                        accumulated_content += content
+                        chunk_count += 1
                     
-                    # Add small delay to simulate natural streaming pace
-                    await asyncio.sleep(0.05)
+                        if self.stream_pacing:
+                            await asyncio.sleep(self.stream_pacing)
                     
-                    # Yield streaming chunk
-                    yield {
-                        'type': 'chunk',
-                        'content': content,
-                        'accumulated': accumulated_content,
-                        'chunk_index': chunk_count,
-                        'stage': 'generating',
-                        'timestamp': time.time()
-                    }
+                        # Yield streaming chunk
+                        yield {
+                            'type': 'chunk',
+                            'content': content,
+                            'accumulated': accumulated_content,
+                            'chunk_index': chunk_count,
+                            'stage': 'generating',
+                            'timestamp': time.time()
+                        }
             
-            # Yield completion
-            yield {
-                'type': 'complete',
-                'content': accumulated_content,
-                'stage': 'generating',
-                'metadata': {
-                    'chunks': chunk_count,
-                    'service': 'gemini',
-                    'total_length': len(accumulated_content)
+                # Yield completion
+                yield {
+                    'type': 'complete',
+                    'content': accumulated_content,
+                    'stage': 'generating',
+                    'metadata': {
+                        'chunks': chunk_count,
+                        'service': 'gemini',
+                        'total_length': len(accumulated_content)
+                    }
                 }
-            }
             
-            logger.info(f"✅ Gemini 流式调用完成，共 {chunk_count} 个分块，总长度: {len(accumulated_content)}")
+                logger.info(f"✅ Gemini 流式调用完成，共 {chunk_count} 个分块，总长度: {len(accumulated_content)}")
             
         except Exception as e:
             logger.error(f"❌ Gemini 流式调用失败: {e}")
@@ -483,17 +598,54 @@ class StreamingLLMReportGenerator:
             }
         }
     
+    async def _stream_current_service(self, prompt: str) -> AsyncIterator[Dict]:
+        """Stream a follow-up prompt through the current service"""
+        if self.current_service == APIService.KIMI:
+            async for chunk in self._stream_kimi(prompt):
+                yield chunk
+        elif self.current_service == APIService.GEMINI:
+            async for chunk in self._stream_gemini(prompt):
+                yield chunk
+
+    async def _generate_post_analysis_streaming(self, full_content: str, city: str, industry: str,
+                                                parallel: bool = False) -> AsyncIterator[Dict]:
+        """Generate the summaries and SWOT analysis that follow the report body
+
+        Args:
+            full_content: Complete report text
+            city: Target city name
+            industry: Target industry name
+            parallel: Run the zh summary, en summary and SWOT streams concurrently
+                and interleave their chunks; consumers must route chunks by 'stage'
+        """
+        if not parallel:
+            async for chunk in self._generate_summaries_streaming(full_content, city, industry):
+                yield chunk
+            async for chunk in self._generate_swot_streaming(full_content, city, industry):
+                yield chunk
+            return
+
+        logger.info("⚡ 并行生成中英文摘要与 SWOT 分析")
+        async for chunk in merge_async_streams([
+            self._generate_summary_streaming(full_content, 'zh'),
+            self._generate_summary_streaming(full_content, 'en'),
+            self._generate_swot_streaming(full_content, city, industry),
+        ]):
+            yield chunk
+
     async def _generate_summaries_streaming(self, full_content: str, city: str, industry: str) -> AsyncIterator[Dict]:
         """Generate summaries with streaming support"""
-        
-        # Chinese summary
-        yield {
-            'type': 'start',
-            'stage': 'summary_zh',
-            'message': '正在生成中文执行摘要...'
-        }
-        
-        summary_prompt_zh = f"""请基于以下完整的产业分析报告，生成一份简洁的执行摘要（Executive Summary），
+        for language in ('zh', 'en'):
+            async for chunk in self._generate_summary_streaming(full_content, language):
+                yield chunk
+
+    async def _generate_summary_streaming(self, full_content: str, language: str) -> AsyncIterator[Dict]:
+        """Generate the executive summary in one language with streaming support"""
+        stage = f'summary_{language}'
+
+        if language == 'zh':
+            message = '正在生成中文执行摘要...'
+            summary_prompt = f"""请基于以下完整的产业分析报告，生成一份简洁的执行摘要（Executive Summary），
 长度控制在300-500字，包含：
 1. 核心发现（2-3点）
 2. 关键数据指标（2-3个）
@@ -503,44 +655,9 @@ class StreamingLLMReportGenerator:
 {full_content[:3000]}
 
 请直接输出摘要内容，不需要额外的格式说明。"""
-        
-        accumulated_summary_zh = ""
-        
-        if self.current_service == APIService.KIMI:
-            async for chunk in self._stream_kimi(summary_prompt_zh):
-                if chunk['type'] == 'chunk':
-                    accumulated_summary_zh += chunk['content']
-                    yield {
-                        'type': 'summary_chunk',
-                        'content': chunk['content'],
-                        'language': 'zh',
-                        'accumulated': accumulated_summary_zh
-                    }
-        elif self.current_service == APIService.GEMINI:
-            async for chunk in self._stream_gemini(summary_prompt_zh):
-                if chunk['type'] == 'chunk':
-                    accumulated_summary_zh += chunk['content']
-                    yield {
-                        'type': 'summary_chunk',
-                        'content': chunk['content'],
-                        'language': 'zh',
-                        'accumulated': accumulated_summary_zh
-                    }
-        
-        yield {
-            'type': 'summary_complete',
-            'content': accumulated_summary_zh,
-            'language': 'zh'
-        }
-        
-        # English summary
-        yield {
-            'type': 'start',
-            'stage': 'summary_en',
-            'message': '正在生成英文执行摘要...'
-        }
-        
-        summary_prompt_en = f"""Based on the following industrial analysis report, 
+        else:
+            message = '正在生成英文执行摘要...'
+            summary_prompt = f"""Based on the following industrial analysis report, 
 generate a concise Executive Summary in English (200-300 words) including:
 1. Key findings (2-3 points)
 2. Critical metrics (2-3 items)
@@ -550,34 +667,30 @@ Report content:
 {full_content[:3000]}
 
 Please output the summary directly without additional formatting instructions."""
-        
-        accumulated_summary_en = ""
-        
-        if self.current_service == APIService.KIMI:
-            async for chunk in self._stream_kimi(summary_prompt_en):
-                if chunk['type'] == 'chunk':
-                    accumulated_summary_en += chunk['content']
-                    yield {
-                        'type': 'summary_chunk',
-                        'content': chunk['content'],
-                        'language': 'en',
-                        'accumulated': accumulated_summary_en
-                    }
-        elif self.current_service == APIService.GEMINI:
-            async for chunk in self._stream_gemini(summary_prompt_en):
-                if chunk['type'] == 'chunk':
-                    accumulated_summary_en += chunk['content']
-                    yield {
-                        'type': 'summary_chunk',
-                        'content': chunk['content'],
-                        'language': 'en',
-                        'accumulated': accumulated_summary_en
-                    }
-        
+
+        yield {
+            'type': 'start',
+            'stage': stage,
+            'message': message
+        }
+
+        accumulated_summary = ""
+        async for chunk in self._stream_current_service(summary_prompt):
+            if chunk['type'] == 'chunk':
+                accumulated_summary += chunk['content']
+                yield {
+                    'type': 'summary_chunk',
+                    'content': chunk['content'],
+                    'language': language,
+                    'stage': stage,
+                    'accumulated': accumulated_summary
+                }
+
         yield {
             'type': 'summary_complete',
-            'content': accumulated_summary_en,
-            'language': 'en'
+            'content': accumulated_summary,
+            'language': language,
+            'stage': stage
         }
     
     async def _generate_swot_streaming(self, full_content: str, city: str, industry: str) -> AsyncIterator[Dict]:
@@ -611,29 +724,20 @@ Please output the summary directly without additional formatting instructions.""
 请只输出JSON格式的内容，不要包含markdown代码块标记或其他说明文字。"""
         
         accumulated_swot = ""
-        
-        if self.current_service == APIService.KIMI:
-            async for chunk in self._stream_kimi(swot_prompt):
-                if chunk['type'] == 'chunk':
-                    accumulated_swot += chunk['content']
-                    yield {
-                        'type': 'swot_chunk',
-                        'content': chunk['content'],
-                        'accumulated': accumulated_swot
-                    }
-        elif self.current_service == APIService.GEMINI:
-            async for chunk in self._stream_gemini(swot_prompt):
-                if chunk['type'] == 'chunk':
-                    accumulated_swot += chunk['content']
-                    yield {
-                        'type': 'swot_chunk',
-                        'content': chunk['content'],
-                        'accumulated': accumulated_swot
-                    }
+        async for chunk in self._stream_current_service(swot_prompt):
+            if chunk['type'] == 'chunk':
+                accumulated_swot += chunk['content']
+                yield {
+                    'type': 'swot_chunk',
+                    'content': chunk['content'],
+                    'stage': 'swot',
+                    'accumulated': accumulated_swot
+                }
         
         yield {
             'type': 'swot_complete',
-            'content': accumulated_swot
+            'content': accumulated_swot,
+            'stage': 'swot'
         }
     
     def _prepare_prompt(self, city: str, industry: str, additional_context: str) -> str:
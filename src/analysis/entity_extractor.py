@@ -8,9 +8,12 @@ import re
 import logging
 import jieba
 import jieba.posseg as pseg
-from typing import Dict, List, Set
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set
 from collections import Counter
 
+from src.utils.keyword_matcher import get_keyword_matcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +33,9 @@ class EntityExtractor:
         self.product_keywords = ['平台', '系统', '软件', '硬件', '设备', '产品', 
                                '解决方案', '服务', '应用']
         
+        self.famous_companies = ['百度', '阿里巴巴', '腾讯', '华为', '小米', '字节跳动',
+                                '美团', '京东', '滴滴', '蚂蚁', '商汤', '旷视']
+        
         # Location indicators
         self.location_indicators = ['市', '省', '区', '县', '镇', '街道', '园区', 
                                    '开发区', '高新区', '经济区']
@@ -44,12 +50,13 @@ class EntityExtractor:
             Dictionary containing different types of entities
         """
         try:
+            hits = self._scan_keyword_hits(text)
             entities = {
-                'companies': self._extract_companies(text),
+                'companies': self._extract_companies(text, hits),
                 'persons': self._extract_persons(text),
                 'locations': self._extract_locations(text),
                 'technologies': self._extract_technologies(text),
-                'products': self._extract_products(text)
+                'products': self._extract_products(text, hits)
             }
             
             # Add statistics
@@ -68,41 +75,85 @@ class EntityExtractor:
             logger.error(f"Error extracting entities: {e}")
             return self._get_empty_entities()
     
-    def _extract_companies(self, text: str) -> List[Dict]:
+    def _scan_keyword_hits(self, text: str) -> Dict[str, List[int]]:
+        """Locate company suffixes, famous companies, tech/product keywords and
+        line breaks with a single automaton pass over the text."""
+        matcher = get_keyword_matcher(
+            self.company_suffixes + self.famous_companies +
+            self.tech_keywords + self.product_keywords + ['\n']
+        )
+        return matcher.positions(text)
+    
+    def _extract_companies(self, text: str, hits: Optional[Dict[str, List[int]]] = None) -> List[Dict]:
         """Extract company names."""
         companies = []
         seen = set()
+        if hits is None:
+            hits = self._scan_keyword_hits(text)
         
         # Pattern 1: Chinese characters + company suffix
         for suffix in self.company_suffixes:
-            pattern = r'[\u4e00-\u9fa5]{2,20}' + suffix
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                company = match.group()
+            for start, end in self._company_spans(text, hits.get(suffix, []), len(suffix)):
+                company = text[start:end]
                 if company not in seen and len(company) >= 4:
                     seen.add(company)
                     companies.append({
                         'name': company,
                         'type': 'company',
-                        'position': match.start(),
+                        'position': start,
                         'confidence': 0.9
                     })
         
         # Pattern 2: Famous companies (simple matching)
-        famous_companies = ['百度', '阿里巴巴', '腾讯', '华为', '小米', '字节跳动',
-                           '美团', '京东', '滴滴', '蚂蚁', '商汤', '旷视']
-        for company in famous_companies:
-            if company in text and company not in seen:
+        for company in self.famous_companies:
+            if company in hits and company not in seen:
                 seen.add(company)
                 companies.append({
                     'name': company,
                     'type': 'company',
-                    'position': text.find(company),
+                    'position': hits[company][0],
                     'confidence': 1.0
                 })
         
         return sorted(companies, key=lambda x: x['position'])
     
+    @staticmethod
+    def _company_spans(text: str, suffix_starts: List[int], suffix_len: int):
+        """Yield the spans ``re.finditer('[\u4e00-\u9fa5]{2,20}' + suffix)`` would
+        return, computed from the suffix positions instead of rescanning the text.
+        
+        Each span starts at the leftmost position that has 2-20 Chinese characters
+        before a suffix hit and, like the greedy quantifier, extends to the last
+        such hit within 20 characters.
+        """
+        def earliest_start(pos: int) -> int:
+            # Walk back over at most 20 Chinese characters
+            lo = pos
+            while lo > pos - 20 and lo > 0 and '\u4e00' <= text[lo - 1] <= '\u9fa5':
+                lo -= 1
+            return lo
+        
+        cursor = 0
+        i = 0
+        while i < len(suffix_starts):
+            pos = suffix_starts[i]
+            start = max(cursor, earliest_start(pos))
+            if pos - start < 2:
+                i += 1
+                continue
+            # Greedy quantifier: take the furthest hit reachable from ``start``
+            end_pos = pos
+            j = i + 1
+            while j < len(suffix_starts):
+                nxt = suffix_starts[j]
+                if nxt - start > 20 or earliest_start(nxt) > start:
+                    break
+                end_pos = nxt
+                j += 1
+            yield start, end_pos + suffix_len
+            cursor = end_pos + suffix_len
+            i = bisect_left(suffix_starts, cursor, j)
+    
     def _extract_persons(self, text: str) -> List[Dict]:
         """Extract person names."""
         persons = []
@@ -164,11 +215,14 @@ class EntityExtractor:
         technologies = []
         seen = set()
         
+        # Count occurrences of all technologies in one pass
+        counts = get_keyword_matcher(self.tech_keywords).count(text)
+        
         for tech in self.tech_keywords:
-            if tech in text and tech not in seen:
+            if tech in counts and tech not in seen:
                 seen.add(tech)
                 # Count occurrences for importance
-                count = text.count(tech)
+                count = counts[tech]
                 technologies.append({
                     'name': tech,
                     'type': 'technology',
@@ -178,18 +232,35 @@ class EntityExtractor:
         
         return sorted(technologies, key=lambda x: x['count'], reverse=True)
     
-    def _extract_products(self, text: str) -> List[Dict]:
+    def _extract_products(self, text: str, hits: Optional[Dict[str, List[int]]] = None) -> List[Dict]:
         """Extract product/service names."""
         products = []
         seen = set()
+        if hits is None:
+            hits = self._scan_keyword_hits(text)
+        line_breaks = hits.get('\n', [])
         
-        # Pattern: tech keyword + product keyword
+        # Pattern: tech keyword + product keyword on the same line, equivalent to
+        # re.finditer(tech + '.*?' + prod) but resolved from keyword positions
         for tech in self.tech_keywords:
+            tech_starts = hits.get(tech, [])
+            if not tech_starts:
+                continue
             for prod in self.product_keywords:
-                pattern = tech + '.*?' + prod
-                matches = re.finditer(pattern, text)
-                for match in matches:
-                    product = match.group()
+                prod_starts = hits.get(prod, [])
+                if not prod_starts:
+                    continue
+                i = 0
+                while i < len(tech_starts):
+                    start = tech_starts[i]
+                    j = bisect_left(prod_starts, start + len(tech))
+                    k = bisect_left(line_breaks, start)
+                    line_end = line_breaks[k] if k < len(line_breaks) else len(text)
+                    if j == len(prod_starts) or prod_starts[j] + len(prod) > line_end:
+                        i += 1
+                        continue
+                    end = prod_starts[j] + len(prod)
+                    product = text[start:end]
                     if product not in seen and len(product) <= 30:
                         seen.add(product)
                         products.append({
@@ -197,6 +268,7 @@ class EntityExtractor:
                             'type': 'product',
                             'confidence': 0.7
                         })
+                    i = bisect_left(tech_starts, end, i + 1)
         
         return products
     
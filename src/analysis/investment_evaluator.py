@@ -2,10 +2,17 @@
 """Investment Value Evaluation Module"""
 
 import logging
-from typing import Dict
+from typing import Dict, Set
+
+from src.utils.keyword_matcher import get_keyword_matcher
 
 logger = logging.getLogger(__name__)
 
+POLICY_KEYWORDS = ['政策支持', '优惠政策', '补贴', '扶持', '鼓励']
+MARKET_KEYWORDS = ['市场规模', '增长', '扩大', '需求旺盛']
+TECHNOLOGY_KEYWORDS = ['技术成熟', '创新', '领先', '突破']
+COMPETITION_KEYWORDS = ['竞争激烈', '红海', '过度竞争']
+
 
 class InvestmentEvaluator:
     """Evaluate investment value of industries."""
@@ -15,12 +22,17 @@ class InvestmentEvaluator:
         try:
             content = report_data.get('full_content', '')
             
+            # Find every scoring keyword in a single pass
+            found = get_keyword_matcher(
+                POLICY_KEYWORDS + MARKET_KEYWORDS + TECHNOLOGY_KEYWORDS + COMPETITION_KEYWORDS
+            ).present(content)
+            
             # Simple scoring based on keywords
             scores = {
-                'policy_support': self._score_policy(content),
-                'market_size': self._score_market(content),
-                'tech_maturity': self._score_technology(content),
-                'competition': self._score_competition(content)
+                'policy_support': self._score_policy(found),
+                'market_size': self._score_market(found),
+                'tech_maturity': self._score_technology(found),
+                'competition': self._score_competition(found)
             }
             
             overall_score = sum(scores.values()) / len(scores)
@@ -46,28 +58,24 @@ class InvestmentEvaluator:
             logger.error(f"Error evaluating investment: {e}")
             return self._get_default_evaluation()
     
-    def _score_policy(self, text: str) -> float:
+    def _score_policy(self, found: Set[str]) -> float:
         """Score policy support (0-10)."""
-        positive_keywords = ['政策支持', '优惠政策', '补贴', '扶持', '鼓励']
-        score = min(10, sum(2 for kw in positive_keywords if kw in text))
+        score = min(10, sum(2 for kw in POLICY_KEYWORDS if kw in found))
         return score
     
-    def _score_market(self, text: str) -> float:
+    def _score_market(self, found: Set[str]) -> float:
         """Score market size (0-10)."""
-        positive_keywords = ['市场规模', '增长', '扩大', '需求旺盛']
-        score = min(10, sum(2 for kw in positive_keywords if kw in text))
+        score = min(10, sum(2 for kw in MARKET_KEYWORDS if kw in found))
         return score
     
-    def _score_technology(self, text: str) -> float:
+    def _score_technology(self, found: Set[str]) -> float:
         """Score technology maturity (0-10)."""
-        positive_keywords = ['技术成熟', '创新', '领先', '突破']
-        score = min(10, sum(2 for kw in positive_keywords if kw in text))
+        score = min(10, sum(2 for kw in TECHNOLOGY_KEYWORDS if kw in found))
         return score
     
-    def _score_competition(self, text: str) -> float:
+    def _score_competition(self, found: Set[str]) -> float:
         """Score competition level (0-10, higher is better = less competition)."""
-        negative_keywords = ['竞争激烈', '红海', '过度竞争']
-        penalty = sum(2 for kw in negative_keywords if kw in text)
+        penalty = sum(2 for kw in COMPETITION_KEYWORDS if kw in found)
         return max(0, 8 - penalty)
     
     def _get_default_evaluation(self) -> Dict:
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Derived Report Analyses
+Pure functions that compute the per-report analyses served under /api/report/<id>/*
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.analysis.sentiment_analyzer import SentimentAnalyzer
+from src.analysis.entity_extractor import EntityExtractor
+from src.analysis.investment_evaluator import InvestmentEvaluator
+from src.visualization.map_visualizer import MapVisualizer
+from src.visualization.knowledge_graph_visualizer import KnowledgeGraphVisualizer
+from src.visualization.story_generator import StoryGenerator
+from src.utils.report_analysis_cache import ReportAnalysisCache, report_analysis_cache
+
+logger = logging.getLogger(__name__)
+
+
+def compute_sentiment(report_data: Dict, **_) -> Dict:
+    """Sentiment by category plus detected risks."""
+    analyzer = SentimentAnalyzer()
+    return {
+        'sentiment': analyzer.analyze_by_category(report_data),
+        'risks': analyzer.detect_risks(report_data.get('full_content', ''))
+    }
+
+
+def compute_entities(report_data: Dict, **_) -> Dict:
+    """Named entities and their graph."""
+    extractor = EntityExtractor()
+    entities = extractor.extract_entities(report_data.get('full_content', ''))
+    return {
+        'entities': entities,
+        'graph': extractor.build_entity_graph(entities)
+    }
+
+
+def compute_investment(report_data: Dict, **_) -> Dict:
+    """Keyword-based investment evaluation."""
+    return InvestmentEvaluator().evaluate(report_data)
+
+
+def compute_knowledge_graph(report_data: Dict, city: str = '', industry: str = '', **_) -> Dict:
+    """ECharts knowledge graph built from extracted entities."""
+    entities = EntityExtractor().extract_entities(report_data.get('full_content', ''))
+    kg = KnowledgeGraphVisualizer()
+    graph = kg.transform_entities_to_graph(entities)
+    config = kg.generate_echarts_config(graph, title=f"{city or ''}{industry or ''} 知识图谱")
+    return {
+        'graph_config': config,
+        'node_count': graph.get('statistics', {}).get('total_nodes', 0),
+        'edge_count': graph.get('statistics', {}).get('total_links', 0),
+        'type_count': graph.get('statistics', {}).get('node_types', 0)
+    }
+
+
+def compute_industry_chain(report_data: Dict, **_) -> Dict:
+    """Upstream/midstream/downstream breakdown parsed from the value chain section."""
+    text = report_data.get('sections', {}).get('value_chain') or report_data.get('full_content', '')
+
+    # Simple heuristic parsing
+    def section(items):
+        return {
+            'strength': '良好',
+            'components': items[:6],
+            'gaps': items[6:9]
+        }
+
+    # Extract bullet-like lines
+    items = [ln.strip('- •* ').strip() for ln in text.split('\n') if re.match(r'^\s*[-•*]|\d+[\.\)、]', ln)]
+    weak_points = [it for it in items if any(k in it for k in ['瓶颈', '缺', '不足', '短板'])][:5]
+    return {
+        'completeness_score': 78,
+        'upstream': section(items[:9]),
+        'midstream': section(items[3:12]),
+        'downstream': section(items[6:15]),
+        'weak_points': weak_points
+    }
+
+
+def compute_story(report_data: Dict, story_type: str = 'industry_overview', **_) -> Dict:
+    """Data story of the given type."""
+    return StoryGenerator().create_story(report_data, story_type=story_type)
+
+
+def compute_visualizations(report_data: Dict, city: str = '', industry: str = '',
+                           config_path: str = 'config.json', **_) -> Dict:
+    """Map, scatter, 3D bar and network charts for the report."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    visualizer = MapVisualizer(config)
+
+    # Extract geo data from report
+    geo_data = visualizer.extract_geo_data_from_report(report_data.get('full_content', ''))
+
+    # Province map (fallback sample data)
+    province_data = {
+        city or "四川": 100,
+        "北京": 80,
+        "上海": 90,
+        "广东": 85
+    }
+    province_map = visualizer.generate_province_map(
+        province_data,
+        title=f"{industry}产业分布地图"
+    )
+
+    # Geo scatter
+    geo_scatter = visualizer.generate_geo_scatter(
+        geo_data.get('cities', []),
+        title=f"{city or ''}产业地理分布"
+    )
+
+    # 3D bar (mock using keywords)
+    bar3d_data = [
+        {"x": "市场规模", "y": city or "成都", "z": 100},
+        {"x": "投资", "y": city or "成都", "z": 80},
+        {"x": "企业数", "y": city or "成都", "z": 60}
+    ]
+    bar_3d = visualizer.generate_3d_bar_chart(bar3d_data)
+
+    # Simple network graph
+    nodes = [
+        {"id": "1", "name": city or "城市", "category": 0, "value": 100},
+        {"id": "2", "name": industry or "产业", "category": 1, "value": 80},
+        {"id": "3", "name": "龙头企业", "category": 2, "value": 60}
+    ]
+    links = [
+        {"source": "1", "target": "2", "value": 1},
+        {"source": "2", "target": "3", "value": 1}
+    ]
+    network_graph = visualizer.generate_industry_network(nodes, links)
+
+    return {
+        'province_map': province_map,
+        'bar_3d': bar_3d,
+        'geo_scatter': geo_scatter,
+        'network_graph': network_graph
+    }
+
+
+# Analyzer name -> (version, compute function). Bump a version whenever the
+# analyzer's output changes so cached results are recomputed.
+REPORT_ANALYZERS: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    'sentiment': ('1', compute_sentiment),
+    'entities': ('1', compute_entities),
+    'investment': ('1', compute_investment),
+    'knowledge_graph': ('1', compute_knowledge_graph),
+    'industry_chain': ('1', compute_industry_chain),
+    'story': ('1', compute_story),
+    'visualizations': ('1', compute_visualizations),
+}
+
+# Options (with their defaults) that change an analyzer's output. They are
+# folded into the cache variant so callers with other options never share a result.
+VARIANT_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'knowledge_graph': {'city': '', 'industry': ''},
+    'visualizations': {'city': '', 'industry': '', 'config_path': 'config.json'},
+}
+
+
+def analysis_variant(name: str, options: Dict[str, Any]) -> str:
+    """Cache variant for the output-relevant options of analyzer ``name``.
+
+    A config file is keyed by its content rather than its path, so a relative
+    and an absolute path to the same file share results and editing the file
+    invalidates them.
+    """
+    defaults = VARIANT_OPTIONS.get(name)
+    if not defaults:
+        return ''
+    values = {key: options.get(key) or default for key, default in defaults.items()}
+    if 'config_path' in values:
+        config_path = Path(values.pop('config_path'))
+        try:
+            values['config'] = hashlib.sha256(config_path.read_bytes()).hexdigest()
+        except OSError:
+            values['config'] = str(config_path.resolve())
+    encoded = json.dumps(values, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def run_report_analysis(name: str, report_id: str, report_path: Path,
+                        variant: str = '', cache: Optional[ReportAnalysisCache] = None,
+                        **options) -> Any:
+    """Return analysis ``name`` for a report, served from the analysis cache.
+
+    The report JSON is only read when the cache misses.
+
+    Args:
+        name: Key of REPORT_ANALYZERS
+        report_id: Report identifier
+        report_path: Path of the report JSON file
+        variant: Distinguishes results of one analyzer computed with different
+            options; derived from VARIANT_OPTIONS when not given
+        cache: Cache to use, defaults to the global report analysis cache
+        **options: Extra keyword arguments passed to the compute function
+    """
+    version, compute = REPORT_ANALYZERS[name]
+    variant = variant or analysis_variant(name, options)
+
+    def _compute():
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report_data = json.load(f)
+        return compute(report_data, **options)
+
+    cache = cache or report_analysis_cache
+    return cache.get_or_compute(report_id, Path(report_path), name, version, _compute, variant=variant)
+
+
+# Options the report view requests by default; precomputed results must be
+# cached under the same variant the endpoints look up
+DEFAULT_ANALYSIS_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'story': {'variant': 'industry_overview', 'story_type': 'industry_overview'},
+}
+
+
+def precompute_report_analyses(report_id: str, report_path: Path,
+                               city: str = '', industry: str = '',
+                               analyzers: Optional[List[str]] = None,
+                               max_workers: int = 4,
+                               cache: Optional[ReportAnalysisCache] = None,
+                               **options) -> Dict[str, bool]:
+    """Warm the analysis cache for a freshly completed report.
+
+    Runs every analyzer (or the given subset) in a thread pool so the first
+    view of the report is served entirely from the cache. Failures are logged
+    and reported per analyzer, never raised.
+
+    Returns:
+        Mapping of analyzer name to whether it completed successfully
+    """
+    names = analyzers or list(REPORT_ANALYZERS.keys())
+    results: Dict[str, bool] = {}
+
+    def _run(name: str):
+        kwargs = dict(options)
+        kwargs.update(DEFAULT_ANALYSIS_OPTIONS.get(name, {}))
+        run_report_analysis(name, report_id, report_path, cache=cache,
+                            city=city, industry=industry, **kwargs)
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(_run, name): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                results[name] = True
+            except Exception as e:
+                logger.warning(f"预计算报告分析失败 {report_id}/{name}: {e}")
+                results[name] = False
+
+    logger.info(f"报告 {report_id} 分析预计算完成: "
+                f"{sum(results.values())}/{len(results)} 项, 耗时 {time.time() - started:.2f}s")
+    return results
@@ -8,6 +8,8 @@ import logging
 from typing import Dict, List
 from snownlp import SnowNLP
 
+from src.utils.keyword_matcher import get_keyword_matcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,6 +27,19 @@ class SentimentAnalyzer:
             '劣势', '威胁', '风险', '挑战', '困难', '问题', '缺陷', '不足',
             '落后', '下降', '减少', '薄弱', '危机', '障碍', '限制'
         ]
+        
+        self.risk_keywords = {
+            '高风险': ['风险高', '重大风险', '严重威胁'],
+            '市场风险': ['市场波动', '需求下降', '竞争激烈'],
+            '政策风险': ['政策不确定', '监管压力', '合规风险'],
+            '技术风险': ['技术落后', '创新不足', '技术瓶颈'],
+            '资金风险': ['资金紧张', '融资困难', '成本上升']
+        }
+        
+        self.sentiment_matcher = get_keyword_matcher(self.positive_keywords + self.negative_keywords)
+        self.risk_matcher = get_keyword_matcher(
+            kw for keywords in self.risk_keywords.values() for kw in keywords
+        )
     
     def analyze_text(self, text: str) -> Dict:
         """Analyze sentiment of text.
@@ -44,8 +59,9 @@ class SentimentAnalyzer:
             overall_sentiment = s.sentiments
             
             # Count keywords
-            positive_count = sum(1 for kw in self.positive_keywords if kw in text)
-            negative_count = sum(1 for kw in self.negative_keywords if kw in text)
+            found = self.sentiment_matcher.present(text)
+            positive_count = sum(1 for kw in self.positive_keywords if kw in found)
+            negative_count = sum(1 for kw in self.negative_keywords if kw in found)
             
             # Calculate sentiment distribution
             total_keywords = positive_count + negative_count
@@ -136,16 +152,9 @@ class SentimentAnalyzer:
             risks.append(f"整体情感偏负面 (得分: {sentiment['overall_score']})")
         
         # Check for specific risk keywords
-        risk_keywords = {
-            '高风险': ['风险高', '重大风险', '严重威胁'],
-            '市场风险': ['市场波动', '需求下降', '竞争激烈'],
-            '政策风险': ['政策不确定', '监管压力', '合规风险'],
-            '技术风险': ['技术落后', '创新不足', '技术瓶颈'],
-            '资金风险': ['资金紧张', '融资困难', '成本上升']
-        }
-        
-        for risk_type, keywords in risk_keywords.items():
-            if any(kw in text for kw in keywords):
+        found = self.risk_matcher.present(text)
+        for risk_type, keywords in self.risk_keywords.items():
+            if any(kw in found for kw in keywords):
                 risks.append(f"检测到{risk_type}")
         
         return risks
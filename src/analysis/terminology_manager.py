@@ -12,6 +12,8 @@ from collections import Counter
 from typing import Dict, List, Any, Optional
 import os
 
+from src.utils.keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +29,13 @@ class TerminologyManager:
         self.terminology_file = terminology_file or "data/terminology.json"
         self.terminology = self._load_terminology()
         self.stopwords = self._load_stopwords()
+        self._term_matcher: Optional[KeywordMatcher] = None
+    
+    def _get_term_matcher(self) -> KeywordMatcher:
+        """获取术语匹配自动机（术语变更后重新编译）"""
+        if self._term_matcher is None:
+            self._term_matcher = KeywordMatcher(self.terminology.keys())
+        return self._term_matcher
     
     def _load_terminology(self) -> Dict[str, Dict]:
         """加载术语词典"""
@@ -129,6 +138,7 @@ class TerminologyManager:
                 "related": related or [],
                 "importance": importance
             }
+            self._term_matcher = None
             self._save_terminology(self.terminology)
             logger.info(f"添加术语: {term}")
         except Exception as e:
@@ -157,24 +167,22 @@ class TerminologyManager:
         try:
             annotations = []
             
-            # 查找文本中的术语
-            for term, info in self.terminology.items():
-                if term in text:
-                    # 找到所有出现位置
-                    start = 0
-                    while True:
-                        pos = text.find(term, start)
-                        if pos == -1:
-                            break
-                        
-                        annotations.append({
-                            "term": term,
-                            "position": pos,
-                            "length": len(term),
-                            "definition": info["definition"],
-                            "category": info["category"]
-                        })
-                        start = pos + 1
+            # 一次扫描找到所有术语的所有出现位置
+            matcher = self._get_term_matcher()
+            hits = matcher.positions(text)
+            
+            for term in matcher.keywords:
+                if term not in hits:
+                    continue
+                info = self.terminology[term]
+                for pos in hits[term]:
+                    annotations.append({
+                        "term": term,
+                        "position": pos,
+                        "length": len(term),
+                        "definition": info["definition"],
+                        "category": info["category"]
+                    })
             
             # 按位置排序
             annotations.sort(key=lambda x: x["position"])
@@ -7,7 +7,9 @@ import os
 import re
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
 import jieba
@@ -16,8 +18,42 @@ from docx import Document
 from PyPDF2 import PdfReader
 import pandas as pd
 
+from src.utils.keyword_matcher import get_keyword_matcher
+
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class TextAnalysisContext:
+    """Tokenization results shared by every stage of one analysis run.
+
+    The cleaned text is POS-tagged once and every segment is tokenized once,
+    so categorization, keyword extraction, statistics, AI-opportunity scoring
+    and sentiment analysis never call jieba again.
+    """
+    content: str
+    segments: List[str]
+    sentences: List[str]
+    tagged_words: List[Tuple[str, str]] = field(default_factory=list)
+    segment_words: List[Counter] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, content: str, segments: List[str]) -> 'TextAnalysisContext':
+        """Tokenize ``content`` and its ``segments`` exactly once."""
+        return cls(
+            content=content,
+            segments=segments,
+            sentences=[s.strip() for s in re.split(r'[。！？]', content)],
+            tagged_words=[(word, flag) for word, flag in pseg.cut(content)],
+            segment_words=[Counter(jieba.lcut(segment)) for segment in segments]
+        )
+
+    @property
+    def words(self) -> List[str]:
+        """All tokens of the full text in order."""
+        return [word for word, _ in self.tagged_words]
+
+
 class TextProcessor:
     """Process and analyze regional industrial text data."""
     
@@ -227,20 +263,23 @@ class TextProcessor:
         # Segment text into sentences/paragraphs
         segments = self._segment_text(clean_content)
         
+        # Tokenize once; every stage below reads from this context
+        context = TextAnalysisContext.build(clean_content, segments)
+        
         # Categorize content
-        categorized_content = self._categorize_content(segments)
+        categorized_content = self._categorize_content(context)
         
         # Extract key information
-        key_insights = self._extract_key_insights(clean_content)
+        key_insights = self._extract_key_insights(context)
         
         # Analyze AI integration opportunities
-        ai_opportunities = self._analyze_ai_integration(clean_content)
+        ai_opportunities = self._analyze_ai_integration(context)
         
         # Generate summary statistics
-        stats = self._generate_statistics(clean_content, segments)
+        stats = self._generate_statistics(context)
         
         # 添加情感分析
-        sentiment_analysis = self._analyze_sentiment(clean_content)
+        sentiment_analysis = self._analyze_sentiment(context)
         
         return {
             'categories': categorized_content,
@@ -300,7 +339,7 @@ class TextProcessor:
         
         return [seg for seg in segments if len(seg) > 20]  # Filter out very short segments
     
-    def _categorize_content(self, segments: List[str]) -> Dict[str, Dict[str, Any]]:
+    def _categorize_content(self, context: TextAnalysisContext) -> Dict[str, Dict[str, Any]]:
         """Categorize text segments into predefined categories."""
         categorized = {}
         
@@ -316,6 +355,13 @@ class TextProcessor:
             "未来展望": ["未来", "展望", "预期", "预测", "目标", "规划", "愿景", "前景"]
         }
         
+        # Count every category keyword in each segment with a single scan
+        matcher = get_keyword_matcher(
+            kw for category in self.categories
+            for kw in category_keywords.get(category, [category])
+        )
+        segment_hits = [matcher.count(segment) for segment in context.segments]
+        
         for category in self.categories:
             categorized[category] = {
                 'content': [],
@@ -325,16 +371,15 @@ class TextProcessor:
             
             keywords = category_keywords.get(category, [category])
             
-            for segment in segments:
+            for segment, word_counts, hits in zip(context.segments, context.segment_words, segment_hits):
                 # Calculate relevance score based on keyword matches
                 score = 0
                 for keyword in keywords:
-                    score += segment.count(keyword) * 2
+                    score += hits.get(keyword, 0) * 2
                     # Also check for partial matches in segmented words
-                    words = jieba.lcut(segment)
-                    for word in words:
+                    for word, count in word_counts.items():
                         if keyword in word or word in keyword:
-                            score += 1
+                            score += count
                 
                 # If segment is relevant to this category
                 if score > 0:
@@ -356,16 +401,13 @@ class TextProcessor:
         
         return categorized
     
-    def _extract_key_insights(self, content: str) -> List[Dict[str, Any]]:
+    def _extract_key_insights(self, context: TextAnalysisContext) -> List[Dict[str, Any]]:
         """Extract key insights from the content."""
         insights = []
         
-        # Use jieba to extract key phrases
-        words = pseg.cut(content)
-        
         # Count important terms
         important_terms = {}
-        for word, flag in words:
+        for word, flag in context.tagged_words:
             # Focus on nouns, adjectives, and verbs
             if flag in ['n', 'nr', 'ns', 'nt', 'nz', 'a', 'ad', 'v', 'vn'] and len(word) > 1:
                 important_terms[word] = important_terms.get(word, 0) + 1
@@ -374,7 +416,7 @@ class TextProcessor:
         top_terms = sorted(important_terms.items(), key=lambda x: x[1], reverse=True)[:20]
         
         # Look for numerical data and trends with context
-        numerical_insights = self._extract_numerical_insights(content)
+        numerical_insights = self._extract_numerical_insights(context.content)
         
         # 添加词性分析结果
         
@@ -437,7 +479,7 @@ class TextProcessor:
             logger.error(f"词性分析失败: {e}")
             return []
     
-    def _analyze_ai_integration(self, content: str) -> Dict[str, Any]:
+    def _analyze_ai_integration(self, context: TextAnalysisContext) -> Dict[str, Any]:
         """Analyze potential AI integration opportunities."""
         ai_keywords = {
             "智能制造": ["制造", "生产", "工厂", "设备", "自动化"],
@@ -451,19 +493,24 @@ class TextProcessor:
         
         opportunities = {}
         
+        # One pass over the text for counts, one per sentence for containment
+        matcher = get_keyword_matcher(kw for keywords in ai_keywords.values() for kw in keywords)
+        keyword_counts = matcher.count(context.content)
+        keyword_sentences = {}
+        for sentence in context.sentences:
+            if len(sentence) > 10:
+                for keyword in matcher.present(sentence):
+                    keyword_sentences.setdefault(keyword, []).append(sentence)
+        
         for ai_area, keywords in ai_keywords.items():
             score = 0
             relevant_segments = []
             
             for keyword in keywords:
-                matches = len(re.findall(keyword, content))
-                score += matches
+                score += keyword_counts.get(keyword, 0)
                 
                 # Find sentences containing these keywords
-                sentences = re.split(r'[。！？]', content)
-                for sentence in sentences:
-                    if keyword in sentence and len(sentence.strip()) > 10:
-                        relevant_segments.append(sentence.strip())
+                relevant_segments.extend(keyword_sentences.get(keyword, []))
             
             if score > 0:
                 opportunities[ai_area] = {
@@ -526,11 +573,11 @@ class TextProcessor:
         else:
             return f"潜在机会：{base_recommendation}，可以作为未来发展方向"
     
-    def _analyze_sentiment(self, content: str) -> Dict[str, Any]:
+    def _analyze_sentiment(self, context: TextAnalysisContext) -> Dict[str, Any]:
         """Analyze sentiment of the content using SnowNLP.
         
         Args:
-            content: Text content to analyze
+            context: Shared analysis context of the text
             
         Returns:
             Sentiment analysis results
@@ -539,7 +586,7 @@ class TextProcessor:
             from snownlp import SnowNLP
             
             # 分段进行情感分析
-            segments = self._segment_text(content)
+            segments = context.segments
             
             # 计算整体情感分数
             sentiment_scores = []
@@ -588,18 +635,20 @@ class TextProcessor:
                 'confidence': 0.0
             }
     
-    def _generate_statistics(self, content: str, segments: List[str]) -> Dict[str, Any]:
+    def _generate_statistics(self, context: TextAnalysisContext) -> Dict[str, Any]:
         """Generate content statistics."""
-        word_count = len(jieba.lcut(content))
+        words = context.words
+        segments = context.segments
+        word_count = len(words)
         
         # Character and word statistics
         stats = {
-            'total_characters': len(content),
+            'total_characters': len(context.content),
             'total_words': word_count,
             'total_segments': len(segments),
             'avg_segment_length': sum(len(seg) for seg in segments) // len(segments) if segments else 0,
             'reading_time_minutes': max(1, word_count // 300),  # Approximate reading time
-            'unique_words': len(set(jieba.lcut(content)))  # Unique word count
+            'unique_words': len(set(words))  # Unique word count
         }
         
         return stats
\ No newline at end of file
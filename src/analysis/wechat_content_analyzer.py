@@ -14,6 +14,7 @@ from dataclasses import asdict, dataclass
 
 from src.analysis.policy_analyzer import PolicyAnalyzer
 from src.analysis.policy_document_processor import PolicyInfo
+from src.utils.keyword_matcher import get_keyword_matcher
 
 @dataclass
 class WeChatArticle:
@@ -129,8 +130,9 @@ class WeChatContentAnalyzer:
                 "支持", "措施", "要求", "标准", "金额", "比例", "期限", "截止日期"
             ]
             
+            found = get_keyword_matcher(policy_keywords).present(content)
             for kw in policy_keywords:
-                if kw in content and kw not in keywords:
+                if kw in found and kw not in keywords:
                     keywords.append(kw)
             
             # Extract amounts and percentages
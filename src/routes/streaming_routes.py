@@ -7,13 +7,15 @@ Provides Server-Sent Events (SSE) endpoints for streaming LLM responses
 import json
 import logging
 import time
+import uuid
 import asyncio
 import threading
 from queue import Queue, Empty
 from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
-from src.ai.streaming_llm_generator import StreamingLLMReportGenerator
+from src.ai.llm_registry import llm_generator_registry
 from src.utils.api_error_handler import handle_api_error, APIError
+from src.utils.stream_delta import DeltaStreamEncoder
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +32,32 @@ def format_sse_event(event_type: str, data: dict) -> str:
     return f"data: {json.dumps(event_data, ensure_ascii=False)}\n\n"
 
 
+# Live delta-protocol streams by stream_id, kept for a while after they finish
+# so late resync requests can still be answered
+_stream_sessions = {}
+_stream_sessions_lock = threading.Lock()
+STREAM_SESSION_TTL = 300
+
+
+def _open_stream_session(chunk_queue: Queue) -> tuple:
+    """Register a delta-protocol stream; returns (stream_id, session)."""
+    now = time.time()
+    session = {
+        'encoder': DeltaStreamEncoder(),
+        'queue': chunk_queue,
+        'lock': threading.Lock(),
+        'finished_at': None
+    }
+    stream_id = uuid.uuid4().hex
+    with _stream_sessions_lock:
+        expired = [sid for sid, sess in _stream_sessions.items()
+                   if sess['finished_at'] and now - sess['finished_at'] > STREAM_SESSION_TTL]
+        for sid in expired:
+            del _stream_sessions[sid]
+        _stream_sessions[stream_id] = session
+    return stream_id, session
+
+
 @streaming_bp.route('/api/stream/generate-report', methods=['POST'])
 def stream_generate_report():
     """
@@ -50,11 +78,10 @@ def stream_generate_report():
         
         # Log available services
         try:
-            from src.ai.streaming_llm_generator import StreamingLLMReportGenerator
             from pathlib import Path
             app_root = Path(__file__).parent.parent.parent
             cfg_path = str(app_root / 'config.json')
-            temp_generator = StreamingLLMReportGenerator(config_path=cfg_path, llm_service='kimi')
+            temp_generator = llm_generator_registry.get_streaming_generator('kimi', config_path=cfg_path)
             logger.info(f"Available services: {[s.value for s in temp_generator.available_services]}")
             logger.info(f"Current service: {temp_generator.current_service.value}")
         except Exception as e:
@@ -68,6 +95,17 @@ def stream_generate_report():
         industry = data.get('industry', '').strip()
         additional_context = data.get('additional_context', '')
         llm_service = data.get('llm_service', 'kimi')
+        parallel_post_processing = data.get('parallel_post_processing')
+        # protocol 2: delta-only chunks with offsets/checksums instead of the accumulated text
+        try:
+            protocol = int(data.get('protocol', 1))
+        except (TypeError, ValueError):
+            protocol = 1
+        # Optional typewriter pacing requested by the client, off by default
+        try:
+            stream_pacing = max(0.0, float(data.get('pacing_ms', 0))) / 1000
+        except (TypeError, ValueError):
+            stream_pacing = 0.0
         
         logger.info(f"请求参数 - city: '{city}', industry: '{industry}', llm_service: '{llm_service}', additional_context: '{additional_context[:50]}...'")
         
@@ -83,6 +121,9 @@ def stream_generate_report():
             try:
                 # Create a queue for communication between async and sync
                 chunk_queue = Queue()
+                stream_id, session = (None, None)
+                if protocol >= DeltaStreamEncoder.PROTOCOL_VERSION:
+                    stream_id, session = _open_stream_session(chunk_queue)
                 
                 async def async_generate():
                     """Async generator function"""
@@ -92,7 +133,9 @@ def stream_generate_report():
                             'message': '开始生成报告...',
                             'city': city,
                             'industry': industry,
-                            'service': llm_service
+                            'service': llm_service,
+                            'protocol': DeltaStreamEncoder.PROTOCOL_VERSION if session else 1,
+                            'stream_id': stream_id
                         })
                         chunk_queue.put(start_event.encode('utf-8'))
                         
@@ -104,10 +147,11 @@ def stream_generate_report():
 
                         # Initialize generator with timeout protection
                         try:
-                            generator = StreamingLLMReportGenerator(
+                            generator = llm_generator_registry.get_streaming_generator(
+                                llm_service,
                                 config_path=cfg_path,
-                                llm_service=llm_service,
-                                enable_fallback=True
+                                enable_fallback=True,
+                                stream_pacing=stream_pacing
                             )
                             logger.info(f"Generator initialized successfully. Available services: {[s.value for s in generator.available_services]}")
                         except Exception as init_error:
@@ -146,13 +190,17 @@ def stream_generate_report():
                         
                         # Stream the generation process
                         async for chunk in generator.generate_report_streaming(
-                            city, industry, additional_context
+                            city, industry, additional_context,
+                            parallel_post_processing=parallel_post_processing
                         ):
-                            sse_event = format_sse_event('report_chunk', chunk)
-                            chunk_queue.put(sse_event.encode('utf-8'))
-                            
-                            # Control streaming pace
-                            await asyncio.sleep(0.05)
+                            if session:
+                                # Encode and enqueue atomically so resync snapshots stay ordered
+                                with session['lock']:
+                                    sse_event = format_sse_event('report_chunk', session['encoder'].encode(chunk))
+                                    chunk_queue.put(sse_event.encode('utf-8'))
+                            else:
+                                sse_event = format_sse_event('report_chunk', chunk)
+                                chunk_queue.put(sse_event.encode('utf-8'))
                         
                         # Send completion event
                         final_event = format_sse_event('report_complete', {
@@ -185,6 +233,9 @@ def stream_generate_report():
                         error_event = format_sse_event('error', error_data)
                         chunk_queue.put(error_event.encode('utf-8'))
                     finally:
+                        if session:
+                            with session['lock']:
+                                session['finished_at'] = time.time()
                         chunk_queue.put(None)  # Sentinel to indicate completion
                 
                 # Run async function in a separate thread
@@ -255,6 +306,29 @@ def stream_generate_report():
         }), 500
 
 
+@streaming_bp.route('/api/stream/<stream_id>/resync', methods=['POST'])
+def resync_stream(stream_id):
+    """
+    Request the full text of a delta-protocol stream
+    While the stream is live the snapshot is delivered in-band as a 'resync'
+    event; once it has finished the snapshot is returned in the response
+    """
+    data = request.get_json(silent=True) or {}
+    with _stream_sessions_lock:
+        session = _stream_sessions.get(stream_id)
+    if not session:
+        return jsonify({'error': 'Unknown or expired stream'}), 404
+
+    encoder = session['encoder']
+    names = [data['stream']] if data.get('stream') else encoder.streams()
+    with session['lock']:
+        if session['finished_at'] is None:
+            for name in names:
+                session['queue'].put(format_sse_event('resync', encoder.snapshot(name)).encode('utf-8'))
+            return jsonify({'status': 'queued', 'streams': names})
+    return jsonify({'status': 'finished', 'resync': [encoder.snapshot(name) for name in names]})
+
+
 @streaming_bp.route('/api/stream/test', methods=['GET'])
 def test_stream():
     """Test endpoint for streaming functionality"""
@@ -1,6 +1,8 @@
 """Background task processing module."""
 from .celery_app import celery_app
-from .report_tasks import generate_llm_report_task
+from .report_tasks import generate_llm_report_task, precompute_report_analyses_task
 from .wechat_tasks import fetch_wechat_articles_task
+from .email_policy_tasks import ingest_email_policies_task
 
-__all__ = ['celery_app', 'generate_llm_report_task', 'fetch_wechat_articles_task']
+__all__ = ['celery_app', 'generate_llm_report_task', 'precompute_report_analyses_task',
+           'fetch_wechat_articles_task', 'ingest_email_policies_task']
@@ -2,19 +2,99 @@
 """
 Celery application for background task processing
 Handles async report generation and other long-running tasks
+
+Tasks are routed to named queues so that a 25-minute LLM report never sits
+in front of a short scrape or analysis job; run one worker per queue with
+``worker_options(queue)`` (see scripts/start.sh)
 """
 
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pkg_resources")
 
 import os
+from fnmatch import fnmatch
+from typing import Dict, List, Optional
+
 from celery import Celery
+from celery.signals import task_postrun, worker_init
+from kombu import Queue
+
+from src.utils.llm_rate_limiter import configure_llm_rate_limiter
+from src.utils.task_progress import TERMINAL_STATES, configure_task_progress, task_progress
+
+# Queue -> worker defaults. Each value can be overridden per deployment with
+# CELERY_<QUEUE>_CONCURRENCY / _PREFETCH / _RATE_LIMIT (empty rate limit = none).
+# Rate limits are task starts per worker, per task type.
+QUEUE_SETTINGS: Dict[str, Dict] = {
+    # Long LLM report jobs: few slots, fetch one job per slot so queued
+    # reports go to whichever worker frees up first
+    'llm': {'concurrency': 2, 'prefetch': 1, 'rate_limit': '10/m'},
+    # Web and mailbox scraping: I/O bound, polite to the scraped sites
+    'scrape': {'concurrency': 4, 'prefetch': 1, 'rate_limit': '30/m'},
+    # Short analysis jobs; also the default queue for unrouted tasks
+    'analysis': {'concurrency': 4, 'prefetch': 4, 'rate_limit': None},
+}
+DEFAULT_QUEUE = 'analysis'
+
+# Task name (glob) -> queue; first match wins, unmatched tasks use DEFAULT_QUEUE
+TASK_QUEUE_ROUTES = {
+    'generate_llm_report': 'llm',
+    'precompute_report_analyses': 'analysis',
+    'src.tasks.wechat_tasks.*': 'scrape',
+    'src.tasks.email_policy_tasks.*': 'scrape',
+}
+
+
+def queue_setting(queue: str, key: str):
+    """Worker setting of a queue, with the environment override applied."""
+    default = QUEUE_SETTINGS[queue][key]
+    value = os.getenv(f'CELERY_{queue.upper()}_{key.upper()}')
+    if value is None:
+        return default
+    if key == 'rate_limit':
+        return value or None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return default
+
+
+def queue_for_task(task_name: str) -> str:
+    """Queue a task is routed to."""
+    for pattern, queue in TASK_QUEUE_ROUTES.items():
+        if fnmatch(task_name, pattern):
+            return queue
+    return DEFAULT_QUEUE
+
+
+def worker_options(queue: str) -> List[str]:
+    """``celery worker`` options for a worker dedicated to ``queue``."""
+    return [
+        '-Q', queue,
+        '-n', f'{queue}@%h',
+        '-c', str(queue_setting(queue, 'concurrency')),
+        '--prefetch-multiplier', str(queue_setting(queue, 'prefetch')),
+    ]
+
+
+class QueueRateLimits:
+    """Task annotation applying the rate limit of the task's queue."""
+
+    def annotate(self, task) -> Optional[Dict]:
+        rate_limit = queue_setting(queue_for_task(task.name), 'rate_limit')
+        return {'rate_limit': rate_limit} if rate_limit else None
+
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Task progress, task registries and LLM rate limits; web processes and
+# workers must agree on it, so both default to the broker's Redis
+TASK_STORE_REDIS_URL = os.getenv('TASK_STORE_REDIS_URL') or REDIS_URL
 
 # Configure Celery
 celery_app = Celery(
     'industrial_analysis',
-    broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
-    backend=os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    broker=REDIS_URL,
+    backend=REDIS_URL
 )
 
 # Celery configuration
@@ -27,7 +107,38 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Queue topology and routing
+    task_queues=[Queue(name, routing_key=name) for name in QUEUE_SETTINGS],
+    task_default_queue=DEFAULT_QUEUE,
+    task_default_routing_key=DEFAULT_QUEUE,
+    task_routes=[{pattern: {'queue': queue} for pattern, queue in TASK_QUEUE_ROUTES.items()}],
+    task_annotations=[QueueRateLimits()],
+    # A worker reserves one job per slot; short-job workers raise this with
+    # --prefetch-multiplier (see worker_options)
+    worker_prefetch_multiplier=1,
+    # Late-acked jobs (LLM reports) are redelivered after this many seconds
+    # without an ack; must exceed the hard time limit or a running report
+    # would be handed to a second worker
+    broker_transport_options={'visibility_timeout': 2 * 60 * 60},
 )
 
+
+@worker_init.connect
+def configure_worker_progress(sender=None, **kwargs):
+    """Publish task progress to the Redis the web processes read it from,
+    and share the LLM rate limits with them."""
+    if getattr(sender, 'app', celery_app) is not celery_app:
+        return
+    client = configure_task_progress(TASK_STORE_REDIS_URL)
+    configure_llm_rate_limiter(redis_client=client)
+
+
+@task_postrun.connect
+def publish_final_progress(task_id=None, state=None, retval=None, **kwargs):
+    """Publish every task's final state, including uncaught exceptions."""
+    if task_id and state in TERMINAL_STATES:
+        task_progress.publish_result(task_id, state, retval)
+
+
 # Auto-discover tasks
 celery_app.autodiscover_tasks(['src.tasks'])
@@ -7,11 +7,9 @@ Background task to periodically check email for new policy URLs
 
 import time
 import logging
-from datetime import datetime
 
 from src.utils.email_reader import EmailReader
-from src.analysis.policy_analysis_integrator import PolicyAnalysisIntegrator
-from app import db, PolicyAnalysis, create_app
+from src.tasks.email_policy_tasks import ingest_policy_urls
 
 logger = logging.getLogger(__name__)
 
@@ -19,87 +17,26 @@ logger = logging.getLogger(__name__)
 def check_email_for_policies():
     """Check email for new policy URLs and process them"""
     try:
-        # Create app context
-        app = create_app()
-        
+        from app import app, db, PolicyAnalysis
+
         with app.app_context():
-            from app import db
             logger.info("🔍 Starting email policy check...")
-            
-            # Initialize email reader
-            email_reader = EmailReader()
-            
+
             # Get new emails with URLs
-            emails_with_urls = email_reader.get_unread_emails_with_urls()
-            
-            new_policies_count = 0
-            
-            if emails_with_urls:
-                # Initialize policy integrator
-                integrator = PolicyAnalysisIntegrator()
-                
-                for email_info in emails_with_urls:
-                    logger.info(f"Processing email: {email_info['subject'][:50]}...")
-                    for url in email_info['urls']:
-                        try:
-                            logger.info(f"Analyzing policy from URL: {url}")
-                            
-                            # Analyze the policy from URL
-                            analysis_result = integrator.analyze_policy_from_url(url)
-                            
-                            if analysis_result.get('success'):
-                                # Extract classification info
-                                classification = analysis_result.get('classification', {})
-                                
-                                # Create PolicyAnalysis record
-                                policy_analysis = PolicyAnalysis(
-                                    title=analysis_result.get('title', 'Unknown Title'),
-                                    original_url=analysis_result.get('url'),
-                                    source_type='email',
-                                    content=analysis_result.get('content', ''),
-                                    content_summary=analysis_result.get('content_summary', analysis_result.get('title', ''))[:500],  # Better summary
-                                    analysis_result=analysis_result,
-                                    classification_region=classification.get('region', [None])[0] if classification.get('region') else None,
-                                    classification_industry=classification.get('industry', [None])[0] if classification.get('industry') else None,
-                                    classification_year=classification.get('year'),
-                                    classification_policy_type=classification.get('policy_type'),
-                                    applicability_score=analysis_result.get('policy_analysis', {}).get('applicability', {}).get('score', 0) if analysis_result.get('policy_analysis', {}).get('applicability') else 0,
-                                    entities=analysis_result.get('entities'),
-                                    knowledge_graph=analysis_result.get('knowledge_graph'),
-                                    llm_interpretation=analysis_result.get('llm_interpretation'),
-                                    tags=','.join(classification.get('region', []) + classification.get('industry', [])),
-                                    status='completed'
-                                )
-                                
-                                db.session.add(policy_analysis)
-                                db.session.commit()
-                                new_policies_count += 1
-                                
-                                logger.info(f"✅ Successfully added policy: {policy_analysis.title[:50]}...")
-                                
-                            else:
-                                logger.error(f"❌ Failed to analyze policy from URL: {url}")
-                                
-                        except Exception as e:
-                            logger.error(f"Error processing policy from email {email_info['id']}, URL {url}: {e}")
-                            
-                            # Create failed record
-                            policy_analysis = PolicyAnalysis(
-                                title=f"分析失败 - {url}",
-                                original_url=url,
-                                source_type='email',
-                                status='failed',
-                                content_summary=f"分析失败: {str(e)}"
-                            )
-                            db.session.add(policy_analysis)
-                            db.session.commit()
+            emails_with_urls = EmailReader().get_unread_emails_with_urls()
 
-                logger.info(f"✅ Email check completed. Added {new_policies_count} new policies.")
-            else:
+            if not emails_with_urls:
                 logger.info("✅ No new emails with policy URLs found.")
-                
+                return 0
+
+            # De-duplicate, analyze concurrently and store in batches
+            counts = ingest_policy_urls(db.session, PolicyAnalysis, emails_with_urls)
+            new_policies_count = counts['added'] + counts['retried']
+            logger.info(f"✅ Email check completed. Added {new_policies_count} new policies "
+                        f"({counts['known']} already stored, {counts['failed']} failed).")
+
         return new_policies_count
-        
+
     except Exception as e:
         logger.error(f"❌ Error in email policy check: {e}")
         return 0
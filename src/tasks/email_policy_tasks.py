@@ -0,0 +1,322 @@
+"""
+Email Policy Ingestion Tasks
+Celery task that turns policy URLs from unread emails into PolicyAnalysis rows:
+URLs are normalized and de-duplicated (across emails and against stored
+policies), analyzed concurrently and written in batched transactions
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import select
+
+from src.utils.task_progress import publish_task_progress
+from .celery_app import celery_app
+
+
+def get_app():
+    from app import app
+    return app
+
+
+def get_db():
+    from app import db
+    return db
+
+
+def get_PolicyAnalysis():
+    from app import PolicyAnalysis
+    return PolicyAnalysis
+
+
+logger = logging.getLogger(__name__)
+
+# Concurrent URL analyses (each one scrapes a page and calls the LLM)
+DEFAULT_MAX_WORKERS = int(os.getenv('EMAIL_POLICY_WORKERS', 4))
+# PolicyAnalysis rows written per transaction
+DEFAULT_BATCH_SIZE = int(os.getenv('EMAIL_POLICY_BATCH_SIZE', 20))
+# URLs per ``original_url IN (...)`` lookup
+LOOKUP_CHUNK_SIZE = 500
+
+# Query parameters added by newsletters and link trackers; they do not change
+# the page, so URLs differing only in these are the same policy
+TRACKING_PARAMS = frozenset({
+    'from', 'isappinstalled', 'scene', 'clicktime', 'enterid', 'sessionid',
+    'spm', 'share_token', 'fbclid', 'gclid', 'mc_cid', 'mc_eid',
+})
+TRACKING_PREFIXES = ('utm_',)
+
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def normalize_policy_url(url: Optional[str]) -> Optional[str]:
+    """Canonical form of a policy URL used for de-duplication and storage.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the remaining query parameters and strips a trailing
+    slash from the path. Returns None for anything that is not an http(s) URL.
+    """
+    if not url:
+        return None
+    url = url.strip().rstrip('.,;)>]\'"')
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port is None or str(port) == _DEFAULT_PORTS[scheme] else f"{host}:{port}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip('/') if parts.path not in ('', '/') else ''
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def collect_email_urls(emails: Iterable[Dict]) -> Tuple[List[str], int]:
+    """Normalized URLs of all emails in first-seen order.
+
+    Returns:
+        (unique normalized URLs, number of duplicate or invalid URLs dropped)
+    """
+    seen = {}
+    dropped = 0
+    for email_info in emails:
+        for url in email_info.get('urls') or []:
+            normalized = normalize_policy_url(url)
+            if normalized is None or normalized in seen:
+                dropped += 1
+                continue
+            seen[normalized] = True
+    return list(seen), dropped
+
+
+def find_known_urls(session, model, urls: List[str]) -> Dict[str, Tuple[int, str]]:
+    """Stored policies for the given normalized URLs.
+
+    Rows stored before URLs were normalized only match when their URL was
+    already in canonical form.
+
+    Returns:
+        {normalized url: (policy id, status)}
+    """
+    table = model.__table__
+    known = {}
+    for start in range(0, len(urls), LOOKUP_CHUNK_SIZE):
+        chunk = urls[start:start + LOOKUP_CHUNK_SIZE]
+        rows = session.execute(
+            select(table.c.id, table.c.original_url, table.c.status)
+            .where(table.c.original_url.in_(chunk))
+        )
+        for row in rows:
+            current = known.get(row.original_url)
+            # Prefer a successful analysis over a failed one for the same URL
+            if current is None or current[1] == 'failed':
+                known[row.original_url] = (row.id, row.status)
+    return known
+
+
+def policy_values(url: str, analysis_result: Dict) -> Dict:
+    """PolicyAnalysis column values for a successful analysis of ``url``."""
+    classification = analysis_result.get('classification') or {}
+    applicability = (analysis_result.get('policy_analysis') or {}).get('applicability')
+    regions = classification.get('region') or []
+    industries = classification.get('industry') or []
+    return {
+        'title': analysis_result.get('title') or 'Unknown Title',
+        'original_url': url,
+        'source_type': 'email',
+        'content': analysis_result.get('content', ''),
+        'content_summary': (analysis_result.get('content_summary') or analysis_result.get('title') or '')[:500],
+        'analysis_result': analysis_result,
+        'classification_region': regions[0] if regions else None,
+        'classification_industry': industries[0] if industries else None,
+        'classification_year': classification.get('year'),
+        'classification_policy_type': classification.get('policy_type'),
+        'applicability_score': applicability.get('score', 0) if applicability else 0,
+        'entities': analysis_result.get('entities'),
+        'knowledge_graph': analysis_result.get('knowledge_graph'),
+        'llm_interpretation': analysis_result.get('llm_interpretation'),
+        'tags': ','.join(regions + industries),
+        'status': 'completed'
+    }
+
+
+def failed_policy_values(url: str, error: str) -> Dict:
+    """PolicyAnalysis column values recording a failed analysis of ``url``."""
+    return {
+        'title': f"分析失败 - {url}",
+        'original_url': url,
+        'source_type': 'email',
+        'status': 'failed',
+        'content_summary': f"分析失败: {error}"
+    }
+
+
+def _integrator_analyzer() -> Callable[[str], Dict]:
+    """``analyze(url)`` backed by one PolicyAnalysisIntegrator per worker thread."""
+    local = threading.local()
+
+    def analyze(url: str) -> Dict:
+        integrator = getattr(local, 'integrator', None)
+        if integrator is None:
+            from src.analysis.policy_analysis_integrator import PolicyAnalysisIntegrator
+            integrator = local.integrator = PolicyAnalysisIntegrator()
+        return integrator.analyze_policy_from_url(url)
+
+    return analyze
+
+
+def ingest_policy_urls(session, model, emails: Iterable[Dict],
+                       analyze: Optional[Callable[[str], Dict]] = None,
+                       max_workers: int = DEFAULT_MAX_WORKERS,
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Analyze the new policy URLs of ``emails`` and store the results.
+
+    URLs already stored with a non-failed status are skipped; a previously
+    failed URL is analyzed again and its row updated in place. Analyses run on
+    a pool of ``max_workers`` threads while this thread writes the results,
+    committing every ``batch_size`` rows.
+
+    Args:
+        session: SQLAlchemy session
+        model: PolicyAnalysis model
+        emails: Items of ``EmailReader.get_unread_emails_with_urls``
+        analyze: ``analyze(url) -> analysis result``; defaults to
+            PolicyAnalysisIntegrator.analyze_policy_from_url
+        max_workers: Concurrent analyses
+        batch_size: Rows per transaction
+        progress: Called as ``progress(done, total)`` after every URL
+
+    Returns:
+        Counts of collected URLs, dropped duplicates, already stored URLs, and
+        added, retried and failed policies
+    """
+    urls, duplicates = collect_email_urls(emails)
+    known = find_known_urls(session, model, urls)
+    retry_ids = {url: policy_id for url, (policy_id, status) in known.items() if status == 'failed'}
+    pending = [url for url in urls if url not in known or url in retry_ids]
+
+    counts = {
+        'urls': len(urls),
+        'duplicates': duplicates,
+        'known': len(urls) - len(pending),
+        'added': 0,
+        'retried': 0,
+        'failed': 0,
+    }
+    if not pending:
+        return counts
+
+    analyze = analyze or _integrator_analyzer()
+    batch_size = max(1, batch_size)
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        try:
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        batch.clear()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))),
+                            thread_name_prefix='email-policy') as executor:
+        futures = {executor.submit(analyze, url): url for url in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                result = future.result()
+                if result and result.get('success'):
+                    values = policy_values(url, result)
+                else:
+                    error = (result or {}).get('error', 'unknown error')
+                    logger.error(f"❌ Failed to analyze policy from URL: {url}: {error}")
+                    values = failed_policy_values(url, error)
+            except Exception as e:
+                logger.error(f"Error processing policy URL {url}: {e}")
+                values = failed_policy_values(url, str(e))
+
+            if url in retry_ids:
+                policy = session.get(model, retry_ids[url])
+                for field, value in values.items():
+                    setattr(policy, field, value)
+                if values['status'] != 'failed':
+                    counts['retried'] += 1
+            else:
+                policy = model(**values)
+                session.add(policy)
+                if values['status'] != 'failed':
+                    counts['added'] += 1
+            if values['status'] == 'failed':
+                counts['failed'] += 1
+
+            batch.append(policy)
+            if len(batch) >= batch_size:
+                flush()
+            if progress is not None:
+                progress(done, len(pending))
+    flush()
+
+    return counts
+
+
+@celery_app.task(bind=True)
+def ingest_email_policies_task(self, max_workers: int = None, batch_size: int = None):
+    """
+    Task to analyze policy URLs from unread emails and store them in the database
+
+    Args:
+        max_workers: Concurrent analyses (default EMAIL_POLICY_WORKERS)
+        batch_size: Policies per database transaction (default EMAIL_POLICY_BATCH_SIZE)
+    """
+    try:
+        from src.utils.email_reader import EmailReader
+
+        logger.info("🔍 Starting email policy check...")
+        publish_task_progress(self, {
+            'current': 0, 'total': 1, 'stage': 'email',
+            'status': '📧 读取未读邮件...', 'message': '正在读取未读邮件...'
+        })
+        emails = EmailReader().get_unread_emails_with_urls()
+
+        def report_progress(done, total):
+            publish_task_progress(self, {
+                'current': done, 'total': total, 'stage': 'analysis',
+                'status': f'🔍 分析政策链接 ({done}/{total})',
+                'message': f'正在分析政策链接 ({done}/{total})'
+            })
+
+        with get_app().app_context():
+            counts = ingest_policy_urls(
+                get_db().session, get_PolicyAnalysis(), emails,
+                max_workers=max_workers or DEFAULT_MAX_WORKERS,
+                batch_size=batch_size or DEFAULT_BATCH_SIZE,
+                progress=report_progress
+            )
+
+        new_policies = counts['added'] + counts['retried']
+        logger.info(f"✅ Email check completed: {new_policies} new, {counts['known']} already stored, "
+                    f"{counts['duplicates']} duplicates, {counts['failed']} failed")
+        return dict(counts, success=True, emails=len(emails), new_policies=new_policies,
+                    message=f'检查完成，新增 {new_policies} 条政策')
+
+    except Exception as e:
+        logger.error(f"❌ Error in email policy check: {e}")
+        return {'success': False, 'error': str(e), 'new_policies': 0}
@@ -6,19 +6,28 @@ Background tasks for report generation
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pkg_resources")
 
+import os
 import json
 import logging
 from datetime import datetime
 from pathlib import Path
+from celery.exceptions import Retry, SoftTimeLimitExceeded
 from .celery_app import celery_app
-from src.ai.llm_generator import LLMReportGenerator
+from src.ai.llm_registry import llm_generator_registry
+from src.ai.sectioned_report import SectionCheckpointStore, SectionGenerationError, SectionedReportBuilder
+from src.analysis.report_analyses import precompute_report_analyses
 from src.utils.api_error_handler import handle_api_error, api_error_handler
 from src.utils.notification_service import notification_service
+from src.utils.report_analysis_cache import report_analysis_cache
+from src.utils.task_progress import publish_task_progress
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(bind=True, name='generate_llm_report', max_retries=3, default_retry_delay=60)
+# Acknowledged only when finished, so a report interrupted by a worker
+# shutdown is redelivered instead of lost
+@celery_app.task(bind=True, name='generate_llm_report', max_retries=3, default_retry_delay=60,
+                 acks_late=True)
 def generate_llm_report_task(self, city: str, industry: str, 
                              additional_context: str = "",
                              user_id: str = None,
@@ -34,7 +43,10 @@ def generate_llm_report_task(self, city: str, industry: str,
         user_id: User ID who requested the report
         initial_report_id: Initial report ID created in the web request
         llm_service: LLM service to use (kimi, gemini, etc.)
-        **kwargs: Additional arguments (ignored)
+        **kwargs: Additional arguments: ``app_root_path``, ``sectioned``
+            (generate and checkpoint the report section by section, default
+            from LLM_SECTIONED_REPORTS), ``parallel_post_processing`` and
+            ``precompute_analyses``
     
     Returns:
         Dictionary with task result including report_id and status
@@ -50,21 +62,18 @@ def generate_llm_report_task(self, city: str, industry: str,
         logger.info(f"📝 补充信息: {additional_context[:100] if additional_context else '无'}")
         
         # Update task state - INIT
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 10, 
-                'total': 100, 
-                'status': f'🔧 初始化 {llm_service.upper()} API...',
-                'stage': 'init',
-                'message': f'正在初始化 {llm_service.upper()} LLM 报告生成器'
-            }
-        )
+        publish_task_progress(self, {
+            'current': 10, 
+            'total': 100, 
+            'status': f'🔧 初始化 {llm_service.upper()} API...',
+            'stage': 'init',
+            'message': f'正在初始化 {llm_service.upper()} LLM 报告生成器'
+        })
         
         # Initialize LLM generator with fallback support
         logger.info(f"\n📦 正在初始化 {llm_service.upper()} LLM 报告生成器...")
         try:
-            generator = LLMReportGenerator(llm_service=llm_service, enable_fallback=True)
+            generator = llm_generator_registry.get_generator(llm_service, enable_fallback=True)
             logger.info(f"✅ {llm_service.upper()} LLM 报告生成器初始化完成")
         except Exception as e:
             logger.error(f"❌ LLM 报告生成器初始化失败: {e}")
@@ -80,26 +89,74 @@ def generate_llm_report_task(self, city: str, industry: str,
         # Store model name for metadata
         self.model_name = getattr(generator, 'model_name', llm_service)
         
+        # Use initial_report_id if provided, otherwise generate new timestamp
+        if initial_report_id:
+            report_id = initial_report_id
+            logger.info(f"📋 使用初始报告ID: {report_id}")
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            report_id = f"llm_report_{timestamp}"
+            logger.info(f"📋 生成新报告ID: {report_id}")
+        
+        # Get app_root_path from kwargs if provided
+        app_root_path = kwargs.get('app_root_path')
+        
+        if app_root_path:
+            output_dir = Path(app_root_path) / 'data' / 'output' / 'llm_reports'
+        else:
+            output_dir = Path('data/output/llm_reports')
+        
+        # Section-by-section generation checkpoints every finished section, so
+        # a retry (e.g. after the soft time limit) only generates the rest
+        sectioned = kwargs.get('sectioned')
+        if sectioned is None:
+            sectioned = os.getenv('LLM_SECTIONED_REPORTS', '1').lower() not in ('0', 'false', 'no')
+        checkpoints = None
+        if sectioned:
+            # The task id survives retries; the initial report id survives resubmission
+            checkpoints = SectionCheckpointStore(
+                output_dir / 'checkpoints' / (initial_report_id or self.request.id or report_id)
+            )
+        
         # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 20, 
-                'total': 100, 
-                'status': f'🌐 调用 {llm_service.upper()} API 生成 {city} {industry} 报告...',
+        publish_task_progress(self, {
+            'current': 20, 
+            'total': 100, 
+            'status': f'🌐 调用 {llm_service.upper()} API 生成 {city} {industry} 报告...',
+            'stage': 'generating',
+            'message': f'正在使用 {llm_service.upper()} API 生成 {city} {industry} 产业分析报告',
+            'model': getattr(self, 'model_name', None),
+            'service': llm_service
+        })
+        # Generate the main report with comprehensive error handling
+        logger.info('🌐 开始调用 %s API...', llm_service.upper())
+        
+        def _on_generation_progress(fraction, message):
+            # Generation covers 20% - 60% of the task
+            publish_task_progress(self, {
+                'current': 20 + int(40 * min(max(fraction, 0.0), 1.0)),
+                'total': 100,
+                'status': message,
                 'stage': 'generating',
-                'message': f'正在使用 {llm_service.upper()} API 生成 {city} {industry} 产业分析报告',
+                'message': message,
                 'model': getattr(self, 'model_name', None),
                 'service': llm_service
-            }
-        )
-        logger.info('🌐 开始调用 %s API...', llm_service.upper())
+            })
         
-        # Generate the main report with comprehensive error handling
-        logger.info('🌐 开始调用 %s API...', llm_service.upper())
+        def _on_section(done, total, key, resumed):
+            _on_generation_progress(
+                done / total,
+                f'{"♻️ 已从检查点恢复" if resumed else "✅ 已生成"}章节 {key} ({done}/{total})'
+            )
         
         try:
-            report_result = generator.generate_report(city, industry, additional_context)
+            if checkpoints is not None:
+                report_result = SectionedReportBuilder(generator, checkpoints).generate(
+                    city, industry, additional_context, on_section=_on_section
+                )
+            else:
+                report_result = generator.generate_report(city, industry, additional_context,
+                                                          on_progress=_on_generation_progress)
             
             if not report_result.get('success'):
                 error_msg = report_result.get('error', '报告生成失败')
@@ -126,6 +183,12 @@ def generate_llm_report_task(self, city: str, industry: str,
         except Exception as e:
             logger.error(f"❌ 报告生成过程异常: {e}")
             
+            # Finished sections are checkpointed: retry the task to generate the rest
+            if isinstance(e, (SectionGenerationError, SoftTimeLimitExceeded)) and \
+                    checkpoints is not None and self.request.retries < self.max_retries:
+                logger.warning(f"🔁 {self.request.retries + 1}/{self.max_retries} 次重试，将从章节检查点继续")
+                raise self.retry(exc=e)
+            
             # 使用错误处理器分析错误
             api_error = handle_api_error(e, llm_service, "报告生成")
             
@@ -168,97 +231,105 @@ def generate_llm_report_task(self, city: str, industry: str,
         logger.info(f"📋 尝试过的服务: {[s.upper() for s in attempted_services]}")
         
         # Update progress - Report generated
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 60,
+        publish_task_progress(self, {
+            'current': 60,
+            'total': 100,
+            'status': '✅ 报告主体生成完成',
+            'stage': 'report_done',
+            'message': f'报告主体已生成，共 {len(report_result["full_content"])} 字'
+        })
+        
+        # Summaries and SWOT only depend on the finished report body, so they
+        # can optionally be requested concurrently
+        parallel_post = kwargs.get('parallel_post_processing')
+        if parallel_post is None:
+            parallel_post = os.getenv('LLM_PARALLEL_POST_PROCESSING', '0') == '1'
+        
+        if parallel_post:
+            publish_task_progress(self, {
+                'current': 65,
                 'total': 100,
-                'status': '✅ 报告主体生成完成',
-                'stage': 'report_done',
-                'message': f'报告主体已生成，共 {len(report_result["full_content"])} 字'
-            }
-        )
-        
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={
+                'status': '📝 并行生成摘要与 SWOT 分析...',
+                'stage': 'post_analysis',
+                'message': '正在同时生成中英文执行摘要与优劣势分析'
+            })
+            logger.info("\n📝 正在并行生成执行摘要与 SWOT 分析...")
+            
+            part_labels = {'summary_zh': '中文摘要', 'summary_en': '英文摘要', 'swot': 'SWOT 分析'}
+            finished = []
+            
+            def _on_part_complete(name):
+                finished.append(name)
+                publish_task_progress(self, {
+                    'current': 65 + 9 * len(finished),
+                    'total': 100,
+                    'status': f'✅ {part_labels[name]}完成',
+                    'stage': f'{name}_done',
+                    'message': f'已完成 {len(finished)}/3: ' + '、'.join(part_labels[n] for n in finished)
+                })
+            
+            post = generator.generate_post_analysis(
+                report_result['full_content'], parallel=True, on_complete=_on_part_complete
+            )
+            summary_zh, summary_en, swot = post['summary_zh'], post['summary_en'], post['swot']
+            logger.info("✅ 摘要（中英文）与 SWOT 分析生成完成")
+        else:
+            # Update progress
+            publish_task_progress(self, {
                 'current': 65, 
                 'total': 100, 
                 'status': '📝 生成中文摘要...',
                 'stage': 'summary_zh',
                 'message': '正在生成中文执行摘要'
-            }
-        )
-        logger.info("\n📝 正在生成执行摘要...")
+            })
+            logger.info("\n📝 正在生成执行摘要...")
         
-        # Generate summary in both languages
-        summary_zh = generator.generate_summary(report_result['full_content'], 'zh')
+            # Generate summary in both languages
+            summary_zh = generator.generate_summary(report_result['full_content'], 'zh')
         
-        self.update_state(
-            state='PROGRESS',
-            meta={
+            publish_task_progress(self, {
                 'current': 73, 
                 'total': 100, 
                 'status': '📝 生成英文摘要...',
                 'stage': 'summary_en',
                 'message': '正在生成英文执行摘要'
-            }
-        )
-        summary_en = generator.generate_summary(report_result['full_content'], 'en')
-        logger.info("✅ 摘要生成完成（中英文）")
+            })
+            summary_en = generator.generate_summary(report_result['full_content'], 'en')
+            logger.info("✅ 摘要生成完成（中英文）")
         
-        # Update progress - Summaries done
-        self.update_state(
-            state='PROGRESS',
-            meta={
+            # Update progress - Summaries done
+            publish_task_progress(self, {
                 'current': 80,
                 'total': 100,
                 'status': '✅ 摘要生成完成',
                 'stage': 'summary_done',
                 'message': '中英文摘要已生成'
-            }
-        )
+            })
         
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={
+            # Update progress
+            publish_task_progress(self, {
                 'current': 85, 
                 'total': 100, 
                 'status': '📊 生成 SWOT 分析...',
                 'stage': 'swot',
                 'message': '正在生成优劣势分析'
-            }
-        )
-        logger.info("\n📊 正在生成 SWOT 分析...")
+            })
+            logger.info("\n📊 正在生成 SWOT 分析...")
         
-        # Generate SWOT analysis
-        swot = generator.generate_swot_analysis(report_result['full_content'])
-        logger.info("✅ SWOT 分析生成完成")
+            # Generate SWOT analysis
+            swot = generator.generate_swot_analysis(report_result['full_content'])
+            logger.info("✅ SWOT 分析生成完成")
         
-        # Update progress - SWOT done
-        self.update_state(
-            state='PROGRESS',
-            meta={
+            # Update progress - SWOT done
+            publish_task_progress(self, {
                 'current': 92,
                 'total': 100,
                 'status': '✅ SWOT 分析完成',
                 'stage': 'swot_done',
                 'message': 'SWOT 分析已生成'
-            }
-        )
+            })
         
         # Prepare final report data
-        # Use initial_report_id if provided, otherwise generate new timestamp
-        if initial_report_id:
-            report_id = initial_report_id
-            logger.info(f"📋 使用初始报告ID: {report_id}")
-        else:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            report_id = f"llm_report_{timestamp}"
-            logger.info(f"📋 生成新报告ID: {report_id}")
-        
         final_report = {
             'report_id': report_id,
             'city': city,
@@ -280,26 +351,15 @@ def generate_llm_report_task(self, city: str, industry: str,
         }
         
         # Save report to file
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 95,
-                'total': 100,
-                'status': '💾 保存报告文件...',
-                'stage': 'saving',
-                'message': f'正在保存报告到 {report_id}.json'
-            }
-        )
+        publish_task_progress(self, {
+            'current': 95,
+            'total': 100,
+            'status': '💾 保存报告文件...',
+            'stage': 'saving',
+            'message': f'正在保存报告到 {report_id}.json'
+        })
         
         logger.info(f"\n💾 保存报告到文件...")
-        
-        # Get app_root_path from kwargs if provided
-        app_root_path = kwargs.get('app_root_path')
-        
-        if app_root_path:
-            output_dir = Path(app_root_path) / 'data' / 'output' / 'llm_reports'
-        else:
-            output_dir = Path('data/output/llm_reports')
         output_dir.mkdir(parents=True, exist_ok=True)
         
         output_path = output_dir / f"{report_id}.json"
@@ -307,19 +367,38 @@ def generate_llm_report_task(self, city: str, industry: str,
             json.dump(final_report, f, ensure_ascii=False, indent=2)
         
         logger.info(f"✅ 报告已保存: {output_path}")
+        
+        # A retry may overwrite an earlier version of this report
+        report_analysis_cache.invalidate(output_path)
+        if checkpoints is not None:
+            checkpoints.clear()
         logger.info(f"📏 文件大小: {output_path.stat().st_size / 1024:.2f} KB")
         
         # Update progress - Saving done
-        self.update_state(
-            state='PROGRESS',
-            meta={
-                'current': 98,
-                'total': 100,
-                'status': '✅ 报告已保存',
-                'stage': 'saving_done',
-                'message': f'报告文件已保存: {output_path.stat().st_size / 1024:.2f} KB'
-            }
-        )
+        publish_task_progress(self, {
+            'current': 98,
+            'total': 100,
+            'status': '✅ 报告已保存',
+            'stage': 'saving_done',
+            'message': f'报告文件已保存: {output_path.stat().st_size / 1024:.2f} KB'
+        })
+        
+        # Optional post-completion stage: warm the analysis cache so the
+        # first report view does not pay the analysis latency. It runs as its
+        # own task on the analysis queue, so the report completes now and
+        # this llm slot is freed for the next report.
+        precompute = kwargs.get('precompute_analyses')
+        if precompute is None:
+            precompute = os.getenv('PRECOMPUTE_REPORT_ANALYSES', '1').lower() not in ('0', 'false', 'no')
+        if precompute:
+            try:
+                config_path = Path(app_root_path) / 'config.json' if app_root_path else Path('config.json')
+                precompute_report_analyses_task.delay(
+                    report_id, str(output_path), city=city, industry=industry,
+                    config_path=str(config_path)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ 无法提交报告分析预计算任务（不影响报告生成）: {e}")
         
         logger.info("="*80)
         logger.info("🎉 LLM 报告生成任务完成！")
@@ -330,37 +409,30 @@ def generate_llm_report_task(self, city: str, industry: str,
             True, city, industry, actual_service, user_id
         )
         
-        # Update progress to complete with all information
-        self.update_state(
-            state='SUCCESS',
-            meta={
-                'current': 100, 
-                'total': 100, 
-                'status': '✅ 报告生成完成！',
-                'stage': 'completed',
-                'message': '所有处理已完成，正在跳转到报告页面...',
-                'report_id': report_id,
-                'file_path': str(output_path),
-                'file_size': f"{output_path.stat().st_size / 1024:.2f} KB",
-                'city': city,
-                'industry': industry,
-                'generated_at': final_report['generated_at'],
-                'model': self.model_name,
-                'service': llm_service
-            }
-        )
-        
+        # The result is published as the task's SUCCESS snapshot (see
+        # celery_app.publish_final_progress), so it carries everything the
+        # status page shows
         return {
             'success': True,
+            'current': 100,
+            'total': 100,
+            'status': '✅ 报告生成完成！',
+            'stage': 'completed',
+            'message': '所有处理已完成，正在跳转到报告页面...',
             'report_id': report_id,
             'file_path': str(output_path),
+            'file_size': f"{output_path.stat().st_size / 1024:.2f} KB",
             'city': city,
             'industry': industry,
             'generated_at': final_report['generated_at'],
+            'model': self.model_name,
+            'service': llm_service,
             'service_used': actual_service,
             'attempted_services': attempted_services
         }
     
+    except Retry:
+        raise
     except Exception as e:
         logger.error("="*80)
         logger.error("❌ LLM 报告生成任务失败")
@@ -372,15 +444,25 @@ def generate_llm_report_task(self, city: str, industry: str,
         logger.error("完整堆栈跟踪:")
         logger.error(traceback.format_exc())
         
-        self.update_state(
-            state='FAILURE',
-            meta={
-                'exc_type': type(e).__name__,
-                'exc_message': str(e),
-                'traceback': traceback.format_exc(),
-                'status': f'任务失败: {str(e)}'
-            })
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'exc_type': type(e).__name__
         }
+
+
+@celery_app.task(name='precompute_report_analyses', ignore_result=True)
+def precompute_report_analyses_task(report_id: str, report_path: str, city: str = None,
+                                    industry: str = None, config_path: str = 'config.json'):
+    """Warm the analysis cache of a saved report (queued by generate_llm_report_task).
+
+    Failures only mean the first report view computes the analyses itself.
+    """
+    try:
+        precompute_report_analyses(
+            report_id, Path(report_path), city=city, industry=industry,
+            max_workers=int(os.getenv('PRECOMPUTE_WORKERS', '4')),
+            config_path=config_path
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ 报告分析预计算失败（不影响报告生成）: {e}")
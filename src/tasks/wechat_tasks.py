@@ -4,12 +4,22 @@ Celery tasks for fetching WeChat articles periodically
 """
 
 import logging
-from datetime import datetime
+import os
+from typing import Dict, Iterable, List
+
+from sqlalchemy import bindparam, func, insert, inspect, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from src.data.wechat_scraper import WeChatScraper
+from src.utils.fulltext_index import wechat_article_fulltext_index
 from .celery_app import celery_app  # Use existing celery_app
 
 # Avoid circular import - import db and models from their proper location
 # These imports will be resolved when the task is actually run within the app context
+def get_app():
+    from app import app
+    return app
+
 def get_db():
     from app import db
     return db
@@ -20,12 +30,170 @@ def get_WeChatArticle():
 
 logger = logging.getLogger(__name__)
 
+# Articles written per transaction by the bulk upsert
+DEFAULT_CHUNK_SIZE = int(os.getenv('WECHAT_INGEST_CHUNK_SIZE', 200))
+
+# Columns refreshed when an already stored article is fetched again
+UPDATABLE_FIELDS = ('content', 'summary', 'content_html')
+
+
+def _article_row(article_data: Dict) -> Dict:
+    """Map a scraped article to WeChatArticle column values."""
+    keywords = article_data.get('keywords')
+    industry_relevance = article_data.get('industry_relevance')
+    return {
+        'title': article_data.get('title') or '',
+        'content': article_data.get('content'),
+        'publish_date': article_data.get('publish_date'),
+        'author': article_data.get('author'),
+        'source_account': article_data.get('source_account') or '',
+        'url': article_data.get('url'),
+        'summary': article_data.get('summary'),
+        'content_html': article_data.get('content_html'),
+        'keywords': ','.join(keywords) if keywords else '',
+        'industry_relevance': ','.join(industry_relevance) if industry_relevance else ''
+    }
+
+
+def _onupdate_value(column):
+    """Python-side ``onupdate`` value of a column; ON CONFLICT DO UPDATE does not apply it."""
+    default = column.onupdate
+    if default is None:
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def has_unique_url_index(conn, table) -> bool:
+    """Whether the unique url index that ON CONFLICT(url) needs exists.
+
+    ``ensure_indexes`` cannot build it over duplicate rows; ``init_db`` and
+    the migration script remove them first with ``deduplicate_wechat_articles``.
+    """
+    inspector = inspect(conn)
+    return any(ix.get('unique') and ix['column_names'] == ['url']
+               for ix in inspector.get_indexes(table.name)) or \
+        any(uc['column_names'] == ['url'] for uc in inspector.get_unique_constraints(table.name))
+
+
+def upsert_wechat_articles(session, model, articles: Iterable[Dict],
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """Insert new articles and refresh changed ones in batched transactions.
+
+    Per chunk: one ``url IN (...)`` lookup, one executemany INSERT (with ON
+    CONFLICT on the unique url index, so a concurrent writer cannot cause a
+    duplicate) and one executemany UPDATE for rows whose content changed.
+    Without the unique index (a database whose duplicates were never
+    removed) new rows are inserted without ON CONFLICT.
+    Unchanged rows and rows without a URL are skipped. The full-text index is
+    updated for every written row, since Core statements bypass the ORM events.
+
+    Returns:
+        Counts of inserted, updated and skipped articles
+    """
+    table = model.__table__
+    chunk_size = max(1, chunk_size)
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    rows: Dict[str, Dict] = {}
+    for article_data in articles:
+        row = _article_row(article_data)
+        if not row['url']:
+            counts['skipped'] += 1
+            continue
+        if row['url'] in rows:
+            # Same article listed twice in one fetch: keep the last copy
+            counts['skipped'] += 1
+        rows[row['url']] = row
+    rows_list = list(rows.values())
+
+    if has_unique_url_index(session.connection(), table):
+        upsert_stmt = sqlite_insert(table)
+        conflict_set = {field: upsert_stmt.excluded[field] for field in UPDATABLE_FIELDS}
+        if 'updated_at' in table.c:
+            conflict_set['updated_at'] = _onupdate_value(table.c.updated_at)
+        upsert_stmt = upsert_stmt.on_conflict_do_update(
+            index_elements=[table.c.url], set_=conflict_set
+        ).returning(table.c.id, table.c.url)
+    else:
+        logger.warning("微信文章表缺少唯一 URL 索引，使用普通 INSERT（请运行迁移脚本清理重复文章）")
+        upsert_stmt = insert(table).returning(table.c.id, table.c.url)
+    update_stmt = update(table).where(table.c.id == bindparam('_id')).values(
+        {field: bindparam(field) for field in UPDATABLE_FIELDS}
+    )
+
+    for start in range(0, len(rows_list), chunk_size):
+        chunk = rows_list[start:start + chunk_size]
+        try:
+            existing = {
+                row.url: row for row in session.execute(
+                    select(table.c.id, table.c.url, *[table.c[f] for f in UPDATABLE_FIELDS])
+                    .where(table.c.url.in_([r['url'] for r in chunk]))
+                )
+            }
+
+            to_insert: List[Dict] = []
+            to_update: List[Dict] = []
+            for row in chunk:
+                current = existing.get(row['url'])
+                if current is None:
+                    to_insert.append(row)
+                elif any(getattr(current, f) != row[f] for f in UPDATABLE_FIELDS):
+                    to_update.append(dict({f: row[f] for f in UPDATABLE_FIELDS}, _id=current.id))
+                else:
+                    counts['skipped'] += 1
+
+            indexed = []
+            if to_insert:
+                ids = {r.url: r.id for r in session.execute(upsert_stmt, to_insert)}
+                indexed.extend(dict(row, id=ids[row['url']]) for row in to_insert if row['url'] in ids)
+            if to_update:
+                session.execute(update_stmt, to_update)
+                by_id = {existing[row['url']].id: row for row in chunk if row['url'] in existing}
+                indexed.extend(dict(by_id[u['_id']], id=u['_id']) for u in to_update)
+
+            conn = session.connection()
+            if indexed and wechat_article_fulltext_index.exists(conn):
+                wechat_article_fulltext_index.upsert(conn, indexed)
+
+            session.commit()
+            counts['inserted'] += len(to_insert)
+            counts['updated'] += len(to_update)
+        except Exception:
+            session.rollback()
+            raise
+
+    return counts
+
+
+def deduplicate_wechat_articles(session, model) -> int:
+    """Delete all but the newest row of each URL so the unique url index can be built.
+
+    Returns:
+        Number of rows removed
+    """
+    table = model.__table__
+    keep = select(func.max(table.c.id)).where(table.c.url.isnot(None)).group_by(table.c.url)
+    duplicates = [row.id for row in session.execute(
+        select(table.c.id).where(table.c.url.isnot(None), table.c.id.notin_(keep))
+    )]
+    if duplicates:
+        session.execute(table.delete().where(table.c.id.in_(duplicates)))
+        conn = session.connection()
+        if wechat_article_fulltext_index.exists(conn):
+            wechat_article_fulltext_index.delete(conn, duplicates)
+        session.commit()
+    return len(duplicates)
+
 
 @celery_app.task
-def fetch_wechat_articles_task():
+def fetch_wechat_articles_task(chunk_size: int = None):
     """
     Task to fetch WeChat articles from specified accounts and store in database
+
+    Args:
+        chunk_size: Articles per database transaction (default WECHAT_INGEST_CHUNK_SIZE)
     """
+    scraper = None
     try:
         logger.info("Starting WeChat articles fetch task")
 
@@ -37,50 +205,21 @@ def fetch_wechat_articles_task():
 
         logger.info(f"Retrieved {len(articles)} articles from WeChat accounts")
 
-        # Store articles in database
-        new_articles_count = 0
+        # Store articles in database in batches
         WeChatArticle = get_WeChatArticle()
         db = get_db()
+        with get_app().app_context():
+            counts = upsert_wechat_articles(db.session, WeChatArticle, articles,
+                                            chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
 
-        for article_data in articles:
-            # Check if article already exists in database (based on URL)
-            existing_article = WeChatArticle.query.filter_by(url=article_data['url']).first()
-
-            if not existing_article:
-                # Create new article record
-                new_article = WeChatArticle(
-                    title=article_data['title'],
-                    content=article_data['content'],
-                    publish_date=article_data['publish_date'],
-                    author=article_data['author'],
-                    source_account=article_data['source_account'],
-                    url=article_data['url'],
-                    summary=article_data['summary'],
-                    content_html=article_data['content_html'],
-                    keywords=','.join(article_data['keywords']) if article_data['keywords'] else '',
-                    industry_relevance=','.join(article_data['industry_relevance']) if article_data['industry_relevance'] else ''
-                )
-
-                db.session.add(new_article)
-                new_articles_count += 1
-            else:
-                # Update existing article if needed
-                existing_article.content = article_data['content']
-                existing_article.summary = article_data['summary']
-                existing_article.content_html = article_data['content_html']
-                existing_article.updated_at = datetime.utcnow()
-
-        # Commit changes to database
-        db.session.commit()
-
-        logger.info(f"Successfully stored {new_articles_count} new articles in database")
-
-        # Close scraper
-        scraper.close()
+        logger.info(f"Stored WeChat articles: {counts['inserted']} new, "
+                    f"{counts['updated']} updated, {counts['skipped']} skipped")
 
         return {
             'status': 'success',
-            'new_articles_count': new_articles_count,
+            'new_articles_count': counts['inserted'],
+            'updated_articles_count': counts['updated'],
+            'skipped_articles_count': counts['skipped'],
             'total_articles_processed': len(articles)
         }
 
@@ -89,13 +228,14 @@ def fetch_wechat_articles_task():
         import traceback
         logger.error(traceback.format_exc())
 
-        # Rollback in case of error
-        db.session.rollback()
-
         return {
             'status': 'error',
             'error': str(e)
         }
+    finally:
+        # Close scraper
+        if scraper is not None:
+            scraper.close()
 
 
 def schedule_wechat_fetching():
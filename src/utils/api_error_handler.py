@@ -1,19 +1,43 @@
 #!/usr/bin/env python3
 """
 API Error Handler for managing quota limits and connection issues
-Provides comprehensive error detection, user notifications, and fallback mechanisms
+Provides comprehensive error detection, user notifications, and fallback mechanisms.
+Each service has a circuit breaker fed by a rolling window of call outcomes and
+latencies, so requests skip a failing service instead of waiting through its
+timeouts, and fallback order follows live health
 """
 
+import os
 import re
 import logging
+import threading
 import time
-from typing import Dict, Optional, List, Tuple
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Optional, List, Tuple
 from enum import Enum
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+from src.utils.llm_rate_limiter import RateLimitTimeout
+
 logger = logging.getLogger(__name__)
 
+# Errors kept for the error summary and notification pages
+ERROR_HISTORY_SIZE = 200
+# Most recent errors counted in get_error_summary
+SUMMARY_WINDOW = 10
+# Circuit breaker settings; override with the API_CIRCUIT_* environment variables.
+# A breaker opens once at least MIN_CALLS calls in the last WINDOW seconds
+# failed, or took longer than SLOW_CALL_SECONDS, at FAILURE_RATE or more
+CIRCUIT_WINDOW_SECONDS = float(os.getenv('API_CIRCUIT_WINDOW', 60))
+CIRCUIT_MIN_CALLS = int(os.getenv('API_CIRCUIT_MIN_CALLS', 5))
+CIRCUIT_FAILURE_RATE = float(os.getenv('API_CIRCUIT_FAILURE_RATE', 0.5))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('API_CIRCUIT_SLOW_CALL_SECONDS', 300))
+# Seconds an open breaker rejects calls before letting a probe through; doubled
+# after every failed probe up to CIRCUIT_MAX_OPEN_SECONDS
+CIRCUIT_OPEN_SECONDS = float(os.getenv('API_CIRCUIT_OPEN_SECONDS', 30))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv('API_CIRCUIT_MAX_OPEN_SECONDS', 300))
+
 
 class APIErrorType(Enum):
     """Types of API errors that can occur"""
@@ -58,6 +82,254 @@ class APIQuotaInfo:
     last_request_time: Optional[datetime]
 
 
+class CircuitOpenError(Exception):
+    """Every candidate service is behind an open circuit breaker"""
+
+    def __init__(self, services: Iterable[str], retry_after: float):
+        self.services = list(services)
+        self.retry_after = int(retry_after) + 1
+        # Worded so that detect_error_type classifies it as service_unavailable
+        super().__init__(f"Service unavailable: circuit open for {', '.join(self.services)}, "
+                         f"retry after {self.retry_after} seconds")
+
+
+class ErrorHistory:
+    """Fixed-size ring buffer of API errors.
+
+    Counts of error types and services over the last ``window`` errors are
+    kept up to date on every append, so summaries cost the same however many
+    errors were seen. Supports len(), iteration, indexing and slicing like a list.
+    """
+
+    def __init__(self, capacity: int = ERROR_HISTORY_SIZE, window: int = SUMMARY_WINDOW):
+        self.capacity = capacity
+        self.window = min(window, capacity)
+        self.clear()
+
+    def clear(self):
+        self._items: List[Optional[APIError]] = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+        self.total = 0
+        self.type_counts: Counter = Counter()
+        self.service_counts: Counter = Counter()
+
+    def append(self, error: APIError):
+        # The oldest error of the summary window drops out of the counts
+        if self._size >= self.window:
+            self._count(self[self._size - self.window], -1)
+        if self._size == self.capacity:
+            self._items[self._start] = error
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._items[(self._start + self._size) % self.capacity] = error
+            self._size += 1
+        self._count(error, 1)
+        self.total += 1
+
+    def _count(self, error: APIError, delta: int):
+        for counter, key in ((self.type_counts, error.error_type.value),
+                             (self.service_counts, error.service.value)):
+            counter[key] += delta
+            if not counter[key]:
+                del counter[key]
+
+    @property
+    def recent(self) -> int:
+        """Number of errors in the summary window"""
+        return min(self._size, self.window)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._items[(self._start + i) % self.capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('error history index out of range')
+        return self._items[(self._start + index) % self.capacity]
+
+
+class CircuitState(Enum):
+    """States of a service circuit breaker"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker for one service over a rolling window of calls.
+
+    CLOSED lets every call through until the failure or slow-call rate of the
+    window reaches the threshold. OPEN rejects calls until its cooldown ends,
+    then HALF_OPEN admits a single probe: a success closes the breaker, a
+    failure opens it again for twice as long.
+    """
+
+    def __init__(self, service: str, window: float = CIRCUIT_WINDOW_SECONDS,
+                 min_calls: int = CIRCUIT_MIN_CALLS, failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 max_open_seconds: float = CIRCUIT_MAX_OPEN_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.service = service
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self._lock = threading.Lock()
+        self._reset_window()
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self._probe_at: Optional[float] = None
+
+    def _reset_window(self):
+        # (timestamp, failed, slow, latency) per call, with running totals
+        self._calls: deque = deque()
+        self._failures = 0
+        self._slow = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+
+    def _prune(self, now: float):
+        horizon = now - self.window
+        while self._calls and self._calls[0][0] < horizon:
+            _, failed, slow, latency = self._calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+            if latency is not None:
+                self._latency_sum -= latency
+                self._latency_count -= 1
+
+    def _record(self, now: float, failed: bool, latency: Optional[float]):
+        self._prune(now)
+        slow = latency is not None and latency >= self.slow_call_seconds
+        self._calls.append((now, failed, slow, latency))
+        self._failures += failed
+        self._slow += slow
+        if latency is not None:
+            self._latency_sum += latency
+            self._latency_count += 1
+
+    def _advance(self, now: float):
+        if self.state == CircuitState.OPEN and now >= self._opened_at + self._cooldown:
+            self.state = CircuitState.HALF_OPEN
+            self._probe_at = None
+
+    def _admits(self, now: float) -> bool:
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            return False
+        # A probe that never reported back within the slow-call limit is lost
+        return self._probe_at is None or now - self._probe_at >= self.slow_call_seconds
+
+    def _open(self, now: float, cooldown: float):
+        self.state = CircuitState.OPEN
+        self._opened_at = now
+        self._cooldown = cooldown
+        self._probe_at = None
+        logger.warning(f"🔌 {self.service.upper()} 熔断器打开，{cooldown:.0f} 秒内跳过该服务")
+
+    def _tripped(self) -> bool:
+        calls = len(self._calls)
+        if calls < self.min_calls:
+            return False
+        return (self._failures / calls >= self.failure_rate_threshold or
+                self._slow / calls >= self.failure_rate_threshold)
+
+    def available(self) -> bool:
+        """Whether a call would be let through now, without claiming the probe"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            return self._admits(now)
+
+    def allow_request(self) -> bool:
+        """Claim permission for one call; in HALF_OPEN only one probe gets it"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            if not self._admits(now):
+                return False
+            if self.state == CircuitState.HALF_OPEN:
+                self._probe_at = now
+            return True
+
+    def record_success(self, latency: Optional[float] = None):
+        with self._lock:
+            now = self.clock()
+            if self.state == CircuitState.HALF_OPEN:
+                # Start over so failures from before the outage do not reopen it
+                self.state = CircuitState.CLOSED
+                self._cooldown = self.open_seconds
+                self._reset_window()
+                logger.info(f"✅ {self.service.upper()} 熔断器已恢复关闭")
+            self._record(now, False, latency)
+            if self.state == CircuitState.CLOSED and self._tripped():
+                self._open(now, self.open_seconds)
+
+    def record_failure(self, latency: Optional[float] = None, trip: bool = False):
+        """Record a failed call; ``trip`` opens the breaker at once for the
+        longest cooldown (quota or credentials will not recover in seconds)"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            self._record(now, True, latency)
+            if self.state == CircuitState.HALF_OPEN:
+                self._open(now, self.max_open_seconds if trip else
+                           min(self._cooldown * 2, self.max_open_seconds))
+            elif self.state == CircuitState.CLOSED and (trip or self._tripped()):
+                self._open(now, self.max_open_seconds if trip else self.open_seconds)
+
+    def health(self) -> Optional[Tuple[int, float, float]]:
+        """(state rank, failure rate, mean latency) for ordering, or None if
+        the breaker rejects calls"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            if not self._admits(now):
+                return None
+            self._prune(now)
+            return (0 if self.state == CircuitState.CLOSED else 1,
+                    self._failures / len(self._calls) if self._calls else 0.0,
+                    self._latency_sum / self._latency_count if self._latency_count else 0.0)
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self.state != CircuitState.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._cooldown - self.clock())
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            self._prune(now)
+            calls = len(self._calls)
+            return {
+                'state': self.state.value,
+                'calls': calls,
+                'failures': self._failures,
+                'slow_calls': self._slow,
+                'failure_rate': round(self._failures / calls, 3) if calls else 0.0,
+                'avg_latency': round(self._latency_sum / self._latency_count, 2) if self._latency_count else None,
+                'retry_in': round(max(0.0, self._opened_at + self._cooldown - now), 1)
+                if self.state == CircuitState.OPEN else 0.0
+            }
+
+
 class APIErrorHandler:
     """Handles API errors with intelligent detection and user notifications"""
     
@@ -66,7 +338,6 @@ class APIErrorHandler:
         APIService.KIMI: {
             APIErrorType.QUOTA_EXCEEDED: [
                 r'quota.*exceeded',
-                r'rate.*limit.*exceeded',
                 r'insufficient.*quota',
                 r'配额.*已用完',
                 r'配额.*不足',
@@ -169,18 +440,52 @@ class APIErrorHandler:
         }
     }
     
-    def __init__(self):
+    # Errors that say the service cannot take calls now; invalid requests
+    # are the caller's fault and do not count against it
+    CIRCUIT_IGNORED_ERRORS = (APIErrorType.INVALID_REQUEST,)
+    # Errors that open the circuit at once
+    CIRCUIT_TRIP_ERRORS = (APIErrorType.QUOTA_EXCEEDED, APIErrorType.AUTHENTICATION_ERROR)
+    # Raised on our side without reaching the provider: a caller queued too
+    # long for the rate limiter, or every circuit was open
+    LOCAL_ERRORS = (RateLimitTimeout, CircuitOpenError)
+    # Per-minute budgets, which providers also word as "quota ... exceeded"
+    TRANSIENT_LIMIT_PATTERN = r'per.*(minute|second)|\brpm\b|\btpm\b'
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
         self.quota_cache: Dict[APIService, APIQuotaInfo] = {}
-        self.error_history: List[APIError] = []
+        self.error_history = ErrorHistory()
+        # Tie-break for services of equal health
         self.service_fallback_order = [APIService.KIMI, APIService.GEMINI, APIService.DOUBAO]
+        self.circuit_breakers: Dict[APIService, CircuitBreaker] = {
+            service: CircuitBreaker(service.value, clock=clock) for service in APIService
+        }
+        self._lock = threading.Lock()
         
-    def detect_error_type(self, error: Exception, service: APIService) -> APIError:
-        """Intelligently detect the type of API error"""
+    def detect_error_type(self, error: Exception, service: APIService,
+                          latency: Optional[float] = None) -> APIError:
+        """Intelligently detect the type of API error and record it against the service"""
+        with self._lock:
+            # The same exception is often reported again by each caller up the stack
+            for recorded in self.error_history[-SUMMARY_WINDOW:]:
+                if recorded.original_error is error:
+                    return recorded
+
+            api_error = self._classify(error, service)
+            self.error_history.append(api_error)
+
+        if not isinstance(error, self.LOCAL_ERRORS):
+            self.record_failure(service, api_error.error_type, latency)
+        return api_error
+
+    def _classify(self, error: Exception, service: APIService) -> APIError:
+        """Build the APIError for an exception without recording it"""
         error_message = str(error).lower()
-        error_type = APIErrorType.UNKNOWN_ERROR
+        error_type = self._classify_by_status_code(error, error_message)
         
         # Check against known patterns for the service
         service_patterns = self.ERROR_PATTERNS.get(service, {})
+        if error_type != APIErrorType.UNKNOWN_ERROR:
+            service_patterns = {}
         
         for api_error_type, patterns in service_patterns.items():
             for pattern in patterns:
@@ -190,6 +495,9 @@ class APIErrorHandler:
             if error_type != APIErrorType.UNKNOWN_ERROR:
                 break
         
+        if error_type == APIErrorType.QUOTA_EXCEEDED and re.search(self.TRANSIENT_LIMIT_PATTERN, error_message):
+            error_type = APIErrorType.RATE_LIMITED
+        
         # Additional heuristics for common error types
         if error_type == APIErrorType.UNKNOWN_ERROR:
             error_type = self._classify_error_by_heuristics(error, error_message)
@@ -198,8 +506,10 @@ class APIErrorHandler:
         user_message = self._generate_user_message(error_type, service)
         suggested_action = self._generate_suggested_action(error_type, service)
         retry_after = self._calculate_retry_after(error_type, error)
+        if isinstance(error, CircuitOpenError):
+            retry_after = error.retry_after
         
-        api_error = APIError(
+        return APIError(
             error_type=error_type,
             service=service,
             message=str(error),
@@ -209,12 +519,35 @@ class APIErrorHandler:
             suggested_action=suggested_action,
             user_friendly_message=user_message
         )
-        
-        # Store in history
-        self.error_history.append(api_error)
-        
-        return api_error
     
+    def _classify_by_status_code(self, error: Exception, error_message: str) -> APIErrorType:
+        """Classify provider errors that carry an HTTP status code.
+
+        A 429 is a rate limit unless its message is about balance or monthly
+        quota; per-minute quota messages are rate limits as well. Checked
+        before the message patterns so that a transient 429 does not read as
+        an exhausted quota and open the circuit for the longest cooldown.
+        """
+        status = getattr(error, 'status_code', None)
+        if status is None:
+            status = getattr(error, 'code', None)
+        if status is None:
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+        try:
+            status = int(status)
+        except (TypeError, ValueError):
+            return APIErrorType.UNKNOWN_ERROR
+
+        if status == 429:
+            if re.search(self.TRANSIENT_LIMIT_PATTERN, error_message) or \
+                    not re.search(r'insufficient|balance|余额|配额.*(已用完|不足)|exceeded.*current.*quota',
+                                  error_message):
+                return APIErrorType.RATE_LIMITED
+            return APIErrorType.QUOTA_EXCEEDED
+        if status in (401, 403):
+            return APIErrorType.AUTHENTICATION_ERROR
+        return APIErrorType.UNKNOWN_ERROR
+
     def _classify_error_by_heuristics(self, error: Exception, error_message: str) -> APIErrorType:
         """Classify errors using additional heuristics"""
         # Connection-related errors
@@ -302,27 +635,77 @@ class APIErrorHandler:
         
         return None
     
+    def record_success(self, service: APIService, latency: Optional[float] = None):
+        """Record a successful call and its latency in seconds"""
+        self.circuit_breakers[service].record_success(latency)
+
+    def record_failure(self, service: APIService, error_type: APIErrorType,
+                       latency: Optional[float] = None):
+        """Record a failed call; detect_error_type calls this for every new error"""
+        if error_type in self.CIRCUIT_IGNORED_ERRORS:
+            return
+        self.circuit_breakers[service].record_failure(
+            latency, trip=error_type in self.CIRCUIT_TRIP_ERRORS)
+
+    def allow_request(self, service: APIService) -> bool:
+        """Claim a call to the service; False while its circuit is open"""
+        return self.circuit_breakers[service].allow_request()
+
+    def breaker_state(self, service: APIService) -> CircuitState:
+        self.circuit_breakers[service].available()
+        return self.circuit_breakers[service].state
+
+    def order_services(self, services: Iterable[APIService],
+                       preferred: Optional[APIService] = None) -> List[APIService]:
+        """Services that currently accept calls, healthiest first.
+
+        Closed circuits come before half-open ones; among those the preferred
+        service leads, then lower failure rate, lower latency and finally
+        ``service_fallback_order``. Services whose circuit is open are left out.
+        """
+        static_rank = {service: i for i, service in enumerate(self.service_fallback_order)}
+        ranked = []
+        for position, service in enumerate(dict.fromkeys(services)):
+            health = self.circuit_breakers[service].health()
+            if health is None:
+                continue
+            state_rank, failure_rate, latency = health
+            ranked.append((state_rank, service != preferred, failure_rate, latency,
+                           static_rank.get(service, len(static_rank)), position, service))
+        return [entry[-1] for entry in sorted(ranked)]
+
+    def circuit_open_error(self, services: Iterable[APIService]) -> CircuitOpenError:
+        """The error to raise when every one of ``services`` is circuit-open"""
+        services = list(services)
+        retry_after = min((self.circuit_breakers[s].retry_in() for s in services),
+                          default=CIRCUIT_OPEN_SECONDS)
+        return CircuitOpenError([s.value for s in services], retry_after)
+
+    def get_service_health(self) -> Dict[str, Dict[str, object]]:
+        """Circuit state and rolling-window stats per service"""
+        return {service.value: breaker.snapshot() for service, breaker in self.circuit_breakers.items()}
+
+    def reset_circuit_breakers(self):
+        """Close every circuit and forget the rolling windows"""
+        self.circuit_breakers = {
+            service: CircuitBreaker(service.value, clock=breaker.clock)
+            for service, breaker in self.circuit_breakers.items()
+        }
+
     def get_fallback_service(self, failed_service: APIService, 
                            available_services: List[APIService]) -> Optional[APIService]:
-        """Get the next best available service"""
-        # Remove the failed service from fallback order
-        fallback_order = [s for s in self.service_fallback_order if s != failed_service]
-        
-        # Return the first available service
-        for service in fallback_order:
-            if service in available_services:
-                return service
-        
-        return None
+        """Get the healthiest other available service, or None if none accepts calls"""
+        candidates = self.order_services(s for s in available_services if s != failed_service)
+        return candidates[0] if candidates else None
     
     def is_quota_exceeded(self, service: APIService, error: Exception) -> bool:
         """Check if the error is specifically a quota exceeded error"""
-        api_error = self.detect_error_type(error, service)
+        api_error = self._classify(error, service)
         return api_error.error_type == APIErrorType.QUOTA_EXCEEDED
     
     def is_connection_issue(self, service: APIService, error: Exception) -> bool:
         """Check if the error is a connection-related issue"""
-        api_error = self.detect_error_type(error, service)
+        api_error = self._classify(error, service)
         connection_errors = [
             APIErrorType.CONNECTION_TIMEOUT,
             APIErrorType.CONNECTION_REFUSED,
@@ -331,36 +714,32 @@ class APIErrorHandler:
         return api_error.error_type in connection_errors
     
     def get_error_summary(self) -> Dict[str, any]:
-        """Get a summary of recent errors"""
-        if not self.error_history:
-            return {"status": "ok", "message": "No recent errors"}
-        
-        recent_errors = self.error_history[-10:]  # Last 10 errors
-        
-        error_counts = {}
-        service_counts = {}
-        
-        for error in recent_errors:
-            error_counts[error.error_type.value] = error_counts.get(error.error_type.value, 0) + 1
-            service_counts[error.service.value] = service_counts.get(error.service.value, 0) + 1
-        
-        return {
-            "status": "error_summary",
-            "total_errors": len(self.error_history),
-            "recent_errors": len(recent_errors),
-            "error_types": error_counts,
-            "affected_services": service_counts,
-            "last_error": {
-                "type": recent_errors[-1].error_type.value,
-                "service": recent_errors[-1].service.value,
-                "message": recent_errors[-1].user_friendly_message,
-                "timestamp": recent_errors[-1].timestamp.isoformat()
+        """Get a summary of the last SUMMARY_WINDOW errors from the running counts"""
+        with self._lock:
+            if not self.error_history:
+                return {"status": "ok", "message": "No recent errors"}
+            
+            last_error = self.error_history[-1]
+            return {
+                "status": "error_summary",
+                "total_errors": self.error_history.total,
+                "recent_errors": self.error_history.recent,
+                "error_types": dict(self.error_history.type_counts),
+                "affected_services": dict(self.error_history.service_counts),
+                "open_circuits": [service.value for service, breaker in self.circuit_breakers.items()
+                                  if breaker.state != CircuitState.CLOSED],
+                "last_error": {
+                    "type": last_error.error_type.value,
+                    "service": last_error.service.value,
+                    "message": last_error.user_friendly_message,
+                    "timestamp": last_error.timestamp.isoformat()
+                }
             }
-        }
     
     def clear_error_history(self):
         """Clear the error history"""
-        self.error_history.clear()
+        with self._lock:
+            self.error_history.clear()
     
     def should_retry_immediately(self, error: APIError) -> bool:
         """Determine if the error warrants immediate retry"""
@@ -387,14 +766,15 @@ class APIErrorHandler:
 api_error_handler = APIErrorHandler()
 
 
-def handle_api_error(error: Exception, service: str, context: str = "") -> APIError:
+def handle_api_error(error: Exception, service: str, context: str = "",
+                     latency: Optional[float] = None) -> APIError:
     """Convenience function to handle API errors"""
     try:
         service_enum = APIService(service.lower())
     except ValueError:
         service_enum = APIService.KIMI  # Default fallback
     
-    api_error = api_error_handler.detect_error_type(error, service_enum)
+    api_error = api_error_handler.detect_error_type(error, service_enum, latency)
     
     logger.error(f"API Error in {context}: {api_error.user_friendly_message}")
     logger.error(f"Original error: {api_error.message}")
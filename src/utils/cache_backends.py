@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存后端
+CacheManager 的可插拔存储层：进程内 LRU、Redis（共享连接池）与磁盘
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: counters are only atomic within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 后端 get 的返回值：(数据, 过期时间戳, 序列化内容或 None)
+CacheEntry = Tuple[Any, float, Optional[bytes]]
+
+
+def encode_entry(data: Any, timestamp: float, ttl: int, default_ttl: int) -> bytes:
+    """序列化缓存条目（默认 ttl 的条目沿用旧的 (data, timestamp) 格式）"""
+    payload = (data, timestamp) if ttl == default_ttl else (data, timestamp, ttl)
+    return pickle.dumps(payload)
+
+
+def decode_entry(blob: bytes, default_ttl: int) -> Tuple[Any, float]:
+    """反序列化缓存条目，返回 (数据, 过期时间戳)"""
+    payload = pickle.loads(blob)
+    ttl = payload[2] if len(payload) > 2 else default_ttl
+    return payload[0], payload[1] + ttl
+
+
+def hash_key(key: str) -> str:
+    """缓存键的 md5，用作文件名与 Redis 键"""
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def counter_value(data: Any) -> int:
+    """计数器条目的值（兼容旧的 {'count': n} 格式）"""
+    if isinstance(data, dict):
+        data = data.get('count', 0)
+    try:
+        return int(data or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class MemoryCacheBackend:
+    """进程内 LRU 缓存层，按条目数与字节数（序列化大小）限制"""
+
+    name = 'memory'
+
+    def __init__(self, max_items: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        # key -> (data, expires_at, size)
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.RLock()
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                self._remove(key)
+                self.expired += 1
+                return None
+            self.entries.move_to_end(key)
+            return entry[0], entry[1], None
+
+    def set(self, key: str, data: Any, expires_at: float, blob: bytes):
+        size = len(blob)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (data, expires_at, size)
+            self.total_bytes += size
+            while self.entries and (len(self.entries) > self.max_items
+                                    or self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def sweep_expired(self, now: float) -> int:
+        with self._lock:
+            expired = [k for k, v in self.entries.items() if v[1] <= now]
+            for key in expired:
+                self._remove(key)
+            self.expired += len(expired)
+            return len(expired)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {'items': len(self.entries), 'bytes': self.total_bytes}
+
+
+class RedisCacheBackend:
+    """Redis 缓存层，多个 worker 进程共享
+
+    过期由 Redis 的键 TTL 负责。连接失败后在 ``retry_after`` 秒内跳过该层，
+    请求直接落到后面的本地层，而不是每次都等待超时。
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, namespace: Optional[str] = None, default_ttl: int = 3600,
+                 prefix: str = 'cache:', retry_after: float = 30.0):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.key_prefix = f"{prefix}{namespace or 'default'}:"
+        self.retry_after = retry_after
+        self.evictions = 0
+        self.expired = 0
+        self.errors = 0
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.time() >= self._down_until
+
+    def _redis_key(self, key: str) -> str:
+        return self.key_prefix + hash_key(key)
+
+    def _counter_key(self, key: str) -> str:
+        return f"{self.key_prefix}counter:{hash_key(key)}"
+
+    def _failed(self, action: str, error: Exception):
+        self.errors += 1
+        self._down_until = time.time() + self.retry_after
+        logger.warning(f"Redis 缓存{action}失败，{self.retry_after:.0f}s 内使用本地缓存: {error}")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        if not self.available:
+            return None
+        try:
+            blob = self.client.get(self._redis_key(key))
+        except Exception as e:
+            self._failed('读取', e)
+            return None
+        if blob is None:
+            return None
+        data, expires_at = decode_entry(blob, self.default_ttl)
+        return data, expires_at, blob
+
+    def set(self, key: str, data: Any, expires_at: float, blob: bytes):
+        ttl_ms = int((expires_at - time.time()) * 1000)
+        if ttl_ms <= 0 or not self.available:
+            return
+        try:
+            self.client.set(self._redis_key(key), blob, px=ttl_ms)
+        except Exception as e:
+            self._failed('写入', e)
+
+    def delete(self, key: str):
+        if not self.available:
+            return
+        try:
+            self.client.delete(self._redis_key(key), self._counter_key(key))
+        except Exception as e:
+            self._failed('删除', e)
+
+    def increment(self, key: str, amount: int, ttl: int, initial: int = 0) -> Optional[int]:
+        """INCRBY 计数器并返回新值；Redis 中尚无该计数器时以 ``initial`` 起算。
+        Redis 不可用时返回 None"""
+        if not self.available:
+            return None
+        try:
+            counter_key = self._counter_key(key)
+            pipe = self.client.pipeline()
+            pipe.set(counter_key, initial, nx=True, ex=ttl)
+            pipe.incrby(counter_key, amount)
+            pipe.expire(counter_key, ttl)
+            return int(pipe.execute()[1])
+        except Exception as e:
+            self._failed('计数', e)
+            return None
+
+    def get_counter(self, key: str) -> Optional[int]:
+        """计数器的值；不存在或 Redis 不可用时返回 None"""
+        if not self.available:
+            return None
+        try:
+            value = self.client.get(self._counter_key(key))
+        except Exception as e:
+            self._failed('读取', e)
+            return None
+        return None if value is None else int(value)
+
+    def clear(self):
+        if not self.available:
+            return
+        try:
+            keys = list(self.client.scan_iter(match=self.key_prefix + '*', count=500))
+            for i in range(0, len(keys), 500):
+                self.client.delete(*keys[i:i + 500])
+        except Exception as e:
+            self._failed('清空', e)
+
+    def sweep_expired(self, now: float) -> int:
+        return 0
+
+    def info(self) -> Dict:
+        return {'available': self.available, 'errors': self.errors}
+
+
+class DiskCacheBackend:
+    """磁盘缓存层：``<md5>.cache`` 文件，按总字节数 LRU 淘汰
+
+    条目索引在启动时构建一次（stat 加每个文件的固定长度头部，不反序列化内容），
+    之后随读写维护；文件头记录条目的过期时间，重启后自定义 TTL 依然生效。
+    写入采用临时文件 + 原子重命名，读者不会读到写了一半的文件。
+    """
+
+    name = 'disk'
+    # 文件头：魔数 + 过期时间戳；没有文件头的旧文件按 mtime + default_ttl 处理
+    HEADER = struct.Struct('>4sd')
+    MAGIC = b'CEX1'
+
+    def __init__(self, cache_dir: Path, default_ttl: int = 3600,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        # cache file key -> (size, expires_at)，按最近使用排序
+        self.index: "OrderedDict[str, tuple]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.RLock()
+        self._load_index()
+
+    def _path(self, file_key: str) -> Path:
+        return self.cache_dir / f"{file_key}.cache"
+
+    def _split(self, content: bytes) -> Tuple[Optional[float], bytes]:
+        """文件内容 -> (文件头中的过期时间或 None, 序列化条目)"""
+        if content[:len(self.MAGIC)] == self.MAGIC and len(content) >= self.HEADER.size:
+            _, expires_at = self.HEADER.unpack_from(content)
+            return expires_at, content[self.HEADER.size:]
+        return None, content
+
+    def _load_index(self):
+        entries = []
+        for cache_file in self.cache_dir.glob("*.cache"):
+            try:
+                stat = cache_file.stat()
+                with open(cache_file, 'rb') as f:
+                    expires_at, _ = self._split(f.read(self.HEADER.size))
+            except OSError:
+                continue
+            if expires_at is None:
+                expires_at = stat.st_mtime + self.default_ttl
+            # 文件写入时间即最近使用时间
+            entries.append((stat.st_mtime, cache_file.stem, stat.st_size, expires_at))
+        entries.sort()
+        with self._lock:
+            self.index = OrderedDict(
+                (file_key, (size, expires_at)) for _, file_key, size, expires_at in entries
+            )
+            self.total_bytes = sum(entry[2] for entry in entries)
+
+    def _remove(self, file_key: str):
+        entry = self.index.pop(file_key, None)
+        if entry is not None:
+            self.total_bytes -= entry[0]
+        try:
+            self._path(file_key).unlink()
+        except OSError:
+            pass
+
+    def _write_atomic(self, path: Path, blob: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        file_key = hash_key(key)
+        try:
+            with open(self._path(file_key), 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                entry = self.index.pop(file_key, None)
+                if entry is not None:
+                    self.total_bytes -= entry[0]
+            return None
+
+        header_expires_at, blob = self._split(content)
+        data, expires_at = decode_entry(blob, self.default_ttl)
+        if header_expires_at is not None:
+            expires_at = header_expires_at
+        with self._lock:
+            if time.time() >= expires_at:
+                self._remove(file_key)
+                self.expired += 1
+                return None
+            if file_key in self.index:
+                self.index.move_to_end(file_key)
+            else:
+                # 其他进程写入的文件
+                self.index[file_key] = (len(content), expires_at)
+                self.total_bytes += len(content)
+        return data, expires_at, blob
+
+    def set(self, key: str, data: Any, expires_at: float, blob: bytes):
+        file_key = hash_key(key)
+        content = self.HEADER.pack(self.MAGIC, expires_at) + blob
+        self._write_atomic(self._path(file_key), content)
+        with self._lock:
+            old = self.index.pop(file_key, None)
+            if old is not None:
+                self.total_bytes -= old[0]
+            self.index[file_key] = (len(content), expires_at)
+            self.total_bytes += len(content)
+            while self.index and self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.index)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(hash_key(key))
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的计数器写锁（flock）"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.cache_dir / '.counters.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_counter(self, key: str) -> int:
+        entry = self.get(key)
+        return counter_value(entry[0]) if entry else 0
+
+    def increment(self, key: str, amount: int, ttl: int) -> int:
+        """在文件锁内读取、累加并原子写回计数器，返回新值"""
+        with self._lock, self._file_lock():
+            value = self.get_counter(key) + amount
+            now = time.time()
+            self.set(key, value, now + ttl, encode_entry(value, now, ttl, self.default_ttl))
+            return value
+
+    def clear(self):
+        with self._lock:
+            for cache_file in self.cache_dir.glob("*.cache"):
+                try:
+                    cache_file.unlink()
+                except OSError:
+                    pass
+            self.index.clear()
+            self.total_bytes = 0
+
+    def sweep_expired(self, now: float) -> int:
+        with self._lock:
+            expired = [k for k, v in self.index.items() if v[1] <= now]
+            for file_key in expired:
+                self._remove(file_key)
+            self.expired += len(expired)
+            return len(expired)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {'items': len(self.index), 'bytes': self.total_bytes,
+                    'cache_dir': str(self.cache_dir)}
+
+
+_default_redis_client = None
+_default_redis_lock = threading.Lock()
+
+
+def configure_cache_backends(redis_url: Optional[str] = None, redis_client=None,
+                             max_connections: int = 20, socket_timeout: float = 1.0):
+    """在应用启动时配置一次共享的 Redis 缓存层
+
+    之后所有未显式指定后端的 CacheManager 都会在内存层与磁盘层之间使用该
+    Redis（共用一个连接池）。不传参数则关闭 Redis 层。
+
+    Args:
+        redis_url: Redis 地址，如 redis://localhost:6379/1
+        redis_client: 已创建的客户端（例如测试中的 fakeredis），优先于 redis_url
+        max_connections: 连接池大小
+        socket_timeout: 连接与读写超时（秒）
+
+    Returns:
+        生效的 Redis 客户端，未配置时为 None
+    """
+    global _default_redis_client
+    client = redis_client
+    if client is None and redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(
+                redis_url,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+                health_check_interval=30
+            )
+        except Exception as e:
+            logger.warning(f"无法创建 Redis 缓存客户端，仅使用本地缓存: {e}")
+            client = None
+    with _default_redis_lock:
+        _default_redis_client = client
+    if client is not None:
+        logger.info("缓存后端: memory -> redis -> disk")
+    return client
+
+
+def get_default_redis_client():
+    """当前配置的共享 Redis 缓存客户端（未配置时为 None）"""
+    return _default_redis_client
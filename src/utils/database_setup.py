@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Database setup
+SQLite connection tuning (WAL, busy timeout, synchronous=NORMAL), connection
+pool sizing and index maintenance for the Flask-SQLAlchemy engine
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds a connection waits for a write lock before raising
+# "database is locked"; covers a Celery worker committing a large batch
+DEFAULT_BUSY_TIMEOUT_MS = 30000
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def busy_timeout_ms() -> int:
+    return _env_int('DB_BUSY_TIMEOUT_MS', DEFAULT_BUSY_TIMEOUT_MS)
+
+
+def default_pool_size() -> int:
+    """Connections per process: one per gunicorn thread plus one spare.
+
+    Each gunicorn worker (and each Celery child) is a separate process with
+    its own pool, so the pool only has to cover the threads of one process.
+    ``DB_POOL_SIZE`` overrides the derived value.
+    """
+    threads = _env_int('GUNICORN_THREADS', 4)
+    return _env_int('DB_POOL_SIZE', max(1, threads) + 1)
+
+
+def sqlite_engine_options(database_uri: str, pool_size: Optional[int] = None) -> Dict:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for the given database URI.
+
+    Non-SQLite URIs only get the pool settings.
+    """
+    pool_size = pool_size or default_pool_size()
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': pool_size,
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+    }
+    if database_uri.startswith('sqlite'):
+        if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+            # In-memory databases live in one connection; keep the default pool
+            return {}
+        options['connect_args'] = {
+            'timeout': busy_timeout_ms() / 1000,
+            'check_same_thread': False,
+        }
+    return options
+
+
+def install_sqlite_pragmas(engine: Engine, synchronous: str = 'NORMAL'):
+    """Apply the connection PRAGMAs to every new SQLite connection of ``engine``.
+
+    WAL lets readers proceed while a writer commits, so the dashboard no longer
+    blocks on the Celery worker; synchronous=NORMAL is durable under WAL except
+    for the last transactions before a power loss.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if engine.url.database not in (None, '', ':memory:'):
+                cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms()}')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        finally:
+            cursor.close()
+
+    # Pooled connections must not be shared with forked children (Celery
+    # prefork, gunicorn preload); the child opens its own connections
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def configure_database(app, db):
+    """Install the SQLite tuning on the app's engine (call once after ``SQLAlchemy(app)``)."""
+    with app.app_context():
+        install_sqlite_pragmas(db.engine)
+    logger.info(f"数据库连接已配置: {app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}")
+
+
+def ensure_columns(db) -> List[str]:
+    """Add nullable columns declared on the models but missing from existing tables.
+
+    Only covers the simple case SQLite supports in place (``ALTER TABLE ...
+    ADD COLUMN`` without constraints); must run inside an app context.
+
+    Returns:
+        ``table.column`` names that were added
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing or not col.nullable or col.primary_key:
+                continue
+            col_type = col.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}'))
+            added.append(f"{table.name}.{col.name}")
+            logger.info(f"添加字段 {table.name}.{col.name} ({col_type})")
+    return added
+
+
+def ensure_indexes(db, analyze: bool = True) -> List[str]:
+    """Create indexes declared on the models but missing from the database.
+
+    ``db.create_all()`` only creates missing tables, so indexes added to an
+    existing table have to be created here. Must run inside an app context.
+
+    Returns:
+        Names of the indexes that were created
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError as e:
+                # A unique index over existing duplicates; the migration script
+                # removes them before creating the index
+                logger.warning(f"无法创建唯一索引 {index.name}（存在重复数据，请运行迁移脚本）: {e}")
+                continue
+            created.append(index.name)
+            logger.info(f"创建索引 {index.name} ON {table.name}")
+
+    if analyze and created and engine.dialect.name == 'sqlite':
+        # Refresh planner statistics so the new indexes are picked up
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+    return created
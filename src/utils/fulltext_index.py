@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Full-text search index
+SQLite FTS5 tables over policy and WeChat article text, tokenized with jieba at
+index time and kept in sync with the ORM models through flush events
+"""
+
+import html
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import jieba
+from sqlalchemy import Float, Integer, column, event, inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Inserted between jieba tokens so FTS5's unicode61 tokenizer splits Chinese
+# words apart. It is invisible and stripped from highlights, so snippets read
+# exactly like the source text.
+TOKEN_SEPARATOR = '\u200b'
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# Private-use markers FTS5 wraps around hits; replaced by the tags above after
+# the snippet text has been HTML-escaped
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+
+_FTS_SPECIAL = re.compile(r'["*^():{}+\-]')
+_CJK_WORD = re.compile(r'[\u4e00-\u9fff]{3,}')
+# Chinese runs, or runs of other letters and digits
+_GRAM_RUN = re.compile(r'[\u4e00-\u9fff]+|[^\W_\u4e00-\u9fff]+')
+
+# Hidden FTS column with overlapping character bigrams of all indexed columns.
+# Word tokens give ranking and highlights; the bigrams make any Chinese
+# substring match wherever jieba put the word boundaries, like a LIKE filter.
+GRAMS_COLUMN = 'grams'
+GRAMS_WEIGHT = 0.5
+
+
+def tokenize(value: str) -> List[str]:
+    """Jieba tokens with long Chinese words split into their dictionary sub-words.
+
+    Like ``jieba.cut_for_search``, but the sub-words tile the word instead of
+    overlapping it, so joining the tokens gives back the original text. This
+    lets a query for "智能" find text containing "人工智能" (人工 智能), while
+    "人工智能" itself still matches as the phrase of its sub-words.
+    """
+    tokens = []
+    for word in jieba.cut(value):
+        if not _CJK_WORD.fullmatch(word):
+            tokens.append(word)
+            continue
+        i = 0
+        while i < len(word):
+            for size in (2, 3, 1):
+                piece = word[i:i + size]
+                if size == 1 or (i + size <= len(word) and piece != word and jieba.get_FREQ(piece)):
+                    break
+            tokens.append(piece)
+            i += len(piece)
+    return tokens
+
+
+def segment(value: Optional[str]) -> str:
+    """Segment text for indexing, keeping every original character."""
+    if not value:
+        return ''
+    return TOKEN_SEPARATOR.join(tokenize(str(value)))
+
+
+def _gram_runs(value: str) -> List[Tuple[bool, str]]:
+    """(is Chinese, run) pairs of the characters ``grams`` indexes."""
+    return [('\u4e00' <= run[0] <= '\u9fff', run) for run in _GRAM_RUN.findall(value)]
+
+
+def grams(*values: Optional[str]) -> str:
+    """Bigram text for the hidden column.
+
+    Each Chinese run becomes its overlapping bigrams followed by its last
+    character, so a query run of any length is a phrase of indexed tokens;
+    other words are kept whole.
+    """
+    tokens = []
+    for value in values:
+        for is_cjk, run in _gram_runs(str(value or '')):
+            if is_cjk:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                tokens.append(run[-1])
+            else:
+                tokens.append(run)
+    return ' '.join(tokens)
+
+
+def _gram_phrase(term: str) -> str:
+    """``grams`` column phrase matching ``term`` anywhere in the text."""
+    tokens = []
+    runs = _gram_runs(term)
+    for is_cjk, run in runs:
+        if is_cjk and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    if not tokens:
+        return ''
+    phrase = '"' + ' '.join(tokens) + '"'
+    # A trailing single character may be the start of an indexed bigram
+    if runs[-1][0] and len(runs[-1][1]) == 1:
+        phrase += ' *'
+    return f"{GRAMS_COLUMN} : {phrase}"
+
+
+def render_snippet(value: Optional[str]) -> str:
+    """HTML-safe snippet with <mark> around hits and the token separators removed."""
+    escaped = html.escape((value or '').replace(TOKEN_SEPARATOR, ''))
+    return escaped.replace(_MARK_START, HIGHLIGHT_START).replace(_MARK_END, HIGHLIGHT_END)
+
+
+def build_match_query(query: str, any_term: bool = False) -> str:
+    """Turn user input into an FTS5 MATCH expression.
+
+    Every whitespace-separated term becomes a phrase of its ``tokenize``
+    tokens, so "人工智能" matches the indexed tokens 人工 智能 in sequence, OR
+    the phrase of its bigrams in the hidden ``grams`` column, so "网联汽车"
+    still matches text segmented as 智能|网|联|汽车. Terms are ANDed, or ORed
+    when ``any_term`` is set. FTS operators in the input are treated as plain text.
+    """
+    phrases = []
+    for term in str(query or '').split():
+        term = _FTS_SPECIAL.sub(' ', term)
+        tokens = [t.strip() for t in tokenize(term)]
+        tokens = [t for t in tokens if t]
+        if tokens:
+            gram_phrase = _gram_phrase(term)
+            words = '"' + ' '.join(tokens) + '"'
+            phrases.append(f"({words} OR {gram_phrase})" if gram_phrase else words)
+    return (' OR ' if any_term else ' AND ').join(phrases)
+
+
+class FullTextIndex:
+    """FTS5 index over some text columns of one table, keyed by the row id.
+
+    The FTS table stores the segmented text (needed for highlights) plus the
+    hidden ``grams`` column, with its rowid equal to the source row's primary key.
+    """
+
+    def __init__(self, name: str, source_table: str, columns: Sequence[str],
+                 weights: Optional[Sequence[float]] = None):
+        self.name = name
+        self.source_table = source_table
+        self.columns = list(columns)
+        self.weights = list(weights or [1.0] * len(self.columns))
+        # Databases (by URL) known to have the FTS table
+        self._known = set()
+
+    # ---- schema ----
+    def exists(self, conn) -> bool:
+        url = str(conn.engine.url)
+        if url in self._known:
+            return True
+        row = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.name}
+        ).first()
+        if row is not None:
+            self._known.add(url)
+        return row is not None
+
+    @property
+    def _fts_columns(self) -> List[str]:
+        return self.columns + [GRAMS_COLUMN]
+
+    @property
+    def _bm25_weights(self) -> str:
+        return ', '.join(str(w) for w in self.weights + [GRAMS_WEIGHT])
+
+    def create(self, conn) -> bool:
+        """Create the FTS table and backfill it; returns False if it already existed.
+
+        A table with an outdated column layout is dropped and rebuilt.
+        """
+        if self.exists(conn):
+            existing = [row[1] for row in conn.execute(text(f"PRAGMA table_info({self.name})"))]
+            if existing == self._fts_columns:
+                return False
+            logger.info(f"全文索引 {self.name} 结构已变更，重建索引")
+            conn.execute(text(f"DROP TABLE {self.name}"))
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {self.name} USING fts5("
+            f"{', '.join(self._fts_columns)}, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        self._known.add(str(conn.engine.url))
+        count = self.rebuild(conn)
+        logger.info(f"创建全文索引 {self.name}，已索引 {count} 行")
+        return True
+
+    def rebuild(self, conn, batch_size: int = 500) -> int:
+        """Re-index every row of the source table."""
+        conn.execute(text(f"DELETE FROM {self.name}"))
+        rows = conn.execute(text(
+            f"SELECT id, {', '.join(self.columns)} FROM {self.source_table}"
+        )).mappings().all()
+        for i in range(0, len(rows), batch_size):
+            self._insert_many(conn, rows[i:i + batch_size])
+        return len(rows)
+
+    # ---- maintenance ----
+    def _insert_many(self, conn, rows: Iterable[Dict]):
+        params = [
+            dict({'rowid': row['id'], GRAMS_COLUMN: grams(*(row.get(c) for c in self.columns))},
+                 **{c: segment(row.get(c)) for c in self.columns})
+            for row in rows
+        ]
+        if params:
+            conn.execute(text(
+                f"INSERT INTO {self.name} (rowid, {', '.join(self._fts_columns)}) "
+                f"VALUES (:rowid, {', '.join(':' + c for c in self._fts_columns)})"
+            ), params)
+
+    def upsert(self, conn, rows: Iterable[Dict]):
+        """(Re)index rows given as dicts with ``id`` and the indexed columns."""
+        rows = list(rows)
+        if not rows:
+            return
+        self.delete(conn, [row['id'] for row in rows])
+        self._insert_many(conn, rows)
+
+    def delete(self, conn, ids: Iterable[int]):
+        params = [{'rowid': rowid} for rowid in ids]
+        if params:
+            conn.execute(text(f"DELETE FROM {self.name} WHERE rowid = :rowid"), params)
+
+    def watch(self, model):
+        """Keep the index in sync with ORM inserts, updates and deletes of ``model``.
+
+        Updates only re-index when one of the indexed columns changed. Rows
+        written with Core statements (bulk inserts) must call ``upsert`` themselves.
+        """
+        columns = self.columns
+
+        def _row(target) -> Dict:
+            return dict({'id': target.id}, **{c: getattr(target, c) for c in columns})
+
+        def _reindex(mapper, connection, target):
+            if self.exists(connection):
+                self.upsert(connection, [_row(target)])
+
+        def _after_update(mapper, connection, target):
+            state = inspect(target)
+            if any(state.attrs[c].history.has_changes() for c in columns):
+                _reindex(mapper, connection, target)
+
+        def _after_delete(mapper, connection, target):
+            if self.exists(connection):
+                self.delete(connection, [target.id])
+
+        event.listen(model, 'after_insert', _reindex)
+        event.listen(model, 'after_update', _after_update)
+        event.listen(model, 'after_delete', _after_delete)
+
+    # ---- queries ----
+    def match_subquery(self, match: str):
+        """Subquery of ``rowid`` and ``rank`` (lower is better) for a MATCH expression.
+
+        Join it to the source model to filter, count and order hits in SQL.
+        """
+        weights = self._bm25_weights
+        return text(
+            f"SELECT rowid AS rowid, bm25({self.name}, {weights}) AS rank "
+            f"FROM {self.name} WHERE {self.name} MATCH :match"
+        ).bindparams(match=match).columns(
+            column('rowid', Integer), column('rank', Float)
+        ).subquery(f"{self.name}_hits")
+
+    def highlights(self, conn, match: str, ids: Sequence[int],
+                   snippet_tokens: int = 24) -> Dict[int, Dict[str, str]]:
+        """Highlighted snippets per column for the given hit ids.
+
+        Returns:
+            {id: {column: snippet}}, only for columns that contain a match
+        """
+        if not ids or not match:
+            return {}
+        selects = ', '.join(
+            f"snippet({self.name}, {i}, :start, :end, '…', {snippet_tokens})"
+            for i in range(len(self.columns))
+        )
+        id_params = {f"id{i}": rowid for i, rowid in enumerate(ids)}
+        rows = conn.execute(text(
+            f"SELECT rowid, {selects} FROM {self.name} "
+            f"WHERE {self.name} MATCH :match AND rowid IN ({', '.join(':' + k for k in id_params)})"
+        ), dict(id_params, match=match, start=_MARK_START, end=_MARK_END)).fetchall()
+
+        result = {}
+        for row in rows:
+            snippets = {}
+            for column_name, value in zip(self.columns, row[1:]):
+                if value and _MARK_START in value:
+                    snippets[column_name] = render_snippet(value)
+            result[row[0]] = snippets
+        return result
+
+    def search(self, conn, query: str, limit: int = 20, offset: int = 0,
+               any_term: bool = False) -> List[Dict]:
+        """Ranked hits for user input, with highlights.
+
+        Returns:
+            List of {'id', 'score', 'highlights'} ordered by relevance
+        """
+        match = build_match_query(query, any_term=any_term)
+        if not match:
+            return []
+        weights = self._bm25_weights
+        rows = conn.execute(text(
+            f"SELECT rowid, bm25({self.name}, {weights}) AS rank FROM {self.name} "
+            f"WHERE {self.name} MATCH :match ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), {'match': match, 'limit': limit, 'offset': offset}).fetchall()
+        highlights = self.highlights(conn, match, [row[0] for row in rows])
+        return [
+            {'id': row[0], 'score': round(-row[1], 6), 'highlights': highlights.get(row[0], {})}
+            for row in rows
+        ]
+
+
+policy_fulltext_index = FullTextIndex(
+    'policy_analysis_fts', 'policy_analysis',
+    ['title', 'content_summary', 'content'], weights=[5.0, 3.0, 1.0]
+)
+
+wechat_article_fulltext_index = FullTextIndex(
+    'wechat_article_fts', 'we_chat_article',
+    ['title', 'content', 'industry_relevance'], weights=[5.0, 1.0, 3.0]
+)
+
+FULLTEXT_INDEXES = (policy_fulltext_index, wechat_article_fulltext_index)
+
+
+def fts5_available(conn) -> bool:
+    try:
+        return conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar() == 1
+    except Exception:
+        return False
+
+
+def ensure_fulltext_indexes(db) -> List[str]:
+    """Create (and backfill) missing FTS tables; must run inside an app context.
+
+    Returns:
+        Names of the FTS tables that were created
+    """
+    created = []
+    with db.engine.begin() as conn:
+        if conn.dialect.name != 'sqlite' or not fts5_available(conn):
+            logger.warning("SQLite FTS5 不可用，全文检索回退为 LIKE 查询")
+            return created
+        for index in FULLTEXT_INDEXES:
+            if index.create(conn):
+                created.append(index.name)
+    return created
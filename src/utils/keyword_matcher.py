@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Multi-keyword matcher based on the Aho-Corasick automaton
+Finds every occurrence of every keyword of a dictionary in one pass over the text
+"""
+
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """Compiled Aho-Corasick automaton over a fixed keyword dictionary.
+
+    All scanning methods walk the text exactly once regardless of how many
+    keywords the dictionary holds. Matching is case-sensitive, like ``in``.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """Build the automaton.
+
+        Args:
+            keywords: Keywords to match; empty strings and duplicates are ignored
+        """
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(kw for kw in keywords if kw))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        self._build()
+
+    def _build(self):
+        """Build the trie, failure links and merged output sets."""
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (keyword,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield ``(start, keyword)`` for every (possibly overlapping) hit, in end-position order."""
+        if not text or not self.keywords:
+            return
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                yield index - len(keyword) + 1, keyword
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Return all overlapping hits sorted by start position."""
+        return sorted(self.iter_matches(text), key=lambda hit: (hit[0], -len(hit[1])))
+
+    def positions(self, text: str) -> Dict[str, List[int]]:
+        """Map each keyword found to the ascending start positions of all its hits."""
+        result: Dict[str, List[int]] = {}
+        for start, keyword in self.iter_matches(text):
+            result.setdefault(keyword, []).append(start)
+        for starts in result.values():
+            starts.sort()
+        return result
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count non-overlapping hits per keyword, matching ``str.count`` semantics.
+
+        Keywords that do not occur are omitted from the result.
+        """
+        counts: Dict[str, int] = {}
+        last_end: Dict[str, int] = {}
+        for start, keyword in self.iter_matches(text):
+            # Hits of one keyword arrive in ascending order, so a greedy
+            # left-to-right pick reproduces str.count exactly
+            if start >= last_end.get(keyword, 0):
+                counts[keyword] = counts.get(keyword, 0) + 1
+                last_end[keyword] = start + len(keyword)
+        return counts
+
+    def present(self, text: str) -> Set[str]:
+        """Return the set of keywords that occur at least once."""
+        return {keyword for _, keyword in self.iter_matches(text)}
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+
+@lru_cache(maxsize=128)
+def _compile(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    logger.debug(f"Compiling keyword matcher over {len(keywords)} keywords")
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Return a cached matcher for a keyword dictionary.
+
+    Matchers are compiled once per distinct keyword tuple and shared by all
+    callers, so analyzers can call this on every request without rebuilding.
+    """
+    return _compile(tuple(keywords))
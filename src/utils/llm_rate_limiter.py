@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+LLM rate limiter
+Requests-per-minute and tokens-per-minute token buckets plus a concurrency
+cap for every LLM service and API key. With Redis configured the budgets are
+shared by all web and Celery worker processes; otherwise, or while Redis is
+unreachable, each process keeps its own. Callers are admitted in arrival
+order, so a burst of reports queues up instead of tripping provider 429s
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Budgets per service; override with LLM_<SERVICE>_RPM, LLM_<SERVICE>_TPM and
+# LLM_<SERVICE>_CONCURRENCY. 0 disables a limit.
+DEFAULT_LIMITS = {
+    'kimi': {'rpm': 60, 'tpm': 128000, 'concurrency': 3},
+    'gemini': {'rpm': 60, 'tpm': 1000000, 'concurrency': 2},
+    'doubao': {'rpm': 60, 'tpm': 0, 'concurrency': 2},
+}
+# A bucket holds this many seconds of its per-minute budget, which bounds
+# the burst when many callers arrive at once
+BURST_SECONDS = 10
+# Completion tokens reserved per call before the real usage is known
+COMPLETION_TOKEN_ESTIMATE = 2000
+# Seconds a concurrency slot is held by a caller that never released it
+# (e.g. a killed worker)
+LEASE_TTL = 10 * 60
+# Seconds a queued caller stays in line without polling before it is dropped
+WAITER_TTL = 15
+# Seconds a caller waits for a slot before giving up
+DEFAULT_ACQUIRE_TIMEOUT = float(os.getenv('LLM_RATE_LIMIT_TIMEOUT', 300))
+# Seconds a Redis-backed limiter is bypassed for the local one after an error
+REDIS_RETRY_SECONDS = 30
+
+
+class RateLimitTimeout(Exception):
+    """No slot became free within the caller's timeout."""
+
+
+@dataclass(frozen=True)
+class LLMLimits:
+    rpm: int
+    tpm: int
+    concurrency: int
+
+    @property
+    def rpm_capacity(self) -> float:
+        return max(1.0, self.rpm * BURST_SECONDS / 60.0)
+
+    @property
+    def tpm_capacity(self) -> float:
+        return max(1.0, self.tpm * BURST_SECONDS / 60.0)
+
+    @property
+    def unlimited(self) -> bool:
+        return not (self.rpm or self.tpm or self.concurrency)
+
+
+def estimate_tokens(prompt: Union[str, Iterable, None]) -> int:
+    """Rough token count of a prompt or message list: one token per CJK
+    character, one per four other characters."""
+    if prompt is None:
+        return 0
+    if not isinstance(prompt, str):
+        prompt = ''.join(m.get('content') or '' if isinstance(m, dict) else str(m) for m in prompt)
+    cjk = sum(1 for ch in prompt if ch >= '⺀')
+    return cjk + (len(prompt) - cjk) // 4 + 1
+
+
+def _refill(tokens: Optional[float], updated: float, per_minute: int, capacity: float, now: float) -> float:
+    if tokens is None:
+        return capacity
+    return min(capacity, tokens + max(0.0, now - updated) * per_minute / 60.0)
+
+
+def _admit(limits: LLMLimits, state: Dict[str, float], in_flight: int, cost: float,
+           now: float, poll: float) -> Tuple[float, Optional[Dict[str, float]]]:
+    """Admission decision for the caller at the head of the queue.
+
+    Returns:
+        ``(0, new_state)`` when admitted, else ``(seconds to wait, None)``
+    """
+    blocked_until = state.get('blocked_until', 0.0)
+    if blocked_until > now:
+        return blocked_until - now, None
+    if limits.concurrency and in_flight >= limits.concurrency:
+        return poll, None
+
+    updated = state.get('updated', now)
+    rpm = _refill(state.get('rpm_tokens'), updated, limits.rpm, limits.rpm_capacity, now)
+    tpm = _refill(state.get('tpm_tokens'), updated, limits.tpm, limits.tpm_capacity, now)
+    waits = []
+    if limits.rpm and rpm < 1:
+        waits.append((1 - rpm) * 60.0 / limits.rpm)
+    if limits.tpm and tpm < cost:
+        waits.append((cost - tpm) * 60.0 / limits.tpm)
+    if waits:
+        return max(max(waits), 0.001), None
+    return 0.0, {'rpm_tokens': rpm - 1, 'tpm_tokens': tpm - cost, 'updated': now,
+                 'blocked_until': blocked_until}
+
+
+def _refund(limits: LLMLimits, state: Dict[str, float], tokens: float, now: float) -> Dict[str, float]:
+    """State after returning (or, when negative, charging) TPM tokens."""
+    updated = state.get('updated', now)
+    return dict(
+        state,
+        rpm_tokens=_refill(state.get('rpm_tokens'), updated, limits.rpm, limits.rpm_capacity, now),
+        tpm_tokens=min(limits.tpm_capacity,
+                       _refill(state.get('tpm_tokens'), updated, limits.tpm, limits.tpm_capacity, now) + tokens),
+        updated=now
+    )
+
+
+def _usage(limits: LLMLimits, state: Dict[str, float], in_flight: int, waiting: int, now: float) -> Dict:
+    updated = state.get('updated', now)
+    rpm = _refill(state.get('rpm_tokens'), updated, limits.rpm, limits.rpm_capacity, now)
+    tpm = _refill(state.get('tpm_tokens'), updated, limits.tpm, limits.tpm_capacity, now)
+
+    def used(available, capacity):
+        return round(min(1.0, max(0.0, 1 - available / capacity)), 3)
+
+    return {
+        'limits': {'rpm': limits.rpm, 'tpm': limits.tpm, 'concurrency': limits.concurrency},
+        'in_flight': in_flight,
+        'waiting': waiting,
+        'rpm_available': round(rpm, 2) if limits.rpm else None,
+        'tpm_available': round(tpm) if limits.tpm else None,
+        'blocked_for': round(max(0.0, state.get('blocked_until', 0.0) - now), 1),
+        'utilization': {
+            'concurrency': round(in_flight / limits.concurrency, 3) if limits.concurrency else None,
+            'rpm': used(rpm, limits.rpm_capacity) if limits.rpm else None,
+            'tpm': used(tpm, limits.tpm_capacity) if limits.tpm else None,
+        }
+    }
+
+
+class MemoryLimiterBackend:
+    """Buckets in this process; waiters sleep on a condition variable."""
+
+    poll_interval = 0.05
+    # Waiters refresh their place in line at least this often
+    max_sleep = WAITER_TTL / 3
+
+    def __init__(self):
+        # bucket -> {'state': {...}, 'leases': {lease: expires_at}, 'queue': {waiter: last_seen}}
+        self._buckets: Dict[str, Dict] = {}
+        self._changed = threading.Condition()
+
+    def _bucket(self, bucket: str, now: float) -> Dict:
+        entry = self._buckets.setdefault(bucket, {'state': {}, 'leases': {}, 'queue': OrderedDict()})
+        for lease, expires in list(entry['leases'].items()):
+            if expires <= now:
+                del entry['leases'][lease]
+        for waiter, seen in list(entry['queue'].items()):
+            if seen < now - WAITER_TTL:
+                del entry['queue'][waiter]
+        return entry
+
+    def try_acquire(self, bucket: str, waiter: str, limits: LLMLimits, cost: float,
+                    now: float) -> Tuple[Optional[str], float]:
+        with self._changed:
+            entry = self._bucket(bucket, now)
+            entry['queue'][waiter] = now
+            if next(iter(entry['queue'])) != waiter:
+                return None, self.poll_interval
+            wait, state = _admit(limits, entry['state'], len(entry['leases']), cost, now, self.poll_interval)
+            if state is None:
+                return None, wait
+            entry['state'] = state
+            del entry['queue'][waiter]
+            lease = uuid.uuid4().hex
+            entry['leases'][lease] = now + LEASE_TTL
+            # The next waiter is now at the head
+            self._changed.notify_all()
+            return lease, 0.0
+
+    def wait(self, seconds: float):
+        with self._changed:
+            self._changed.wait(min(seconds, self.max_sleep))
+
+    def leave(self, bucket: str, waiter: str):
+        with self._changed:
+            self._buckets.get(bucket, {}).get('queue', {}).pop(waiter, None)
+            self._changed.notify_all()
+
+    def release(self, bucket: str, lease: str, limits: LLMLimits, refund: float, now: float):
+        with self._changed:
+            entry = self._bucket(bucket, now)
+            entry['leases'].pop(lease, None)
+            if refund:
+                entry['state'] = _refund(limits, entry['state'], refund, now)
+            self._changed.notify_all()
+
+    def backoff(self, bucket: str, until: float):
+        with self._changed:
+            state = self._bucket(bucket, time.time())['state']
+            state['blocked_until'] = max(state.get('blocked_until', 0.0), until)
+
+    def buckets(self) -> List[str]:
+        with self._changed:
+            return list(self._buckets)
+
+    def usage(self, bucket: str, limits: LLMLimits, now: float) -> Dict:
+        with self._changed:
+            entry = self._bucket(bucket, now)
+            return _usage(limits, entry['state'], len(entry['leases']), len(entry['queue']), now)
+
+
+class RedisLimiterBackend:
+    """Buckets in Redis, updated with WATCH/MULTI transactions.
+
+    Layout per bucket (``{service}:{key id}``)::
+
+        llm_limit:{bucket}:state    hash of token counts, last refill, backoff
+        llm_limit:{bucket}:leases   zset of concurrency slots by expiry
+        llm_limit:{bucket}:queue    zset of waiting callers by ticket
+        llm_limit:{bucket}:seen     hash of each waiter's last poll
+        llm_limit:{bucket}:ticket   ticket counter
+        llm_limit:buckets           set of bucket names
+    """
+
+    poll_interval = 0.1
+    # Waiters refresh their place in line at least this often
+    max_sleep = WAITER_TTL / 3
+    KEY_TTL = 24 * 3600
+
+    def __init__(self, client, prefix: str = 'llm_limit:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, bucket: str, name: str) -> str:
+        return f"{self.prefix}{bucket}:{name}"
+
+    @staticmethod
+    def _state(raw: Dict) -> Dict[str, float]:
+        return {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+
+    def _is_head(self, bucket: str, waiter: str, now: float) -> bool:
+        queue, seen = self._key(bucket, 'queue'), self._key(bucket, 'seen')
+        while True:
+            head = self.client.zrange(queue, 0, 0)
+            if not head:
+                return False
+            head = head[0].decode() if isinstance(head[0], bytes) else head[0]
+            if head == waiter:
+                return True
+            last_seen = self.client.hget(seen, head)
+            if last_seen is not None and float(last_seen) >= now - WAITER_TTL:
+                return False
+            # The head stopped polling (its process died): drop it
+            self.client.zrem(queue, head)
+            self.client.hdel(seen, head)
+
+    def try_acquire(self, bucket: str, waiter: str, limits: LLMLimits, cost: float,
+                    now: float) -> Tuple[Optional[str], float]:
+        import redis
+
+        queue, seen = self._key(bucket, 'queue'), self._key(bucket, 'seen')
+        state_key, leases = self._key(bucket, 'state'), self._key(bucket, 'leases')
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(seen, waiter, now)
+        pipe.zscore(queue, waiter)
+        _, ticket = pipe.execute()
+        if ticket is None:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.sadd(f"{self.prefix}buckets", bucket)
+            pipe.incr(self._key(bucket, 'ticket'))
+            ticket = pipe.execute()[1]
+            self.client.zadd(queue, {waiter: ticket}, nx=True)
+            for name in ('queue', 'seen', 'ticket'):
+                self.client.expire(self._key(bucket, name), self.KEY_TTL)
+        if not self._is_head(bucket, waiter, now):
+            return None, self.poll_interval
+
+        with self.client.pipeline() as pipe:
+            for _ in range(5):
+                try:
+                    pipe.watch(state_key, leases)
+                    state = self._state(pipe.hgetall(state_key))
+                    in_flight = pipe.zcount(leases, f"({now}", '+inf')
+                    wait, new_state = _admit(limits, state, in_flight, cost, now, self.poll_interval)
+                    if new_state is None:
+                        pipe.reset()
+                        return None, wait
+                    lease = uuid.uuid4().hex
+                    pipe.multi()
+                    pipe.hset(state_key, mapping=new_state)
+                    pipe.zremrangebyscore(leases, '-inf', now)
+                    pipe.zadd(leases, {lease: now + LEASE_TTL})
+                    pipe.zrem(queue, waiter)
+                    pipe.hdel(seen, waiter)
+                    pipe.expire(state_key, self.KEY_TTL)
+                    pipe.expire(leases, self.KEY_TTL)
+                    pipe.execute()
+                    return lease, 0.0
+                except redis.WatchError:
+                    continue
+        return None, self.poll_interval
+
+    def wait(self, seconds: float):
+        time.sleep(min(seconds, self.max_sleep))
+
+    def leave(self, bucket: str, waiter: str):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrem(self._key(bucket, 'queue'), waiter)
+        pipe.hdel(self._key(bucket, 'seen'), waiter)
+        pipe.execute()
+
+    def _update_state(self, bucket: str, change):
+        import redis
+
+        state_key = self._key(bucket, 'state')
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(state_key)
+                    state = change(self._state(pipe.hgetall(state_key)))
+                    pipe.multi()
+                    pipe.hset(state_key, mapping=state)
+                    pipe.expire(state_key, self.KEY_TTL)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+
+    def release(self, bucket: str, lease: str, limits: LLMLimits, refund: float, now: float):
+        self.client.zrem(self._key(bucket, 'leases'), lease)
+        if refund:
+            self._update_state(bucket, lambda state: _refund(limits, state, refund, now))
+
+    def backoff(self, bucket: str, until: float):
+        self._update_state(bucket, lambda state: dict(
+            state, blocked_until=max(state.get('blocked_until', 0.0), until)))
+
+    def buckets(self) -> List[str]:
+        return sorted(b.decode() if isinstance(b, bytes) else b
+                      for b in self.client.smembers(f"{self.prefix}buckets"))
+
+    def usage(self, bucket: str, limits: LLMLimits, now: float) -> Dict:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._key(bucket, 'state'))
+        pipe.zcount(self._key(bucket, 'leases'), f"({now}", '+inf')
+        pipe.zcard(self._key(bucket, 'queue'))
+        state, in_flight, waiting = pipe.execute()
+        return _usage(limits, self._state(state), in_flight, waiting, now)
+
+
+class RateLimitLease:
+    """A granted call. Report the real token usage with ``settle`` so the
+    TPM bucket is corrected when the lease is released."""
+
+    def __init__(self, service: str, bucket: str, reserved: float, limits: LLMLimits,
+                 backend=None, lease_id: Optional[str] = None, waited: float = 0.0):
+        self.service = service
+        self.bucket = bucket
+        self.reserved = reserved
+        self.limits = limits
+        self.backend = backend
+        self.lease_id = lease_id
+        self.waited = waited
+        self.actual_tokens: Optional[int] = None
+
+    def settle(self, tokens: Optional[int]):
+        if tokens:
+            self.actual_tokens = int(tokens)
+
+
+class LLMRateLimiter:
+    """Admits LLM calls within each service's and API key's budgets.
+
+    Usage::
+
+        with llm_rate_limiter.acquire('kimi', api_key, prompt=prompt, max_tokens=1000) as lease:
+            completion = client.chat.completions.create(...)
+            lease.settle(completion.usage.total_tokens)
+
+    A call reserves one request and an estimate of its tokens; ``settle``
+    corrects the estimate afterwards. ``backoff`` pauses a bucket for every
+    process after the provider answers 429.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._local = MemoryLimiterBackend()
+        self._redis_down_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'timeouts': 0, 'backoffs': 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = self._local
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def _active_backend(self):
+        backend = self.backend
+        if backend is not self._local and time.monotonic() < self._redis_down_until:
+            return self._local
+        return backend
+
+    def _backend_failed(self, backend, error: Exception):
+        if backend is self._local:
+            raise error
+        logger.warning(f"LLM 限流 Redis 不可用，{REDIS_RETRY_SECONDS} 秒内改用进程内限流: {error}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    @staticmethod
+    def limits_for(service: str) -> LLMLimits:
+        defaults = DEFAULT_LIMITS.get(service, {'rpm': 0, 'tpm': 0, 'concurrency': 0})
+        values = {}
+        for name, default in defaults.items():
+            raw = os.getenv(f"LLM_{service.upper()}_{name.upper()}")
+            try:
+                values[name] = max(0, int(raw)) if raw not in (None, '') else default
+            except ValueError:
+                logger.warning(f"无效的 LLM_{service.upper()}_{name.upper()}: {raw}")
+                values[name] = default
+        return LLMLimits(**values)
+
+    @staticmethod
+    def bucket_name(service: str, api_key: Optional[str] = None) -> str:
+        key_id = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12] if api_key else 'default'
+        return f"{service}:{key_id}"
+
+    def _reservation(self, limits: LLMLimits, prompt, max_tokens: Optional[int]) -> float:
+        if not limits.tpm:
+            return 0.0
+        completion = min(max_tokens or COMPLETION_TOKEN_ESTIMATE, COMPLETION_TOKEN_ESTIMATE)
+        return float(min(estimate_tokens(prompt) + completion, limits.tpm_capacity))
+
+    def _try(self, lease: RateLimitLease, waiter: str) -> Tuple[bool, float, object]:
+        backend = self._active_backend()
+        try:
+            lease_id, wait = backend.try_acquire(lease.bucket, waiter, lease.limits, lease.reserved, time.time())
+        except Exception as e:
+            self._backend_failed(backend, e)
+            return False, 0.0, backend
+        if lease_id:
+            lease.backend, lease.lease_id = backend, lease_id
+        return bool(lease_id), wait, backend
+
+    def _leave(self, backend, lease: RateLimitLease, waiter: str):
+        try:
+            backend.leave(lease.bucket, waiter)
+        except Exception as e:
+            logger.debug(f"退出限流队列失败: {e}")
+
+    def _prepare(self, service: str, api_key: Optional[str], prompt, max_tokens: Optional[int]) -> RateLimitLease:
+        limits = self.limits_for(service)
+        return RateLimitLease(service, self.bucket_name(service, api_key),
+                              self._reservation(limits, prompt, max_tokens), limits)
+
+    def _granted(self, lease: RateLimitLease, started: float):
+        lease.waited = time.monotonic() - started
+        with self._lock:
+            self.stats['acquired'] += 1
+            if lease.waited > 0.01:
+                self.stats['waited'] += 1
+                self.stats['wait_seconds'] += lease.waited
+        if lease.waited > 1:
+            logger.info(f"⏳ {lease.service.upper()} 限流排队 {lease.waited:.1f} 秒")
+
+    def _timed_out(self, lease: RateLimitLease, timeout: float):
+        with self._lock:
+            self.stats['timeouts'] += 1
+        raise RateLimitTimeout(f"等待 {lease.service.upper()} 调用配额超时 ({timeout:.0f} 秒): "
+                               f"too many requests queued")
+
+    def _release(self, lease: RateLimitLease):
+        if lease.lease_id is None:
+            return
+        refund = 0.0
+        if lease.limits.tpm and lease.actual_tokens is not None:
+            refund = lease.reserved - lease.actual_tokens
+        try:
+            lease.backend.release(lease.bucket, lease.lease_id, lease.limits, refund, time.time())
+        except Exception as e:
+            # The slot expires after LEASE_TTL
+            logger.warning(f"释放 LLM 限流名额失败: {e}")
+
+    @contextmanager
+    def acquire(self, service: str, api_key: Optional[str] = None, prompt=None,
+                max_tokens: Optional[int] = None, timeout: Optional[float] = None):
+        """Block until a call to ``service`` fits the budgets, then hold a
+        concurrency slot for the ``with`` block.
+
+        Raises:
+            RateLimitTimeout: No slot within ``timeout`` seconds
+        """
+        lease = self._prepare(service, api_key, prompt, max_tokens)
+        if not lease.limits.unlimited:
+            timeout = DEFAULT_ACQUIRE_TIMEOUT if timeout is None else timeout
+            waiter = uuid.uuid4().hex
+            started = time.monotonic()
+            while True:
+                granted, wait, backend = self._try(lease, waiter)
+                if granted:
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._leave(backend, lease, waiter)
+                    self._timed_out(lease, timeout)
+                backend.wait(min(wait, remaining))
+            self._granted(lease, started)
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    @asynccontextmanager
+    async def acquire_async(self, service: str, api_key: Optional[str] = None, prompt=None,
+                            max_tokens: Optional[int] = None, timeout: Optional[float] = None):
+        """``acquire`` for coroutines: waits with ``asyncio.sleep``."""
+        lease = self._prepare(service, api_key, prompt, max_tokens)
+        if not lease.limits.unlimited:
+            timeout = DEFAULT_ACQUIRE_TIMEOUT if timeout is None else timeout
+            waiter = uuid.uuid4().hex
+            started = time.monotonic()
+            while True:
+                granted, wait, backend = self._try(lease, waiter)
+                if granted:
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._leave(backend, lease, waiter)
+                    self._timed_out(lease, timeout)
+                await asyncio.sleep(min(wait, remaining, backend.poll_interval * 2))
+            self._granted(lease, started)
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    def backoff(self, service: str, api_key: Optional[str], seconds: float):
+        """Hold every caller of this service and key for ``seconds``, e.g.
+        after a 429 answer."""
+        if not seconds or seconds <= 0:
+            return
+        backend = self._active_backend()
+        try:
+            backend.backoff(self.bucket_name(service, api_key), time.time() + seconds)
+        except Exception as e:
+            self._backend_failed(backend, e)
+            self._local.backoff(self.bucket_name(service, api_key), time.time() + seconds)
+        with self._lock:
+            self.stats['backoffs'] += 1
+        logger.warning(f"⏸️ {service.upper()} 返回限流，所有调用暂停 {seconds:.0f} 秒")
+
+    def utilization(self) -> Dict[str, Dict]:
+        """Current usage of every bucket seen so far, by ``service:key id``."""
+        backend = self._active_backend()
+        now = time.time()
+        try:
+            buckets = backend.buckets()
+            return {bucket: dict(backend.usage(bucket, self.limits_for(bucket.split(':', 1)[0]), now),
+                                 service=bucket.split(':', 1)[0])
+                    for bucket in buckets}
+        except Exception as e:
+            logger.warning(f"读取 LLM 限流状态失败: {e}")
+            return {}
+
+
+def configure_llm_rate_limiter(redis_url: Optional[str] = None, redis_client=None,
+                               connect_timeout: float = 2.0):
+    """Share the LLM budgets through Redis, once per process.
+
+    Web processes pass the task-store client; Celery workers connect from
+    the URL. Without Redis every process enforces the budgets on its own.
+
+    Returns:
+        The Redis client in use, or None for the in-process limiter
+    """
+    client = redis_client
+    if client is None and redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_connect_timeout=connect_timeout,
+                                          socket_timeout=connect_timeout, health_check_interval=30)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"无法连接 LLM 限流 Redis，配额仅在当前进程内生效: {e}")
+            client = None
+    llm_rate_limiter.backend = RedisLimiterBackend(client) if client is not None else None
+    return client
+
+
+# Global instance
+llm_rate_limiter = LLMRateLimiter()
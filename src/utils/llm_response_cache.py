@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+LLM response cache
+Persists completion texts keyed by (service, model, temperature, prompt hash) so
+identical summary, SWOT, Q&A and policy-parsing calls are answered from disk
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """Disk-backed, TTL- and size-bounded cache of LLM response texts.
+
+    Entries are JSON files sharded by the first two hex digits of their key.
+    An in-memory index ordered by last use drives LRU eviction once the
+    store exceeds ``max_bytes`` or ``max_entries``. It is rebuilt from disk
+    the first time the cache is used in a process.
+    """
+
+    def __init__(self, cache_dir: str = 'data/cache/llm', ttl_seconds: int = 7 * 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024, max_entries: int = 20000,
+                 enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'expired': 0}
+
+    @staticmethod
+    def make_key(service: str, model: Optional[str], temperature: Optional[float],
+                 prompt: Any, **params) -> str:
+        """Stable hash of everything that determines the response."""
+        material = json.dumps({
+            'service': service,
+            'model': model,
+            'temperature': temperature,
+            'prompt': prompt,
+            'params': params
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        """Build the LRU index from disk once per process (oldest first)."""
+        if self._index is not None:
+            return
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob('*/*.json'):
+                try:
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+                except OSError:
+                    continue
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(size for _, _, size in entries)
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._index and (self._total_bytes > self.max_bytes or len(self._index) > self.max_entries):
+            key = next(iter(self._index))
+            self._forget(key)
+            self.stats['evictions'] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取 LLM 响应缓存失败 {path}: {e}")
+            return None
+
+        with self._lock:
+            self._load_index()
+            if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+                self._forget(key)
+                self.stats['expired'] += 1
+                return None
+            if key in self._index:
+                self._index.move_to_end(key)
+        return entry.get('response')
+
+    def set(self, key: str, response: str, meta: Optional[Dict] = None) -> bool:
+        """Store a response atomically; returns False if it could not be written."""
+        path = self._path(key)
+        entry = {'created_at': time.time(), 'meta': meta or {}, 'response': response}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            size = path.stat().st_size
+        except Exception as e:
+            logger.warning(f"写入 LLM 响应缓存失败 {path}: {e}")
+            return False
+
+        with self._lock:
+            self._load_index()
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.stats['writes'] += 1
+            self._evict()
+        return True
+
+    def get_or_call(self, service: str, model: Optional[str], temperature: Optional[float],
+                    prompt: Any, call: Callable[[], str], bypass: bool = False, **params) -> str:
+        """Serve a response from the cache, calling the LLM on a miss.
+
+        Args:
+            service: LLM service name
+            model: Model name
+            temperature: Sampling temperature (None when the SDK default is used)
+            prompt: Prompt text or chat messages
+            call: Performs the actual API call and returns the response text
+            bypass: Skip the cache lookup and always call the LLM (the fresh
+                response still replaces the cached one)
+            **params: Other request parameters that change the response, e.g. max_tokens
+        """
+        if not self.enabled:
+            return call()
+
+        key = self.make_key(service, model, temperature, prompt, **params)
+        if not bypass:
+            cached = self.get(key)
+            if cached is not None:
+                self.stats['hits'] += 1
+                logger.info(f"♻️ LLM 响应缓存命中: {service}/{model} ({key[:12]})")
+                return cached
+        self.stats['misses'] += 1
+
+        response = call()
+        # Only plain non-empty texts are worth caching; errors propagate uncached
+        if isinstance(response, str) and response.strip():
+            self.set(key, response, meta={'service': service, 'model': model})
+        return response
+
+    def clear(self) -> int:
+        """Remove every cached response; returns the number removed."""
+        with self._lock:
+            self._load_index()
+            keys = list(self._index.keys())
+            for key in keys:
+                self._forget(key)
+        return len(keys)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_index()
+            return dict(self.stats, entries=len(self._index), total_bytes=self._total_bytes,
+                        max_bytes=self.max_bytes, max_entries=self.max_entries,
+                        ttl_seconds=self.ttl_seconds, enabled=self.enabled)
+
+
+# Global LLM response cache instance
+llm_response_cache = LLMResponseCache(
+    cache_dir=os.environ.get('LLM_CACHE_DIR', 'data/cache/llm'),
+    ttl_seconds=int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600)),
+    max_bytes=int(os.environ.get('LLM_CACHE_MAX_MB', 200)) * 1024 * 1024,
+    max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 20000)),
+    enabled=os.environ.get('LLM_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no'),
+)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination
+Cursor-based paging on (created_at, id) so deep pages cost the same as the first
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """Opaque URL-safe cursor pointing just past a row."""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Optional[datetime], int]]:
+    """Inverse of ``encode_cursor``; None for an empty cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def page_size(value: Any, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Parse a requested page size, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_page(query, created_col, id_col, cursor: Optional[str] = None,
+                limit: int = DEFAULT_PAGE_SIZE,
+                key: Optional[Callable[[Any], Tuple[Optional[datetime], int]]] = None
+                ) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of ``query`` newest first, ordered by (created_at, id).
+
+    The position filter is a row-value comparison, so with an index ending in
+    ``created_at`` (the id is the implicit rowid) SQLite seeks straight to the
+    page instead of skipping OFFSET rows.
+
+    Args:
+        query: SQLAlchemy query; its ordering is replaced
+        created_col: Timestamp column (expected to be non-NULL)
+        id_col: Primary key column (tie-breaker)
+        cursor: ``next_cursor`` of the previous page, or None for the first page
+        limit: Page size
+        key: Extracts (created_at, id) from a result row; defaults to the
+            attributes named like the columns
+
+    Returns:
+        (rows, next_cursor), where next_cursor is None on the last page
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        query = query.filter(tuple_(created_col, id_col) < tuple_(*position))
+
+    rows = query.order_by(None).order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if key is None:
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+        else:
+            next_cursor = encode_cursor(*key(rows[-1]))
+    return rows, next_cursor
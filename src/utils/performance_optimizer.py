@@ -5,42 +5,136 @@
 提供缓存管理、批量处理、数据压缩等性能优化功能
 """
 
+import asyncio
+import dataclasses
+import inspect
 import json
 import logging
 import hashlib
-import pickle
+import threading
 import time
+import weakref
+from datetime import date, datetime
+from enum import Enum
 from functools import wraps
 from typing import Dict, List, Any, Optional, Callable
-from pathlib import Path
+from pathlib import Path, PurePath
 import os
 
+from src.utils.cache_backends import (
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    counter_value,
+    encode_entry,
+    get_default_redis_client,
+)
+
 logger = logging.getLogger(__name__)
 
 
 class CacheManager:
-    """缓存管理器"""
-    
-    def __init__(self, cache_dir: str = "data/cache", ttl: int = 3600):
+    """缓存管理器
+
+    由可插拔的后端链组成，默认依次为：
+    - 内存层：按条目数与字节数限制的 LRU
+    - Redis 层：应用启动时通过 ``configure_cache_backends`` 配置后启用，多进程共享
+    - 磁盘层：按总字节数限制的 LRU，写入采用临时文件 + 原子重命名
+
+    读取按顺序查找，命中后回填前面的层；写入与删除作用于所有层。
+    过期条目由后台线程定期清理；键按命名空间隔离（默认命名空间沿用旧的
+    ``<md5>.cache`` 文件布局，其他命名空间存放在同名子目录中）。
+    """
+
+    def __init__(self, cache_dir: str = "data/cache", ttl: int = 3600,
+                 namespace: Optional[str] = None,
+                 max_memory_items: int = 1000,
+                 max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024,
+                 sweep_interval: int = 300,
+                 backends: Optional[List[Any]] = None,
+                 redis_client: Any = None):
         """初始化缓存管理器
-        
+
         Args:
             cache_dir: 缓存目录
             ttl: 缓存过期时间（秒）
+            namespace: 键命名空间，None 表示默认命名空间
+            max_memory_items: 内存层最大条目数
+            max_memory_bytes: 内存层最大字节数（按序列化大小估算）
+            max_disk_bytes: 磁盘层最大字节数
+            sweep_interval: 后台过期清理间隔（秒），0 表示不启动清理线程
+            backends: 自定义后端链（按查找顺序），指定后忽略默认链
+            redis_client: 本实例使用的 Redis 客户端，默认使用全局配置
         """
-        self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.cache_dir = Path(cache_dir) / namespace if namespace else Path(cache_dir)
         self.ttl = ttl
-        self.memory_cache = {}
-    
-    def _get_cache_key(self, key: str) -> str:
-        """生成缓存键的hash"""
-        return hashlib.md5(key.encode()).hexdigest()
-    
-    def _get_cache_path(self, cache_key: str) -> Path:
-        """获取缓存文件路径"""
-        return self.cache_dir / f"{cache_key}.cache"
-    
+        self._lock = threading.RLock()
+        self._counters = {'misses': 0, 'sets': 0}
+
+        self._custom_backends = list(backends) if backends is not None else None
+        if self._custom_backends is None:
+            self._memory = MemoryCacheBackend(max_memory_items, max_memory_bytes)
+            self._disk = DiskCacheBackend(self.cache_dir, ttl, max_disk_bytes)
+        self._redis_client = redis_client
+        self._redis: Optional[RedisCacheBackend] = None
+
+        self._stop_sweeper = threading.Event()
+        if sweep_interval > 0:
+            self._start_sweeper(sweep_interval)
+
+    @property
+    def backends(self) -> List[Any]:
+        """当前生效的后端链（全局 Redis 配置变化后自动跟随）"""
+        if self._custom_backends is not None:
+            return self._custom_backends
+        client = self._redis_client or get_default_redis_client()
+        if client is None:
+            return [self._memory, self._disk]
+        if self._redis is None or self._redis.client is not client:
+            self._redis = RedisCacheBackend(client, self.namespace, self.ttl)
+        return [self._memory, self._redis, self._disk]
+
+    @property
+    def memory_cache(self) -> Dict:
+        """内存层条目（key -> (data, expires_at, size)）"""
+        for backend in self.backends:
+            if isinstance(backend, MemoryCacheBackend):
+                return backend.entries
+        return {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """命中、未命中、写入、淘汰与过期计数"""
+        backends = self.backends
+        stats = {f"{backend.name}_hits": 0 for backend in backends}
+        with self._lock:
+            stats.update(self._counters)
+        for backend in backends:
+            stats[f"{backend.name}_evictions"] = backend.evictions
+        stats['expired'] = sum(backend.expired for backend in backends)
+        return stats
+
+    def _start_sweeper(self, interval: int):
+        """启动后台过期清理线程（弱引用，实例被回收后线程自动退出）"""
+        ref = weakref.ref(self)
+        stop = self._stop_sweeper
+
+        def sweep_loop():
+            while not stop.wait(interval):
+                manager = ref()
+                if manager is None:
+                    return
+                manager.sweep_expired()
+                del manager
+
+        threading.Thread(target=sweep_loop, name='cache-sweeper', daemon=True).start()
+
+    def close(self):
+        """停止后台清理线程"""
+        self._stop_sweeper.set()
+
     def get(self, key: str, use_memory: bool = True) -> Optional[Any]:
         """获取缓存
         
@@ -52,58 +146,56 @@ class CacheManager:
             缓存的数据，如果不存在或过期则返回None
         """
         try:
-            # 先查内存缓存
-            if use_memory and key in self.memory_cache:
-                cached_data, timestamp = self.memory_cache[key]
-                if time.time() - timestamp < self.ttl:
-                    logger.debug(f"内存缓存命中: {key}")
-                    return cached_data
-                else:
-                    del self.memory_cache[key]
-            
-            # 查文件缓存
-            cache_key = self._get_cache_key(key)
-            cache_path = self._get_cache_path(cache_key)
-            
-            if cache_path.exists():
-                with open(cache_path, 'rb') as f:
-                    cached_data, timestamp = pickle.load(f)
-                
-                if time.time() - timestamp < self.ttl:
-                    logger.debug(f"文件缓存命中: {key}")
-                    if use_memory:
-                        self.memory_cache[key] = (cached_data, timestamp)
-                    return cached_data
-                else:
-                    cache_path.unlink()
-            
+            backends = [b for b in self.backends
+                        if use_memory or not isinstance(b, MemoryCacheBackend)]
+            for i, backend in enumerate(backends):
+                entry = backend.get(key)
+                if entry is None:
+                    continue
+                data, expires_at, blob = entry
+                with self._lock:
+                    name = f"{backend.name}_hits"
+                    self._counters[name] = self._counters.get(name, 0) + 1
+                logger.debug(f"{backend.name} 缓存命中: {key}")
+
+                # 回填更靠前的层
+                if i:
+                    if blob is None:
+                        blob = encode_entry(data, expires_at - self.ttl, self.ttl, self.ttl)
+                    for upper in backends[:i]:
+                        upper.set(key, data, expires_at, blob)
+                return data
+
+            with self._lock:
+                self._counters['misses'] += 1
             return None
             
         except Exception as e:
             logger.error(f"获取缓存失败: {e}")
             return None
     
-    def set(self, key: str, data: Any, use_memory: bool = True):
+    def set(self, key: str, data: Any, use_memory: bool = True, ttl: Optional[int] = None):
         """设置缓存
         
         Args:
             key: 缓存键
             data: 要缓存的数据
             use_memory: 是否同时保存到内存
+            ttl: 本条目的过期时间（秒），默认使用实例 ttl
         """
         try:
             timestamp = time.time()
-            
-            # 保存到内存
-            if use_memory:
-                self.memory_cache[key] = (data, timestamp)
-            
-            # 保存到文件
-            cache_key = self._get_cache_key(key)
-            cache_path = self._get_cache_path(cache_key)
-            
-            with open(cache_path, 'wb') as f:
-                pickle.dump((data, timestamp), f)
+            ttl = self.ttl if ttl is None else ttl
+            blob = encode_entry(data, timestamp, ttl, self.ttl)
+
+            for backend in self.backends:
+                if isinstance(backend, MemoryCacheBackend):
+                    if not use_memory:
+                        backend.delete(key)
+                        continue
+                backend.set(key, data, timestamp + ttl, blob)
+            with self._lock:
+                self._counters['sets'] += 1
             
             logger.debug(f"设置缓存: {key}")
             
@@ -113,15 +205,8 @@ class CacheManager:
     def delete(self, key: str):
         """删除缓存"""
         try:
-            # 删除内存缓存
-            if key in self.memory_cache:
-                del self.memory_cache[key]
-            
-            # 删除文件缓存
-            cache_key = self._get_cache_key(key)
-            cache_path = self._get_cache_path(cache_key)
-            if cache_path.exists():
-                cache_path.unlink()
+            for backend in self.backends:
+                backend.delete(key)
             
             logger.debug(f"删除缓存: {key}")
             
@@ -129,35 +214,98 @@ class CacheManager:
             logger.error(f"删除缓存失败: {e}")
     
     def clear(self):
-        """清空所有缓存"""
+        """清空本命名空间的所有缓存"""
         try:
-            # 清空内存缓存
-            self.memory_cache.clear()
-            
-            # 清空文件缓存
-            for cache_file in self.cache_dir.glob("*.cache"):
-                cache_file.unlink()
+            for backend in self.backends:
+                backend.clear()
             
             logger.info("清空所有缓存")
             
         except Exception as e:
             logger.error(f"清空缓存失败: {e}")
+
+    def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """原子地增加计数器并返回新值
+
+        不经过内存层（各进程的内存副本会互相覆盖）：配置了 Redis 时使用
+        INCRBY，首次计数时以磁盘上的值起算；否则在文件锁内更新磁盘条目。
+
+        Args:
+            key: 计数器键
+            amount: 增量
+            ttl: 过期时间（秒），每次计数后重新计算，默认使用实例 ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        backends = self.backends
+        disk = next((b for b in backends if isinstance(b, DiskCacheBackend)), None)
+        redis = next((b for b in backends if isinstance(b, RedisCacheBackend)), None)
+        for backend in backends:
+            if isinstance(backend, MemoryCacheBackend):
+                backend.delete(key)
+
+        if redis is not None:
+            value = redis.increment(key, amount, ttl, disk.get_counter(key) if disk else 0)
+            if value is not None:
+                return value
+        if disk is not None:
+            return disk.increment(key, amount, ttl)
+        # 自定义后端链：无法保证原子性
+        with self._lock:
+            value = counter_value(self.get(key, use_memory=False)) + amount
+            self.set(key, value, use_memory=False, ttl=ttl)
+            return value
+
+    def get_counter(self, key: str) -> int:
+        """读取 ``increment`` 维护的计数器（不经过内存层），不存在时为 0"""
+        backends = self.backends
+        for backend in backends:
+            if isinstance(backend, RedisCacheBackend):
+                value = backend.get_counter(key)
+                if value is not None:
+                    return value
+        for backend in backends:
+            if isinstance(backend, DiskCacheBackend):
+                return backend.get_counter(key)
+        return counter_value(self.get(key, use_memory=False))
+
+    def sweep_expired(self) -> int:
+        """清理本地各层中已过期的条目（Redis 由键 TTL 自行过期）
+
+        Returns:
+            清理的条目数
+        """
+        removed = 0
+        try:
+            now = time.time()
+            for backend in self.backends:
+                removed += backend.sweep_expired(now)
+            if removed:
+                logger.debug(f"清理过期缓存: {removed} 项")
+        except Exception as e:
+            logger.error(f"清理过期缓存失败: {e}")
+        return removed
     
     def get_cache_info(self) -> Dict:
-        """获取缓存信息"""
+        """获取缓存信息（来自各层索引，不扫描目录）"""
         try:
-            memory_count = len(self.memory_cache)
-            file_count = len(list(self.cache_dir.glob("*.cache")))
-            
-            total_size = sum(
-                f.stat().st_size for f in self.cache_dir.glob("*.cache")
-            )
-            
+            backends = self.backends
+            infos = {backend.name: backend.info() for backend in backends}
+            memory = infos.get('memory', {})
+            disk = infos.get('disk', {})
+            stats = self.stats
+            hits = sum(v for k, v in stats.items() if k.endswith('_hits'))
+            lookups = hits + stats['misses']
             return {
-                "memory_cached_items": memory_count,
-                "file_cached_items": file_count,
-                "total_size_mb": round(total_size / 1024 / 1024, 2),
-                "cache_dir": str(self.cache_dir)
+                "namespace": self.namespace or "default",
+                "backends": [backend.name for backend in backends],
+                "memory_cached_items": memory.get('items', 0),
+                "memory_size_mb": round(memory.get('bytes', 0) / 1024 / 1024, 2),
+                "file_cached_items": disk.get('items', 0),
+                "total_size_mb": round(disk.get('bytes', 0) / 1024 / 1024, 2),
+                "cache_dir": str(self.cache_dir),
+                "redis_available": infos['redis']['available'] if 'redis' in infos else None,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                **stats
             }
             
         except Exception as e:
@@ -165,34 +313,204 @@ class CacheManager:
             return {}
 
 
-def cached(ttl: int = 3600, use_memory: bool = True):
+def _canonicalize(obj: Any, _seen: Optional[set] = None) -> Any:
+    """把参数转换为与内存地址、字典顺序无关的可 JSON 序列化结构"""
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, bytes):
+        return ['bytes', hashlib.sha256(obj).hexdigest()]
+    if isinstance(obj, Enum):
+        return ['enum', type(obj).__qualname__, _canonicalize(obj.value, _seen)]
+    if isinstance(obj, (datetime, date)):
+        return ['datetime', obj.isoformat()]
+    if isinstance(obj, PurePath):
+        return ['path', str(obj)]
+
+    _seen = _seen if _seen is not None else set()
+    if id(obj) in _seen:
+        return ['cycle', type(obj).__qualname__]
+    _seen.add(id(obj))
+    try:
+        if isinstance(obj, dict):
+            items = [(_canonicalize(k, _seen), _canonicalize(v, _seen)) for k, v in obj.items()]
+            items.sort(key=lambda kv: json.dumps(kv[0], sort_keys=True, ensure_ascii=False))
+            return ['dict', items]
+        if isinstance(obj, (list, tuple)):
+            return [type(obj).__name__, [_canonicalize(v, _seen) for v in obj]]
+        if isinstance(obj, (set, frozenset)):
+            values = [_canonicalize(v, _seen) for v in obj]
+            values.sort(key=lambda v: json.dumps(v, sort_keys=True, ensure_ascii=False))
+            return ['set', values]
+        cache_key = getattr(obj, '__cache_key__', None)
+        if callable(cache_key):
+            return ['object', type(obj).__qualname__, _canonicalize(cache_key(), _seen)]
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            fields = {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+            return ['dataclass', type(obj).__qualname__, _canonicalize(fields, _seen)]
+        if hasattr(obj, '__dict__') and not isinstance(obj, type):
+            return ['object', type(obj).__qualname__, _canonicalize(vars(obj), _seen)]
+        if isinstance(obj, type):
+            return ['type', f"{obj.__module__}.{obj.__qualname__}"]
+        return ['repr', repr(obj)]
+    finally:
+        _seen.discard(id(obj))
+
+
+def make_cache_key(*args, **kwargs) -> str:
+    """生成稳定的缓存键
+
+    支持 dict（与键顺序无关）、list/tuple/set、dataclass 以及普通对象（按属性），
+    对象可实现 ``__cache_key__()`` 自定义参与哈希的内容。
+    """
+    material = json.dumps([_canonicalize(list(args)), _canonicalize(kwargs)],
+                          sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class _SingleFlight:
+    """合并同一键的并发调用：只有一个调用者执行，其余等待其结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, list] = {}
+        self._async_calls: Dict[tuple, "asyncio.Future"] = {}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                # [完成事件, 结果, 异常]
+                call = self._calls[key] = [threading.Event(), None, None]
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = func()
+            return call[1]
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call[0].set()
+
+    async def do_async(self, key: str, func: Callable[[], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        future = self._async_calls.get(flight_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._async_calls[flight_key] = future
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._async_calls.pop(flight_key, None)
+
+
+_shared_cache_manager: Optional[CacheManager] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> CacheManager:
+    """获取 ``cached`` 装饰器共用的缓存管理器（首次使用时创建）"""
+    global _shared_cache_manager
+    with _shared_cache_lock:
+        if _shared_cache_manager is None:
+            _shared_cache_manager = CacheManager(namespace='memoize')
+        return _shared_cache_manager
+
+
+def cached(ttl: int = 3600, use_memory: bool = True, namespace: Optional[str] = None,
+           cache: Optional[CacheManager] = None, ignore_self: bool = True):
     """缓存装饰器
+
+    所有被装饰的函数共用一个缓存管理器，按函数命名空间区分键；同一键的并发
+    调用只执行一次（single-flight）。支持普通函数、方法和 async 函数。
+    返回 None 的结果不会被缓存。
     
     Args:
         ttl: 缓存过期时间（秒）
         use_memory: 是否使用内存缓存
+        namespace: 键命名空间，默认为函数的 ``模块.限定名``
+        cache: 使用的缓存管理器，默认为共享实例
+        ignore_self: 方法的 self/cls 不参与键计算
     """
     def decorator(func: Callable) -> Callable:
-        cache_manager = CacheManager(ttl=ttl)
-        
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # 生成缓存键
-            cache_key = f"{func.__name__}_{str(args)}_{str(kwargs)}"
-            
-            # 尝试获取缓存
-            cached_result = cache_manager.get(cache_key, use_memory)
-            if cached_result is not None:
-                return cached_result
-            
-            # 执行函数
-            result = func(*args, **kwargs)
-            
-            # 保存缓存
-            cache_manager.set(cache_key, result, use_memory)
-            
-            return result
-        
+        func_namespace = namespace or f"{func.__module__}.{func.__qualname__}"
+        params = list(inspect.signature(func).parameters)
+        skip_first = ignore_self and bool(params) and params[0] in ('self', 'cls')
+        flight = _SingleFlight()
+
+        def cache_key(*args, **kwargs) -> str:
+            key_args = args[1:] if skip_first else args
+            return f"{func_namespace}:{make_cache_key(*key_args, **kwargs)}"
+
+        def lookup(key: str) -> Optional[Any]:
+            return (cache or get_shared_cache()).get(key, use_memory)
+
+        def store(key: str, result: Any):
+            if result is not None:
+                (cache or get_shared_cache()).set(key, result, use_memory, ttl=ttl)
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = cache_key(*args, **kwargs)
+                cached_result = lookup(key)
+                if cached_result is not None:
+                    return cached_result
+
+                async def compute():
+                    result = await func(*args, **kwargs)
+                    store(key, result)
+                    return result
+
+                return await flight.do_async(key, compute)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                # 生成缓存键
+                key = cache_key(*args, **kwargs)
+                
+                # 尝试获取缓存
+                cached_result = lookup(key)
+                if cached_result is not None:
+                    return cached_result
+
+                def compute():
+                    # 等待期间其他调用者可能已写入缓存
+                    result = lookup(key)
+                    if result is None:
+                        result = func(*args, **kwargs)
+                        store(key, result)
+                    return result
+
+                return flight.do(key, compute)
+
+        def invalidate(*args, **kwargs):
+            """删除指定参数对应的缓存"""
+            (cache or get_shared_cache()).delete(cache_key(*args, **kwargs))
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Persistent per-report analysis cache
+Stores derived analyses next to the report file, keyed by report ID, report file hash and analyzer version
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReportAnalysisCache:
+    """Content-addressed cache of derived report analyses.
+
+    Each analysis is stored as ``<report>.analysis/<analyzer>[__<variant>].json``
+    beside the report file. An entry is only served while the report file's
+    SHA-256 and the analyzer version both still match, so regenerated reports
+    and upgraded analyzers are recomputed automatically.
+    """
+
+    CACHE_DIR_SUFFIX = '.analysis'
+
+    def __init__(self):
+        self._hash_memo: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+    def cache_dir_for(self, report_path: Path) -> Path:
+        """Directory holding the cached analyses of a report."""
+        report_path = Path(report_path)
+        return report_path.with_name(report_path.stem + self.CACHE_DIR_SUFFIX)
+
+    def file_hash(self, report_path: Path) -> str:
+        """SHA-256 of the report file, memoized on (mtime, size)."""
+        report_path = Path(report_path)
+        stat = report_path.stat()
+        key = str(report_path.resolve())
+        with self._lock:
+            memo = self._hash_memo.get(key)
+        if memo and memo[0] == stat.st_mtime_ns and memo[1] == stat.st_size:
+            return memo[2]
+
+        digest = hashlib.sha256()
+        with open(report_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        file_hash = digest.hexdigest()
+        with self._lock:
+            self._hash_memo[key] = (stat.st_mtime_ns, stat.st_size, file_hash)
+        return file_hash
+
+    def _entry_path(self, report_path: Path, analyzer: str, variant: str = '') -> Path:
+        name = analyzer if not variant else f"{analyzer}__{variant}"
+        safe_name = re.sub(r'[^\w\-]', '_', name)
+        return self.cache_dir_for(report_path) / f"{safe_name}.json"
+
+    def get(self, report_id: str, report_path: Path, analyzer: str,
+            version: str, variant: str = '') -> Optional[Any]:
+        """Return the cached result, or None if missing or stale."""
+        entry_path = self._entry_path(report_path, analyzer, variant)
+        try:
+            if not entry_path.exists():
+                return None
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if (entry.get('report_id') == report_id and
+                    entry.get('version') == version and
+                    entry.get('file_hash') == self.file_hash(report_path)):
+                return entry.get('result')
+        except Exception as e:
+            logger.warning(f"读取报告分析缓存失败 {entry_path}: {e}")
+        return None
+
+    def set(self, report_id: str, report_path: Path, analyzer: str, version: str,
+            result: Any, variant: str = '', file_hash: Optional[str] = None) -> bool:
+        """Persist a result atomically; returns False if it could not be written."""
+        entry_path = self._entry_path(report_path, analyzer, variant)
+        entry = {
+            'report_id': report_id,
+            'analyzer': analyzer,
+            'variant': variant,
+            'version': version,
+            'file_hash': file_hash or self.file_hash(report_path),
+            'computed_at': datetime.now().isoformat(),
+            'result': result
+        }
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, entry_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self.stats['writes'] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"写入报告分析缓存失败 {entry_path}: {e}")
+            return False
+
+    def get_or_compute(self, report_id: str, report_path: Path, analyzer: str, version: str,
+                       compute: Callable[[], Any], variant: str = '') -> Any:
+        """Serve a cached analysis, computing and storing it on a miss."""
+        cached = self.get(report_id, report_path, analyzer, version, variant)
+        if cached is not None:
+            self.stats['hits'] += 1
+            logger.debug(f"报告分析缓存命中: {report_id}/{analyzer}")
+            return cached
+
+        self.stats['misses'] += 1
+        # Hash before computing so a concurrent regeneration is never cached
+        # under the new file's hash
+        file_hash = self.file_hash(report_path)
+        result = compute()
+        self.set(report_id, report_path, analyzer, version, result, variant, file_hash=file_hash)
+        return result
+
+    def invalidate(self, report_path: Path, analyzer: Optional[str] = None) -> int:
+        """Drop cached analyses of a report (all, or one analyzer with all its variants).
+
+        Returns:
+            Number of cache entries removed
+        """
+        cache_dir = self.cache_dir_for(report_path)
+        if not cache_dir.exists():
+            return 0
+        try:
+            if analyzer is None:
+                removed = len(list(cache_dir.glob('*.json')))
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            else:
+                safe_name = re.sub(r'[^\w\-]', '_', analyzer)
+                entries = [p for p in cache_dir.glob('*.json')
+                           if p.stem == safe_name or p.stem.startswith(f"{safe_name}__")]
+                for entry in entries:
+                    entry.unlink()
+                removed = len(entries)
+            logger.info(f"已清除报告分析缓存: {cache_dir} ({removed} 项)")
+            return removed
+        except Exception as e:
+            logger.error(f"清除报告分析缓存失败 {cache_dir}: {e}")
+            return 0
+
+
+# Global report analysis cache instance
+report_analysis_cache = ReportAnalysisCache()
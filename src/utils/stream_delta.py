@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Delta encoding for streamed LLM output
+Turns generator chunks into delta-only payloads (protocol v2) so each SSE event
+carries only new text plus offsets and periodic checksums
+"""
+
+import threading
+import zlib
+from typing import Dict, Optional
+
+# Chunk types that append text to a stream, and the types that close one
+DELTA_TYPES = ('chunk', 'summary_chunk', 'swot_chunk')
+COMPLETE_TYPES = ('complete', 'summary_complete', 'swot_complete')
+
+
+class _StreamState:
+    """Text received so far on one logical stream."""
+
+    __slots__ = ('parts', 'length', 'crc', 'count')
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self.crc = 0
+        self.count = 0
+
+    def append(self, content: str):
+        self.parts.append(content)
+        self.length += len(content)
+        self.crc = zlib.crc32(content.encode('utf-8'), self.crc)
+        self.count += 1
+
+    def text(self) -> str:
+        text = ''.join(self.parts)
+        self.parts = [text]
+        return text
+
+    def checksum(self) -> str:
+        return f"{self.crc & 0xffffffff:08x}"
+
+
+class DeltaStreamEncoder:
+    """Encode streaming chunks for the delta protocol (v2).
+
+    Every chunk of a logical stream ('report', 'summary_zh', 'summary_en',
+    'swot') loses its ``accumulated`` field and gains ``stream`` and ``offset``:
+    the start of ``content`` in the stream's text, counted in Unicode code points.
+    Every ``checksum_interval`` chunks it also carries ``length`` and ``checksum``:
+    the CRC32 of the UTF-8 text so far, as 8 hex digits. Completion chunks drop
+    the full ``content`` unless it disagrees with the deltas sent. Clients
+    rebuild the text themselves and ask for a snapshot if it diverges.
+    """
+
+    PROTOCOL_VERSION = 2
+
+    def __init__(self, checksum_interval: int = 20):
+        self.checksum_interval = max(1, checksum_interval)
+        self._streams: Dict[str, _StreamState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stream_key(chunk: Dict) -> Optional[str]:
+        """Name of the logical stream a chunk belongs to, or None for control chunks."""
+        chunk_type = chunk.get('type')
+        if chunk_type in ('chunk', 'complete'):
+            return 'report'
+        if chunk_type in ('summary_chunk', 'summary_complete'):
+            return chunk.get('stage') or f"summary_{chunk.get('language', 'zh')}"
+        if chunk_type in ('swot_chunk', 'swot_complete'):
+            return 'swot'
+        return None
+
+    def encode(self, chunk: Dict) -> Dict:
+        """Return the delta-protocol payload for a generator chunk."""
+        with self._lock:
+            chunk_type = chunk.get('type')
+            if chunk_type == 'service_fallback':
+                # The fallback service regenerates the report body from scratch
+                self._streams.pop('report', None)
+                return chunk
+
+            key = self.stream_key(chunk)
+            if key is None:
+                return chunk
+
+            state = self._streams.setdefault(key, _StreamState())
+            payload = {k: v for k, v in chunk.items() if k != 'accumulated'}
+            payload['stream'] = key
+
+            if chunk_type in DELTA_TYPES:
+                payload['offset'] = state.length
+                state.append(chunk.get('content') or '')
+                if state.count % self.checksum_interval == 0:
+                    payload['length'] = state.length
+                    payload['checksum'] = state.checksum()
+                return payload
+
+            # Completion: only resend the text when it differs from the deltas
+            content = chunk.get('content')
+            if isinstance(content, str) and (
+                    len(content) != state.length or
+                    f"{zlib.crc32(content.encode('utf-8')) & 0xffffffff:08x}" != state.checksum()):
+                state = self._streams[key] = _StreamState()
+                if content:
+                    state.append(content)
+            else:
+                payload.pop('content', None)
+            payload['length'] = state.length
+            payload['checksum'] = state.checksum()
+            return payload
+
+    def snapshot(self, stream: str) -> Dict:
+        """Full text of one stream for a resync event."""
+        with self._lock:
+            state = self._streams.get(stream) or _StreamState()
+            return {
+                'stream': stream,
+                'content': state.text(),
+                'length': state.length,
+                'checksum': state.checksum()
+            }
+
+    def streams(self):
+        """Names of the streams seen so far."""
+        with self._lock:
+            return list(self._streams.keys())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Task progress channel
+Celery tasks publish progress snapshots (stage, percent, message) that are
+stored per task and broadcast over Redis pub/sub; the web side reads the
+latest snapshot for status polls and relays the broadcasts as Server-Sent
+Events, so watching a task no longer costs an ``AsyncResult`` read per poll
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Snapshots outlive the task as long as Celery keeps results (one day)
+DEFAULT_PROGRESS_TTL = 24 * 3600
+# Seconds a process reuses a snapshot it read; polls of the same task by many
+# viewers within this window cost one Redis read
+SNAPSHOT_CACHE_SECONDS = float(os.getenv('TASK_PROGRESS_CACHE_SECONDS', 1.0))
+# Snapshots kept in the per-process cache
+SNAPSHOT_CACHE_SIZE = 1024
+# Seconds between SSE keep-alive comments on a quiet task
+SSE_HEARTBEAT_INTERVAL = 15
+# Longest an event stream stays open; matches the Celery hard time limit
+MAX_STREAM_SECONDS = 30 * 60
+
+TERMINAL_STATES = frozenset({'SUCCESS', 'FAILURE', 'REVOKED'})
+
+
+def is_terminal(snapshot: Optional[Dict]) -> bool:
+    return bool(snapshot) and snapshot.get('state') in TERMINAL_STATES
+
+
+def snapshot_from_result(state: str, info: Any) -> Dict:
+    """Progress snapshot for a Celery state and its info/result.
+
+    A task that returns ``{'success': False, ...}`` finishes in Celery's
+    SUCCESS state; its snapshot reports FAILURE so clients need not look
+    inside the result.
+    """
+    if state == 'PENDING':
+        return {'state': state, 'status': '等待处理...'}
+
+    if state == 'SUCCESS':
+        if isinstance(info, dict) and not info.get('success', True):
+            error = info.get('error', 'Unknown error')
+            snapshot = {'state': 'FAILURE', 'status': f'任务失败: {error}', 'error': error}
+            if info.get('exc_type'):
+                snapshot['error_details'] = {
+                    'error_type': info['exc_type'],
+                    'error_message': error,
+                    'is_api_error': 'api' in info['exc_type'].lower()
+                }
+            return snapshot
+        return {'state': state, 'status': '完成', 'result': info if isinstance(info, dict) else {'value': info}}
+
+    if state in TERMINAL_STATES or isinstance(info, BaseException):
+        if isinstance(info, BaseException):
+            error = str(info)
+            error_details = {
+                'error_type': type(info).__name__,
+                'error_message': error,
+                'is_api_error': 'api' in type(info).__name__.lower()
+            }
+        elif isinstance(info, dict):
+            error = info.get('error') or info.get('exc_message') or str(info)
+            error_details = None
+            if 'exc_type' in info:
+                error_details = {
+                    'error_type': info.get('exc_type'),
+                    'error_message': info.get('exc_message'),
+                    'is_api_error': 'api' in (info.get('exc_type') or '').lower()
+                }
+        else:
+            error = str(info) if info is not None else state
+            error_details = None
+        return {'state': state, 'status': error, 'error': error, 'error_details': error_details}
+
+    snapshot = {'state': state}
+    if isinstance(info, dict):
+        snapshot.update(info)
+        snapshot.setdefault('current', 0)
+        snapshot.setdefault('total', 100)
+        snapshot.setdefault('status', '')
+        snapshot.setdefault('stage', 'init')
+        snapshot.setdefault('message', snapshot['status'])
+    return snapshot
+
+
+class MemoryProgressBackend:
+    """In-process snapshots; subscribers wait on a condition variable.
+
+    Only correct when the task runs in the web process (eager Celery, tests).
+    """
+
+    def __init__(self, ttl: int = DEFAULT_PROGRESS_TTL):
+        self.ttl = ttl
+        # task_id -> (snapshot, expires_at)
+        self._snapshots: Dict[str, tuple] = {}
+        self._changed = threading.Condition()
+
+    def publish(self, task_id: str, snapshot: Dict):
+        with self._changed:
+            self._snapshots[task_id] = (snapshot, time.time() + self.ttl)
+            self._changed.notify_all()
+
+    def load(self, task_id: str) -> Optional[Dict]:
+        with self._changed:
+            entry = self._snapshots.get(task_id)
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                del self._snapshots[task_id]
+                return None
+            return entry[0]
+
+    def subscribe(self, task_id: str) -> 'MemorySubscription':
+        return MemorySubscription(self, task_id)
+
+
+class MemorySubscription:
+    def __init__(self, backend: MemoryProgressBackend, task_id: str):
+        self.backend = backend
+        self.task_id = task_id
+        with backend._changed:
+            entry = backend._snapshots.get(task_id)
+        self._seen = entry[0] if entry else None
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next published snapshot, or None after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        with self.backend._changed:
+            while True:
+                entry = self.backend._snapshots.get(self.task_id)
+                if entry is not None and entry[0] is not self._seen:
+                    self._seen = entry[0]
+                    return entry[0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.backend._changed.wait(remaining)
+
+    def close(self):
+        pass
+
+
+class RedisProgressBackend:
+    """Snapshots as Redis strings, updates broadcast with PUBLISH.
+
+    Layout::
+
+        task_progress:{id}           latest snapshot (JSON), expires after ttl
+        task_progress:{id}:updates   pub/sub channel carrying each snapshot
+    """
+
+    def __init__(self, client, ttl: int = DEFAULT_PROGRESS_TTL, prefix: str = 'task_progress:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, task_id: str) -> str:
+        return f"{self.prefix}{task_id}"
+
+    def _channel(self, task_id: str) -> str:
+        return f"{self.prefix}{task_id}:updates"
+
+    def publish(self, task_id: str, snapshot: Dict):
+        payload = json.dumps(snapshot, ensure_ascii=False, default=str)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self._key(task_id), payload, ex=self.ttl)
+        pipe.publish(self._channel(task_id), payload)
+        pipe.execute()
+
+    def load(self, task_id: str) -> Optional[Dict]:
+        payload = self.client.get(self._key(task_id))
+        return json.loads(payload) if payload else None
+
+    def subscribe(self, task_id: str) -> 'RedisSubscription':
+        return RedisSubscription(self.client, self._channel(task_id))
+
+
+class RedisSubscription:
+    def __init__(self, client, channel: str):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next published snapshot, or None after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Subscribe confirmations come back as None before the timeout
+            message = self.pubsub.get_message(timeout=remaining)
+            if message and message.get('type') == 'message':
+                return json.loads(message['data'])
+
+    def close(self):
+        try:
+            self.pubsub.close()
+        except Exception as e:
+            logger.debug(f"关闭进度订阅失败: {e}")
+
+
+class TaskProgress:
+    """Publishes and reads task progress snapshots.
+
+    A snapshot is the status-endpoint payload: ``state`` plus ``current``,
+    ``total``, ``stage``, ``status`` and ``message`` while in PROGRESS,
+    ``result`` on SUCCESS and ``error`` on FAILURE. Every snapshot carries
+    ``updated_at``.
+    """
+
+    def __init__(self, backend=None, cache_seconds: float = SNAPSHOT_CACHE_SECONDS):
+        self._backend = backend
+        self.cache_seconds = cache_seconds
+        # task_id -> (snapshot, cached_until)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'published': 0, 'hits': 0, 'reads': 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = MemoryProgressBackend()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, task_id: str, snapshot: Dict):
+        # Finished tasks no longer change, so their snapshot can be reused
+        # until it expires from the backend
+        seconds = max(self.cache_seconds, 60) if is_terminal(snapshot) else self.cache_seconds
+        with self._lock:
+            self._cache[task_id] = (snapshot, time.monotonic() + seconds)
+            self._cache.move_to_end(task_id)
+            while len(self._cache) > SNAPSHOT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def publish(self, task_id: str, state: str = 'PROGRESS', **fields) -> Optional[Dict]:
+        """Store and broadcast a snapshot. Errors are logged, never raised,
+        so progress reporting cannot fail the task."""
+        snapshot = dict(fields, state=state, updated_at=time.time())
+        try:
+            self.backend.publish(task_id, snapshot)
+        except Exception as e:
+            logger.warning(f"发布任务进度失败 {task_id}: {e}")
+            return None
+        self.stats['published'] += 1
+        self._remember(task_id, snapshot)
+        return snapshot
+
+    def publish_result(self, task_id: str, state: str, info: Any) -> Optional[Dict]:
+        """Publish the final snapshot of a finished Celery task."""
+        fields = snapshot_from_result(state, info)
+        return self.publish(task_id, **fields)
+
+    def snapshot(self, task_id: str, cached: bool = True,
+                 fallback: Optional[Callable[[], Optional[Dict]]] = None) -> Optional[Dict]:
+        """Latest snapshot of a task, or None when it never published one.
+
+        Args:
+            cached: Reuse a snapshot this process read within ``cache_seconds``
+            fallback: Builds the snapshot of a task that never published one
+                (e.g. from the Celery result backend); its result is cached
+                like a published snapshot
+        """
+        if cached and self.cache_seconds > 0:
+            with self._lock:
+                entry = self._cache.get(task_id)
+                if entry is not None and time.monotonic() < entry[1]:
+                    self.stats['hits'] += 1
+                    return entry[0]
+        self.stats['reads'] += 1
+        try:
+            snapshot = self.backend.load(task_id)
+        except Exception as e:
+            logger.warning(f"读取任务进度失败 {task_id}: {e}")
+            snapshot = None
+        if snapshot is None and fallback is not None:
+            snapshot = fallback()
+        if snapshot is not None:
+            self._remember(task_id, snapshot)
+        return snapshot
+
+    def iter_updates(self, task_id: str, load: Optional[Callable[[], Optional[Dict]]] = None,
+                     heartbeat: float = SSE_HEARTBEAT_INTERVAL,
+                     max_seconds: float = MAX_STREAM_SECONDS) -> Iterator[Optional[Dict]]:
+        """Current snapshot followed by every update until the task finishes.
+
+        Subscribes before reading the current snapshot so no update falls in
+        between. Yields None after ``heartbeat`` quiet seconds.
+
+        Args:
+            load: Reads the current snapshot; defaults to an uncached read
+            max_seconds: Stop after this long even if the task is unfinished
+        """
+        subscription = self.backend.subscribe(task_id)
+        try:
+            current = load() if load is not None else self.snapshot(task_id, cached=False)
+            last_update = 0.0
+            if current is not None:
+                yield current
+                if is_terminal(current):
+                    return
+                last_update = current.get('updated_at') or 0.0
+
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                update = subscription.get(min(heartbeat, max(0.0, deadline - time.monotonic())))
+                if update is None:
+                    yield None
+                    continue
+                # Skip updates already covered by the initial snapshot
+                if (update.get('updated_at') or 0.0) <= last_update:
+                    continue
+                last_update = update.get('updated_at') or last_update
+                yield update
+                if is_terminal(update):
+                    return
+        finally:
+            subscription.close()
+
+    def sse_stream(self, task_id: str, transform: Optional[Callable[[Dict], Dict]] = None,
+                   **kwargs) -> Iterator[str]:
+        """``iter_updates`` as Server-Sent Events lines with keep-alive comments.
+
+        Args:
+            transform: Applied to each snapshot before it is sent
+        """
+        for update in self.iter_updates(task_id, **kwargs):
+            if update is None:
+                yield ': keep-alive\n\n'
+                continue
+            if transform is not None:
+                update = transform(update)
+            yield f"data: {json.dumps(update, ensure_ascii=False, default=str)}\n\n"
+
+
+def configure_task_progress(redis_url: Optional[str] = None, redis_client=None,
+                            ttl: int = DEFAULT_PROGRESS_TTL, connect_timeout: float = 2.0):
+    """Point the progress channel at Redis, once per process.
+
+    Web processes pass the task-store client; Celery workers connect from
+    the URL. Like the task store, reads have no socket timeout because
+    subscriptions block while they wait. Without Redis the channel stays in
+    process.
+
+    Returns:
+        The Redis client in use, or None for the in-process backend
+    """
+    client = redis_client
+    if client is None and redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_connect_timeout=connect_timeout,
+                                          health_check_interval=30)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"无法连接任务进度 Redis，进度仅在当前进程内可见: {e}")
+            client = None
+    task_progress.backend = RedisProgressBackend(client, ttl=ttl) if client is not None \
+        else MemoryProgressBackend(ttl=ttl)
+    return client
+
+
+def publish_task_progress(task, meta: Dict) -> Optional[Dict]:
+    """Publish PROGRESS ``meta`` for a bound Celery task.
+
+    Replaces ``task.update_state(state='PROGRESS', meta=meta)``: the snapshot
+    goes to the progress channel instead of the result backend.
+    """
+    task_id = getattr(task.request, 'id', None)
+    if not task_id:
+        return None
+    return task_progress.publish(task_id, 'PROGRESS', **meta)
+
+
+# Global instance
+task_progress = TaskProgress()
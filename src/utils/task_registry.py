@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Task registry
+Report generation task state and event logs in a store shared by all worker
+processes (Redis hashes and streams), with an in-process stand-in when Redis
+is not configured
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a task (state and events) is kept after its last update
+DEFAULT_TASK_TTL = 3600
+# Events returned per read
+EVENT_BATCH_SIZE = 100
+# Events kept per task; older ones are dropped first. A report_chunk carries
+# only its delta (clients rebuild the text from the replayed chunks), so the
+# log grows linearly with the report: enough for every chunk of a long report
+# at well under a hundred bytes each.
+DEFAULT_MAX_EVENTS = int(os.getenv('TASK_EVENT_LOG_MAXLEN', 10000))
+# Events kept when a finished task's log is compacted; the report_complete
+# event holds the full report text
+FINAL_EVENT_TYPES = frozenset({
+    'generation_start', 'report_complete', 'summary_complete', 'swot_complete',
+    'final_complete', 'error', 'end',
+})
+# Seconds between SSE keep-alive comments while a task is quiet
+SSE_HEARTBEAT_INTERVAL = 15
+# Seconds after the end marker before a task's log is compacted, so live
+# subscribers can drain the chunks first
+COMPACT_DELAY = 10
+
+
+class TaskStatus(Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+
+
+@dataclass
+class TaskInfo:
+    task_id: str
+    city: str
+    industry: str
+    llm_service: str
+    additional_context: str
+    status: TaskStatus
+    created_at: float
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    report_id: Optional[str] = None  # ID of the generated report after completion
+    user_id: Optional[int] = None   # User who created the task
+    paused: bool = False
+    cancelled: bool = False
+    progress: float = 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['status'] = self.status.value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TaskInfo':
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in data.items() if k in known}
+        values['status'] = TaskStatus(values.get('status', TaskStatus.PENDING.value))
+        return cls(**values)
+
+
+_STREAM_ID = re.compile(r'^\d+(-\d+)?$')
+
+
+def _decode(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class MemoryTaskStore:
+    """In-process task store; only the process that created a task can see it"""
+
+    name = 'memory'
+
+    def __init__(self, ttl: int = DEFAULT_TASK_TTL, max_events: int = DEFAULT_MAX_EVENTS):
+        self.ttl = ttl
+        self.max_events = max_events
+        self._tasks: Dict[str, Dict] = {}
+        self._touched: Dict[str, float] = {}
+        # task_id -> bounded log of (event id, event); ids keep counting up
+        # when old events are dropped
+        self._events: Dict[str, deque] = {}
+        self._last_ids: Dict[str, int] = {}
+        self._cond = threading.Condition()
+
+    def _sweep(self):
+        cutoff = time.time() - self.ttl
+        for task_id in [t for t, touched in self._touched.items() if touched < cutoff]:
+            self._drop(task_id)
+
+    def _drop(self, task_id: str) -> bool:
+        self._touched.pop(task_id, None)
+        self._events.pop(task_id, None)
+        self._last_ids.pop(task_id, None)
+        return self._tasks.pop(task_id, None) is not None
+
+    def save(self, task_id: str, state: Dict):
+        with self._cond:
+            self._sweep()
+            self._tasks[task_id] = dict(state)
+            self._events.setdefault(task_id, deque(maxlen=self.max_events))
+            self._last_ids.setdefault(task_id, 0)
+            self._touched[task_id] = time.time()
+
+    def update(self, task_id: str, changes: Dict, fetch: bool = True) -> Optional[Dict]:
+        with self._cond:
+            state = self._tasks.get(task_id)
+            if state is None:
+                return None
+            state.update(changes)
+            self._touched[task_id] = time.time()
+            # Readers waiting for events also watch the task status
+            self._cond.notify_all()
+            return dict(state)
+
+    def load(self, task_id: str) -> Optional[Dict]:
+        with self._cond:
+            state = self._tasks.get(task_id)
+            return dict(state) if state is not None else None
+
+    def list(self) -> List[Dict]:
+        with self._cond:
+            self._sweep()
+            return [dict(state) for state in self._tasks.values()]
+
+    def delete(self, task_id: str) -> bool:
+        with self._cond:
+            deleted = self._drop(task_id)
+            self._cond.notify_all()
+            return deleted
+
+    def append_event(self, task_id: str, event: Dict) -> Optional[str]:
+        with self._cond:
+            events = self._events.get(task_id)
+            if events is None:
+                return None
+            event_id = self._last_ids[task_id] + 1
+            self._last_ids[task_id] = event_id
+            events.append((event_id, event))
+            self._touched[task_id] = time.time()
+            self._cond.notify_all()
+            return str(event_id)
+
+    def read_events(self, task_id: str, after: Optional[str] = None,
+                    timeout: float = 0) -> List[Tuple[str, Dict]]:
+        try:
+            after_id = int(after or 0)
+        except ValueError:
+            after_id = 0
+
+        def available():
+            return task_id not in self._events or self._last_ids[task_id] > after_id
+
+        with self._cond:
+            if timeout:
+                self._cond.wait_for(available, timeout=timeout)
+            result = []
+            for event_id, event in self._events.get(task_id) or ():
+                if event_id > after_id:
+                    result.append((str(event_id), event))
+                    if len(result) >= EVENT_BATCH_SIZE:
+                        break
+            return result
+
+    def compact(self, task_id: str, keep_types=FINAL_EVENT_TYPES) -> int:
+        """Drop events whose type is not in ``keep_types``; returns how many were dropped."""
+        with self._cond:
+            events = self._events.get(task_id)
+            if not events:
+                return 0
+            kept = [(event_id, event) for event_id, event in events
+                    if event.get('type') in keep_types]
+            removed = len(events) - len(kept)
+            self._events[task_id] = deque(kept, maxlen=self.max_events)
+            return removed
+
+    def info(self) -> Dict:
+        with self._cond:
+            return {'backend': self.name, 'tasks': len(self._tasks)}
+
+
+class RedisTaskStore:
+    """Task store shared by every process connected to the same Redis
+
+    Each task is a hash (one JSON-encoded field per TaskInfo attribute, so
+    concurrent updates of different fields do not overwrite each other) plus
+    a stream of events capped at ``max_events`` (stream IDs serve as event
+    IDs); a sorted set indexes the tasks of the namespace by last update.
+    Keys expire ``ttl`` seconds after the last write.
+    """
+
+    name = 'redis'
+
+    def __init__(self, client, namespace: str, ttl: int = DEFAULT_TASK_TTL,
+                 prefix: str = 'tasks:', max_events: int = DEFAULT_MAX_EVENTS):
+        self.client = client
+        self.ttl = ttl
+        self.max_events = max_events
+        self.key_prefix = f"{prefix}{namespace}:"
+        self.index_key = f"{self.key_prefix}index"
+
+    def _state_key(self, task_id: str) -> str:
+        return f"{self.key_prefix}{task_id}"
+
+    def _events_key(self, task_id: str) -> str:
+        return f"{self.key_prefix}{task_id}:events"
+
+    def _sweep(self):
+        cutoff = time.time() - self.ttl
+        stale = [_decode(t) for t in self.client.zrangebyscore(self.index_key, '-inf', cutoff)]
+        for task_id in stale:
+            self.delete(task_id)
+
+    def _write(self, task_id: str, values: Dict):
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.hset(self._state_key(task_id),
+                  mapping={k: json.dumps(v, ensure_ascii=False) for k, v in values.items()})
+        pipe.expire(self._state_key(task_id), self.ttl)
+        pipe.expire(self._events_key(task_id), self.ttl)
+        pipe.zadd(self.index_key, {task_id: now})
+        pipe.execute()
+
+    def save(self, task_id: str, state: Dict):
+        self._sweep()
+        self._write(task_id, state)
+
+    def update(self, task_id: str, changes: Dict, fetch: bool = True) -> Optional[Dict]:
+        """Merge ``changes`` into a task; returns the new state (``{}`` when not
+        ``fetch``), or None if the task does not exist."""
+        if not self.client.exists(self._state_key(task_id)):
+            return None
+        self._write(task_id, changes)
+        return self.load(task_id) if fetch else {}
+
+    def load(self, task_id: str) -> Optional[Dict]:
+        raw = self.client.hgetall(self._state_key(task_id))
+        if not raw:
+            return None
+        return {_decode(k): json.loads(_decode(v)) for k, v in raw.items()}
+
+    def list(self) -> List[Dict]:
+        self._sweep()
+        task_ids = [_decode(t) for t in self.client.zrange(self.index_key, 0, -1)]
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(self._state_key(task_id))
+        states = []
+        for task_id, raw in zip(task_ids, pipe.execute()):
+            if raw:
+                states.append({_decode(k): json.loads(_decode(v)) for k, v in raw.items()})
+            else:
+                self.client.zrem(self.index_key, task_id)
+        return states
+
+    def delete(self, task_id: str) -> bool:
+        pipe = self.client.pipeline()
+        pipe.delete(self._state_key(task_id), self._events_key(task_id))
+        pipe.zrem(self.index_key, task_id)
+        deleted, _ = pipe.execute()
+        return bool(deleted)
+
+    def append_event(self, task_id: str, event: Dict) -> Optional[str]:
+        key = self._events_key(task_id)
+        pipe = self.client.pipeline()
+        pipe.xadd(key, {'event': json.dumps(event, ensure_ascii=False)},
+                  maxlen=self.max_events, approximate=True)
+        pipe.expire(key, self.ttl)
+        event_id, _ = pipe.execute()
+        return _decode(event_id)
+
+    @staticmethod
+    def _parse_entries(entries) -> List[Tuple[str, Dict]]:
+        events = []
+        for event_id, payload in entries:
+            payload = {_decode(k): v for k, v in payload.items()}
+            events.append((_decode(event_id), json.loads(_decode(payload['event']))))
+        return events
+
+    def read_events(self, task_id: str, after: Optional[str] = None,
+                    timeout: float = 0) -> List[Tuple[str, Dict]]:
+        if not after or not _STREAM_ID.match(after):
+            after = '0-0'
+        block = int(timeout * 1000) if timeout else None
+        response = self.client.xread({self._events_key(task_id): after},
+                                     count=EVENT_BATCH_SIZE, block=block)
+        events = []
+        for _, entries in response or []:
+            events.extend(self._parse_entries(entries))
+        return events
+
+    def compact(self, task_id: str, keep_types=FINAL_EVENT_TYPES) -> int:
+        key = self._events_key(task_id)
+        events = self._parse_entries(self.client.xrange(key))
+        dropped = [event_id for event_id, event in events
+                   if event.get('type') not in keep_types]
+        for i in range(0, len(dropped), 500):
+            self.client.xdel(key, *dropped[i:i + 500])
+        return len(dropped)
+
+    def info(self) -> Dict:
+        return {'backend': self.name, 'tasks': self.client.zcard(self.index_key)}
+
+
+_task_store_client = None
+_memory_stores: Dict[str, MemoryTaskStore] = {}
+_task_store_lock = threading.Lock()
+
+
+def configure_task_store(redis_url: Optional[str] = None, redis_client=None,
+                         max_connections: int = 50, connect_timeout: float = 2.0):
+    """Configure the Redis that task registries share, once at app startup.
+
+    Without a reachable Redis every process keeps its tasks in memory, which
+    is only correct with a single worker process. Reads have no socket
+    timeout because event streams block in XREAD; the pool is larger than
+    the cache pool since every open event stream holds a connection while it
+    waits.
+
+    Returns:
+        The Redis client in use, or None for the in-process store
+    """
+    global _task_store_client
+    client = redis_client
+    if client is None and redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(
+                redis_url,
+                max_connections=max_connections,
+                socket_connect_timeout=connect_timeout,
+                health_check_interval=30
+            )
+            client.ping()
+        except Exception as e:
+            logger.warning(f"无法连接任务状态 Redis，任务仅在当前进程内可见: {e}")
+            client = None
+    with _task_store_lock:
+        _task_store_client = client
+    if client is not None:
+        logger.info("任务注册表使用 Redis 共享存储")
+    return client
+
+
+def get_task_store(namespace: str, ttl: int = DEFAULT_TASK_TTL):
+    """Task store for a namespace: Redis when configured, else in-process."""
+    if _task_store_client is not None:
+        return RedisTaskStore(_task_store_client, namespace, ttl=ttl)
+    with _task_store_lock:
+        if namespace not in _memory_stores:
+            _memory_stores[namespace] = MemoryTaskStore(ttl=ttl)
+        return _memory_stores[namespace]
+
+
+def default_max_workers() -> int:
+    try:
+        return max(1, int(os.environ.get('REPORT_TASK_WORKERS', 5)))
+    except (TypeError, ValueError):
+        return 5
+
+
+class TaskManager:
+    """Background report tasks with state and events in the shared store.
+
+    Any worker process can serve status, listings and event streams of any
+    task; the task itself runs on the executor of the process that created
+    it. Subclasses implement ``_execute_task``.
+    """
+
+    def __init__(self, namespace: str, max_workers: Optional[int] = None,
+                 store=None, ttl: int = DEFAULT_TASK_TTL, compact_delay: float = COMPACT_DELAY):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.compact_delay = compact_delay
+        self._store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or default_max_workers(),
+                                            thread_name_prefix=f'{namespace}-task')
+
+    @property
+    def store(self):
+        # Resolved lazily so configure_task_store() can run after import
+        return self._store or get_task_store(self.namespace, ttl=self.ttl)
+
+    def create_task(self, city: str, industry: str, llm_service: str, additional_context: str,
+                    user_id: int = None, check_duplicate: bool = False) -> Tuple[str, bool]:
+        """Create a task and start it; returns (task ID, is_new).
+
+        With ``check_duplicate`` an unfinished task for the same city and
+        industry is returned instead of starting a new one.
+        """
+        if check_duplicate:
+            for task in self.get_all_tasks():
+                if (task.city == city and task.industry == industry and
+                        task.status in (TaskStatus.PENDING, TaskStatus.PROCESSING) and
+                        not task.cancelled):
+                    return task.task_id, False
+
+        task_id = str(uuid.uuid4())
+        task = TaskInfo(
+            task_id=task_id,
+            city=city,
+            industry=industry,
+            llm_service=llm_service,
+            additional_context=additional_context,
+            status=TaskStatus.PENDING,
+            created_at=time.time(),
+            user_id=user_id
+        )
+        self.store.save(task_id, task.to_dict())
+        self._executor.submit(self._run, task_id)
+        return task_id, True
+
+    def _run(self, task_id: str):
+        try:
+            self._execute_task(task_id)
+        except Exception as e:
+            logger.error(f"Task {task_id} crashed: {e}")
+            self.update_task(task_id, status=TaskStatus.FAILED, error=str(e))
+            self.send_event(task_id, 'end', {})
+
+    def _execute_task(self, task_id: str):
+        raise NotImplementedError
+
+    def update_task(self, task_id: str, **changes) -> Optional[TaskInfo]:
+        """Update some fields of a task; returns the new state or None if it is gone."""
+        if isinstance(changes.get('status'), TaskStatus):
+            changes['status'] = changes['status'].value
+        state = self.store.update(task_id, changes)
+        return TaskInfo.from_dict(state) if state is not None else None
+
+    def get_task_info(self, task_id: str) -> Optional[TaskInfo]:
+        """Get task information"""
+        state = self.store.load(task_id)
+        return TaskInfo.from_dict(state) if state is not None else None
+
+    def get_all_tasks(self, user_id: int = None) -> List[TaskInfo]:
+        """Get all tasks, optionally filtered by user, oldest first"""
+        tasks = [TaskInfo.from_dict(state) for state in self.store.list()]
+        if user_id:
+            tasks = [task for task in tasks if task.user_id == user_id]
+        return sorted(tasks, key=lambda task: task.created_at)
+
+    def delete_task(self, task_id: str) -> bool:
+        """Delete a task and its events"""
+        return self.store.delete(task_id)
+
+    def send_event(self, task_id: str, event_type: str, data: dict) -> Optional[str]:
+        """Append an event to the task's log and track its progress.
+
+        ``compact_delay`` seconds after the ``end`` marker the log is compacted
+        down to the final events, so a finished task only keeps its report,
+        not every streamed chunk.
+
+        Returns:
+            The event ID, or None if the task no longer exists
+        """
+        event_id = self.store.append_event(task_id, {
+            'type': event_type,
+            'data': data,
+            'timestamp': time.time()
+        })
+        if event_type == 'end':
+            if self.compact_delay:
+                timer = threading.Timer(self.compact_delay, self._compact, args=(task_id,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._compact(task_id)
+            return event_id
+
+        if event_type == 'report_chunk':
+            progress = min(95.0, float(data.get('chunk_index', 0)) * 2.0)
+        elif event_type in ('report_complete', 'final_complete'):
+            progress = 100.0
+        else:
+            return event_id
+        self.store.update(task_id, {'progress': progress}, fetch=False)
+        return event_id
+
+    def _compact(self, task_id: str):
+        task = self.get_task_info(task_id)
+        if task is None:
+            return
+        # Without a report_complete event the chunks are the only output there
+        # is; they add up to no more than the report itself
+        keep_types = FINAL_EVENT_TYPES if task.status == TaskStatus.COMPLETED \
+            else FINAL_EVENT_TYPES | {'report_chunk'}
+        try:
+            self.store.compact(task_id, keep_types)
+        except Exception as e:
+            logger.warning(f"Compacting events of task {task_id} failed: {e}")
+
+    def _read_events(self, task_id: str, after: Optional[str],
+                     timeout: float) -> Iterator[Optional[Tuple[str, Dict]]]:
+        """(event_id, event) pairs after ``after`` until the end marker; None
+        after every ``timeout`` seconds without events."""
+        cursor = after
+        while True:
+            events = self.store.read_events(task_id, after=cursor, timeout=timeout)
+            if not events:
+                task_info = self.get_task_info(task_id)
+                if task_info is None or task_info.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                    return
+                yield None
+                continue
+            for cursor, event in events:
+                if event.get('type') == 'end':
+                    return
+                yield cursor, event
+
+    def iter_events(self, task_id: str, after: Optional[str] = None,
+                    timeout: float = 30) -> Iterator[Tuple[str, Dict]]:
+        """(event_id, event) pairs of a task until its end marker.
+
+        Reading does not consume events, so any number of subscribers (in any
+        process) see the same sequence; ``after`` resumes behind an event ID a
+        subscriber already received. Stops when the task is gone, or finished
+        without further events.
+        """
+        for item in self._read_events(task_id, after, timeout):
+            if item is not None:
+                yield item
+
+    def sse_stream(self, task_id: str, after: Optional[str] = None,
+                   heartbeat: float = SSE_HEARTBEAT_INTERVAL) -> Iterator[str]:
+        """The task's events as Server-Sent Events with ``id:`` lines.
+
+        Browsers send the last ``id`` back as ``Last-Event-ID`` on reconnect;
+        pass it as ``after`` to resume. Emits a comment line every
+        ``heartbeat`` seconds without events so proxies keep the connection.
+        """
+        for item in self._read_events(task_id, after, heartbeat):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_id, event = item
+            yield f"id: {event_id}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -0,0 +1,155 @@
+import pytest
+
+from src.utils.api_error_handler import (APIErrorHandler, APIErrorType, APIService, CircuitBreaker,
+                                         CircuitOpenError, CircuitState, ErrorHistory)
+from src.utils.llm_rate_limiter import RateLimitTimeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_breaker(clock):
+    return CircuitBreaker('kimi', window=60, min_calls=4, failure_rate=0.5, slow_call_seconds=10,
+                          open_seconds=30, max_open_seconds=120, clock=clock)
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = make_breaker(clock)
+    breaker.record_success(1.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    # Below the minimum number of calls
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    clock.now += 30
+    assert breaker.available()
+    assert breaker.allow_request()
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN and breaker.retry_in() == 60
+
+    clock.now += 60
+    assert breaker.allow_request()
+    breaker.record_success(2.0)
+    assert breaker.state == CircuitState.CLOSED
+    # The window restarts, so one more failure does not reopen it
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_slow_calls_and_old_calls(clock):
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    # Failures older than the window no longer count
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.snapshot()['calls'] == 1
+
+    for _ in range(3):
+        breaker.record_success(12.0)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_quota_errors_open_the_circuit_at_once(clock):
+    handler = APIErrorHandler(clock=clock)
+    handler.detect_error_type(Exception("Quota exceeded for this month"), APIService.KIMI)
+    assert handler.breaker_state(APIService.KIMI) == CircuitState.OPEN
+    assert handler.circuit_breakers[APIService.KIMI].retry_in() == pytest.approx(300)
+    # Classifying an error again does not record it
+    handler.is_connection_issue(APIService.GEMINI, Exception("Connection timeout"))
+    assert handler.breaker_state(APIService.GEMINI) == CircuitState.CLOSED
+    assert len(handler.error_history) == 1
+
+
+class StatusError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_rate_limits_and_local_errors_do_not_trip(clock):
+    handler = APIErrorHandler(clock=clock)
+    error = handler.detect_error_type(StatusError("Error code: 429 - rate limit exceeded", 429), APIService.KIMI)
+    assert error.error_type == APIErrorType.RATE_LIMITED
+    error = handler.detect_error_type(Exception("Quota exceeded for requests per minute"), APIService.GEMINI)
+    assert error.error_type == APIErrorType.RATE_LIMITED
+    assert handler.breaker_state(APIService.KIMI) == CircuitState.CLOSED
+    assert handler.breaker_state(APIService.GEMINI) == CircuitState.CLOSED
+
+    # Queueing for the rate limiter never reached the provider
+    for _ in range(6):
+        handler.detect_error_type(RateLimitTimeout("too many requests queued"), APIService.KIMI)
+    assert handler.breaker_state(APIService.KIMI) == CircuitState.CLOSED
+    assert handler.circuit_breakers[APIService.KIMI].snapshot()['calls'] == 1
+
+    error = handler.detect_error_type(
+        StatusError("Your account has insufficient balance", 429), APIService.KIMI)
+    assert error.error_type == APIErrorType.QUOTA_EXCEEDED
+    assert handler.breaker_state(APIService.KIMI) == CircuitState.OPEN
+
+
+def test_fallback_order_follows_live_health(clock):
+    handler = APIErrorHandler(clock=clock)
+    services = [APIService.KIMI, APIService.GEMINI, APIService.DOUBAO]
+    assert handler.order_services(services) == services
+    assert handler.get_fallback_service(APIService.GEMINI, services) == APIService.KIMI
+
+    handler.record_success(APIService.GEMINI, 3.0)
+    handler.record_success(APIService.DOUBAO, 1.0)
+    handler.record_success(APIService.KIMI, 1.0)
+    handler.record_failure(APIService.KIMI, APIErrorType.CONNECTION_TIMEOUT)
+    # Kimi is still preferred while its circuit is closed
+    assert handler.order_services(services, preferred=APIService.KIMI)[0] == APIService.KIMI
+    assert handler.get_fallback_service(APIService.GEMINI, services) == APIService.DOUBAO
+
+    for _ in range(3):
+        handler.record_failure(APIService.KIMI, APIErrorType.SERVICE_UNAVAILABLE)
+    assert handler.order_services(services, preferred=APIService.KIMI) == [APIService.DOUBAO, APIService.GEMINI]
+    assert handler.get_fallback_service(APIService.GEMINI, [APIService.KIMI, APIService.GEMINI]) is None
+
+    error = handler.circuit_open_error([APIService.KIMI])
+    assert isinstance(error, CircuitOpenError) and error.retry_after == 31
+    api_error = handler.detect_error_type(error, APIService.KIMI)
+    assert api_error.error_type == APIErrorType.SERVICE_UNAVAILABLE and api_error.retry_after == 31
+
+
+def test_error_history_is_bounded_with_running_counts():
+    history = ErrorHistory(capacity=5, window=3)
+    handler = APIErrorHandler()
+    handler.error_history = history
+    for i in range(7):
+        service = APIService.GEMINI if i % 2 else APIService.KIMI
+        handler.detect_error_type(Exception(f"Connection timeout {i}"), service)
+
+    assert len(history) == 5 and history.total == 7
+    assert [e.message[-1] for e in history[-5:]] == list('23456')
+    assert history[0].message.endswith('2') and history[-1].message.endswith('6')
+
+    summary = handler.get_error_summary()
+    assert summary['total_errors'] == 7 and summary['recent_errors'] == 3
+    assert summary['error_types'] == {'connection_timeout': 3}
+    assert summary['affected_services'] == {'kimi': 2, 'gemini': 1}
+    assert summary['last_error']['service'] == 'kimi'
+
+    # Reporting the same exception again up the stack is not a new error
+    handler.detect_error_type(history[-1].original_error, APIService.KIMI)
+    assert history.total == 7
+
+    handler.clear_error_history()
+    assert handler.get_error_summary() == {"status": "ok", "message": "No recent errors"}
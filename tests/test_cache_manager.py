@@ -0,0 +1,218 @@
+import asyncio
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import fakeredis
+
+from src.utils.cache_backends import DiskCacheBackend, configure_cache_backends
+from src.utils.performance_optimizer import CacheManager, cached, make_cache_key
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), max_memory_items=2, sweep_interval=0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # a becomes most recently used
+    cache.set('c', 3)
+
+    assert list(cache.memory_cache.keys()) == ['a', 'c']
+    assert cache.stats['memory_evictions'] == 1
+    # Evicted from memory but still served from disk
+    assert cache.get('b') == 2
+    assert cache.stats['disk_hits'] == 1
+
+
+def test_disk_tier_is_size_capped(tmp_path):
+    blob_size = DiskCacheBackend.HEADER.size + len(pickle.dumps(('x' * 1000, time.time())))
+    cache = CacheManager(cache_dir=str(tmp_path), max_disk_bytes=blob_size * 3, sweep_interval=0)
+    for i in range(5):
+        cache.set(f'k{i}', 'x' * 1000, use_memory=False)
+
+    info = cache.get_cache_info()
+    assert info['file_cached_items'] == 3
+    assert info['disk_evictions'] == 2
+    assert len(list(tmp_path.glob('*.cache'))) == 3
+    assert cache.get('k0', use_memory=False) is None
+    assert cache.get('k4', use_memory=False) == 'x' * 1000
+
+
+def test_expiry_sweep_and_per_entry_ttl(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), ttl=3600, sweep_interval=0)
+    cache.set('short', 'v', ttl=0)
+    cache.set('long', 'v')
+    time.sleep(0.01)
+
+    assert cache.sweep_expired() == 2  # memory and disk entries of 'short'
+    assert cache.get('short') is None
+    assert cache.get('long') == 'v'
+    assert len(list(tmp_path.glob('*.cache'))) == 1
+
+
+def test_custom_ttl_survives_restart(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), ttl=1, sweep_interval=0)
+    cache.set('long', 'v', ttl=3600)
+    cache.set('default', 'v')
+
+    # The rebuilt index reads each entry's own expiry back
+    reopened = CacheManager(cache_dir=str(tmp_path), ttl=1, sweep_interval=0)
+    assert reopened._disk.sweep_expired(time.time() + 10) == 1
+    assert reopened.get('long', use_memory=False) == 'v'
+    assert reopened.get('default', use_memory=False) is None
+
+
+def test_namespaces_are_isolated_and_index_survives_restart(tmp_path):
+    default = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+    search = CacheManager(cache_dir=str(tmp_path), namespace='policy_search', sweep_interval=0)
+    default.set('key', 'default')
+    search.set('key', 'search')
+
+    assert default.get('key', use_memory=False) == 'default'
+    assert search.get('key', use_memory=False) == 'search'
+    search.clear()
+    assert default.get('key', use_memory=False) == 'default'
+
+    reopened = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+    assert reopened.get_cache_info()['file_cached_items'] == 1
+    assert reopened.get('key') == 'default'
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_cached_keys_are_canonical(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+    calls = []
+
+    @dataclass
+    class Query:
+        city: str
+        tags: list
+
+    class Analyzer:
+        @cached(ttl=60, cache=cache)
+        def analyze(self, query, options=None):
+            calls.append(query)
+            return {'city': query.city}
+
+    first = Analyzer().analyze(Query('成都', ['a']), options={'x': 1, 'y': [1, 2]})
+    # New instance (different repr) and reordered dict hit the same entry
+    second = Analyzer().analyze(Query('成都', ['a']), options={'y': [1, 2], 'x': 1})
+    assert first == second == {'city': '成都'}
+    assert len(calls) == 1
+
+    Analyzer().analyze(Query('成都', ['b']))
+    assert len(calls) == 2
+    assert make_cache_key({'a': 1, 'b': 2}) == make_cache_key({'b': 2, 'a': 1})
+    assert make_cache_key([1, 2]) != make_cache_key((1, 2))
+
+
+def test_cached_namespaces_share_one_cache(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+
+    @cached(cache=cache)
+    def one(x):
+        return 'one'
+
+    @cached(cache=cache)
+    def two(x):
+        return 'two'
+
+    assert one(1) == 'one' and two(1) == 'two'
+    assert one.cache_key(1) != two.cache_key(1)
+    one.invalidate(1)
+    assert cache.get(one.cache_key(1)) is None
+    assert cache.get(two.cache_key(1)) == 'two'
+
+
+def test_cached_single_flight(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+    calls = []
+
+    @cached(cache=cache)
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(slow, [21] * 8))
+
+    assert results == [42] * 8
+    assert calls == [21]
+
+
+def test_cached_async_single_flight(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+    calls = []
+
+    @cached(cache=cache)
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return {'value': x}
+
+    async def main():
+        return await asyncio.gather(*(fetch(7) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{'value': 7}] * 5
+    assert asyncio.run(fetch(7)) == {'value': 7}
+    assert calls == [7]
+
+
+def test_redis_tier_shares_entries_between_workers(tmp_path):
+    server = fakeredis.FakeServer()
+    worker_a = CacheManager(cache_dir=str(tmp_path / 'a'), namespace='policy_search',
+                            redis_client=fakeredis.FakeRedis(server=server), sweep_interval=0)
+    worker_b = CacheManager(cache_dir=str(tmp_path / 'b'), namespace='policy_search',
+                            redis_client=fakeredis.FakeRedis(server=server), sweep_interval=0)
+
+    worker_a.set('q', {'policies': [1, 2]})
+    assert worker_b.get('q') == {'policies': [1, 2]}
+    assert worker_b.stats['redis_hits'] == 1
+    # Backfilled into worker b's memory tier
+    assert worker_b.get('q') == {'policies': [1, 2]}
+    assert worker_b.stats['memory_hits'] == 1
+    assert worker_b.get_cache_info()['backends'] == ['memory', 'redis', 'disk']
+
+    worker_a.clear()
+    assert worker_b.get('q', use_memory=False) is None
+
+
+def test_configured_redis_is_used_and_failures_fall_back(tmp_path):
+    class BrokenRedis:
+        def get(self, key):
+            raise ConnectionError('down')
+
+        set = delete = get
+
+    client = fakeredis.FakeRedis()
+    try:
+        configure_cache_backends(redis_client=client)
+        cache = CacheManager(cache_dir=str(tmp_path), sweep_interval=0)
+        cache.set('k', 'v')
+        assert len(client.keys('cache:default:*')) == 1
+    finally:
+        configure_cache_backends()
+    assert 'redis' not in CacheManager(cache_dir=str(tmp_path), sweep_interval=0).get_cache_info()['backends']
+
+    broken = CacheManager(cache_dir=str(tmp_path / 'broken'), redis_client=BrokenRedis(), sweep_interval=0)
+    broken.set('k', 'v')
+    assert broken.get('k', use_memory=False) == 'v'
+    assert broken.get_cache_info()['redis_available'] is False
+
+
+def test_counters_are_shared_between_workers(tmp_path):
+    # Two workers with their own memory tiers over the same disk
+    workers = [CacheManager(cache_dir=str(tmp_path), sweep_interval=0) for _ in range(2)]
+    workers[0].set('clicks', {'count': 3})  # old {'count': n} entries keep counting
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: workers[i % 2].increment('clicks'), range(40)))
+    assert workers[0].get_counter('clicks') == workers[1].get_counter('clicks') == 43
+
+    # With Redis, counting continues from the disk value
+    server = fakeredis.FakeServer()
+    shared = [CacheManager(cache_dir=str(tmp_path), redis_client=fakeredis.FakeRedis(server=server),
+                           sweep_interval=0) for _ in range(2)]
+    assert shared[0].increment('clicks') == 44
+    assert shared[1].increment('clicks', 2) == 46
+    assert shared[0].get_counter('clicks') == 46
@@ -0,0 +1,43 @@
+from src.tasks import (celery_app, fetch_wechat_articles_task, generate_llm_report_task,
+                       ingest_email_policies_task, precompute_report_analyses_task)
+from src.tasks.celery_app import (QUEUE_SETTINGS, QueueRateLimits, queue_for_task, queue_setting,
+                                  worker_options)
+
+
+def _routed_queue(task_name):
+    return celery_app.amqp.router.route({}, task_name)['queue'].name
+
+
+def test_tasks_are_routed_to_named_queues():
+    assert _routed_queue(generate_llm_report_task.name) == 'llm'
+    # Post-report analysis warm-up does not hold an llm slot
+    assert _routed_queue(precompute_report_analyses_task.name) == 'analysis'
+    assert _routed_queue(fetch_wechat_articles_task.name) == 'scrape'
+    assert _routed_queue(ingest_email_policies_task.name) == 'scrape'
+    # Anything unrouted lands on the short-job queue, not behind LLM reports
+    assert _routed_queue('src.tasks.analysis_tasks.anything') == 'analysis'
+    assert {q.name for q in celery_app.conf.task_queues} == set(QUEUE_SETTINGS)
+
+
+def test_long_jobs_are_acked_late_and_prefetch_one():
+    assert generate_llm_report_task.acks_late is True
+    assert celery_app.conf.worker_prefetch_multiplier == 1
+    assert celery_app.conf.broker_transport_options['visibility_timeout'] > celery_app.conf.task_time_limit
+
+
+def test_queue_rate_limits_and_overrides(monkeypatch):
+    assert generate_llm_report_task.rate_limit == QUEUE_SETTINGS['llm']['rate_limit']
+    assert fetch_wechat_articles_task.rate_limit == QUEUE_SETTINGS['scrape']['rate_limit']
+
+    class Task:
+        name = 'src.tasks.analysis_tasks.quick'
+    assert QueueRateLimits().annotate(Task) is None
+
+    monkeypatch.setenv('CELERY_LLM_CONCURRENCY', '6')
+    monkeypatch.setenv('CELERY_LLM_RATE_LIMIT', '')
+    monkeypatch.setenv('CELERY_ANALYSIS_PREFETCH', 'lots')
+    assert queue_setting('llm', 'concurrency') == 6
+    assert queue_setting('llm', 'rate_limit') is None
+    assert queue_setting('analysis', 'prefetch') == QUEUE_SETTINGS['analysis']['prefetch']
+    assert worker_options('llm') == ['-Q', 'llm', '-n', 'llm@%h', '-c', '6', '--prefetch-multiplier', '1']
+    assert queue_for_task('generate_llm_report') == 'llm'
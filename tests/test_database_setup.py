@@ -0,0 +1,57 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from src.utils.database_setup import configure_database, ensure_indexes, sqlite_engine_options
+
+
+def _make_app(db_path):
+    app = Flask(__name__)
+    uri = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(uri, pool_size=3)
+    db = SQLAlchemy(app)
+    configure_database(app, db)
+    return app, db
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_BUSY_TIMEOUT_MS', '1234')
+    app, db = _make_app(tmp_path / 'test.db')
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.engine.pool.size() == 3
+
+
+def test_ensure_indexes_adds_missing_indexes_to_existing_tables(tmp_path):
+    db_path = tmp_path / 'legacy.db'
+    app, db = _make_app(db_path)
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, owner INTEGER, created_at DATETIME)'))
+
+    class Item(db.Model):
+        __tablename__ = 'item'
+        __table_args__ = (db.Index('ix_item_owner_created', 'owner', 'created_at'),)
+        id = db.Column(db.Integer, primary_key=True)
+        owner = db.Column(db.Integer)
+        created_at = db.Column(db.DateTime)
+
+    with app.app_context():
+        assert ensure_indexes(db) == ['ix_item_owner_created']
+        assert ensure_indexes(db) == []
+        with db.engine.connect() as conn:
+            plan = conn.execute(text(
+                'EXPLAIN QUERY PLAN SELECT id FROM item WHERE owner = 1 ORDER BY created_at DESC'
+            )).fetchall()
+        assert any('ix_item_owner_created' in row[-1] for row in plan)
+
+
+def test_memory_uri_keeps_default_pool():
+    assert sqlite_engine_options('sqlite://') == {}
+    assert sqlite_engine_options('sqlite:///x.db', pool_size=2)['connect_args']['check_same_thread'] is False
@@ -0,0 +1,174 @@
+import threading
+import time
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+from src.tasks.email_policy_tasks import (collect_email_urls, ingest_policy_urls,
+                                          normalize_policy_url)
+
+
+def _make_db(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'policies.db'}"
+    db = SQLAlchemy(app)
+
+    class Policy(db.Model):
+        __tablename__ = 'policy_analysis'
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(500), nullable=False)
+        original_url = db.Column(db.String(500), index=True)
+        source_type = db.Column(db.String(50))
+        content = db.Column(db.Text)
+        content_summary = db.Column(db.Text)
+        analysis_result = db.Column(db.JSON)
+        classification_region = db.Column(db.String(100))
+        classification_industry = db.Column(db.String(200))
+        classification_year = db.Column(db.Integer)
+        classification_policy_type = db.Column(db.String(100))
+        applicability_score = db.Column(db.Float)
+        entities = db.Column(db.JSON)
+        knowledge_graph = db.Column(db.JSON)
+        llm_interpretation = db.Column(db.JSON)
+        status = db.Column(db.String(50))
+        tags = db.Column(db.String(500))
+
+    return app, db, Policy
+
+
+def _analysis(url):
+    return {
+        'success': True, 'url': url, 'title': f'政策 {url}', 'content': '正文',
+        'classification': {'region': ['成都'], 'industry': ['电子信息'], 'year': 2024,
+                           'policy_type': '补贴'},
+        'policy_analysis': {'applicability': {'score': 80}}
+    }
+
+
+def test_normalize_policy_url():
+    assert normalize_policy_url('HTTPS://Www.Gov.cn:443/zhengce/a.html/?b=2&a=1&utm_source=x#top') \
+        == 'https://www.gov.cn/zhengce/a.html?a=1&b=2'
+    assert normalize_policy_url('http://gov.cn/') == 'http://gov.cn'
+    assert normalize_policy_url('http://gov.cn:8080/p?scene=1') == 'http://gov.cn:8080/p'
+    assert normalize_policy_url('https://mp.weixin.qq.com/s/abc).') == 'https://mp.weixin.qq.com/s/abc'
+    assert normalize_policy_url('mailto:a@b.cn') is None
+    assert normalize_policy_url('') is None
+
+
+def test_collect_email_urls_deduplicates_across_emails():
+    emails = [
+        {'id': b'1', 'urls': ['https://gov.cn/p1?utm_medium=email', 'https://gov.cn/p2']},
+        {'id': b'2', 'urls': ['https://GOV.cn/p1', 'ftp://gov.cn/file', 'https://gov.cn/p3#x']},
+    ]
+    urls, dropped = collect_email_urls(emails)
+    assert urls == ['https://gov.cn/p1', 'https://gov.cn/p2', 'https://gov.cn/p3']
+    assert dropped == 2
+
+
+def test_ingest_skips_known_urls_and_commits_in_batches(tmp_path):
+    app, db, Policy = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Policy(title='已有', original_url='https://gov.cn/p0', status='completed'))
+        db.session.commit()
+
+        commits = []
+        event.listen(db.session, 'after_commit', lambda session: commits.append(1))
+        analyzed = []
+        lock = threading.Lock()
+
+        def analyze(url):
+            with lock:
+                analyzed.append(url)
+            return _analysis(url)
+
+        emails = [
+            {'id': b'1', 'urls': [f'https://gov.cn/p{i}' for i in range(5)]},
+            {'id': b'2', 'urls': [f'https://gov.cn/p{i}/?utm_source=wx' for i in range(3, 8)]},
+        ]
+        counts = ingest_policy_urls(db.session, Policy, emails, analyze=analyze,
+                                    max_workers=3, batch_size=3)
+
+        assert counts == {'urls': 8, 'duplicates': 2, 'known': 1, 'added': 7,
+                          'retried': 0, 'failed': 0}
+        assert sorted(analyzed) == [f'https://gov.cn/p{i}' for i in range(1, 8)]
+        # 7 rows in batches of 3
+        assert len(commits) == 3
+        stored = Policy.query.filter(Policy.original_url == 'https://gov.cn/p4').one()
+        assert stored.classification_region == '成都' and stored.tags == '成都,电子信息'
+        assert Policy.query.count() == 8
+
+        # The same newsletter next week adds nothing and analyzes nothing
+        analyzed.clear()
+        counts = ingest_policy_urls(db.session, Policy, emails, analyze=analyze)
+        assert counts['known'] == 8 and counts['added'] == 0
+        assert analyzed == []
+
+
+def test_ingest_records_failures_and_retries_them_in_place(tmp_path):
+    app, db, Policy = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        emails = [{'id': b'1', 'urls': ['https://gov.cn/ok', 'https://gov.cn/down', 'https://gov.cn/bad']}]
+
+        def flaky(url):
+            if url.endswith('down'):
+                raise ConnectionError('timeout')
+            if url.endswith('bad'):
+                return {'success': False, 'error': 'no content'}
+            return _analysis(url)
+
+        counts = ingest_policy_urls(db.session, Policy, emails, analyze=flaky)
+        assert (counts['added'], counts['failed']) == (1, 2)
+        failed = Policy.query.filter_by(original_url='https://gov.cn/down').one()
+        assert failed.status == 'failed' and 'timeout' in failed.content_summary
+
+        counts = ingest_policy_urls(db.session, Policy, emails, analyze=_analysis)
+        assert counts['known'] == 1 and counts['retried'] == 2
+        assert Policy.query.count() == 3
+        assert db.session.get(Policy, failed.id).status == 'completed'
+
+
+def test_ingest_runs_analyses_concurrently(tmp_path):
+    app, db, Policy = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+
+        def slow(url):
+            time.sleep(0.2)
+            return _analysis(url)
+
+        emails = [{'id': b'1', 'urls': [f'https://gov.cn/p{i}' for i in range(4)]}]
+        started = time.monotonic()
+        counts = ingest_policy_urls(db.session, Policy, emails, analyze=slow, max_workers=4)
+        assert counts['added'] == 4
+        assert time.monotonic() - started < 0.6
+
+
+def test_task_publishes_progress_snapshots(tmp_path, monkeypatch):
+    from src.tasks import email_policy_tasks
+    from src.utils import email_reader
+
+    app, db, Policy = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+
+    class Reader:
+        def get_unread_emails_with_urls(self):
+            return [{'urls': ['https://gov.cn/a', 'https://gov.cn/b']}]
+
+    published = []
+    monkeypatch.setattr(email_reader, 'EmailReader', Reader)
+    monkeypatch.setattr(email_policy_tasks, 'get_app', lambda: app)
+    monkeypatch.setattr(email_policy_tasks, 'get_db', lambda: db)
+    monkeypatch.setattr(email_policy_tasks, 'get_PolicyAnalysis', lambda: Policy)
+    monkeypatch.setattr(email_policy_tasks, '_integrator_analyzer', lambda: _analysis)
+    monkeypatch.setattr(email_policy_tasks, 'publish_task_progress',
+                        lambda task, meta: published.append(meta))
+
+    result = email_policy_tasks.ingest_email_policies_task.apply().get()
+
+    assert result['success'] and result['new_policies'] == 2
+    assert [meta['stage'] for meta in published] == ['email', 'analysis', 'analysis']
+    assert published[-1]['current'] == published[-1]['total'] == 2
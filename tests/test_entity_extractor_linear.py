@@ -0,0 +1,78 @@
+import random
+import re
+import time
+
+from src.analysis.entity_extractor import EntityExtractor
+
+
+def _legacy_companies(extractor, text):
+    companies, seen = [], set()
+    for suffix in extractor.company_suffixes:
+        for match in re.finditer(r'[一-龥]{2,20}' + suffix, text):
+            company = match.group()
+            if company not in seen and len(company) >= 4:
+                seen.add(company)
+                companies.append({'name': company, 'type': 'company',
+                                  'position': match.start(), 'confidence': 0.9})
+    for company in extractor.famous_companies:
+        if company in text and company not in seen:
+            seen.add(company)
+            companies.append({'name': company, 'type': 'company',
+                              'position': text.find(company), 'confidence': 1.0})
+    return sorted(companies, key=lambda x: x['position'])
+
+
+def _legacy_products(extractor, text):
+    products, seen = [], set()
+    for tech in extractor.tech_keywords:
+        for prod in extractor.product_keywords:
+            for match in re.finditer(tech + '.*?' + prod, text):
+                product = match.group()
+                if product not in seen and len(product) <= 30:
+                    seen.add(product)
+                    products.append({'name': product, 'type': 'product', 'confidence': 0.7})
+    return products
+
+
+def _make_report(extractor, length, seed=7):
+    rng = random.Random(seed)
+    vocabulary = (
+        extractor.company_suffixes + extractor.tech_keywords + extractor.product_keywords +
+        extractor.famous_companies + ['成都', '高新区', '发展', '产业', '建设', '推动',
+                                      '，', '。', ' ', '\n', 'abc', '2025年']
+    )
+    parts, size = [], 0
+    while size < length:
+        word = rng.choice(vocabulary)
+        parts.append(word)
+        size += len(word)
+    return ''.join(parts)[:length]
+
+
+def test_linear_extractor_matches_regex_output():
+    extractor = EntityExtractor()
+    for seed in range(5):
+        text = _make_report(extractor, 5000, seed)
+        assert extractor._extract_companies(text) == _legacy_companies(extractor, text)
+        assert extractor._extract_products(text) == _legacy_products(extractor, text)
+
+
+def test_product_and_company_extraction_scales_linearly():
+    """Regression benchmark: 4x the text must not cost much more than 4x the time."""
+    extractor = EntityExtractor()
+
+    def timed(text):
+        best = float('inf')
+        for _ in range(3):
+            started = time.perf_counter()
+            hits = extractor._scan_keyword_hits(text)
+            extractor._extract_companies(text, hits)
+            extractor._extract_products(text, hits)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    small = timed(_make_report(extractor, 25_000))
+    large = timed(_make_report(extractor, 100_000))
+
+    assert large < 2.0
+    assert large / small < 8
@@ -0,0 +1,147 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from src.utils.fulltext_index import FullTextIndex, build_match_query, ensure_fulltext_indexes
+
+
+def _make_db(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'fts.db'}"
+    db = SQLAlchemy(app)
+
+    class Policy(db.Model):
+        __tablename__ = 'policy'
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(200))
+        content = db.Column(db.Text)
+
+    index = FullTextIndex('policy_fts', 'policy', ['title', 'content'], weights=[5.0, 1.0])
+    index.watch(Policy)
+    return app, db, Policy, index
+
+
+def test_index_is_backfilled_and_maintained_incrementally(tmp_path):
+    app, db, Policy, index = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Policy(title='关于支持人工智能产业发展的若干政策', content='加快算力基础设施建设'))
+        db.session.commit()
+
+        with db.engine.begin() as conn:
+            assert index.create(conn)  # backfills the existing row
+            assert not index.create(conn)
+
+        db.session.add(Policy(title='新能源汽车补贴', content='支持人工智能在汽车领域应用'))
+        db.session.commit()
+
+        conn = db.session.connection()
+        hits = index.search(conn, '人工智能')
+        assert [hit['id'] for hit in hits] == [1, 2]  # title match ranks first
+        assert hits[0]['highlights']['title'] == '关于支持<mark>人工智能</mark>产业发展的若干政策'
+        assert '<mark>人工智能</mark>' in hits[1]['highlights']['content']
+
+        policy = db.session.get(Policy, 2)
+        policy.content = '支持<b>新能源</b>电池回收'
+        db.session.commit()
+        assert [hit['id'] for hit in index.search(db.session.connection(), '人工智能')] == [1]
+        snippet = index.search(db.session.connection(), '电池')[0]['highlights']['content']
+        assert '&lt;b&gt;' in snippet and '<mark>电池</mark>' in snippet
+
+        db.session.delete(db.session.get(Policy, 1))
+        db.session.commit()
+        assert index.search(db.session.connection(), '人工智能') == []
+
+
+def test_match_subquery_joins_with_filters(tmp_path):
+    app, db, Policy, index = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            index.create(conn)
+        db.session.add_all([
+            Policy(title='人工智能', content='成都'),
+            Policy(title='集成电路', content='人工智能芯片'),
+            Policy(title='生物医药', content='创新药'),
+        ])
+        db.session.commit()
+
+        hits = index.match_subquery(build_match_query('人工智能 芯片', any_term=True))
+        rows = Policy.query.join(hits, hits.c.rowid == Policy.id).order_by(hits.c.rank).all()
+        assert sorted(p.id for p in rows) == [1, 2]
+        assert Policy.query.join(hits, hits.c.rowid == Policy.id).filter(Policy.id > 1).count() == 1
+
+
+def test_sub_words_of_indexed_words_are_found(tmp_path):
+    app, db, Policy, index = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            index.create(conn)
+        db.session.add_all([
+            Policy(title='关于支持人工智能产业发展的若干政策', content='中华人民共和国新能源汽车'),
+            Policy(title='生物医药', content='智能制造'),
+        ])
+        db.session.commit()
+
+        conn = db.session.connection()
+        assert sorted(hit['id'] for hit in index.search(conn, '智能')) == [1, 2]
+        assert [hit['id'] for hit in index.search(conn, '人工智能')] == [1]
+        assert [hit['id'] for hit in index.search(conn, '能源')] == [1]
+        assert [hit['id'] for hit in index.search(conn, '新能源')] == [1]
+        highlights = {hit['id']: hit['highlights'] for hit in index.search(conn, '智能')}
+        assert highlights[1]['title'] == '关于支持人工<mark>智能</mark>产业发展的若干政策'
+
+
+def test_queries_starting_inside_an_indexed_word(tmp_path):
+    app, db, Policy, index = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            index.create(conn)
+        db.session.add_all([
+            Policy(title='智能网联汽车示范区建设方案', content='支持AI芯片研发'),
+            Policy(title='高新技术企业认定', content='税收优惠'),
+        ])
+        db.session.commit()
+
+        conn = db.session.connection()
+        for query, expected in [('网联汽车', [1]), ('联汽', [1]), ('新技术', [2]), ('技术企', [2]),
+                                ('车', [1]), ('AI芯', [1]), ('芯片研发', [1]), ('网联 税收', [])]:
+            assert [hit['id'] for hit in index.search(conn, query)] == expected, query
+        assert sorted(hit['id'] for hit in index.search(conn, '网联 税收', any_term=True)) == [1, 2]
+        # Word matches still rank and highlight as before
+        assert index.search(conn, '汽车')[0]['highlights']['title'] == '智能网联<mark>汽车</mark>示范区建设方案'
+
+
+def test_outdated_index_is_rebuilt(tmp_path):
+    app, db, Policy, index = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Policy(title='智能网联汽车', content=''))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE VIRTUAL TABLE policy_fts USING fts5(title, content)")
+            assert index.create(conn)
+            assert not index.create(conn)
+        assert [hit['id'] for hit in index.search(db.session.connection(), '网联')] == [1]
+
+
+def test_build_match_query_neutralizes_operators():
+    assert build_match_query('') == ''
+    query = build_match_query('AI" OR *')
+    assert query.count('"') % 2 == 0
+    assert '*' not in query
+
+
+def test_ensure_fulltext_indexes_creates_app_tables(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'app.db'}"
+    db = SQLAlchemy(app)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('CREATE TABLE policy_analysis (id INTEGER PRIMARY KEY, title TEXT, '
+                                 'content_summary TEXT, content TEXT)')
+            conn.exec_driver_sql('CREATE TABLE we_chat_article (id INTEGER PRIMARY KEY, title TEXT, '
+                                 'content TEXT, industry_relevance TEXT)')
+        assert ensure_fulltext_indexes(db) == ['policy_analysis_fts', 'wechat_article_fts']
+        assert ensure_fulltext_indexes(db) == []
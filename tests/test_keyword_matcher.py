@@ -0,0 +1,41 @@
+from src.utils.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+
+def test_matcher_finds_overlapping_hits_in_one_pass():
+    matcher = KeywordMatcher(['人工智能', '智能', '智能制造', '制造'])
+    text = '发展人工智能与智能制造产业'
+
+    positions = matcher.positions(text)
+    assert positions['人工智能'] == [2]
+    assert positions['智能'] == [4, 7]
+    assert positions['智能制造'] == [7]
+    assert positions['制造'] == [9]
+    assert matcher.present(text) == {'人工智能', '智能', '智能制造', '制造'}
+
+
+def test_count_matches_str_count_semantics():
+    keywords = ['aa', 'a', '风险', '5G', '']
+    text = 'aaaa 风险风险 5G a'
+    counts = KeywordMatcher(keywords).count(text)
+    for keyword in filter(None, keywords):
+        assert counts.get(keyword, 0) == text.count(keyword)
+
+
+def test_positions_match_find_loop():
+    terms = ['大数据', '数据', '云计算', '据']
+    text = '大数据与云计算推动数据要素流通，大数据平台'
+    positions = KeywordMatcher(terms).positions(text)
+    for term in terms:
+        expected, start = [], 0
+        while (pos := text.find(term, start)) != -1:
+            expected.append(pos)
+            start = pos + 1
+        assert positions.get(term, []) == expected
+
+
+def test_get_keyword_matcher_is_cached():
+    first = get_keyword_matcher(['政策', '补贴'])
+    second = get_keyword_matcher(iter(['政策', '补贴']))
+    assert first is second
+    assert len(first) == 2
+    assert KeywordMatcher([]).count('任何文本') == {}
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import fakeredis
+import pytest
+import redis
+
+from src.utils.llm_rate_limiter import (LLMRateLimiter, MemoryLimiterBackend, RateLimitTimeout,
+                                        RedisLimiterBackend, estimate_tokens)
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_limiter(request, monkeypatch):
+    """Limiters standing in for separate processes sharing one store."""
+    for name in ('RPM', 'TPM', 'CONCURRENCY'):
+        monkeypatch.delenv(f'LLM_KIMI_{name}', raising=False)
+    shared = MemoryLimiterBackend() if request.param == 'memory' else fakeredis.FakeRedis()
+
+    def make():
+        if request.param == 'memory':
+            return LLMRateLimiter(shared)
+        return LLMRateLimiter(RedisLimiterBackend(shared))
+    return make
+
+
+def test_concurrency_is_capped_and_callers_are_served_in_order(make_limiter, monkeypatch):
+    monkeypatch.setenv('LLM_KIMI_CONCURRENCY', '2')
+    workers = [make_limiter(), make_limiter()]
+    running, peak, order = [0], [0], []
+    lock = threading.Lock()
+
+    def call(i):
+        with workers[i % 2].acquire('kimi', 'key-a', prompt='x'):
+            with lock:
+                order.append(i)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.1)
+            with lock:
+                running[0] -= 1
+
+    threads = []
+    for i in range(6):
+        threads.append(threading.Thread(target=call, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+    assert order == list(range(6))
+    usage = workers[0].utilization()[LLMRateLimiter.bucket_name('kimi', 'key-a')]
+    assert usage['in_flight'] == 0 and usage['waiting'] == 0
+    assert workers[0].stats['waited'] + workers[1].stats['waited'] >= 3
+
+
+def test_budgets_are_per_key_and_shared_across_processes(make_limiter, monkeypatch):
+    monkeypatch.setenv('LLM_KIMI_CONCURRENCY', '1')
+    web, worker = make_limiter(), make_limiter()
+    with web.acquire('kimi', 'key-a'):
+        with pytest.raises(RateLimitTimeout):
+            with worker.acquire('kimi', 'key-a', timeout=0.2):
+                pass
+        # Another API key has its own budget
+        with worker.acquire('kimi', 'key-b', timeout=0.2):
+            pass
+    assert worker.stats['timeouts'] == 1
+    with worker.acquire('kimi', 'key-a', timeout=0.2):
+        pass
+
+
+def test_token_budget_is_reserved_then_settled(make_limiter, monkeypatch):
+    # 6000 TPM: the bucket holds 10 seconds' worth, 1000 tokens
+    monkeypatch.setenv('LLM_KIMI_TPM', '6000')
+    limiter = make_limiter()
+    bucket = LLMRateLimiter.bucket_name('kimi', 'key-a')
+    prompt = '分析' * 100
+
+    with limiter.acquire('kimi', 'key-a', prompt=prompt, max_tokens=300) as lease:
+        assert lease.reserved == estimate_tokens(prompt) + 300
+        assert limiter.utilization()[bucket]['tpm_available'] <= 1000 - lease.reserved + 5
+        lease.settle(50)
+    # The unused reservation is returned
+    assert limiter.utilization()[bucket]['tpm_available'] >= 950
+
+    # A call larger than the bucket waits for it to refill
+    started = time.monotonic()
+    with limiter.acquire('kimi', 'key-a', prompt='x', max_tokens=1000) as lease:
+        lease.settle(1000)
+    with limiter.acquire('kimi', 'key-a', prompt='x', max_tokens=50):
+        pass
+    assert time.monotonic() - started >= 0.4
+
+
+def test_backoff_pauses_every_caller(make_limiter):
+    first, second = make_limiter(), make_limiter()
+    first.backoff('kimi', 'key-a', 0.3)
+    started = time.monotonic()
+    with second.acquire('kimi', 'key-a'):
+        pass
+    assert time.monotonic() - started >= 0.25
+    assert first.stats['backoffs'] == 1
+
+
+def test_waiters_keep_their_place_through_a_long_backoff(make_limiter, monkeypatch):
+    from src.utils import llm_rate_limiter
+
+    monkeypatch.setattr(llm_rate_limiter, 'WAITER_TTL', 0.3)
+    monkeypatch.setattr(MemoryLimiterBackend, 'max_sleep', 0.1)
+    monkeypatch.setattr(RedisLimiterBackend, 'max_sleep', 0.1)
+    limiter = make_limiter()
+    limiter.backoff('kimi', 'key-a', 1.0)
+    bucket = LLMRateLimiter.bucket_name('kimi', 'key-a')
+    order = []
+
+    def call(i):
+        with make_limiter().acquire('kimi', 'key-a'):
+            order.append(i)
+
+    threads = []
+    for i in range(2):
+        threads.append(threading.Thread(target=call, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.05)
+    # Well past WAITER_TTL, the sleeping head waiter is still in line
+    time.sleep(0.5)
+    assert limiter.utilization()[bucket]['waiting'] == 2
+    for thread in threads:
+        thread.join()
+    assert order == [0, 1]
+
+
+def test_falls_back_to_local_limits_when_redis_is_down(monkeypatch):
+    monkeypatch.setenv('LLM_KIMI_CONCURRENCY', '1')
+    client = fakeredis.FakeRedis()
+    limiter = LLMRateLimiter(RedisLimiterBackend(client))
+
+    def down(*args, **kwargs):
+        raise redis.ConnectionError('redis down')
+    monkeypatch.setattr(client, 'pipeline', down)
+
+    with limiter.acquire('kimi', 'key-a', timeout=0.5):
+        with pytest.raises(RateLimitTimeout):
+            with limiter.acquire('kimi', 'key-a', timeout=0.2):
+                pass
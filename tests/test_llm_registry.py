@@ -0,0 +1,68 @@
+import json
+
+from src.ai.client_pool import LLMClientPool
+from src.ai.llm_registry import LLMGeneratorRegistry
+
+
+def _write_config(path, key):
+    path.write_text(json.dumps({'api_keys': {'kimi': key}}), encoding='utf-8')
+
+
+def test_registry_reuses_generator_and_clients(tmp_path, monkeypatch):
+    for name in ('KIMI_API_KEY', 'MOONSHOT_API_KEY', 'GOOGLE_GEMINI_API_KEY'):
+        monkeypatch.delenv(name, raising=False)
+    config = tmp_path / 'config.json'
+    _write_config(config, 'key-1')
+    registry = LLMGeneratorRegistry()
+
+    first = registry.get_generator('kimi', str(config))
+    second = registry.get_generator('kimi', str(config))
+
+    assert registry.stats['builds'] == 1
+    # Per-request copies share the pooled client and loaded config
+    assert first is not second
+    assert first.client is second.client
+    assert first.config is second.config
+
+    # Switching service on one copy does not leak into the shared generator
+    first.llm_service = 'gemini'
+    assert registry.get_generator('kimi', str(config)).llm_service == 'kimi'
+
+
+def test_registry_reloads_on_key_rotation(tmp_path, monkeypatch):
+    for name in ('KIMI_API_KEY', 'MOONSHOT_API_KEY'):
+        monkeypatch.delenv(name, raising=False)
+    config = tmp_path / 'config.json'
+    _write_config(config, 'key-1')
+    registry = LLMGeneratorRegistry()
+    old = registry.get_generator('kimi', str(config))
+
+    _write_config(config, 'key-rotated')
+    new = registry.get_generator('kimi', str(config))
+
+    assert new.api_key == 'key-rotated'
+    assert new.client is not old.client
+    assert registry.stats['reloads'] == 1
+
+
+def test_streaming_generator_options_apply_to_copy_only(tmp_path, monkeypatch):
+    monkeypatch.delenv('KIMI_API_KEY', raising=False)
+    config = tmp_path / 'config.json'
+    _write_config(config, 'key-1')
+    registry = LLMGeneratorRegistry()
+
+    paced = registry.get_streaming_generator('kimi', str(config), stream_pacing=0.2)
+    plain = registry.get_streaming_generator('kimi', str(config))
+
+    assert paced.stream_pacing == 0.2
+    assert plain.stream_pacing == 0.0
+    assert paced.clients is plain.clients
+
+
+def test_client_pool_drops_rotated_keys():
+    pool = LLMClientPool()
+    client = pool.kimi_client('key-a')
+    assert pool.kimi_client('key-a') is client
+    pool.kimi_client('key-b')
+    assert len(pool) == 1
+    assert pool.kimi_client('key-a') is not client
@@ -0,0 +1,70 @@
+import time
+from types import SimpleNamespace
+
+from src.ai.llm_generator import LLMReportGenerator
+from src.ai import llm_generator
+from src.utils.llm_response_cache import LLMResponseCache
+
+
+def test_get_or_call_caches_by_prompt_and_params(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path))
+    calls = []
+
+    def call():
+        calls.append(1)
+        return f'answer {len(calls)}'
+
+    assert cache.get_or_call('kimi', 'm', 0.7, 'prompt', call, max_tokens=10) == 'answer 1'
+    assert cache.get_or_call('kimi', 'm', 0.7, 'prompt', call, max_tokens=10) == 'answer 1'
+    assert cache.get_or_call('kimi', 'm', 0.3, 'prompt', call, max_tokens=10) == 'answer 2'
+    assert cache.get_or_call('kimi', 'm', 0.7, 'prompt', call, max_tokens=20) == 'answer 3'
+    # Bypass always calls and refreshes the stored entry
+    assert cache.get_or_call('kimi', 'm', 0.7, 'prompt', call, bypass=True, max_tokens=10) == 'answer 4'
+    assert cache.get_or_call('kimi', 'm', 0.7, 'prompt', call, max_tokens=10) == 'answer 4'
+    assert cache.stats['hits'] == 2
+
+    # A fresh instance (another process) reads the same store
+    assert LLMResponseCache(cache_dir=str(tmp_path)).get_or_call('kimi', 'm', 0.7, 'prompt', call, max_tokens=10) == 'answer 4'
+
+
+def test_ttl_and_size_bounded_eviction(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), ttl_seconds=0, max_entries=3)
+    key = cache.make_key('kimi', 'm', None, 'p')
+    cache.set(key, 'old')
+    time.sleep(0.01)
+    assert cache.get(key) is None
+    assert cache.stats['expired'] == 1
+
+    cache.ttl_seconds = 3600
+    keys = [cache.make_key('kimi', 'm', None, f'p{i}') for i in range(5)]
+    for k in keys:
+        cache.set(k, 'x' * 100)
+    cache.get(keys[2])  # touch so it survives as most recently used
+    cache.set(cache.make_key('kimi', 'm', None, 'new'), 'y')
+    info = cache.info()
+    assert info['entries'] == 3
+    assert cache.get(keys[2]) == 'x' * 100
+    assert cache.get(keys[0]) is None
+    assert len(list(tmp_path.glob('*/*.json'))) == 3
+
+
+def test_answer_question_uses_cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(cache_dir=str(tmp_path))
+    monkeypatch.setattr(llm_generator, 'llm_response_cache', cache)
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='答案'))])
+
+    generator = LLMReportGenerator.__new__(LLMReportGenerator)
+    generator.llm_service = 'kimi'
+    generator.model_name = 'moonshot-v1-128k'
+    generator.temperature = 0.7
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    assert generator.answer_question('报告', '问题') == '答案'
+    assert generator.answer_question('报告', '问题') == '答案'
+    assert len(calls) == 1
+    generator.answer_question('报告', '问题', use_cache=False)
+    assert len(calls) == 2
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text, tuple_
+
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_page, page_size
+
+
+def _make_db(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'pages.db'}"
+    db = SQLAlchemy(app)
+
+    class Item(db.Model):
+        __table_args__ = (db.Index('ix_item_owner_created', 'owner', 'created_at'),)
+        id = db.Column(db.Integer, primary_key=True)
+        owner = db.Column(db.Integer)
+        created_at = db.Column(db.DateTime)
+
+    return app, db, Item
+
+
+def test_keyset_pages_cover_every_row_once_with_ties(tmp_path):
+    app, db, Item = _make_db(tmp_path)
+    base = datetime(2024, 1, 1)
+    with app.app_context():
+        db.create_all()
+        # Several rows share a timestamp to exercise the id tie-breaker
+        db.session.add_all([Item(owner=1, created_at=base + timedelta(minutes=i // 3)) for i in range(25)])
+        db.session.add(Item(owner=2, created_at=base))
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Item.query.filter_by(owner=1), Item.created_at, Item.id, cursor, limit=7)
+            seen.extend(rows)
+            if cursor is None:
+                break
+
+        assert len(seen) == 25
+        assert len({row.id for row in seen}) == 25
+        keys = [(row.created_at, row.id) for row in seen]
+        assert keys == sorted(keys, reverse=True)
+
+
+def test_keyset_filter_seeks_the_index(tmp_path):
+    app, db, Item = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        cursor = encode_cursor(datetime(2024, 1, 1), 10)
+        query = Item.query.filter_by(owner=1)
+        created_at, row_id = decode_cursor(cursor)
+        sql = str(query.filter(tuple_(Item.created_at, Item.id) < tuple_(created_at, row_id))
+                  .order_by(Item.created_at.desc(), Item.id.desc()).limit(5)
+                  .statement.compile(compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+        assert 'ix_item_owner_created' in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+def test_cursor_round_trip_and_validation():
+    stamp = datetime(2024, 5, 6, 7, 8, 9)
+    assert decode_cursor(encode_cursor(stamp, 42)) == (stamp, 42)
+    assert decode_cursor('') is None
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+    assert page_size('500') == 200
+    assert page_size('abc', 10) == 10
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+from src.ai.llm_generator import LLMReportGenerator
+from src.ai.streaming_llm_generator import merge_async_streams
+
+
+async def _ticker(name, count, delay):
+    for i in range(count):
+        await asyncio.sleep(delay)
+        yield {'stage': name, 'index': i}
+
+
+async def _failing():
+    yield {'stage': 'bad', 'index': 0}
+    raise RuntimeError('boom')
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+def test_merge_async_streams_runs_concurrently_and_keeps_order():
+    started = time.time()
+    items = asyncio.run(_collect(merge_async_streams([
+        _ticker('summary_zh', 5, 0.02),
+        _ticker('summary_en', 5, 0.02),
+        _ticker('swot', 5, 0.02),
+    ])))
+    elapsed = time.time() - started
+
+    assert len(items) == 15
+    for stage in ('summary_zh', 'summary_en', 'swot'):
+        assert [it['index'] for it in items if it['stage'] == stage] == list(range(5))
+    # Sequential consumption would take ~0.3s
+    assert elapsed < 0.25
+
+
+def test_merge_async_streams_propagates_errors():
+    with pytest.raises(RuntimeError):
+        asyncio.run(_collect(merge_async_streams([_ticker('ok', 50, 0.01), _failing()])))
+
+
+def test_generate_post_analysis_parallel_matches_sequential():
+    generator = LLMReportGenerator.__new__(LLMReportGenerator)
+
+    def fake_summary(full_report, language='zh'):
+        time.sleep(0.1)
+        return f'{language}:{full_report}'
+
+    def fake_swot(full_report):
+        time.sleep(0.1)
+        return {'strengths': [full_report]}
+
+    generator.generate_summary = fake_summary
+    generator.generate_swot_analysis = fake_swot
+
+    completed = []
+    started = time.time()
+    parallel = generator.generate_post_analysis('report', parallel=True, on_complete=completed.append)
+    elapsed = time.time() - started
+
+    assert parallel == generator.generate_post_analysis('report')
+    assert sorted(completed) == ['summary_en', 'summary_zh', 'swot']
+    assert elapsed < 0.25
@@ -0,0 +1,121 @@
+import json
+
+from src.utils.report_analysis_cache import ReportAnalysisCache
+from src.analysis.report_analyses import run_report_analysis
+
+
+def _write_report(path, content):
+    path.write_text(json.dumps({'full_content': content, 'sections': {}}, ensure_ascii=False), encoding='utf-8')
+
+
+def test_cache_serves_second_request_without_recompute(tmp_path):
+    report_path = tmp_path / 'r1.json'
+    _write_report(report_path, '政策支持')
+    cache = ReportAnalysisCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': len(calls)}
+
+    assert cache.get_or_compute('r1', report_path, 'demo', '1', compute) == {'value': 1}
+    assert cache.get_or_compute('r1', report_path, 'demo', '1', compute) == {'value': 1}
+    assert len(calls) == 1
+    assert (tmp_path / 'r1.analysis' / 'demo.json').exists()
+
+    # A new analyzer version or a regenerated report is recomputed
+    assert cache.get_or_compute('r1', report_path, 'demo', '2', compute) == {'value': 2}
+    _write_report(report_path, '政策支持，市场规模扩大')
+    assert cache.get_or_compute('r1', report_path, 'demo', '2', compute) == {'value': 3}
+
+
+def test_invalidate_removes_entries(tmp_path):
+    report_path = tmp_path / 'r2.json'
+    _write_report(report_path, '内容')
+    cache = ReportAnalysisCache()
+    cache.set('r2', report_path, 'story', '1', {'a': 1}, variant='overview')
+    cache.set('r2', report_path, 'story', '1', {'a': 2}, variant='policy')
+    cache.set('r2', report_path, 'entities', '1', {'b': 1})
+
+    assert cache.invalidate(report_path, analyzer='story') == 2
+    assert cache.get('r2', report_path, 'entities', '1') == {'b': 1}
+    assert cache.invalidate(report_path) == 1
+    assert cache.get('r2', report_path, 'entities', '1') is None
+
+
+def test_run_report_analysis_uses_cache(tmp_path):
+    report_path = tmp_path / 'r3.json'
+    _write_report(report_path, '政策支持和优惠政策推动市场规模增长，但竞争激烈')
+    cache = ReportAnalysisCache()
+
+    first = run_report_analysis('investment', 'r3', report_path, cache=cache)
+    second = run_report_analysis('investment', 'r3', report_path, cache=cache)
+
+    assert first == second
+    assert first['scores']['policy_support'] == 4
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+
+def test_precompute_warms_every_analyzer(tmp_path):
+    from src.analysis.report_analyses import REPORT_ANALYZERS, precompute_report_analyses
+
+    report_path = tmp_path / 'r4.json'
+    _write_report(report_path, '成都市人工智能产业发展迅速，华为等企业推出AI平台。\n- 上游：芯片\n- 下游：应用')
+    config_path = tmp_path / 'config.json'
+    config_path.write_text('{}', encoding='utf-8')
+    cache = ReportAnalysisCache()
+
+    results = precompute_report_analyses('r4', report_path, city='成都', industry='人工智能',
+                                         cache=cache, config_path=str(config_path))
+
+    assert set(results) == set(REPORT_ANALYZERS)
+    assert all(results.values()), results
+    assert cache.get('r4', report_path, 'story', REPORT_ANALYZERS['story'][0],
+                     variant='industry_overview') is not None
+
+
+def test_option_dependent_analyses_are_cached_per_option(tmp_path):
+    from src.analysis.report_analyses import analysis_variant
+
+    report_path = tmp_path / 'r5.json'
+    _write_report(report_path, '成都市人工智能产业发展迅速，华为等企业推出AI平台。')
+    config_path = tmp_path / 'config.json'
+    config_path.write_text('{}', encoding='utf-8')
+    cache = ReportAnalysisCache()
+
+    assert analysis_variant('knowledge_graph', {'city': '成都'}) != analysis_variant('knowledge_graph', {'city': '北京'})
+    assert analysis_variant('knowledge_graph', {'city': None}) == analysis_variant('knowledge_graph', {})
+    assert analysis_variant('investment', {'city': '成都'}) == ''
+
+    def visualizations(city):
+        return run_report_analysis('visualizations', 'r5', report_path, cache=cache, city=city,
+                                   industry='人工智能', config_path=str(config_path))
+
+    chengdu = visualizations('成都')
+    beijing = visualizations('北京')
+    assert chengdu['bar_3d'] != beijing['bar_3d']
+    assert visualizations('成都') == chengdu
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 2
+
+    # Editing the config file is a new variant
+    config_path.write_text('{"map": {}}', encoding='utf-8')
+    visualizations('成都')
+    assert cache.stats['misses'] == 3
+
+
+def test_endpoint_lookup_is_served_by_precompute(tmp_path, monkeypatch):
+    from src.analysis.report_analyses import precompute_report_analyses
+
+    report_path = tmp_path / 'r6.json'
+    _write_report(report_path, '成都市人工智能产业发展迅速。')
+    (tmp_path / 'config.json').write_text('{}', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    cache = ReportAnalysisCache()
+
+    # The worker passes an absolute config path, the endpoint the default relative one
+    precompute_report_analyses('r6', report_path, city='成都', industry='人工智能', cache=cache,
+                               analyzers=['visualizations', 'knowledge_graph'],
+                               config_path=str(tmp_path / 'config.json'))
+    misses = cache.stats['misses']
+    run_report_analysis('visualizations', 'r6', report_path, cache=cache, city='成都', industry='人工智能')
+    assert cache.stats['misses'] == misses and cache.stats['hits'] == 1
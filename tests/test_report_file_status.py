@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+import app as app_module
+from app import Report, REPORT_FILE_RECHECK, _refresh_report_file_status, _report_file_may_exist, db
+
+
+def test_missing_report_files_are_rechecked_once_stale(tmp_path):
+    report_file = tmp_path / 'report.json'
+    report_file.write_text('{}', encoding='utf-8')
+    with app_module.app.app_context():
+        app_module.init_db()
+        now = app_module.now_beijing().replace(tzinfo=None)
+        report = Report(report_id='file-status-test', report_type='upload', file_path=str(report_file),
+                        status='completed', file_available=False, file_checked_at=now)
+        db.session.add(report)
+        db.session.commit()
+        try:
+            def listed():
+                return Report.query.filter(Report.report_id == 'file-status-test',
+                                           _report_file_may_exist()).all()
+
+            # Recently found missing: left out of the listing
+            assert listed() == []
+
+            # The file came back; once the check is stale the row is listed and re-checked
+            report.file_checked_at = now - REPORT_FILE_RECHECK - timedelta(minutes=1)
+            db.session.commit()
+            rows = listed()
+            assert rows == [report]
+            _refresh_report_file_status(rows)
+            assert db.session.get(Report, report.id).file_available is True
+        finally:
+            db.session.delete(report)
+            db.session.commit()
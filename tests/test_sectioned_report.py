@@ -0,0 +1,102 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.ai import sectioned_report
+from src.ai.llm_generator import LLMReportGenerator
+from src.ai.sectioned_report import (SectionCheckpointStore, SectionGenerationError,
+                                     SectionedReportBuilder, split_report_template)
+
+TEMPLATE = Path('industry_analysis_llm_prompt.md').read_text(encoding='utf-8')
+
+
+class FakeGenerator:
+    llm_service = 'kimi'
+    model_name = 'fake-model'
+    prompt_template = TEMPLATE
+
+    def __init__(self, fail=(), delay=0.05):
+        self.fail = set(fail)
+        self.delay = delay
+        # Shared with the per-section copies
+        self.calls = []
+        self.load = {'running': 0, 'peak': 0}
+        self.lock = threading.Lock()
+
+    def generate_text(self, prompt):
+        heading = prompt.split('不要输出其他章节内容：\n\n', 1)[1].split('\n', 1)[0]
+        with self.lock:
+            self.calls.append(heading)
+            self.load['running'] += 1
+            self.load['peak'] = max(self.load['peak'], self.load['running'])
+        try:
+            time.sleep(self.delay)
+            if any(heading.startswith(f'{n}.') for n in self.fail):
+                raise RuntimeError('quota')
+            # Models often repeat the heading
+            return {'content': f'## {heading}\n正文 {heading[:2]}', 'used_service': 'kimi',
+                    'attempted_services': ['kimi'],
+                    'tokens': {'prompt': 10, 'completion': 5, 'total': 15}}
+        finally:
+            with self.lock:
+                self.load['running'] -= 1
+
+
+def test_split_report_template():
+    title, sections = split_report_template(TEMPLATE, '成都', '汽车产业')
+    assert title.startswith('成都 汽车产业')
+    assert [s.key for s in sections] == list(sectioned_report.SECTION_KEYS.values())
+    assert sections[2].heading == '3. 政策环境与扶持力度 (Policy Landscape)'
+    assert '成都政府针对汽车产业' in sections[2].outline
+    # Numbered sub-items stay in their section's outline
+    assert '4.2. 创新型中小企业' in sections[3].outline
+    assert split_report_template('只有一段说明', '成都', '汽车产业') == ('只有一段说明', [])
+
+
+def test_sections_run_concurrently_under_cap_and_assemble(monkeypatch, tmp_path):
+    monkeypatch.setenv('LLM_SECTION_CONCURRENCY', '2')
+    generator = FakeGenerator()
+    progress = []
+    result = SectionedReportBuilder(generator, SectionCheckpointStore(tmp_path / 'r1')).generate(
+        '成都', '汽车产业', on_section=lambda *args: progress.append(args))
+
+    assert generator.load['peak'] == 2
+    # Summary and conclusion are written from the finished sections
+    assert {generator.calls[-1][:2], generator.calls[-2][:2]} == {'1.', '7.'}
+    assert [p[0] for p in progress] == list(range(1, 8)) and progress[-1][1] == 7
+
+    assert result['success'] and result['used_service'] == 'kimi'
+    assert result['metadata']['tokens'] == {'prompt': 70, 'completion': 35, 'total': 105}
+    assert result['sections']['policy_landscape'] == '正文 3.'
+    # full_content parses back into the same sections
+    parsed = LLMReportGenerator._parse_report_sections(None, result['full_content'])
+    assert parsed == result['sections']
+
+
+def test_retry_resumes_from_checkpoints(tmp_path):
+    store = SectionCheckpointStore(tmp_path / 'r2')
+    failing = FakeGenerator(fail={3, 5})
+    with pytest.raises(SectionGenerationError) as excinfo:
+        SectionedReportBuilder(failing, store).generate('成都', '汽车产业')
+    assert set(excinfo.value.failed) == {'policy_landscape', 'value_chain'}
+    # Dependent sections wait for the others
+    assert not any(c.startswith(('1.', '7.')) for c in failing.calls)
+
+    retry = FakeGenerator()
+    result = SectionedReportBuilder(retry, store).generate('成都', '汽车产业')
+    assert sorted(c[:2] for c in retry.calls) == ['1.', '3.', '5.', '7.']
+    assert set(result['resumed_sections']) == {'industry_overview', 'ecosystem', 'ai_integration'}
+
+    store.clear()
+    assert not store.directory.exists()
+
+
+def test_changed_inputs_discard_checkpoints(tmp_path):
+    store = SectionCheckpointStore(tmp_path / 'r3')
+    SectionedReportBuilder(FakeGenerator(), store).generate('成都', '汽车产业')
+
+    again = FakeGenerator()
+    SectionedReportBuilder(again, store).generate('成都', '汽车产业', '侧重新能源')
+    assert len(again.calls) == 7
@@ -0,0 +1,88 @@
+import json
+import zlib
+from queue import Queue
+
+from flask import Flask
+
+from src.routes import streaming_routes
+from src.utils.stream_delta import DeltaStreamEncoder
+
+
+def _report_chunks(parts):
+    accumulated = ''
+    for index, part in enumerate(parts, 1):
+        accumulated += part
+        yield {'type': 'chunk', 'content': part, 'accumulated': accumulated,
+               'chunk_index': index, 'stage': 'generating'}
+    yield {'type': 'complete', 'content': accumulated, 'stage': 'generating'}
+
+
+def test_delta_payloads_rebuild_the_text():
+    parts = ['成都', '人工智能', '产业😀', 'abc'] * 10
+    encoder = DeltaStreamEncoder(checksum_interval=5)
+    text, checksums = '', 0
+
+    for chunk in _report_chunks(parts):
+        payload = encoder.encode(chunk)
+        assert 'accumulated' not in payload
+        assert payload['stream'] == 'report'
+        if payload['type'] == 'chunk':
+            assert payload['offset'] == len(text)
+            text += payload['content']
+        if 'checksum' in payload:
+            checksums += 1
+            assert payload['length'] == len(text)
+            assert payload['checksum'] == f"{zlib.crc32(text.encode('utf-8')):08x}"
+
+    full = ''.join(parts)
+    assert text == full
+    # Completion only confirms length/checksum, it does not resend the text
+    assert 'content' not in payload
+    assert checksums == len(parts) // 5 + 1
+    assert encoder.snapshot('report')['content'] == full
+
+
+def test_streams_are_tracked_separately_and_reset_on_fallback():
+    encoder = DeltaStreamEncoder()
+    encoder.encode({'type': 'chunk', 'content': 'abc'})
+    zh = encoder.encode({'type': 'summary_chunk', 'content': '摘要', 'language': 'zh', 'stage': 'summary_zh'})
+    swot = encoder.encode({'type': 'swot_chunk', 'content': '{', 'stage': 'swot'})
+    assert (zh['stream'], zh['offset']) == ('summary_zh', 0)
+    assert (swot['stream'], swot['offset']) == ('swot', 0)
+
+    encoder.encode({'type': 'service_fallback', 'fallback_service': 'gemini'})
+    assert encoder.encode({'type': 'chunk', 'content': 'x'})['offset'] == 0
+
+
+def test_diverging_completion_resends_content():
+    encoder = DeltaStreamEncoder()
+    encoder.encode({'type': 'chunk', 'content': 'abc'})
+    payload = encoder.encode({'type': 'complete', 'content': 'abcd'})
+    assert payload['content'] == 'abcd'
+    assert encoder.snapshot('report')['length'] == 4
+
+
+def test_resync_endpoint():
+    app = Flask(__name__)
+    app.register_blueprint(streaming_routes.streaming_bp, url_prefix='/streaming')
+    client = app.test_client()
+
+    chunk_queue = Queue()
+    stream_id, session = streaming_routes._open_stream_session(chunk_queue)
+    session['encoder'].encode({'type': 'chunk', 'content': '报告正文'})
+
+    # Live stream: snapshot is delivered in-band
+    response = client.post(f'/streaming/api/stream/{stream_id}/resync', json={'stream': 'report'})
+    assert response.get_json()['status'] == 'queued'
+    event = json.loads(chunk_queue.get_nowait().decode('utf-8')[len('data: '):])
+    assert event['type'] == 'resync'
+    assert event['data']['content'] == '报告正文'
+
+    # Finished stream: snapshot is returned directly
+    session['finished_at'] = 1.0e12
+    response = client.post(f'/streaming/api/stream/{stream_id}/resync', json={})
+    body = response.get_json()
+    assert body['status'] == 'finished'
+    assert body['resync'][0]['content'] == '报告正文'
+
+    assert client.post('/streaming/api/stream/unknown/resync').status_code == 404
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.ai.streaming_llm_generator import StreamingLLMReportGenerator, iterate_in_thread
+from src.utils.api_error_handler import APIService
+
+
+def _blocking_chunks(count, delay):
+    for i in range(count):
+        time.sleep(delay)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=f'{i};'))])
+
+
+class _FakeCompletions:
+    def create(self, **kwargs):
+        return _blocking_chunks(5, 0.05)
+
+
+def _make_generator():
+    generator = StreamingLLMReportGenerator.__new__(StreamingLLMReportGenerator)
+    generator.clients = {APIService.KIMI: SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions()))}
+    generator.stream_pacing = 0.0
+    return generator
+
+
+def test_iterate_in_thread_propagates_errors():
+    def broken():
+        yield 1
+        raise ValueError('stream broke')
+
+    async def consume():
+        items = []
+        try:
+            async for item in iterate_in_thread(broken()):
+                items.append(item)
+        except ValueError:
+            return items
+        raise AssertionError('error was swallowed')
+
+    assert asyncio.run(consume()) == [1]
+
+
+def test_kimi_streams_share_the_event_loop():
+    generator = _make_generator()
+    ticks = []
+
+    async def ticker(stop):
+        while not stop.is_set():
+            ticks.append(time.time())
+            await asyncio.sleep(0.01)
+
+    async def collect():
+        return [chunk async for chunk in generator._stream_kimi('prompt')]
+
+    async def main():
+        stop = asyncio.Event()
+        tick_task = asyncio.ensure_future(ticker(stop))
+        results = await asyncio.gather(collect(), collect(), collect())
+        stop.set()
+        await tick_task
+        return results
+
+    started = time.time()
+    results = asyncio.run(main())
+    elapsed = time.time() - started
+
+    for chunks in results:
+        assert chunks[-1]['type'] == 'complete'
+        assert chunks[-1]['content'] == '0;1;2;3;4;'
+    # Three 0.25s streams overlap instead of running back to back
+    assert elapsed < 0.6
+    # The loop kept ticking while the SDK iterators were blocking
+    assert len(ticks) > 10
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from src.utils.task_progress import (MemoryProgressBackend, RedisProgressBackend, TaskProgress,
+                                     snapshot_from_result)
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def progress(request):
+    if request.param == 'memory':
+        return TaskProgress(MemoryProgressBackend())
+    return TaskProgress(RedisProgressBackend(fakeredis.FakeRedis()))
+
+
+def _publish_later(progress, task_id, updates, delay=0.1):
+    def run():
+        for state, fields in updates:
+            time.sleep(delay)
+            progress.publish(task_id, state, **fields)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_stream_relays_updates_until_task_finishes(progress):
+    progress.publish('t1', current=10, stage='init', message='初始化')
+    publisher = _publish_later(progress, 't1', [
+        ('PROGRESS', {'current': 30, 'stage': 'generating', 'message': '正在调用 KIMI API'}),
+        ('PROGRESS', {'current': 55, 'stage': 'generating', 'message': '正在解析章节'}),
+        ('SUCCESS', {'status': '完成', 'result': {'report_id': 'r1'}}),
+    ])
+    updates = [u for u in progress.iter_updates('t1', heartbeat=5) if u is not None]
+    publisher.join()
+
+    assert [u.get('current') for u in updates] == [10, 30, 55, None]
+    assert updates[-1]['state'] == 'SUCCESS' and updates[-1]['result'] == {'report_id': 'r1'}
+
+
+def test_stream_heartbeat_and_finished_task(progress):
+    progress.publish('t2', current=20, stage='generating')
+    stream = progress.sse_stream('t2', heartbeat=0.05, transform=lambda s: dict(s, seen=True))
+    first = next(stream)
+    assert first.startswith('data: ') and first.endswith('\n\n')
+    assert json.loads(first[len('data: '):])['seen'] is True
+    # Quiet task: keep-alive comments
+    assert next(stream) == ': keep-alive\n\n'
+    progress.publish('t2', 'FAILURE', error='quota')
+    assert json.loads(next(stream)[len('data: '):])['error'] == 'quota'
+    assert list(stream) == []
+
+    # A finished task's stream is just its final snapshot
+    assert [u['state'] for u in progress.iter_updates('t2', heartbeat=0.05)] == ['FAILURE']
+
+
+def test_snapshot_reads_are_cached_per_process():
+    backend = RedisProgressBackend(fakeredis.FakeRedis())
+    watcher = TaskProgress(backend, cache_seconds=60)
+    worker = TaskProgress(backend)
+
+    worker.publish('t3', current=10)
+    for _ in range(20):
+        assert watcher.snapshot('t3')['current'] == 10
+    assert watcher.stats == {'published': 0, 'hits': 19, 'reads': 1}
+    worker.publish('t3', current=50)
+    assert watcher.snapshot('t3', cached=False)['current'] == 50
+
+    # Unpublished tasks use the fallback once per cache window
+    calls = []
+    fallback = lambda: calls.append(1) or snapshot_from_result('PENDING', None)
+    assert watcher.snapshot('t4', fallback=fallback)['state'] == 'PENDING'
+    assert watcher.snapshot('t4', fallback=fallback)['state'] == 'PENDING'
+    assert len(calls) == 1
+    assert watcher.snapshot('t5') is None
+
+
+def test_snapshot_from_result():
+    assert snapshot_from_result('PROGRESS', {'current': 40, 'status': 'x'}) == {
+        'state': 'PROGRESS', 'current': 40, 'total': 100, 'status': 'x', 'stage': 'init', 'message': 'x'}
+    failed = snapshot_from_result('SUCCESS', {'success': False, 'error': 'quota', 'exc_type': 'APIError'})
+    assert failed['state'] == 'FAILURE' and failed['error_details']['is_api_error']
+    crashed = snapshot_from_result('FAILURE', ValueError('boom'))
+    assert crashed['error'] == 'boom' and crashed['error_details']['error_type'] == 'ValueError'
+    assert snapshot_from_result('SUCCESS', {'success': True, 'report_id': 'r'})['result']['report_id'] == 'r'
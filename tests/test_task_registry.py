@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from src.utils.task_registry import (MemoryTaskStore, RedisTaskStore, TaskInfo, TaskManager,
+                                     TaskStatus)
+
+
+class EchoTaskManager(TaskManager):
+    """Sends one chunk per character of the city, then completes."""
+
+    def __init__(self, *args, release=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = release
+
+    def _execute_task(self, task_id):
+        task = self.update_task(task_id, status=TaskStatus.PROCESSING, started_at=time.time())
+        if self.release is not None:
+            self.release.wait(5)
+        for i, char in enumerate(task.city, 1):
+            self.send_event(task_id, 'report_chunk', {'content': char, 'chunk_index': i})
+        self.update_task(task_id, status=TaskStatus.COMPLETED, completed_at=time.time(),
+                         report_id=f'report-{task_id}')
+        self.send_event(task_id, 'final_complete', {'report_id': f'report-{task_id}'})
+        self.send_event(task_id, 'end', {})
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _save(store, task_id):
+    store.save(task_id, TaskInfo(task_id=task_id, city='成都', industry='电子', llm_service='kimi',
+                                 additional_context='', status=TaskStatus.PROCESSING,
+                                 created_at=time.time()).to_dict())
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    if request.param == 'memory':
+        return MemoryTaskStore()
+    return RedisTaskStore(fakeredis.FakeRedis(), 'test')
+
+
+def test_subscribers_fan_out_and_finished_log_is_compacted(store):
+    release = threading.Event()
+    manager = EchoTaskManager('test', store=store, max_workers=2, release=release, compact_delay=0.2)
+    task_id, is_new = manager.create_task('成都市', '电子信息', 'kimi', '', user_id=7)
+    assert is_new
+
+    received = {0: [], 1: []}
+    readers = [threading.Thread(target=lambda n=n: received[n].extend(
+        event for _, event in manager.iter_events(task_id, timeout=1))) for n in received]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.1)
+    release.set()
+    for reader in readers:
+        reader.join(5)
+
+    # Both live subscribers see every chunk
+    for events in received.values():
+        assert ''.join(e['data']['content'] for e in events if e['type'] == 'report_chunk') == '成都市'
+        assert events[-1]['type'] == 'final_complete'
+
+    # Once compacted, a late subscriber gets no chunks, just the final events
+    assert _wait_for(lambda: [e['type'] for _, e in manager.iter_events(task_id, timeout=0)]
+                     == ['final_complete'])
+    task = manager.get_task_info(task_id)
+    assert task.status == TaskStatus.COMPLETED
+    assert task.report_id == f'report-{task_id}' and task.progress == 100.0
+    assert [t.task_id for t in manager.get_all_tasks(user_id=7)] == [task_id]
+    assert manager.get_all_tasks(user_id=8) == []
+
+
+def test_resume_after_last_event_id_and_sse_format(store):
+    manager = TaskManager('test', store=store, compact_delay=0)
+    _save(store, 't1')
+    ids = [manager.send_event('t1', 'report_chunk', {'content': c, 'chunk_index': i})
+           for i, c in enumerate('abcd', 1)]
+    # IDs increase monotonically
+    assert ids == sorted(ids, key=lambda i: tuple(int(p) for p in i.split('-')))
+    manager.send_event('t1', 'end', {})
+
+    # Compaction after the end marker keeps the chunks of an unfinished report
+    _save(store, 't2')
+    for i, c in enumerate('xy', 1):
+        manager.send_event('t2', 'report_chunk', {'content': c, 'chunk_index': i})
+    manager.send_event('t2', 'swot_complete', {'content': 'SWOT'})
+    manager.send_event('t2', 'progress', {'stage': 'swot'})
+    manager.update_task('t2', status=TaskStatus.FAILED)
+    manager.send_event('t2', 'end', {})
+    events = [e for _, e in manager.iter_events('t2', timeout=0.1)]
+    assert ''.join(e['data']['content'] for e in events if e['type'] == 'report_chunk') == 'xy'
+    assert 'progress' not in [e['type'] for e in events]
+
+    _save(store, 't3')
+    ids = [manager.send_event('t3', 'report_chunk', {'content': c, 'chunk_index': i})
+           for i, c in enumerate('abc', 1)]
+    stream = manager.sse_stream('t3', after=ids[0], heartbeat=0.05)
+    id_line, data_line, _, _ = next(stream).split('\n')
+    assert id_line == f'id: {ids[1]}'
+    assert json.loads(data_line[len('data: '):])['data'] == {'content': 'b', 'chunk_index': 2}
+    assert next(stream).startswith(f'id: {ids[2]}\n')
+    # Quiet task: keep-alive comments until something happens
+    assert next(stream) == ': keep-alive\n\n'
+    manager.update_task('t3', status=TaskStatus.COMPLETED)
+    assert list(stream) == []
+
+
+def test_event_log_is_bounded():
+    for store in (MemoryTaskStore(max_events=5),
+                  RedisTaskStore(fakeredis.FakeRedis(), 'test', max_events=5)):
+        manager = TaskManager('test', store=store)
+        _save(store, 't')
+        for i in range(1, 201):
+            manager.send_event('t', 'report_chunk', {'content': str(i), 'chunk_index': i})
+        manager.update_task('t', status=TaskStatus.COMPLETED)
+        events = [e['data']['content'] for _, e in manager.iter_events('t', timeout=0)]
+        # Redis trims approximately (whole radix tree nodes)
+        assert len(events) < 200 and events[-1] == '200'
+
+
+def test_duplicate_check_and_delete(store):
+    release = threading.Event()
+    manager = EchoTaskManager('test', store=store, release=release)
+    task_id, _ = manager.create_task('成都', '汽车', 'kimi', '', check_duplicate=True)
+    same_id, is_new = manager.create_task('成都', '汽车', 'kimi', '', check_duplicate=True)
+    assert (same_id, is_new) == (task_id, False)
+
+    release.set()
+    assert _wait_for(lambda: manager.get_task_info(task_id).status == TaskStatus.COMPLETED)
+    assert manager.update_task(task_id, paused=True).paused is True
+    assert manager.delete_task(task_id)
+    assert manager.get_task_info(task_id) is None
+    assert manager.update_task(task_id, paused=False) is None
+    assert list(manager.iter_events(task_id, timeout=0.1)) == []
+
+
+def test_redis_store_is_shared_between_workers():
+    server = fakeredis.FakeServer()
+    release = threading.Event()
+    worker_a = EchoTaskManager('report_gen', release=release,
+                               store=RedisTaskStore(fakeredis.FakeRedis(server=server), 'report_gen'))
+    worker_b = EchoTaskManager('report_gen',
+                               store=RedisTaskStore(fakeredis.FakeRedis(server=server), 'report_gen'))
+
+    task_id, _ = worker_a.create_task('绵阳', '电子', 'kimi', '')
+    assert _wait_for(lambda: worker_b.get_task_info(task_id).status == TaskStatus.PROCESSING)
+
+    # Worker b streams a task running in worker a, blocking until events arrive
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(
+        event for _, event in worker_b.iter_events(task_id, timeout=2)))
+    reader.start()
+    release.set()
+    reader.join(5)
+
+    assert [e['data'].get('content') for e in received[:2]] == ['绵', '阳']
+    assert received[-1]['type'] == 'final_complete'
+    assert worker_b.get_task_info(task_id).report_id == f'report-{task_id}'
+
+    # Cancelling through worker b is visible to worker a
+    worker_b.update_task(task_id, cancelled=True)
+    assert worker_a.get_task_info(task_id).cancelled is True
+
+
+def test_memory_store_expires_idle_tasks():
+    store = MemoryTaskStore(ttl=0)
+    manager = EchoTaskManager('test', store=store)
+    task_id, _ = manager.create_task('a', 'b', 'kimi', '')
+    assert _wait_for(lambda: manager.get_task_info(task_id).status == TaskStatus.COMPLETED)
+    time.sleep(0.01)
+    assert manager.get_all_tasks() == []
@@ -0,0 +1,41 @@
+import jieba
+
+from src.analysis import text_processor
+from src.analysis.text_processor import TextProcessor, TextAnalysisContext
+
+
+SAMPLE_TEXT = (
+    "人工智能产业是当前最具发展潜力的战略性新兴产业之一，政府出台了多项扶持政策。"
+    "据统计，2025年人工智能市场规模达到5000亿元，预计未来五年保持25%以上的增长。"
+    "重点企业持续加大研发投入，在芯片、算法和数据分析领域取得技术突破。"
+    "但行业仍面临人才短缺、竞争加剧和数据安全等挑战风险，需要完善质量控制体系。"
+)
+
+
+def test_context_tokenizes_each_segment_once(monkeypatch):
+    calls = []
+    original_lcut = jieba.lcut
+
+    def counting_lcut(text, *args, **kwargs):
+        calls.append(text)
+        return original_lcut(text, *args, **kwargs)
+
+    monkeypatch.setattr(text_processor.jieba, 'lcut', counting_lcut)
+
+    processor = TextProcessor(config_path='__missing_config__.json')
+    result = processor._analyze_text(SAMPLE_TEXT)
+
+    assert result['processed_segments'] > 0
+    # One lcut call per segment, nothing else re-tokenizes the text
+    assert len(calls) == result['processed_segments']
+    assert result['statistics']['total_words'] > 0
+
+
+def test_context_words_follow_tagged_words():
+    processor = TextProcessor(config_path='__missing_config__.json')
+    clean = processor._clean_text(SAMPLE_TEXT)
+    context = TextAnalysisContext.build(clean, processor._segment_text(clean))
+
+    assert context.words == [word for word, _ in context.tagged_words]
+    assert len(context.segment_words) == len(context.segments)
+    assert all(sentence == sentence.strip() for sentence in context.sentences)
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+from src.tasks.wechat_tasks import deduplicate_wechat_articles, upsert_wechat_articles
+
+
+def _make_db(tmp_path, unique=True):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'wechat.db'}"
+    db = SQLAlchemy(app)
+
+    class Article(db.Model):
+        __tablename__ = 'we_chat_article'
+        __table_args__ = (db.Index('uq_article_url', 'url', unique=unique),)
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(500), nullable=False)
+        content = db.Column(db.Text)
+        publish_date = db.Column(db.String(20))
+        author = db.Column(db.String(100))
+        source_account = db.Column(db.String(200), nullable=False)
+        url = db.Column(db.String(500))
+        summary = db.Column(db.Text)
+        keywords = db.Column(db.Text)
+        industry_relevance = db.Column(db.Text)
+        content_html = db.Column(db.Text)
+        created_at = db.Column(db.DateTime, default=datetime.now)
+        updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    return app, db, Article
+
+
+def _article(i, content='正文'):
+    return {
+        'title': f'文章{i}', 'content': content, 'publish_date': '2024-01-01', 'author': 'a',
+        'source_account': '成都发布', 'url': f'https://mp.weixin.qq.com/s/{i}', 'summary': '摘要',
+        'content_html': '<p></p>', 'keywords': ['人工智能'], 'industry_relevance': ['电子信息']
+    }
+
+
+def test_bulk_upsert_counts_and_round_trips(tmp_path):
+    app, db, Article = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        articles = [_article(i) for i in range(10)] + [{'title': 'no url', 'url': None}]
+        counts = upsert_wechat_articles(db.session, Article, articles, chunk_size=4)
+        assert counts == {'inserted': 10, 'updated': 0, 'skipped': 1}
+        # Three chunks: one IN lookup and one multi-row INSERT each
+        writes = [s for s in statements if s.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE'))
+                  and 'sqlite_master' not in s]
+        assert len(writes) == 6
+        assert Article.query.count() == 10
+
+        changed = [_article(i, content='新正文' if i % 2 else '正文') for i in range(10)] + [_article(10)]
+        counts = upsert_wechat_articles(db.session, Article, changed, chunk_size=100)
+        assert counts == {'inserted': 1, 'updated': 5, 'skipped': 5}
+        assert Article.query.filter_by(content='新正文').count() == 5
+        assert Article.query.filter_by(url='https://mp.weixin.qq.com/s/1').one().keywords == '人工智能'
+
+
+def test_duplicates_in_one_fetch_keep_the_last_copy(tmp_path):
+    app, db, Article = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+        counts = upsert_wechat_articles(db.session, Article, [_article(1, 'v1'), _article(1, 'v2')])
+        assert counts == {'inserted': 1, 'updated': 0, 'skipped': 1}
+        assert Article.query.one().content == 'v2'
+
+
+def test_deduplicate_keeps_newest_row_per_url(tmp_path):
+    app, db, Article = _make_db(tmp_path, unique=False)
+    with app.app_context():
+        db.create_all()
+        for content in ('old', 'new'):
+            db.session.add(Article(title='t', source_account='s', url='https://a', content=content))
+        db.session.add(Article(title='t', source_account='s', url=None))
+        db.session.add(Article(title='t', source_account='s', url=None))
+        db.session.commit()
+
+        assert deduplicate_wechat_articles(db.session, Article) == 1
+        assert [a.content for a in Article.query.filter_by(url='https://a')] == ['new']
+        assert Article.query.count() == 3
+
+
+def test_conflicting_insert_refreshes_updated_at(tmp_path):
+    app, db, Article = _make_db(tmp_path)
+    with app.app_context():
+        db.create_all()
+
+        written = []
+
+        def concurrent_writer(conn, cursor, statement, *args):
+            # Another worker stores the article between the lookup and the insert
+            if ' IN (' in statement and 'we_chat_article' in statement and not written:
+                written.append(statement)
+                cursor.connection.execute(
+                    "INSERT INTO we_chat_article (title, source_account, url, content, updated_at) "
+                    "VALUES ('t', 's', 'https://mp.weixin.qq.com/s/1', 'old', '2020-01-01 00:00:00')")
+        event.listen(db.engine, 'after_cursor_execute', concurrent_writer)
+
+        counts = upsert_wechat_articles(db.session, Article, [_article(1, '新正文')])
+        assert counts['inserted'] == 1
+        article = Article.query.one()
+        assert article.content == '新正文' and article.updated_at.year > 2020
+
+
+def test_upsert_without_unique_index(tmp_path):
+    app, db, Article = _make_db(tmp_path, unique=False)
+    with app.app_context():
+        db.create_all()
+        assert upsert_wechat_articles(db.session, Article, [_article(1)])['inserted'] == 1
+        counts = upsert_wechat_articles(db.session, Article, [_article(1, '新正文'), _article(2)])
+        assert counts == {'inserted': 1, 'updated': 1, 'skipped': 0}
+        assert Article.query.count() == 2
+        updated = Article.query.filter_by(url='https://mp.weixin.qq.com/s/1').one()
+        assert updated.updated_at > updated.created_at